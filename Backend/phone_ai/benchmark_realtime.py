@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+实时分析负载与延迟基准测试
+
+在本地启动 FastAPI 服务（uvicorn 子进程），向 /api/realtime/session/{id}/ws
+建立 N 个合成会话，按相机节奏推送 JPEG 帧缓冲，统计：
+- 画面到建议延迟（glass-to-advice）p50/p95/p99：缓冲最后一帧的采集时刻
+  到该缓冲的 cycle 消息到达客户端
+- 服务端 analysis_latency_ms 分布
+- 丢弃的缓冲（上一个缓冲未返回时相机侧丢帧）、未返回的缓冲
+- 服务进程每会话 CPU 与 RSS
+- 饱和曲线：会话数逐级增加，直到吞吐跟不上或丢帧
+
+全部离线运行，不依赖 Redis 或外部服务。
+
+用法：
+  python benchmark_realtime.py                              # 1,2,4,8 个合成会话，每级 20 秒
+  python benchmark_realtime.py --sessions 1 4 16 32 --duration 30
+  python benchmark_realtime.py --video data/x.mp4           # 使用录制视频的帧
+  python benchmark_realtime.py --url http://127.0.0.1:8000  # 压测已运行的服务（不统计 CPU/RSS）
+  python benchmark_realtime.py --json report.json           # 同时输出 JSON 报告
+  python benchmark_realtime.py --trace-sample-rate 0.1      # 服务端分阶段延迟（解码/光流/建议/发送...）
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import cv2
+import httpx
+import numpy as np
+from websockets.asyncio.client import connect
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+PROJECT_DIR = Path(__file__).parent
+
+
+# =============================================================================
+# 帧缓冲
+# =============================================================================
+
+def make_synthetic_frames(count: int, size=(640, 480)) -> list[np.ndarray]:
+    """合成帧：纹理背景缓慢平移并带手抖，画面中有一个运动主体"""
+    width, height = size
+    rng = np.random.default_rng(7)
+    texture = rng.integers(0, 255, (height + 120, width + 240, 3), dtype=np.uint8)
+    texture = cv2.GaussianBlur(texture, (0, 0), 6)
+    texture = cv2.normalize(texture, None, 0, 255, cv2.NORM_MINMAX)
+
+    frames = []
+    for i in range(count):
+        x = (i * 3) % 240
+        y = 60 + int(rng.integers(-4, 5))
+        frame = texture[y:y + height, x:x + width].copy()
+        cx = width // 3 + int(40 * np.sin(i / 10))
+        cv2.circle(frame, (cx, height // 2), height // 6, (240, 240, 240), -1)
+        frames.append(frame)
+    return frames
+
+
+def load_video_frames(path: str, count: int, size=(640, 480)) -> list[np.ndarray]:
+    """从录制视频读取前 count 帧并缩放到 size"""
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(cv2.resize(frame, size))
+    cap.release()
+    if not frames:
+        raise SystemExit(f"无法读取视频: {path}")
+    return frames
+
+
+def encode_buffers(frames: list[np.ndarray], buffer_size: int, fps: float, quality: int) -> list[str]:
+    """预先编码好的 "frames" 消息（JPEG + base64），发送时不再占用客户端 CPU"""
+    encoded = [
+        base64.b64encode(cv2.imencode(".jpg", f, [cv2.IMWRITE_JPEG_QUALITY, quality])[1]).decode()
+        for f in frames
+    ]
+    buffers = []
+    for start in range(0, max(len(encoded) - buffer_size + 1, 1), buffer_size):
+        chunk = encoded[start:start + buffer_size]
+        buffers.append(json.dumps({"type": "frames", "frames": chunk, "fps": fps}))
+    return buffers
+
+
+# =============================================================================
+# 服务进程
+# =============================================================================
+
+class ServerProcess:
+    """uvicorn 子进程；客户端与服务端不争抢同一个 GIL"""
+
+    def __init__(self, port: int, log: bool = False, trace_sample_rate: float = 0.0):
+        self.port = port
+        self.log = log
+        self.trace_sample_rate = trace_sample_rate
+        self.proc: Optional[subprocess.Popen] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "ServerProcess":
+        env = dict(
+            os.environ,
+            PYTHONPATH=str(PROJECT_DIR),
+            REALTIME_TRACE_SAMPLE_RATE=str(self.trace_sample_rate),
+        )
+        output = None if self.log else subprocess.DEVNULL
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.api.app:app",
+             "--host", "127.0.0.1", "--port", str(self.port), "--log-level", "warning"],
+            cwd=PROJECT_DIR, env=env, stdout=output, stderr=output,
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise SystemExit("服务启动失败（加 --server-log 查看日志）")
+            try:
+                httpx.get(self.base_url + "/", timeout=1.0)
+                return self
+            except httpx.HTTPError:
+                time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise SystemExit("服务启动超时")
+
+    def __exit__(self, *exc) -> None:
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+    def sample(self) -> Optional[tuple[float, float]]:
+        """(CPU 秒数, RSS 字节)；读取 /proc，非 Linux 返回 None"""
+        if self.proc is None:
+            return None
+        try:
+            stat = Path(f"/proc/{self.proc.pid}/stat").read_text().rsplit(")", 1)[1].split()
+            status = Path(f"/proc/{self.proc.pid}/status").read_text()
+        except OSError:
+            return None
+        cpu_s = (int(stat[11]) + int(stat[12])) / os.sysconf("SC_CLK_TCK")
+        rss_kb = next(int(line.split()[1]) for line in status.splitlines() if line.startswith("VmRSS:"))
+        return cpu_s, rss_kb * 1024.0
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# =============================================================================
+# 会话
+# =============================================================================
+
+@dataclass
+class SessionStats:
+    """单个合成会话的统计"""
+    sent: int = 0
+    dropped: int = 0  # 上一个缓冲未返回，相机侧丢弃
+    answered: int = 0  # 收到 cycle 消息
+    rejected: int = 0  # frame_ack 带 status（帧数不足、转发等）或 error
+    lost: int = 0  # 结束时仍未返回
+    advice: int = 0  # 收到的建议条数
+    glass_to_advice_ms: list[float] = field(default_factory=list)
+    analysis_latency_ms: list[float] = field(default_factory=list)
+
+
+async def run_session(
+    client: httpx.AsyncClient,
+    ws_base: str,
+    buffers: list[str],
+    interval_s: float,
+    duration_s: float,
+    max_in_flight: int,
+    drain_timeout_s: float,
+) -> SessionStats:
+    """一个相机会话：每 interval_s 推送一个缓冲，接收该缓冲的 cycle 消息"""
+    stats = SessionStats()
+    response = await client.post("/api/realtime/session")
+    response.raise_for_status()
+    session_id = response.json()["session_id"]
+
+    async with connect(
+        f"{ws_base}/api/realtime/session/{session_id}/ws?envelope=1",
+        max_size=None,
+        ping_interval=None,
+    ) as ws:
+        welcome = json.loads(await ws.recv())
+        assert welcome["type"] == "connected", welcome
+
+        # 已发送、尚未返回的缓冲的采集时刻（服务端按顺序处理）
+        in_flight: deque[float] = deque()
+        idle = asyncio.Event()
+        idle.set()
+
+        async def receive() -> None:
+            async for raw in ws:
+                now = time.perf_counter()
+                message = json.loads(raw)
+                msg_type = message.get("type")
+                if msg_type == "cycle" and message.get("ack") is not None:
+                    captured = in_flight.popleft()
+                    stats.answered += 1
+                    stats.advice += len(message["advice"])
+                    stats.glass_to_advice_ms.append((now - captured) * 1000)
+                    stats.analysis_latency_ms.append(message["ack"]["analysis_latency_ms"])
+                elif (msg_type == "frame_ack" and message.get("status")) or msg_type == "error":
+                    if in_flight:
+                        in_flight.popleft()
+                    stats.rejected += 1
+                else:
+                    continue
+                if not in_flight:
+                    idle.set()
+
+        receiver = asyncio.create_task(receive())
+        try:
+            # 各会话错开起始相位，避免所有缓冲同时到达
+            await asyncio.sleep(random.uniform(0, interval_s))
+            start = time.perf_counter()
+            tick = 0
+            while True:
+                captured = start + tick * interval_s
+                if captured - start >= duration_s:
+                    break
+                delay = captured - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if len(in_flight) >= max_in_flight:
+                    stats.dropped += 1
+                else:
+                    in_flight.append(captured)
+                    idle.clear()
+                    await ws.send(buffers[tick % len(buffers)])
+                    stats.sent += 1
+                tick += 1
+
+            try:
+                await asyncio.wait_for(idle.wait(), drain_timeout_s)
+            except asyncio.TimeoutError:
+                pass
+            stats.lost = len(in_flight)
+        finally:
+            receiver.cancel()
+    return stats
+
+
+# =============================================================================
+# 报告
+# =============================================================================
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(p50, 1), "p95": round(p95, 1), "p99": round(p99, 1), "max": round(max(values), 1)}
+
+
+async def run_step(
+    sessions: int,
+    base_url: str,
+    buffers: list[str],
+    args: argparse.Namespace,
+    server: Optional[ServerProcess],
+) -> dict:
+    """一级负载：sessions 个并发会话"""
+    ws_base = "ws" + base_url[len("http"):]
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        before = server.sample() if server else None
+        wall_start = time.perf_counter()
+        results = await asyncio.gather(*(
+            run_session(
+                client, ws_base, buffers,
+                interval_s=args.interval,
+                duration_s=args.duration,
+                max_in_flight=args.max_in_flight,
+                drain_timeout_s=args.drain_timeout,
+            )
+            for _ in range(sessions)
+        ))
+        wall_s = time.perf_counter() - wall_start
+        after = server.sample() if server else None
+        metrics = (await client.get("/api/realtime/metrics")).json()
+
+    glass = [v for s in results for v in s.glass_to_advice_ms]
+    analysis = [v for s in results for v in s.analysis_latency_ms]
+    offered = sum(s.sent + s.dropped for s in results)
+    answered = sum(s.answered for s in results)
+
+    step = {
+        "sessions": sessions,
+        "offered_buffers_per_s": round(offered / args.duration, 2),
+        "answered_per_s": round(answered / wall_s, 2),
+        "sent": sum(s.sent for s in results),
+        "dropped": sum(s.dropped for s in results),
+        "drop_rate": round(sum(s.dropped for s in results) / offered, 4) if offered else 0.0,
+        "rejected": sum(s.rejected for s in results),
+        "lost": sum(s.lost for s in results),
+        "advice": sum(s.advice for s in results),
+        "glass_to_advice_ms": percentiles(glass),
+        "analysis_latency_ms": percentiles(analysis),
+        "server_send_queue_dropped": metrics.get("send_queues", {}).get("dropped"),
+    }
+    if before and after:
+        cpu_pct = (after[0] - before[0]) / wall_s * 100
+        step["server_cpu_pct"] = round(cpu_pct, 1)
+        step["cpu_pct_per_session"] = round(cpu_pct / sessions, 2)
+        step["server_rss_mb"] = round(after[1] / 2**20, 1)
+        step["rss_mb_per_session"] = round((after[1] - before[1]) / 2**20 / sessions, 2)
+    return step
+
+
+def saturated(step: dict, args: argparse.Namespace) -> bool:
+    """丢帧率超过阈值，或 p95 延迟超过预算"""
+    p95 = step["glass_to_advice_ms"]["p95"]
+    return step["drop_rate"] > args.max_drop_rate or (p95 is not None and p95 > args.latency_budget_ms)
+
+
+def print_report(steps: list[dict], args: argparse.Namespace) -> None:
+    print()
+    print(f"{'会话':>4} {'提交/s':>7} {'返回/s':>7} {'丢弃%':>6} {'未返回':>5} "
+          f"{'G2A p50':>8} {'p95':>7} {'p99':>7} {'分析 p50':>8} {'p95':>7} "
+          f"{'CPU%/会话':>9} {'RSS MB/会话':>11}")
+    print("-" * 108)
+    for s in steps:
+        g, a = s["glass_to_advice_ms"], s["analysis_latency_ms"]
+        print(
+            f"{s['sessions']:>4} {s['offered_buffers_per_s']:>7.1f} {s['answered_per_s']:>7.1f} "
+            f"{s['drop_rate'] * 100:>6.1f} {s['lost']:>5} "
+            f"{_ms(g['p50']):>8} {_ms(g['p95']):>7} {_ms(g['p99']):>7} "
+            f"{_ms(a['p50']):>8} {_ms(a['p95']):>7} "
+            f"{_num(s.get('cpu_pct_per_session')):>9} {_num(s.get('rss_mb_per_session')):>11}"
+        )
+    print("-" * 108)
+
+    sustained = [s["sessions"] for s in steps if not saturated(s, args)]
+    first_saturated = next((s["sessions"] for s in steps if saturated(s, args)), None)
+    print(f"饱和判定：丢弃率 > {args.max_drop_rate * 100:.0f}% 或 glass-to-advice p95 > {args.latency_budget_ms:.0f}ms")
+    if sustained:
+        print(f"可持续会话数：{max(sustained)}")
+    if first_saturated is not None:
+        print(f"饱和点：{first_saturated} 个会话")
+    else:
+        print("未达到饱和，可增加 --sessions")
+
+
+def print_stages(tracing: Optional[dict]) -> None:
+    """服务端分阶段延迟（全部负载级别累计，需开启采样）"""
+    stages = (tracing or {}).get("stages")
+    if not stages:
+        return
+    print()
+    print(f"服务端分阶段延迟（采样 {tracing['sampled_cycles']} 个周期，单位 ms）")
+    print(f"{'阶段':<14} {'平均':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'最大':>8}")
+    for stage, h in stages.items():
+        print(f"{stage:<14} {h['avg_ms']:>8.2f} {h['p50_ms']:>8.2f} {h['p95_ms']:>8.2f} "
+              f"{h['p99_ms']:>8.2f} {h['max_ms']:>8.2f}")
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.0f}"
+
+
+def _num(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+# =============================================================================
+# 入口
+# =============================================================================
+
+async def run(
+    args: argparse.Namespace,
+    base_url: str,
+    server: Optional[ServerProcess],
+) -> tuple[list[dict], Optional[dict]]:
+    frame_count = max(args.buffer_size * 8, 64)
+    size = (args.width, args.height)
+    if args.video:
+        frames = load_video_frames(args.video, frame_count, size)
+    else:
+        frames = make_synthetic_frames(frame_count, size)
+    buffers = encode_buffers(frames, args.buffer_size, args.fps, args.jpeg_quality)
+    print(f"帧缓冲：{len(buffers)} 个 × {args.buffer_size} 帧 {size[0]}x{size[1]}，"
+          f"单条消息约 {len(buffers[0]) / 1024:.0f} KB，每 {args.interval}s 推送一个")
+
+    # 预热：首次分析会加载模型/初始化 OpenCV
+    await run_step(1, base_url, buffers, argparse.Namespace(**{**vars(args), "duration": args.interval * 2}), None)
+
+    steps = []
+    for sessions in args.sessions:
+        print(f"运行 {sessions} 个会话，{args.duration:.0f} 秒...")
+        step = await run_step(sessions, base_url, buffers, args, server)
+        steps.append(step)
+        if args.stop_at_saturation and saturated(step, args):
+            break
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        tracing = (await client.get("/api/realtime/metrics")).json().get("tracing")
+    return steps, tracing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="实时分析 WebSocket 负载与延迟基准测试")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8], help="各级并发会话数")
+    parser.add_argument("--duration", type=float, default=20.0, help="每级持续秒数")
+    parser.add_argument("--fps", type=float, default=30.0, help="帧率（写入帧缓冲消息）")
+    parser.add_argument("--interval", type=float, default=0.5, help="缓冲推送间隔（秒），与分析器采样间隔一致")
+    parser.add_argument("--buffer-size", type=int, default=8, help="每个缓冲的帧数")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--jpeg-quality", type=int, default=75)
+    parser.add_argument("--video", help="录制视频路径（默认使用合成帧）")
+    parser.add_argument("--max-in-flight", type=int, default=1, help="每会话未返回缓冲上限，超出则丢弃")
+    parser.add_argument("--drain-timeout", type=float, default=10.0, help="结束后等待未返回缓冲的秒数")
+    parser.add_argument("--max-drop-rate", type=float, default=0.01, help="饱和判定：丢弃率上限")
+    parser.add_argument("--latency-budget-ms", type=float, default=500.0, help="饱和判定：p95 延迟预算")
+    parser.add_argument("--stop-at-saturation", action="store_true", help="达到饱和后不再加压")
+    parser.add_argument("--url", help="已运行服务的地址（不启动子进程，不统计 CPU/RSS）")
+    parser.add_argument("--server-log", action="store_true", help="显示服务日志")
+    parser.add_argument("--trace-sample-rate", type=float, default=0.0,
+                        help="服务端分阶段追踪采样率（REALTIME_TRACE_SAMPLE_RATE，--url 时以服务配置为准）")
+    parser.add_argument("--json", help="JSON 报告输出路径")
+    args = parser.parse_args()
+
+    if args.url:
+        steps, tracing = asyncio.run(run(args, args.url.rstrip("/"), None))
+    else:
+        server = ServerProcess(free_port(), log=args.server_log, trace_sample_rate=args.trace_sample_rate)
+        with server:
+            steps, tracing = asyncio.run(run(args, server.base_url, server))
+
+    print_report(steps, args)
+    print_stages(tracing)
+    if args.json:
+        report = {
+            "config": {k: v for k, v in vars(args).items() if k != "json"},
+            "steps": steps,
+            "tracing": tracing,
+        }
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"报告已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -114,7 +114,39 @@ class SecuritySettings(BaseSettings):
     secret_key: str = Field(default="your-secret-key-change-in-production", alias="SECRET_KEY")
     algorithm: str = "HS256"
     access_token_expire_minutes: int = Field(default=30, alias="ACCESS_TOKEN_EXPIRE_MINUTES")
+    # Verified JWT claims cached per token (LRU)
+    token_cache_size: int = Field(default=1024, alias="TOKEN_CACHE_SIZE")
     rate_limit_per_minute: int = Field(default=100, alias="RATE_LIMIT_PER_MINUTE")
+    # Burst size (defaults to rate_limit_per_minute)
+    rate_limit_burst: Optional[int] = Field(default=None, alias="RATE_LIMIT_BURST")
+    # "memory" (per process) or "redis" (shared across API workers)
+    rate_limit_backend: str = Field(default="memory", alias="RATE_LIMIT_BACKEND")
+
+
+class RealtimeSettings(BaseSettings):
+    """Realtime shooting session configuration."""
+    
+    model_config = ConfigDict(extra="ignore")
+    
+    # "memory" (single worker) or "redis" (sessions shared across API workers)
+    session_backend: str = Field(default="memory", alias="REALTIME_SESSION_BACKEND")
+    # Owner worker lease; analysis moves to another worker if not renewed
+    owner_lease_s: float = Field(default=15.0, alias="REALTIME_OWNER_LEASE_S")
+    session_record_ttl_s: float = Field(default=3600.0, alias="REALTIME_SESSION_TTL_S")
+    # Session state snapshots for fast reconnection / worker migration
+    snapshot_interval_s: float = Field(default=2.0, alias="REALTIME_SNAPSHOT_INTERVAL_S")
+    # Defaults to the client reconnection backoff window plus the empty-session grace period
+    snapshot_ttl_s: Optional[float] = Field(default=None, alias="REALTIME_SNAPSHOT_TTL_S")
+    snapshot_max_entries: int = Field(default=1024, alias="REALTIME_SNAPSHOT_MAX_ENTRIES")
+    # Local directory shared by workers on the same host (memory only if unset)
+    snapshot_dir: Optional[str] = Field(default=None, alias="REALTIME_SNAPSHOT_DIR")
+    # Per-client outbound queue; telemetry/info are latest-wins, critical advice is never dropped
+    send_queue_size: int = Field(default=32, alias="REALTIME_SEND_QUEUE_SIZE")
+    # "disconnect": close clients that keep overflowing; "drop": only drop droppable messages
+    slow_consumer_policy: str = Field(default="disconnect", alias="REALTIME_SLOW_CONSUMER_POLICY")
+    slow_consumer_timeout_s: float = Field(default=10.0, alias="REALTIME_SLOW_CONSUMER_TIMEOUT_S")
+    # Fraction of analysis cycles traced per stage (0 = off; ?debug=1 sessions always traced)
+    trace_sample_rate: float = Field(default=0.0, alias="REALTIME_TRACE_SAMPLE_RATE")
 
 
 class Settings(BaseSettings):
@@ -138,6 +170,7 @@ class Settings(BaseSettings):
     llm: LLMSettings = LLMSettings()
     mm_llm: MMHLLMSettings = MMHLLMSettings()
     security: SecuritySettings = SecuritySettings()
+    realtime: RealtimeSettings = RealtimeSettings()
 
 
 # Global settings instance
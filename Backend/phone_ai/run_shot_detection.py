@@ -16,9 +16,14 @@ from typing import List, Dict, Tuple
 sys.path.insert(0, str(Path(__file__).parent))
 
 from src.models.enums import MotionType
+from src.services.shot_boundary import find_cuts, histogram_distances
 
 
-def detect_shot_boundaries(video_path: str, threshold: float = 30.0) -> List[Tuple[float, float]]:
+def detect_shot_boundaries(
+    video_path: str,
+    threshold: float = 30.0,
+    streaming: bool = True,
+) -> List[Tuple[float, float]]:
     """
     检测镜头切换边界。
     
@@ -27,55 +32,23 @@ def detect_shot_boundaries(video_path: str, threshold: float = 30.0) -> List[Tup
     Args:
         video_path: 视频路径
         threshold: 切换检测阈值（越大越不敏感）
+        streaming: 流式模式（内存占用与视频长度无关）
         
     Returns:
         镜头列表 [(start_time, end_time), ...]
     """
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        raise ValueError(f"无法打开视频: {video_path}")
-    
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    # 分批低分辨率读取 + 向量化直方图差异（见 src/services/shot_boundary.py）
+    frame_indices, frame_diffs, fps, total_frames = histogram_distances(
+        video_path, metric="chisqr", streaming=streaming
+    )
     duration = total_frames / fps
     
     print(f"视频信息: {duration:.2f}秒, {fps:.0f}fps, {total_frames}帧")
     print(f"镜头切换检测阈值: {threshold}")
     print("-" * 60)
     
-    # 读取所有帧的直方图
-    prev_hist = None
-    frame_diffs = []
-    frame_idx = 0
-    
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        # 转换为HSV并计算直方图
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        hist = cv2.calcHist([hsv], [0, 1], None, [50, 60], [0, 180, 0, 256])
-        hist = cv2.normalize(hist, hist).flatten()
-        
-        if prev_hist is not None:
-            # 计算直方图差异（使用相关性）
-            diff = cv2.compareHist(prev_hist, hist, cv2.HISTCMP_CHISQR)
-            frame_diffs.append((frame_idx, diff))
-        
-        prev_hist = hist
-        frame_idx += 1
-    
-    cap.release()
-    
-    # 找到切换点（差异超过阈值的帧）
-    cut_frames = [0]  # 开始帧
-    
-    for idx, diff in frame_diffs:
-        if diff > threshold:
-            # 避免连续检测
-            if idx - cut_frames[-1] > fps * 0.5:  # 至少间隔0.5秒
-                cut_frames.append(idx)
+    # 找到切换点（差异超过阈值的帧，至少间隔0.5秒）
+    cut_frames = find_cuts(frame_indices, frame_diffs, threshold, min_gap_frames=fps * 0.5)
     
     cut_frames.append(total_frames)  # 结束帧
     
@@ -14,6 +14,7 @@ from configs.settings import settings
 from src.api.routes import router
 from src.api.realtime_routes import router as realtime_router, router_v1 as realtime_router_v1
 from src.api.auth import rate_limiter
+from src.realtime.websocket_handler import get_session_manager
 
 
 # Configure logging
@@ -29,7 +30,10 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
     logger.info("Starting Video Shooting Assistant API")
+    session_manager = get_session_manager()
+    await session_manager.start()
     yield
+    await session_manager.stop()
     logger.info("Shutting down Video Shooting Assistant API")
 
 
@@ -63,6 +67,9 @@ async def add_rate_limit_headers(request: Request, call_next):
     
     # Add rate limit info headers
     response.headers["X-RateLimit-Limit"] = str(settings.security.rate_limit_per_minute)
+    remaining = getattr(request.state, "rate_limit_remaining", None)
+    if remaining is not None:
+        response.headers["X-RateLimit-Remaining"] = str(remaining)
     
     return response
 
@@ -7,10 +7,15 @@ Requirements covered:
 - 10.4: Implement rate limiting (100 req/min/user)
 - 10.5: Implement JWT-based authentication
 """
+import hashlib
+import heapq
+import logging
+import math
+import threading
 import time
-from collections import defaultdict
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, NamedTuple, Optional, Union
 
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
@@ -28,12 +33,17 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = settings.security.secret_key
 ALGORITHM = settings.security.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.security.access_token_expire_minutes
+TOKEN_CACHE_SIZE = settings.security.token_cache_size
 
 # Rate limiting settings
 RATE_LIMIT_PER_MINUTE = settings.security.rate_limit_per_minute
+RATE_LIMIT_BURST = settings.security.rate_limit_burst
 
-# Security scheme
+# Security schemes
 security = HTTPBearer(auto_error=False)
+bearer_scheme = HTTPBearer()
+
+logger = logging.getLogger(__name__)
 
 
 # =========================================================================
@@ -93,10 +103,125 @@ def create_access_token(
     return encoded_jwt
 
 
+class TokenCache:
+    """
+    Bounded LRU cache of verified JWT claims.
+    
+    Polling clients send the same token many times per minute; caching the
+    verified claims (keyed by a SHA-256 of the token, never the token itself)
+    skips signature verification on repeat requests. Entries expire slightly
+    before the token's own ``exp``, so an expired token is never accepted.
+    Revoked tokens are remembered until their ``exp`` so they stay rejected
+    after their cache entry is gone.
+    """
+    
+    def __init__(
+        self,
+        max_size: int = TOKEN_CACHE_SIZE,
+        expiry_margin: float = 1.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Initialize token cache.
+        
+        Args:
+            max_size: Maximum number of cached tokens
+            expiry_margin: Seconds before ``exp`` at which entries are dropped
+            clock: Time source (epoch seconds, same base as ``exp``)
+        """
+        self.max_size = max_size
+        self.expiry_margin = expiry_margin
+        self._clock = clock
+        # token hash -> (claims, expires_at), least recently used first
+        self._entries: OrderedDict[bytes, tuple[TokenData, float]] = OrderedDict()
+        # token hash -> exp
+        self._revoked: dict[bytes, float] = {}
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.verifications = 0
+        self.failures = 0
+    
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+    
+    def get(self, token: str) -> Optional[TokenData]:
+        """Return cached claims, or None if not cached or about to expire."""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+    
+    def put(self, token: str, claims: TokenData, exp: float) -> None:
+        """Cache verified claims until just before ``exp``."""
+        expires_at = exp - self.expiry_margin
+        if expires_at <= self._clock():
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def revoke(self, token: str, exp: float) -> None:
+        """Reject the token from now on, until it expires by itself."""
+        key = self._key(token)
+        with self._lock:
+            self._entries.pop(key, None)
+            now = self._clock()
+            self._revoked = {k: e for k, e in self._revoked.items() if e > now}
+            self._revoked[key] = exp
+    
+    def is_revoked(self, token: str) -> bool:
+        """Check whether the token was revoked."""
+        if not self._revoked:
+            return False
+        with self._lock:
+            return self._key(token) in self._revoked
+    
+    def metrics(self) -> dict:
+        """Cache and verification counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "verifications": self.verifications,
+            "failures": self.failures,
+            "revoked": len(self._revoked),
+        }
+
+
+# Global token cache instance
+token_cache = TokenCache()
+
+
+def _invalid_token(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
 def verify_token(token: str) -> TokenData:
     """
     Verify and decode a JWT token.
     
+    Verified claims are served from ``token_cache`` on repeat requests.
+    
     Args:
         token: JWT token string
         
@@ -104,8 +229,16 @@ def verify_token(token: str) -> TokenData:
         TokenData with decoded payload
         
     Raises:
-        HTTPException: If token is invalid or expired
+        HTTPException: If token is invalid, expired or revoked
     """
+    if token_cache.is_revoked(token):
+        raise _invalid_token("Invalid token: revoked")
+    
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+    
+    token_cache.verifications += 1
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
@@ -113,15 +246,15 @@ def verify_token(token: str) -> TokenData:
         exp: datetime = datetime.fromtimestamp(payload.get("exp", 0))
         
         if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token: missing user_id",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+            token_cache.failures += 1
+            raise _invalid_token("Invalid token: missing user_id")
         
-        return TokenData(user_id=user_id, username=username, exp=exp)
+        token_data = TokenData(user_id=user_id, username=username, exp=exp)
+        token_cache.put(token, token_data, payload.get("exp", 0))
+        return token_data
         
     except JWTError as e:
+        token_cache.failures += 1
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Invalid token: {str(e)}",
@@ -129,6 +262,20 @@ def verify_token(token: str) -> TokenData:
         )
 
 
+def revoke_token(token: str) -> None:
+    """
+    Revoke a token (e.g. on logout).
+    
+    Args:
+        token: JWT token string
+        
+    Raises:
+        HTTPException: If token is invalid or expired
+    """
+    token_data = verify_token(token)
+    token_cache.revoke(token, token_data.exp.timestamp())
+
+
 def hash_password(password: str) -> str:
     """Hash a password."""
     return pwd_context.hash(password)
@@ -143,33 +290,90 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 # Rate Limiting
 # =========================================================================
 
+class RateLimitResult(NamedTuple):
+    """Outcome of a single rate limit check."""
+    allowed: bool
+    remaining: int
+    retry_after: int
+
+
 class RateLimiter:
     """
     In-memory rate limiter.
     
-    Implements a sliding window rate limiting algorithm.
-    For production, consider using Redis-based rate limiting.
+    Implements the generic cell rate algorithm (GCRA), an equivalent
+    formulation of a token bucket: each key stores a single "theoretical
+    arrival time" (TAT) instead of a list of request timestamps, so every
+    check is O(1) in time and memory. A key whose TAT has passed holds a
+    full bucket and carries no information, so it is evicted.
     
     Requirement 10.4: Rate limiting of 100 requests per minute per user.
     """
     
-    def __init__(self, requests_per_minute: int = RATE_LIMIT_PER_MINUTE):
+    def __init__(
+        self,
+        requests_per_minute: int = RATE_LIMIT_PER_MINUTE,
+        burst: Optional[int] = RATE_LIMIT_BURST,
+        clock: Callable[[], float] = time.monotonic,
+    ):
         """
         Initialize rate limiter.
         
         Args:
-            requests_per_minute: Maximum requests allowed per minute
+            requests_per_minute: Sustained requests allowed per minute
+            burst: Requests allowed back-to-back (defaults to requests_per_minute)
+            clock: Time source in seconds
         """
         self.requests_per_minute = requests_per_minute
         self.window_size = 60  # 1 minute in seconds
-        self._requests: dict[str, list[float]] = defaultdict(list)
+        self.burst = burst or requests_per_minute
+        # Seconds between requests at the sustained rate
+        self.emission_interval = self.window_size / requests_per_minute
+        # How far the TAT may run ahead of now
+        self.capacity = self.emission_interval * self.burst
+        self._clock = clock
+        # key -> TAT
+        self._tat: dict[str, float] = {}
+        # (TAT, key) min-heap for eviction, one entry per key; an entry
+        # may lag behind its key's current TAT
+        self._expiry: list[tuple[float, str]] = []
+        self._lock = threading.Lock()
     
-    def _clean_old_requests(self, key: str, current_time: float) -> None:
-        """Remove requests outside the current window."""
-        cutoff = current_time - self.window_size
-        self._requests[key] = [
-            t for t in self._requests[key] if t > cutoff
-        ]
+    def __len__(self) -> int:
+        return len(self._tat)
+    
+    def check(self, key: str) -> RateLimitResult:
+        """
+        Consume one request for the given key.
+        
+        Args:
+            key: Identifier for rate limiting (e.g., user_id or IP)
+            
+        Returns:
+            RateLimitResult for this request
+        """
+        with self._lock:
+            now = self._clock()
+            tat = max(self._tat.get(key, now), now)
+            new_tat = tat + self.emission_interval
+            used = new_tat - now
+            
+            if used > self.capacity:
+                retry_after = math.ceil(used - self.capacity)
+                self._evict_idle(now)
+                return RateLimitResult(False, 0, retry_after)
+            
+            if key not in self._tat:
+                heapq.heappush(self._expiry, (new_tat, key))
+            self._tat[key] = new_tat
+            self._evict_idle(now)
+            
+            remaining = int((self.capacity - used) // self.emission_interval)
+            return RateLimitResult(True, remaining, 0)
+    
+    async def acquire(self, key: str) -> RateLimitResult:
+        """Async variant of check(), shared interface with RedisRateLimiter."""
+        return self.check(key)
     
     def is_allowed(self, key: str) -> tuple[bool, int]:
         """
@@ -181,38 +385,138 @@ class RateLimiter:
         Returns:
             Tuple of (is_allowed, remaining_requests)
         """
-        current_time = time.time()
-        self._clean_old_requests(key, current_time)
+        result = self.check(key)
+        return result.allowed, result.remaining
+    
+    def get_retry_after(self, key: str) -> int:
+        """
+        Get seconds until the next request for the key would be allowed.
         
-        request_count = len(self._requests[key])
-        remaining = max(0, self.requests_per_minute - request_count)
+        Args:
+            key: Identifier for rate limiting
+            
+        Returns:
+            Seconds to wait (0 if a request is allowed now)
+        """
+        with self._lock:
+            tat = self._tat.get(key)
+            if tat is None:
+                return 0
+            used = tat + self.emission_interval - self._clock()
+            return max(0, math.ceil(used - self.capacity))
+    
+    def _evict_idle(self, now: float) -> None:
+        """
+        Drop keys whose bucket has refilled.
         
-        if request_count >= self.requests_per_minute:
-            return False, 0
+        Keys are ordered by TAT, so the scan stops at the first key that is
+        still limited no matter how recently other keys were used. A heap
+        entry older than its key's TAT is pushed back with the current TAT;
+        that happens at most once per TAT update, which keeps the amortized
+        cost per check O(log n).
+        """
+        while self._expiry and self._expiry[0][0] <= now:
+            _, key = self._expiry[0]
+            tat = self._tat[key]
+            if tat <= now:
+                heapq.heappop(self._expiry)
+                del self._tat[key]
+            else:
+                heapq.heapreplace(self._expiry, (tat, key))
+
+
+# Atomic GCRA step: reads the TAT, decides, and writes it back in one round trip.
+# Uses the Redis server clock so every API worker agrees on "now".
+_GCRA_LUA = """
+if redis.replicate_commands then redis.replicate_commands() end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then tat = now end
+local new_tat = tat + interval
+local used = new_tat - now
+if used > capacity then
+    return {0, 0, math.ceil(used - capacity)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil(used * 1000))
+return {1, math.floor((capacity - used) / interval), 0}
+"""
+
+
+class RedisRateLimiter:
+    """
+    Redis-backed GCRA rate limiter.
+    
+    Same algorithm as RateLimiter, with the TAT stored in Redis so the
+    limit is shared by all API workers. Each key expires as soon as its
+    bucket is full again. If Redis is unreachable, checks fall back to a
+    per-process RateLimiter rather than rejecting traffic.
+    """
+    
+    def __init__(
+        self,
+        url: str = settings.redis.url,
+        requests_per_minute: int = RATE_LIMIT_PER_MINUTE,
+        burst: Optional[int] = RATE_LIMIT_BURST,
+        key_prefix: str = "ratelimit:",
+    ):
+        """
+        Initialize Redis rate limiter.
         
-        self._requests[key].append(current_time)
-        return True, remaining - 1
+        Args:
+            url: Redis connection URL
+            requests_per_minute: Sustained requests allowed per minute
+            burst: Requests allowed back-to-back (defaults to requests_per_minute)
+            key_prefix: Prefix for Redis keys
+        """
+        self.url = url
+        self.key_prefix = key_prefix
+        self.fallback = RateLimiter(requests_per_minute, burst)
+        self._client = None
+        self._script = None
     
-    def get_retry_after(self, key: str) -> int:
+    def _get_script(self):
+        """Lazily create the client and register the Lua script."""
+        if self._script is None:
+            import redis.asyncio as aioredis
+            
+            self._client = aioredis.from_url(self.url)
+            self._script = self._client.register_script(_GCRA_LUA)
+        return self._script
+    
+    async def acquire(self, key: str) -> RateLimitResult:
         """
-        Get seconds until rate limit resets.
+        Consume one request for the given key.
         
         Args:
-            key: Identifier for rate limiting
+            key: Identifier for rate limiting (e.g., user_id or IP)
             
         Returns:
-            Seconds until oldest request expires
+            RateLimitResult for this request
         """
-        if not self._requests[key]:
-            return 0
+        try:
+            allowed, remaining, retry_after = await self._get_script()(
+                keys=[self.key_prefix + key],
+                args=[self.fallback.emission_interval, self.fallback.capacity],
+            )
+        except Exception as e:
+            logger.warning(f"Redis rate limiter unavailable, using local limits: {e}")
+            return self.fallback.check(key)
         
-        oldest_request = min(self._requests[key])
-        retry_after = int(oldest_request + self.window_size - time.time())
-        return max(0, retry_after)
+        return RateLimitResult(bool(allowed), int(remaining), int(retry_after))
+
+
+def create_rate_limiter() -> Union[RateLimiter, RedisRateLimiter]:
+    """Create the rate limiter selected by RATE_LIMIT_BACKEND."""
+    if settings.security.rate_limit_backend == "redis":
+        return RedisRateLimiter()
+    return RateLimiter()
 
 
 # Global rate limiter instance
-rate_limiter = RateLimiter()
+rate_limiter = create_rate_limiter()
 
 
 # =========================================================================
@@ -245,7 +549,7 @@ async def get_current_user(
 
 
 async def require_auth(
-    credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer()),
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
 ) -> User:
     """
     Require authentication - raises 401 if not authenticated.
@@ -298,10 +602,11 @@ async def rate_limit_check(
         else:
             key = f"ip:{request.client.host if request.client else 'unknown'}"
     
-    is_allowed, remaining = rate_limiter.is_allowed(key)
+    result = await rate_limiter.acquire(key)
+    request.state.rate_limit_remaining = result.remaining
     
-    if not is_allowed:
-        retry_after = rate_limiter.get_retry_after(key)
+    if not result.allowed:
+        retry_after = result.retry_after
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail={
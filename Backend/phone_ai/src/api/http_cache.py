@@ -0,0 +1,197 @@
+"""
+HTTP response caching for polled result endpoints.
+
+Clients poll analysis results repeatedly while nothing changes. This module
+provides:
+- ETag / If-None-Match handling, so unchanged resources answer 304 without
+  touching the result columns at all
+- A bounded LRU of serialized (and pre-gzipped) response bodies keyed by
+  ETag, so repeat fetches of finished results skip DB decode, JSON
+  encoding and compression
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple, Optional
+
+from fastapi import Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+
+
+class EncodedBody(NamedTuple):
+    """A serialized response body with its optional gzip form."""
+    raw: bytes
+    gzipped: Optional[bytes]
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Build a weak ETag from version-identifying parts.
+
+    The same version is served gzipped or as identity depending on
+    Accept-Encoding; the bodies are equivalent but not byte-identical, so
+    the validator is weak.
+
+    Args:
+        parts: Values that change whenever the representation changes
+            (e.g. id, status, updated_at)
+
+    Returns:
+        Weak ETag string (W/"...")
+    """
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check the request's If-None-Match header against an ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [c.strip() for c in header.split(",")]
+    # Weak comparison: W/"x" matches "x"
+    opaque = etag.removeprefix("W/")
+    return any(c.removeprefix("W/") == opaque for c in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    """Build a 304 response."""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
+
+
+def encode_body(content: Any) -> EncodedBody:
+    """Serialize content to JSON and gzip it if it is large enough."""
+    raw = JSONResponse(content=jsonable_encoder(content)).body
+    gzipped = gzip.compress(raw, GZIP_LEVEL) if len(raw) >= GZIP_MIN_SIZE else None
+    return EncodedBody(raw, gzipped)
+
+
+def encoded_response(
+    request: Request,
+    body: EncodedBody,
+    etag: str,
+    status_code: int = status.HTTP_200_OK,
+) -> Response:
+    """Serve an encoded body, choosing gzip if the client accepts it."""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    content = body.raw
+    if body.gzipped is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        content = body.gzipped
+        headers["Content-Encoding"] = "gzip"
+    return Response(
+        content=content,
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+class ResponseCache:
+    """
+    Bounded LRU of encoded response bodies keyed by ETag.
+
+    Because the ETag changes whenever the underlying row changes, entries
+    never need explicit invalidation; stale versions simply age out.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize response cache.
+
+        Args:
+            max_entries: Maximum number of cached bodies
+            max_bytes: Maximum total size of cached bodies (raw + gzip)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, EncodedBody] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _size(body: EncodedBody) -> int:
+        return len(body.raw) + len(body.gzipped or b"")
+
+    def get(self, etag: str) -> Optional[EncodedBody]:
+        """Return the cached body for an ETag, if any."""
+        with self._lock:
+            body = self._entries.get(etag)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(etag)
+            self.hits += 1
+            return body
+
+    def put(self, etag: str, body: EncodedBody) -> None:
+        """Cache a body, evicting least recently used entries as needed."""
+        size = self._size(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(etag, None)
+            if old is not None:
+                self._bytes -= self._size(old)
+            self._entries[etag] = body
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._size(evicted)
+
+    def get_or_encode(
+        self,
+        etag: str,
+        build: Callable[[], Any],
+        cacheable: bool = True,
+    ) -> EncodedBody:
+        """
+        Return the cached body for an ETag, or build, encode and cache it.
+
+        Args:
+            etag: ETag of the current representation
+            build: Produces the response content on a miss
+            cacheable: Whether to store the encoded body
+
+        Returns:
+            Encoded body
+        """
+        body = self.get(etag)
+        if body is None:
+            body = encode_body(build())
+            if cacheable:
+                self.put(etag, body)
+        return body
+
+    def metrics(self) -> dict:
+        """Cache counters."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global cache for analysis result responses
+response_cache = ResponseCache()
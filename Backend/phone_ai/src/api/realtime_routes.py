@@ -43,6 +43,7 @@ class CreateSessionResponse(BaseModel):
     session_id: str
     ws_url: str
     message: str
+    worker_id: Optional[str] = None  # Session-affinity hint
 
 
 class SessionInfoResponse(BaseModel):
@@ -90,14 +91,15 @@ async def create_shooting_session():
     session_id = str(uuid.uuid4())[:8].upper()
     
     session_manager = get_session_manager()
-    session_manager.create_session(session_id)
+    await session_manager.register_session(session_id)
     
     logger.info(f"Created shooting session {session_id}")
     
     return CreateSessionResponse(
         session_id=session_id,
         ws_url=f"/api/realtime/session/{session_id}/ws",
-        message="Session created successfully"
+        message="Session created successfully",
+        worker_id=session_manager.worker_id
     )
 
 
@@ -107,14 +109,15 @@ async def create_shooting_session_v1():
     session_id = str(uuid.uuid4())[:8].upper()
     
     session_manager = get_session_manager()
-    session_manager.create_session(session_id)
+    await session_manager.register_session(session_id)
     
     logger.info(f"Created shooting session {session_id} (v1)")
     
     return CreateSessionResponse(
         session_id=session_id,
         ws_url=f"/v1/realtime/session/{session_id}/ws",
-        message="Session created successfully"
+        message="Session created successfully",
+        worker_id=session_manager.worker_id
     )
 
 
@@ -133,9 +136,9 @@ async def get_session_info(session_id: str):
         Session information including metrics
     """
     session_manager = get_session_manager()
-    session = session_manager.get_session(session_id)
+    record = await session_manager.find_session(session_id)
     
-    if session is None:
+    if record is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={
@@ -144,15 +147,24 @@ async def get_session_info(session_id: str):
             }
         )
     
-    clients = session_manager.get_clients(session_id)
+    # Live stats when this worker owns the session, shared record otherwise
+    session = session_manager.get_session(session_id)
+    if session is not None and record.owner == session_manager.worker_id:
+        motion_state = session.motion_state.value
+        total_analyses = session.total_analyses
+        avg_latency_ms = session.avg_latency_ms
+    else:
+        motion_state = record.motion_state
+        total_analyses = record.total_analyses
+        avg_latency_ms = record.avg_latency_ms
     
     return SessionInfoResponse(
-        session_id=session.session_id,
-        created_at=session.created_at,
-        motion_state=session.motion_state.value,
-        total_analyses=session.total_analyses,
-        avg_latency_ms=session.avg_latency_ms,
-        active_clients=len(clients)
+        session_id=session_id,
+        created_at=record.created_at,
+        motion_state=motion_state,
+        total_analyses=total_analyses,
+        avg_latency_ms=avg_latency_ms,
+        active_clients=record.total_clients
     )
 
 
@@ -168,9 +180,9 @@ async def delete_session(session_id: str):
         session_id: Session identifier
     """
     session_manager = get_session_manager()
-    session = session_manager.get_session(session_id)
+    record = await session_manager.find_session(session_id)
     
-    if session is None:
+    if record is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={
@@ -179,7 +191,7 @@ async def delete_session(session_id: str):
             }
         )
     
-    session_manager.delete_session(session_id)
+    await session_manager.close_session(session_id)
     logger.info(f"Deleted shooting session {session_id}")
 
 
@@ -204,9 +216,9 @@ async def push_advice(session_id: str, advice: AdvicePushRequest):
         Number of clients notified
     """
     session_manager = get_session_manager()
-    session = session_manager.get_session(session_id)
+    record = await session_manager.find_session(session_id)
     
-    if session is None:
+    if record is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={
@@ -215,8 +227,6 @@ async def push_advice(session_id: str, advice: AdvicePushRequest):
             }
         )
     
-    clients = session_manager.get_clients(session_id)
-    
     # Create advice payload
     from src.realtime.types import AdvicePayload, AdvicePriority, AdviceCategory
     
@@ -240,17 +250,38 @@ async def push_advice(session_id: str, advice: AdvicePushRequest):
         trigger_haptic=advice.trigger_haptic,
     )
     
-    # Broadcast to all clients
-    handler = create_websocket_handler()
-    import asyncio
-    await handler._broadcast_advice(session_id, [advice_payload])
+    # Broadcast to all clients, including those connected to other workers
+    await session_manager.start()
+    await session_manager.broadcast(session_id, advice_payload.to_dict())
     
     return AdvicePushResponse(
         success=True,
-        clients_notified=len(clients)
+        clients_notified=record.total_clients
     )
 
 
+@router.get("/metrics")
+async def get_realtime_metrics():
+    """
+    Realtime session metrics for this worker.
+    
+    Returns:
+        Local session count, outbound message counters, fan-out bus
+        counters, snapshot store counters/timings and per-stage latency
+        histograms of traced analysis cycles
+    """
+    session_manager = get_session_manager()
+    return {
+        "worker_id": session_manager.worker_id,
+        "sessions": session_manager.get_session_count(),
+        "outbound": dict(session_manager.outbound_metrics),
+        "send_queues": session_manager.queue_metrics(),
+        "bus": session_manager.bus.metrics(),
+        "snapshots": session_manager.snapshots.metrics(),
+        "tracing": session_manager.tracer.metrics(),
+    }
+
+
 # Temporarily disabled - missing request model definition
 # @router.post("/analyze")
 # async def analyze_frames(request: dict):
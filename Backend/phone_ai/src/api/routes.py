@@ -28,10 +28,12 @@ from fastapi import (
     Form,
     HTTPException,
     Query,
+    Request,
     UploadFile,
     status,
 )
 from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
@@ -45,6 +47,13 @@ from src.tasks.analysis_tasks import (
     get_queue_length,
     estimate_wait_time,
 )
+from src.api.http_cache import (
+    encoded_response,
+    etag_matches,
+    make_etag,
+    not_modified,
+    response_cache,
+)
 from src.api.auth import (
     User,
     Token,
@@ -52,6 +61,9 @@ from src.api.auth import (
     require_auth,
     rate_limit_check,
     generate_token_for_user,
+    revoke_token,
+    token_cache,
+    bearer_scheme,
 )
 
 
@@ -259,6 +271,44 @@ async def upload_video(
     )
 
 
+def _get_task_version(db: Session, video_id: str) -> tuple:
+    """
+    Load only the columns that identify the current version of a task.
+    
+    The large JSONB output columns are not read here, so conditional
+    requests answered with 304 never decode them.
+    
+    Returns:
+        Tuple of (task id, status, updated_at)
+        
+    Raises:
+        HTTPException: If no task exists for the video
+    """
+    row = db.query(
+        AnalysisTask.id,
+        AnalysisTask.status,
+        AnalysisTask.updated_at,
+    ).filter(
+        AnalysisTask.video_id == video_id
+    ).first()
+    
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "error_code": "VIDEO_NOT_FOUND",
+                "message": f"No analysis found for video_id: {video_id}",
+            }
+        )
+    
+    return tuple(row)
+
+
+def _is_final(task_status: str) -> bool:
+    """Whether a task status will no longer change."""
+    return task_status in (TaskStatus.COMPLETED.value, TaskStatus.FAILED.value)
+
+
 @router.get(
     "/analysis/{video_id}",
     response_model=AnalysisResponse,
@@ -270,6 +320,7 @@ async def upload_video(
 )
 async def get_analysis(
     video_id: str,
+    request: Request,
     db: Session = Depends(get_db),
     user: Optional[User] = Depends(get_current_user),
 ):
@@ -279,33 +330,31 @@ async def get_analysis(
     Requirement 9.2: GET /api/analysis/{video_id} endpoint.
     
     Returns the full analysis results including all intermediate outputs
-    from each pipeline stage.
+    from each pipeline stage. Supports If-None-Match (304) and serves
+    finished results from the encoded response cache.
     """
-    task = db.query(AnalysisTask).filter(
-        AnalysisTask.video_id == video_id
-    ).first()
-    
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={
-                "error_code": "VIDEO_NOT_FOUND",
-                "message": f"No analysis found for video_id: {video_id}",
-            }
+    version = _get_task_version(db, video_id)
+    etag = make_etag("analysis", *version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    def build():
+        task = db.get(AnalysisTask, version[0])
+        return AnalysisResponse(
+            video_id=task.video_id,
+            status=task.status,
+            created_at=task.created_at,
+            completed_at=task.completed_at,
+            error_message=task.error_message,
+            uploader_output=task.uploader_output,
+            feature_output=task.feature_output,
+            heuristic_output=task.heuristic_output,
+            metadata_output=task.metadata_output,
+            instruction_card=task.instruction_card,
         )
     
-    return AnalysisResponse(
-        video_id=task.video_id,
-        status=task.status,
-        created_at=task.created_at,
-        completed_at=task.completed_at,
-        error_message=task.error_message,
-        uploader_output=task.uploader_output,
-        feature_output=task.feature_output,
-        heuristic_output=task.heuristic_output,
-        metadata_output=task.metadata_output,
-        instruction_card=task.instruction_card,
-    )
+    body = response_cache.get_or_encode(etag, build, cacheable=_is_final(version[1]))
+    return encoded_response(request, body, etag)
 
 
 @router.get(
@@ -320,6 +369,7 @@ async def get_analysis(
 )
 async def get_suggestions(
     video_id: str,
+    request: Request,
     db: Session = Depends(get_db),
     user: Optional[User] = Depends(get_current_user),
 ):
@@ -329,60 +379,62 @@ async def get_suggestions(
     Requirement 9.3: GET /api/suggestions/{video_id} endpoint.
     
     Returns the three-layer instruction card with confidence information.
+    Supports If-None-Match (304) and serves finished results from the
+    encoded response cache.
     """
-    task = db.query(AnalysisTask).filter(
-        AnalysisTask.video_id == video_id
-    ).first()
-    
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={
-                "error_code": "VIDEO_NOT_FOUND",
-                "message": f"No analysis found for video_id: {video_id}",
-            }
-        )
+    version = _get_task_version(db, video_id)
+    task_status = version[1]
+    etag = make_etag("suggestions", *version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
     # Check if analysis is complete
-    if task.status != TaskStatus.COMPLETED.value:
+    if task_status != TaskStatus.COMPLETED.value:
         return JSONResponse(
             status_code=status.HTTP_202_ACCEPTED,
             content={
                 "video_id": video_id,
-                "status": task.status,
+                "status": task_status,
                 "confidence": None,
                 "confidence_action": None,
                 "confidence_message": "Analysis in progress",
                 "instruction_card": None,
-            }
+            },
+            headers={"ETag": etag, "Cache-Control": "no-cache"},
         )
     
-    # Get confidence info from metadata
-    confidence = None
-    confidence_action = None
-    confidence_message = None
-    
-    if task.metadata_output:
-        confidence = task.metadata_output.get("confidence")
-        if confidence is not None:
-            if confidence > 0.75:
-                confidence_action = "proceed"
-                confidence_message = None
-            elif confidence >= 0.55:
-                confidence_action = "warn"
-                confidence_message = "请尝试并拍摄两条版本"
-            else:
-                confidence_action = "manual"
-                confidence_message = "置信度较低，建议人工确认后再执行"
-    
-    return SuggestionsResponse(
-        video_id=video_id,
-        status=task.status,
-        confidence=confidence,
-        confidence_action=confidence_action,
-        confidence_message=confidence_message,
-        instruction_card=task.instruction_card,
-    )
+    def build():
+        task = db.get(AnalysisTask, version[0])
+        
+        # Get confidence info from metadata
+        confidence = None
+        confidence_action = None
+        confidence_message = None
+        
+        if task.metadata_output:
+            confidence = task.metadata_output.get("confidence")
+            if confidence is not None:
+                if confidence > 0.75:
+                    confidence_action = "proceed"
+                    confidence_message = None
+                elif confidence >= 0.55:
+                    confidence_action = "warn"
+                    confidence_message = "请尝试并拍摄两条版本"
+                else:
+                    confidence_action = "manual"
+                    confidence_message = "置信度较低，建议人工确认后再执行"
+        
+        return SuggestionsResponse(
+            video_id=video_id,
+            status=task.status,
+            confidence=confidence,
+            confidence_action=confidence_action,
+            confidence_message=confidence_message,
+            instruction_card=task.instruction_card,
+        )
+    
+    body = response_cache.get_or_encode(etag, build)
+    return encoded_response(request, body, etag)
 
 
 @router.post(
@@ -669,3 +721,33 @@ async def get_current_user_info(
     Requires valid JWT token.
     """
     return user
+
+
+@router.post(
+    "/auth/logout",
+    status_code=status.HTTP_204_NO_CONTENT,
+    tags=["Authentication"],
+)
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+):
+    """
+    Revoke the presented access token.
+    
+    The token is rejected from then on, even while cached.
+    """
+    revoke_token(credentials.credentials)
+    return None
+
+
+@router.get(
+    "/auth/metrics",
+    tags=["Authentication"],
+)
+async def get_auth_metrics():
+    """
+    Token verification metrics.
+    
+    Returns cache size, hit rate, and verification/failure counts.
+    """
+    return token_cache.metrics()
@@ -6,11 +6,15 @@ Realtime Shooting Advisor Module
 Components:
 - RealtimeAnalyzer: 实时帧分析器
 - AdviceEngine: 建议生成引擎
+- AdviceRuleTable: 编译后的建议阈值表
+- IndicatorPipeline: 会话指标流水线（平滑 + 运动状态）
 - SmoothingFilter: 平滑滤波器
 - MotionStateMachine: 运动状态机
 - HysteresisController: 滞后控制器
 - RealtimeWebSocketHandler: WebSocket 处理器
 - SessionManager: 会话管理器
+- SessionRegistry / FanoutBus: 跨 worker 会话注册表与广播总线
+- LatencyTracer: 热路径分阶段延迟追踪
 """
 
 from .types import (
@@ -23,7 +27,9 @@ from .types import (
 )
 from .analyzer import RealtimeAnalyzer, RealtimeAnalyzerConfig
 from .advice_engine import AdviceEngine, AdviceEngineConfig
-from .smoothing import SmoothingFilter, SmoothingFilterConfig
+from .advice_rules import AdviceRuleTable, AdviceTemplateId, compile_rule_table
+from .indicator_pipeline import IndicatorFrame, IndicatorPipeline
+from .smoothing import SmoothingFilter, SmoothingFilterBank, SmoothingFilterConfig
 from .state_machine import MotionStateMachine, MotionStateMachineConfig
 from .hysteresis import HysteresisController, HysteresisConfig
 from .templates import ADVICE_TEMPLATES
@@ -31,6 +37,7 @@ from .websocket_handler import (
     RealtimeWebSocketHandler,
     SessionManager,
     WebSocketHandlerConfig,
+    ClientOptions,
     ReconnectionManager,
     get_session_manager,
     create_websocket_handler,
@@ -42,6 +49,26 @@ from .session_manager import (
     ClientConnection,
     get_persistent_session_manager,
 )
+from .session_registry import (
+    SessionRecord,
+    SessionRegistry,
+    InMemorySessionRegistry,
+    RedisSessionRegistry,
+    FanoutBus,
+    InMemoryFanoutBus,
+    RedisFanoutBus,
+    create_session_registry,
+    create_fanout_bus,
+)
+from .envelope import CycleEnvelope, available_encodings
+from .send_queue import ClientSendQueue, SendPriority, SendQueueConfig
+from .tracing import CycleTrace, LatencyTracer
+from .snapshot import (
+    SnapshotError,
+    SnapshotStore,
+    snapshot_session,
+    restore_session,
+)
 
 __all__ = [
     # Types and Enums
@@ -56,7 +83,13 @@ __all__ = [
     "RealtimeAnalyzerConfig",
     "AdviceEngine",
     "AdviceEngineConfig",
+    "AdviceRuleTable",
+    "AdviceTemplateId",
+    "compile_rule_table",
+    "IndicatorPipeline",
+    "IndicatorFrame",
     "SmoothingFilter",
+    "SmoothingFilterBank",
     "SmoothingFilterConfig",
     "MotionStateMachine",
     "MotionStateMachineConfig",
@@ -66,6 +99,7 @@ __all__ = [
     "RealtimeWebSocketHandler",
     "SessionManager",
     "WebSocketHandlerConfig",
+    "ClientOptions",
     "ReconnectionManager",
     "get_session_manager",
     "create_websocket_handler",
@@ -75,6 +109,31 @@ __all__ = [
     "SessionData",
     "ClientConnection",
     "get_persistent_session_manager",
+    # Cross-worker registry and fan-out
+    "SessionRecord",
+    "SessionRegistry",
+    "InMemorySessionRegistry",
+    "RedisSessionRegistry",
+    "FanoutBus",
+    "InMemoryFanoutBus",
+    "RedisFanoutBus",
+    "create_session_registry",
+    "create_fanout_bus",
+    # Cycle envelopes
+    "CycleEnvelope",
+    "available_encodings",
+    # Send queues
+    "ClientSendQueue",
+    "SendPriority",
+    "SendQueueConfig",
+    # Latency tracing
+    "CycleTrace",
+    "LatencyTracer",
+    # State snapshots
+    "SnapshotError",
+    "SnapshotStore",
+    "snapshot_session",
+    "restore_session",
     # Templates
     "ADVICE_TEMPLATES",
 ]
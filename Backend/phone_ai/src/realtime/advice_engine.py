@@ -6,43 +6,37 @@ Generates prioritized advice based on smoothed indicators.
 
 Requirements: 2.1-2.4, 3.1-3.3, 4.1-4.6, 5.1-5.3, 6.1-6.3, 7.1-7.2, 8.1-8.5, 13.1-13.5
 """
+import math
 import time
 from dataclasses import dataclass
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-from src.models.data_types import BBox, HeuristicOutput
+from src.models.data_types import BBox
 from src.models.enums import MotionType
 
 from .types import (
     AdvicePayload,
-    AdvicePriority,
     AdviceCategory,
     RealtimeAnalysisResult,
 )
 from .templates import (
-    STABILITY_CRITICAL,
-    STABILITY_WARNING,
-    STABILITY_POSITIVE,
-    SPEED_TOO_FAST,
-    SPEED_UNEVEN,
-    SPEED_PERFECT,
-    SUBJECT_OFF_CENTER,
-    SUBJECT_TOO_LARGE,
-    SUBJECT_TOO_SMALL,
-    SUBJECT_LOST,
-    DIRECTION_HINT,
-    DIRECTION_NAMES,
-    AVOID_DIRECTIONS,
-    BEAT_UPCOMING,
-    BEAT_NOW,
-    MOTION_BLUR,
-    TELEPHOTO_SHAKE,
-    STABILIZATION_SUGGESTION,
     LOW_CONFIDENCE_STATUS,
+    get_direction_hint,
+)
+from .advice_rules import (
+    DIRECTION_KEYS,
+    AdviceRuleTable,
+    AdviceTemplateId,
+    compile_rule_table,
+    direction_index,
+    materialize,
 )
 from .state_machine import MotionStateMachine
 from .hysteresis import HysteresisController, HysteresisConfig
-from .smoothing import SmoothingFilter, IndicatorValues
+from .indicator_pipeline import IndicatorFrame, IndicatorPipeline
+
+if TYPE_CHECKING:
+    from .snapshot import StateReader, StateWriter
 
 
 @dataclass
@@ -81,12 +75,14 @@ class AdviceEngine:
     Generates prioritized advice based on smoothed indicators.
     
     The engine:
-    1. Applies smoothing filter to raw indicators
+    1. Reads smoothed indicators from the session's IndicatorPipeline
     2. Uses hysteresis to prevent rapid toggling
     3. Checks motion type for suppression rules
     4. Generates prioritized advice based on thresholds
     5. Applies category cooldown to avoid repetitive advice
     
+    Thresholds are compiled once into ``rules`` (an AdviceRuleTable).
+    
     Requirements:
     - 2.1-2.4: Stability advice generation
     - 3.1-3.3: Speed advice generation
@@ -101,7 +97,8 @@ class AdviceEngine:
     def __init__(
         self,
         config: Optional[AdviceEngineConfig] = None,
-        hysteresis_config: Optional[HysteresisConfig] = None
+        hysteresis_config: Optional[HysteresisConfig] = None,
+        pipeline: Optional[IndicatorPipeline] = None,
     ):
         """
         Initialize the advice engine.
@@ -109,14 +106,20 @@ class AdviceEngine:
         Args:
             config: Configuration for advice thresholds
             hysteresis_config: Configuration for hysteresis controller
+            pipeline: Session indicator pipeline (created if not given)
         """
         self.config = config or AdviceEngineConfig()
-        self.state_machine = MotionStateMachine()
+        self.pipeline = pipeline or IndicatorPipeline(min_confidence=self.config.min_confidence)
         self._hysteresis = HysteresisController(hysteresis_config)
-        self._smoothing_filter = SmoothingFilter()
+        self.rules: AdviceRuleTable = compile_rule_table(self.config)
         self._last_advice: dict[str, AdvicePayload] = {}
         self._subject_lost_since: Optional[float] = None
     
+    @property
+    def state_machine(self) -> MotionStateMachine:
+        """Motion state machine of the shared pipeline."""
+        return self.pipeline.state_machine
+    
     def generate_advice(
         self,
         analysis_result: RealtimeAnalysisResult,
@@ -125,10 +128,14 @@ class AdviceEngine:
         device_type: str = "consumer",
         focal_length_mm: Optional[float] = None,
         apply_smoothing: bool = True,
+        indicators: Optional[IndicatorFrame] = None,
     ) -> list[AdvicePayload]:
         """
         Generate advice based on current analysis result.
         
+        The result is run through the pipeline unless the caller already
+        did so and passes the frame as ``indicators``.
+        
         Args:
             analysis_result: Realtime analysis result with indicators
             beat_timestamps: Upcoming beat timestamps (optional)
@@ -136,6 +143,7 @@ class AdviceEngine:
             device_type: "consumer" or "professional"
             focal_length_mm: Current focal length (optional)
             apply_smoothing: Whether to apply smoothing filter
+            indicators: Pipeline output for this result, if already computed
             
         Returns:
             List of advice payloads to send to client
@@ -143,50 +151,23 @@ class AdviceEngine:
         if current_time == 0.0:
             current_time = time.time()
         
+        # Smoothing, anomaly detection and motion state (Requirements 8.4, 8.5, 13.1)
+        if indicators is None:
+            indicators = self.pipeline.process(analysis_result, current_time, apply_smoothing)
+        
         # Check confidence threshold (Requirement 13.5)
-        if analysis_result.confidence < self.config.min_confidence:
+        if indicators.low_confidence:
             return [LOW_CONFIDENCE_STATUS]
         
-        # Apply smoothing filter if enabled (Requirement 13.1)
-        if apply_smoothing:
-            indicators = IndicatorValues(
-                motion_smoothness=analysis_result.motion_smoothness,
-                avg_speed=analysis_result.avg_speed_px_frame,
-                speed_variance=analysis_result.speed_variance,
-                primary_direction_deg=analysis_result.primary_direction_deg,
-                subject_occupancy=analysis_result.subject_occupancy,
-                confidence=analysis_result.confidence,
-            )
-            smoothed = self._smoothing_filter.update(indicators)
-            
-            # Check if suppressed due to anomaly (Requirement 13.2)
-            if self._smoothing_filter.is_suppressed():
-                return []
-            
-            # Use smoothed values
-            motion_smoothness = smoothed.motion_smoothness
-            avg_speed = smoothed.avg_speed
-            speed_variance = smoothed.speed_variance
-            primary_direction_deg = smoothed.primary_direction_deg
-            subject_occupancy = smoothed.subject_occupancy
-        else:
-            motion_smoothness = analysis_result.motion_smoothness
-            avg_speed = analysis_result.avg_speed_px_frame
-            speed_variance = analysis_result.speed_variance
-            primary_direction_deg = analysis_result.primary_direction_deg
-            subject_occupancy = analysis_result.subject_occupancy
-        
-        # Update motion state machine (Requirements 8.4, 8.5)
-        heuristic_output = HeuristicOutput(
-            video_id="realtime",
-            time_range=(current_time, current_time + 0.5),
-            avg_motion_px_per_s=avg_speed * 30,  # Convert to px/s assuming 30fps
-            frame_pct_change=0.0,  # Not used for motion type inference
-            motion_smoothness=motion_smoothness,
-            subject_occupancy=subject_occupancy,
-            beat_alignment_score=0.0,
-        )
-        self.state_machine.update(heuristic_output, primary_direction_deg)
+        # Check if suppressed due to anomaly (Requirement 13.2)
+        if indicators.suppressed:
+            return []
+        
+        motion_smoothness = indicators.motion_smoothness
+        avg_speed = indicators.avg_speed_px_frame
+        speed_variance = indicators.speed_variance
+        primary_direction_deg = indicators.primary_direction_deg
+        subject_occupancy = indicators.subject_occupancy
         
         # Generate advice from each category
         advice_list: list[AdvicePayload] = []
@@ -267,13 +248,14 @@ class AdviceEngine:
             return None
         
         # Use hysteresis to determine state
+        band = self.rules.stability
         state = self._hysteresis.check_threshold_multi_level(
             category=category,
             value=motion_smoothness,
-            critical_enter=self.config.stability_critical_threshold - 0.05,  # 0.35
-            critical_exit=self.config.stability_critical_threshold + 0.05,   # 0.45
-            warning_enter=self.config.stability_warning_threshold - 0.05,    # 0.65
-            warning_exit=self.config.stability_warning_threshold + 0.05,     # 0.75
+            critical_enter=band.critical_enter,  # 0.35
+            critical_exit=band.critical_exit,    # 0.45
+            warning_enter=band.warning_enter,    # 0.65
+            warning_exit=band.warning_exit,      # 0.75
             lower_is_worse=True,
         )
         
@@ -282,49 +264,30 @@ class AdviceEngine:
             should_trigger = state == "warning"
             if not self._hysteresis.is_consistent(category, should_trigger):
                 # For positive feedback, we can be more lenient
-                if state != "normal" or motion_smoothness <= self.config.stability_warning_threshold:
+                if state != "normal" or motion_smoothness <= self.rules.stability_positive_min:
                     return None
         
         # Generate advice based on state
         if state == "critical":
             # Critical stability issue (Requirement 2.1)
-            advice = AdvicePayload(
-                priority=AdvicePriority.CRITICAL,
-                category=AdviceCategory.STABILITY,
-                message=STABILITY_CRITICAL.message,
-                advanced_message=STABILITY_CRITICAL.advanced_message if device_type == "professional" else None,
-                trigger_haptic=True,
-                suppress_duration_s=5.0,
-            )
             self._hysteresis.record_advice(category, current_time)
-            return advice
+            return materialize(
+                AdviceTemplateId.STABILITY_CRITICAL,
+                advanced=device_type == "professional",
+            )
         
         elif state == "warning":
             # Warning level stability (Requirement 2.3)
-            advice = AdvicePayload(
-                priority=AdvicePriority.WARNING,
-                category=AdviceCategory.STABILITY,
-                message=STABILITY_WARNING.message,
-                trigger_haptic=False,
-                suppress_duration_s=3.0,
-            )
             self._hysteresis.record_advice(category, current_time)
-            return advice
+            return materialize(AdviceTemplateId.STABILITY_WARNING)
         
         else:  # normal state with good stability
             # Positive feedback (Requirement 2.4)
-            if motion_smoothness > self.config.stability_warning_threshold:
+            if motion_smoothness > self.rules.stability_positive_min:
                 # Only give positive feedback occasionally
                 if not self._hysteresis.is_on_cooldown(f"{category}_positive", current_time):
-                    advice = AdvicePayload(
-                        priority=AdvicePriority.POSITIVE,
-                        category=AdviceCategory.STABILITY,
-                        message=STABILITY_POSITIVE.message,
-                        trigger_haptic=False,
-                        suppress_duration_s=3.0,
-                    )
                     self._hysteresis.record_advice(f"{category}_positive", current_time)
-                    return advice
+                    return materialize(AdviceTemplateId.STABILITY_POSITIVE)
         
         return None
 
@@ -362,63 +325,43 @@ class AdviceEngine:
             return None
         
         # Calculate coefficient of variation
-        cv = (speed_variance ** 0.5) / avg_speed if avg_speed > 0 else 0
+        cv = math.sqrt(speed_variance) / avg_speed if avg_speed > 0 else 0
         
         # Check for too fast (Requirement 3.1)
+        band = self.rules.speed_fast
         is_too_fast = self._hysteresis.check_threshold(
             category=f"{category}_fast",
             value=avg_speed,
-            enter_threshold=self.config.speed_warning_threshold + 2,  # 22
-            exit_threshold=self.config.speed_warning_threshold - 2,   # 18
+            enter_threshold=band.warning_enter,  # 22
+            exit_threshold=band.warning_exit,    # 18
             lower_is_worse=False,  # Higher speed is worse
         )
         
         if is_too_fast:
             if self._hysteresis.is_consistent(f"{category}_fast", True):
-                advice = AdvicePayload(
-                    priority=AdvicePriority.WARNING,
-                    category=AdviceCategory.SPEED,
-                    message=SPEED_TOO_FAST.message,
-                    trigger_haptic=False,
-                    suppress_duration_s=3.0,
-                )
                 self._hysteresis.record_advice(category, current_time)
-                return advice
+                return materialize(AdviceTemplateId.SPEED_TOO_FAST)
             return None
         
         # Check for uneven speed (Requirement 3.2)
-        is_uneven = cv > self.config.speed_cv_warning_threshold
+        is_uneven = cv > self.rules.speed_cv_max
         
         if is_uneven:
             if self._hysteresis.is_consistent(f"{category}_uneven", True):
-                advice = AdvicePayload(
-                    priority=AdvicePriority.WARNING,
-                    category=AdviceCategory.SPEED,
-                    message=SPEED_UNEVEN.message,
-                    trigger_haptic=False,
-                    suppress_duration_s=3.0,
-                )
                 self._hysteresis.record_advice(category, current_time)
-                return advice
+                return materialize(AdviceTemplateId.SPEED_UNEVEN)
             return None
         
         # Check for optimal speed (Requirement 3.3)
         is_optimal = (
-            self.config.speed_optimal_min <= avg_speed <= self.config.speed_optimal_max
-            and cv < self.config.speed_cv_warning_threshold
+            self.rules.speed_optimal_min <= avg_speed <= self.rules.speed_optimal_max
+            and cv < self.rules.speed_cv_max
         )
         
         if is_optimal:
             if not self._hysteresis.is_on_cooldown(f"{category}_positive", current_time):
-                advice = AdvicePayload(
-                    priority=AdvicePriority.POSITIVE,
-                    category=AdviceCategory.SPEED,
-                    message=SPEED_PERFECT.message,
-                    trigger_haptic=False,
-                    suppress_duration_s=3.0,
-                )
                 self._hysteresis.record_advice(f"{category}_positive", current_time)
-                return advice
+                return materialize(AdviceTemplateId.SPEED_PERFECT)
         
         return None
 
@@ -462,15 +405,8 @@ class AdviceEngine:
                 self._subject_lost_since = current_time
                 
                 if not self._hysteresis.is_on_cooldown(f"{category}_lost", current_time):
-                    advice = AdvicePayload(
-                        priority=AdvicePriority.WARNING,
-                        category=AdviceCategory.COMPOSITION,
-                        message=SUBJECT_LOST.message,
-                        trigger_haptic=False,
-                        suppress_duration_s=5.0,
-                    )
                     self._hysteresis.record_advice(f"{category}_lost", current_time)
-                    advice_list.append(advice)
+                    advice_list.append(materialize(AdviceTemplateId.SUBJECT_LOST))
             return advice_list
         else:
             # Subject found - exit Subject_Lost state if we were in it
@@ -528,26 +464,13 @@ class AdviceEngine:
         if direction_key is None:
             return None
         
-        direction_name = DIRECTION_NAMES.get(direction_key, direction_key)
-        avoid_direction = AVOID_DIRECTIONS.get(direction_key, "其他方向")
-        
         # Only generate if we have a clear direction
         motion_type = self.state_machine.get_current_state()
         if motion_type in (MotionType.STATIC, MotionType.HANDHELD):
             return None
         
-        advice = AdvicePayload(
-            priority=AdvicePriority.INFO,
-            category=AdviceCategory.COMPOSITION,
-            message=DIRECTION_HINT.message.format(
-                direction=direction_name,
-                avoid=avoid_direction,
-            ),
-            trigger_haptic=False,
-            suppress_duration_s=3.0,
-        )
         self._hysteresis.record_advice(category, current_time)
-        return advice
+        return get_direction_hint(direction_key)
     
     def _angle_to_direction_key(self, angle_deg: float) -> Optional[str]:
         """
@@ -559,20 +482,8 @@ class AdviceEngine:
         Returns:
             Direction key or None if ambiguous
         """
-        # Normalize angle to 0-360
-        angle = angle_deg % 360
-        
-        # Define direction ranges (with some tolerance)
-        if 45 <= angle < 135:
-            return "down"  # Moving down
-        elif 135 <= angle < 225:
-            return "left"  # Moving left
-        elif 225 <= angle < 315:
-            return "up"  # Moving up
-        elif angle >= 315 or angle < 45:
-            return "right"  # Moving right
-        
-        return None
+        index = direction_index(angle_deg)
+        return DIRECTION_KEYS[index] if index >= 0 else None
     
     def _check_subject_position(
         self,
@@ -606,20 +517,20 @@ class AdviceEngine:
         thirds_y = [1/3, 2/3]
         
         # Calculate minimum distance to center or thirds
-        dist_to_center = ((center_x - 0.5) ** 2 + (center_y - 0.5) ** 2) ** 0.5
+        dist_to_center = math.sqrt((center_x - 0.5) * (center_x - 0.5) + (center_y - 0.5) * (center_y - 0.5))
         
         # Distance to nearest thirds intersection
         min_thirds_dist = float('inf')
         for tx in thirds_x:
             for ty in thirds_y:
-                dist = ((center_x - tx) ** 2 + (center_y - ty) ** 2) ** 0.5
+                dist = math.sqrt((center_x - tx) * (center_x - tx) + (center_y - ty) * (center_y - ty))
                 min_thirds_dist = min(min_thirds_dist, dist)
         
         # Use the smaller of center or thirds distance
         min_dist = min(dist_to_center, min_thirds_dist)
         
         # Check if deviation exceeds threshold
-        if min_dist > self.config.subject_deviation_threshold:
+        if min_dist > self.rules.subject_deviation_max:
             # Determine direction to adjust
             if center_x < 0.4:
                 direction = "右"
@@ -633,15 +544,8 @@ class AdviceEngine:
                 return None  # Close enough
             
             if self._hysteresis.is_consistent(category, True):
-                advice = AdvicePayload(
-                    priority=AdvicePriority.WARNING,
-                    category=AdviceCategory.COMPOSITION,
-                    message=SUBJECT_OFF_CENTER.message.format(direction=direction),
-                    trigger_haptic=False,
-                    suppress_duration_s=3.0,
-                )
                 self._hysteresis.record_advice(category, current_time)
-                return advice
+                return materialize(AdviceTemplateId.SUBJECT_OFF_CENTER, direction=direction)
         
         return None
     
@@ -669,29 +573,15 @@ class AdviceEngine:
         if self._hysteresis.is_on_cooldown(category, current_time):
             return None
         
-        if subject_occupancy > self.config.subject_occupancy_max:
+        if subject_occupancy > self.rules.subject_occupancy_max:
             if self._hysteresis.is_consistent(f"{category}_large", True):
-                advice = AdvicePayload(
-                    priority=AdvicePriority.WARNING,
-                    category=AdviceCategory.COMPOSITION,
-                    message=SUBJECT_TOO_LARGE.message,
-                    trigger_haptic=False,
-                    suppress_duration_s=3.0,
-                )
                 self._hysteresis.record_advice(category, current_time)
-                return advice
+                return materialize(AdviceTemplateId.SUBJECT_TOO_LARGE)
         
-        elif subject_occupancy < self.config.subject_occupancy_min:
+        elif subject_occupancy < self.rules.subject_occupancy_min:
             if self._hysteresis.is_consistent(f"{category}_small", True):
-                advice = AdvicePayload(
-                    priority=AdvicePriority.WARNING,
-                    category=AdviceCategory.COMPOSITION,
-                    message=SUBJECT_TOO_SMALL.message,
-                    trigger_haptic=False,
-                    suppress_duration_s=3.0,
-                )
                 self._hysteresis.record_advice(category, current_time)
-                return advice
+                return materialize(AdviceTemplateId.SUBJECT_TOO_SMALL)
         
         return None
 
@@ -733,28 +623,14 @@ class AdviceEngine:
         time_to_beat = nearest_beat - current_time
         
         # Check if beat is happening now (Requirement 5.2)
-        if time_to_beat <= self.config.beat_now_window_s:
-            advice = AdvicePayload(
-                priority=AdvicePriority.INFO,
-                category=AdviceCategory.BEAT,
-                message=BEAT_NOW.message,
-                trigger_haptic=False,
-                suppress_duration_s=2.0,
-            )
+        if time_to_beat <= self.rules.beat_now_window_s:
             self._hysteresis.record_advice(category, current_time)
-            return advice
+            return materialize(AdviceTemplateId.BEAT_NOW)
         
         # Check if beat is upcoming (Requirement 5.1)
-        if time_to_beat <= self.config.beat_upcoming_window_s:
-            advice = AdvicePayload(
-                priority=AdvicePriority.INFO,
-                category=AdviceCategory.BEAT,
-                message=BEAT_UPCOMING.message,
-                trigger_haptic=False,
-                suppress_duration_s=2.0,
-            )
+        if time_to_beat <= self.rules.beat_upcoming_window_s:
             self._hysteresis.record_advice(category, current_time)
-            return advice
+            return materialize(AdviceTemplateId.BEAT_UPCOMING)
         
         return None
 
@@ -788,31 +664,17 @@ class AdviceEngine:
         
         # Check telephoto + low smoothness (Requirement 6.2)
         if focal_length_mm is not None:
-            if (focal_length_mm > self.config.telephoto_focal_length_mm and
-                motion_smoothness < self.config.telephoto_smoothness_threshold):
+            if (focal_length_mm > self.rules.telephoto_focal_length_mm and
+                motion_smoothness < self.rules.telephoto_smoothness_min):
                 if self._hysteresis.is_consistent(f"{category}_telephoto", True):
-                    advice = AdvicePayload(
-                        priority=AdvicePriority.WARNING,
-                        category=AdviceCategory.EQUIPMENT,
-                        message=TELEPHOTO_SHAKE.message,
-                        trigger_haptic=False,
-                        suppress_duration_s=5.0,
-                    )
                     self._hysteresis.record_advice(category, current_time)
-                    return advice
+                    return materialize(AdviceTemplateId.TELEPHOTO_SHAKE)
         
         # Check for general low smoothness → suggest stabilization (Requirement 6.3)
-        if motion_smoothness < self.config.stability_critical_threshold:
+        if motion_smoothness < self.rules.stabilization_smoothness_min:
             if self._hysteresis.is_consistent(f"{category}_stabilization", True):
-                advice = AdvicePayload(
-                    priority=AdvicePriority.INFO,
-                    category=AdviceCategory.EQUIPMENT,
-                    message=STABILIZATION_SUGGESTION.message,
-                    trigger_haptic=False,
-                    suppress_duration_s=5.0,
-                )
                 self._hysteresis.record_advice(category, current_time)
-                return advice
+                return materialize(AdviceTemplateId.STABILIZATION_SUGGESTION)
         
         return None
 
@@ -822,17 +684,32 @@ class AdviceEngine:
         Reset the advice engine state.
         
         Clears all internal state including:
-        - Smoothing filter
+        - Indicator pipeline (smoothing filter and motion state machine)
         - Hysteresis controller
-        - Motion state machine
         - Subject lost tracking
         """
-        self._smoothing_filter.reset()
+        self.pipeline.reset()
         self._hysteresis.reset()
-        self.state_machine.reset()
         self._subject_lost_since = None
         self._last_advice.clear()
     
+    def write_state(self, w: "StateWriter") -> None:
+        """
+        Write engine state to a snapshot.
+        
+        Covers subject-lost tracking, the indicator pipeline (motion state
+        machine and smoothing filter), and hysteresis states and cooldowns.
+        """
+        w.opt_f64(self._subject_lost_since)
+        self.pipeline.write_state(w)
+        self._hysteresis.write_state(w)
+    
+    def read_state(self, r: "StateReader") -> None:
+        """Restore engine state written by write_state."""
+        self._subject_lost_since = r.opt_f64()
+        self.pipeline.read_state(r)
+        self._hysteresis.read_state(r)
+    
     def get_motion_type(self) -> MotionType:
         """
         Get the current detected motion type.
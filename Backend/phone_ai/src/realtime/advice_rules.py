@@ -0,0 +1,152 @@
+"""
+Advice Rule Table Module
+
+建议规则阈值：把引擎配置编译成只读阈值表，并按模板 ID 生成建议。
+Compiles the thresholds of AdviceEngineConfig into a frozen table that
+AdviceEngine reads, and builds the payload of a fired advice template
+through materialize().
+
+Hysteresis bands are derived from AdviceEngineConfig exactly as
+AdviceEngine always did (stability thresholds +/-0.05, speed warning
+threshold +/-2).
+"""
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import TYPE_CHECKING, Optional
+
+from .templates import ADVICE_TEMPLATES, get_advice
+from .types import AdvicePayload
+
+if TYPE_CHECKING:
+    from .advice_engine import AdviceEngineConfig
+
+
+class AdviceTemplateId(IntEnum):
+    """Advice templates AdviceEngine can fire; the lower-cased name is the ADVICE_TEMPLATES key."""
+    STABILITY_CRITICAL = 0
+    STABILITY_WARNING = 1
+    STABILITY_POSITIVE = 2
+    SPEED_TOO_FAST = 3
+    SPEED_UNEVEN = 4
+    SPEED_PERFECT = 5
+    SUBJECT_LOST = 6
+    DIRECTION_HINT = 7
+    SUBJECT_OFF_CENTER = 8
+    SUBJECT_TOO_LARGE = 9
+    SUBJECT_TOO_SMALL = 10
+    BEAT_NOW = 11
+    BEAT_UPCOMING = 12
+    TELEPHOTO_SHAKE = 13
+    STABILIZATION_SUGGESTION = 14
+
+    @property
+    def template(self) -> AdvicePayload:
+        return ADVICE_TEMPLATES[self.name.lower()]
+
+
+# Direction hint keys by quadrant (see AdviceEngine._angle_to_direction_key)
+DIRECTION_KEYS = ("right", "down", "left", "up")
+
+
+@dataclass(frozen=True, slots=True)
+class HysteresisBand:
+    """Enter/exit thresholds of one hysteresis key."""
+    warning_enter: float
+    warning_exit: float
+    critical_enter: Optional[float] = None  # None: two-level (normal/warning) band
+    critical_exit: Optional[float] = None
+
+
+@dataclass(frozen=True, slots=True)
+class AdviceRuleTable:
+    """
+    规则表
+    Thresholds compiled from the engine config.
+
+    Frozen; engines with equal configs have equal tables.
+    """
+    stability: HysteresisBand
+    speed_fast: HysteresisBand
+    stability_positive_min: float  # Positive feedback needs smoothness above this
+    speed_cv_max: float
+    speed_optimal_min: float
+    speed_optimal_max: float
+    subject_deviation_max: float
+    subject_occupancy_min: float
+    subject_occupancy_max: float
+    beat_now_window_s: float
+    beat_upcoming_window_s: float
+    telephoto_focal_length_mm: float
+    telephoto_smoothness_min: float
+    stabilization_smoothness_min: float
+
+
+def compile_rule_table(
+    config: "AdviceEngineConfig",
+) -> AdviceRuleTable:
+    """
+    Compile engine configuration into a rule table.
+
+    Args:
+        config: Advice thresholds
+
+    Returns:
+        AdviceRuleTable
+    """
+    return AdviceRuleTable(
+        stability=HysteresisBand(
+            critical_enter=config.stability_critical_threshold - 0.05,
+            critical_exit=config.stability_critical_threshold + 0.05,
+            warning_enter=config.stability_warning_threshold - 0.05,
+            warning_exit=config.stability_warning_threshold + 0.05,
+        ),
+        speed_fast=HysteresisBand(
+            warning_enter=config.speed_warning_threshold + 2,
+            warning_exit=config.speed_warning_threshold - 2,
+        ),
+        stability_positive_min=config.stability_warning_threshold,
+        speed_cv_max=config.speed_cv_warning_threshold,
+        speed_optimal_min=config.speed_optimal_min,
+        speed_optimal_max=config.speed_optimal_max,
+        subject_deviation_max=config.subject_deviation_threshold,
+        subject_occupancy_min=config.subject_occupancy_min,
+        subject_occupancy_max=config.subject_occupancy_max,
+        beat_now_window_s=config.beat_now_window_s,
+        beat_upcoming_window_s=config.beat_upcoming_window_s,
+        telephoto_focal_length_mm=config.telephoto_focal_length_mm,
+        telephoto_smoothness_min=config.telephoto_smoothness_threshold,
+        stabilization_smoothness_min=config.stability_critical_threshold,
+    )
+
+
+def materialize(
+    template_id: AdviceTemplateId,
+    advanced: bool = False,
+    **substitutions: str,
+) -> AdvicePayload:
+    """
+    The AdvicePayload for a fired rule.
+
+    Args:
+        template_id: Template that fired
+        advanced: Include the template's advanced message (professional devices)
+        **substitutions: Template variables (e.g. direction="左")
+
+    Returns:
+        Interned, unstamped AdvicePayload (see templates.get_advice)
+    """
+    return get_advice(template_id.name.lower(), advanced, **substitutions)
+
+
+def direction_index(angle_deg: float) -> int:
+    """Index into DIRECTION_KEYS for a motion angle, or -1 if it has none."""
+    angle = angle_deg % 360
+    if 45 <= angle < 135:
+        return 1  # Moving down
+    if 135 <= angle < 225:
+        return 2  # Moving left
+    if 225 <= angle < 315:
+        return 3  # Moving up
+    if angle >= 315 or angle < 45:
+        return 0  # Moving right
+    return -1
@@ -11,14 +11,17 @@ import math
 import time
 from collections import deque
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 import cv2
 import numpy as np
 
 from src.models.data_types import BBox, OpticalFlowData
 from src.realtime.types import RealtimeAnalysisResult
-from src.realtime.smoothing import SmoothingFilter, IndicatorValues
+
+if TYPE_CHECKING:
+    from src.realtime.snapshot import StateReader, StateWriter
+    from src.realtime.tracing import CycleTrace
 
 
 @dataclass
@@ -104,7 +107,6 @@ class RealtimeAnalyzer:
         self._frame_buffer = FrameBuffer()
         self._last_analysis_time = 0.0
         self._last_latency_ms = 0.0
-        self._smoothing_filter = SmoothingFilter()
         
         # Subject tracking state
         self._last_subject_bbox: Optional[BBox] = None
@@ -115,37 +117,52 @@ class RealtimeAnalyzer:
         self._degraded_mode = False
         self._latency_history: deque = deque(maxlen=5)
     
-    def decode_base64_jpeg(self, base64_jpeg: str) -> Optional[np.ndarray]:
+    def decode_base64_jpeg(
+        self,
+        base64_jpeg: str,
+        trace: Optional["CycleTrace"] = None,
+    ) -> Optional[np.ndarray]:
         """
         Decode a Base64-encoded JPEG image to numpy array.
         
         Args:
             base64_jpeg: Base64-encoded JPEG string
+            trace: Latency trace of the cycle (optional)
             
         Returns:
             Decoded frame as numpy array (BGR format), or None if decoding fails
         """
         try:
+            t = time.perf_counter() if trace is not None else 0.0
             jpeg_bytes = base64.b64decode(base64_jpeg)
+            if trace is not None:
+                t = trace.lap("base64_decode", t)
             nparr = np.frombuffer(jpeg_bytes, np.uint8)
             frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            if trace is not None:
+                trace.lap("jpeg_decode", t)
             return frame
         except Exception:
             return None
     
-    def decode_frame_buffer(self, base64_frames: list[str]) -> list[np.ndarray]:
+    def decode_frame_buffer(
+        self,
+        base64_frames: list[str],
+        trace: Optional["CycleTrace"] = None,
+    ) -> list[np.ndarray]:
         """
         Decode a list of Base64-encoded JPEG frames.
         
         Args:
             base64_frames: List of Base64-encoded JPEG strings
+            trace: Latency trace of the cycle (optional)
             
         Returns:
             List of decoded frames as numpy arrays (BGR format)
         """
         frames = []
         for b64_jpeg in base64_frames:
-            frame = self.decode_base64_jpeg(b64_jpeg)
+            frame = self.decode_base64_jpeg(b64_jpeg, trace)
             if frame is not None:
                 frames.append(frame)
         return frames
@@ -206,7 +223,8 @@ class RealtimeAnalyzer:
     
     def compute_optical_flow_farneback(
         self,
-        frames: list[np.ndarray]
+        frames: list[np.ndarray],
+        trace: Optional["CycleTrace"] = None,
     ) -> OpticalFlowData:
         """
         Compute dense optical flow using Farneback algorithm.
@@ -216,6 +234,7 @@ class RealtimeAnalyzer:
         
         Args:
             frames: List of frames (BGR format)
+            trace: Latency trace of the cycle (optional)
             
         Returns:
             OpticalFlowData with speed, direction, and flow vectors
@@ -228,6 +247,7 @@ class RealtimeAnalyzer:
             )
         
         # Convert to grayscale
+        t = time.perf_counter() if trace is not None else 0.0
         gray_frames = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in frames]
         
         # Apply center region only if configured
@@ -238,6 +258,8 @@ class RealtimeAnalyzer:
             y1, y2 = cy - crop_h // 2, cy + crop_h // 2
             x1, x2 = cx - crop_w // 2, cx + crop_w // 2
             gray_frames = [f[y1:y2, x1:x2] for f in gray_frames]
+        if trace is not None:
+            t = trace.lap("gray", t)
         
         all_magnitudes = []
         all_angles = []
@@ -293,6 +315,8 @@ class RealtimeAnalyzer:
         else:
             primary_direction_deg = 0.0
         
+        if trace is not None:
+            trace.lap("optical_flow", t)
         return OpticalFlowData(
             avg_speed_px_s=float(avg_magnitude_per_frame),  # Per frame, not per second
             primary_direction_deg=float(primary_direction_deg),
@@ -301,7 +325,8 @@ class RealtimeAnalyzer:
     
     def compute_optical_flow_lucas_kanade(
         self,
-        frames: list[np.ndarray]
+        frames: list[np.ndarray],
+        trace: Optional["CycleTrace"] = None,
     ) -> OpticalFlowData:
         """
         Compute sparse optical flow using Lucas-Kanade algorithm.
@@ -311,6 +336,7 @@ class RealtimeAnalyzer:
         
         Args:
             frames: List of frames (BGR format)
+            trace: Latency trace of the cycle (optional)
             
         Returns:
             OpticalFlowData with speed, direction, and flow vectors
@@ -323,7 +349,10 @@ class RealtimeAnalyzer:
             )
         
         # Convert to grayscale
+        t = time.perf_counter() if trace is not None else 0.0
         gray_frames = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in frames]
+        if trace is not None:
+            t = trace.lap("gray", t)
         
         # Parameters for corner detection
         feature_params = dict(
@@ -405,6 +434,8 @@ class RealtimeAnalyzer:
         else:
             primary_direction_deg = 0.0
         
+        if trace is not None:
+            trace.lap("optical_flow", t)
         return OpticalFlowData(
             avg_speed_px_s=float(avg_magnitude_per_frame),
             primary_direction_deg=float(primary_direction_deg),
@@ -413,7 +444,8 @@ class RealtimeAnalyzer:
     
     def compute_optical_flow_fast(
         self,
-        frames: list[np.ndarray]
+        frames: list[np.ndarray],
+        trace: Optional["CycleTrace"] = None,
     ) -> tuple[OpticalFlowData, float]:
         """
         Compute optical flow with performance optimization.
@@ -423,6 +455,7 @@ class RealtimeAnalyzer:
         
         Args:
             frames: List of frames (BGR format)
+            trace: Latency trace of the cycle (optional)
             
         Returns:
             Tuple of (OpticalFlowData, latency_ms)
@@ -431,9 +464,9 @@ class RealtimeAnalyzer:
         
         # Check if we should use degraded mode
         if self._degraded_mode or self.config.use_sparse_flow:
-            flow_data = self.compute_optical_flow_lucas_kanade(frames)
+            flow_data = self.compute_optical_flow_lucas_kanade(frames, trace)
         else:
-            flow_data = self.compute_optical_flow_farneback(frames)
+            flow_data = self.compute_optical_flow_farneback(frames, trace)
         
         latency_ms = (time.time() - start_time) * 1000
         
@@ -649,7 +682,8 @@ class RealtimeAnalyzer:
     def analyze_buffer(
         self,
         frames: list[np.ndarray],
-        fps: float = 30.0
+        fps: float = 30.0,
+        trace: Optional["CycleTrace"] = None,
     ) -> RealtimeAnalysisResult:
         """
         Analyze a buffer of frames and return analysis result.
@@ -659,6 +693,8 @@ class RealtimeAnalyzer:
         Args:
             frames: List of 5-10 consecutive frames (BGR format)
             fps: Frames per second of the source video
+            trace: Latency trace of the cycle; records resize, gray,
+                optical_flow, subject and environment spans (optional)
             
         Returns:
             RealtimeAnalysisResult with all indicators
@@ -678,6 +714,7 @@ class RealtimeAnalyzer:
             )
         
         # Resize frames if needed
+        t = time.perf_counter() if trace is not None else 0.0
         resized_frames = []
         for frame in frames:
             if frame.shape[:2] != self.config.target_resolution[::-1]:
@@ -687,21 +724,30 @@ class RealtimeAnalyzer:
                     interpolation=cv2.INTER_LINEAR
                 )
             resized_frames.append(frame)
+        if trace is not None:
+            trace.lap("resize", t)
         
         # Compute optical flow with adaptive degradation
-        flow_data, flow_latency_ms = self.compute_optical_flow_fast(resized_frames)
+        flow_data, flow_latency_ms = self.compute_optical_flow_fast(resized_frames, trace)
+        t = time.perf_counter() if trace is not None else 0.0
         
         # Calculate motion smoothness
         motion_smoothness = self.calculate_motion_smoothness(flow_data)
         
         # Calculate speed variance
         speed_variance = self.calculate_speed_variance(flow_data)
+        if trace is not None:
+            t = trace.lap("optical_flow", t)
         
         # Update subject tracking
         subject_bbox, subject_occupancy, subject_lost = self.update_subject_tracking(resized_frames)
+        if trace is not None:
+            t = trace.lap("subject", t)
 
         # Calculate environment features
         env_features = self.calculate_environment_features(resized_frames[-1])  # Use latest frame
+        if trace is not None:
+            trace.lap("environment", t)
 
         # Calculate total latency
         total_latency_ms = (time.time() - start_time) * 1000
@@ -779,13 +825,61 @@ class RealtimeAnalyzer:
         self._frame_buffer.clear()
         self._last_analysis_time = 0.0
         self._last_latency_ms = 0.0
-        self._smoothing_filter.reset()
         self._last_subject_bbox = None
         self._frames_without_subject = 0
         self._subject_lost = False
         self._degraded_mode = False
         self._latency_history.clear()
 
+    def write_state(self, w: "StateWriter") -> None:
+        """
+        Write analyzer state to a snapshot.
+
+        Buffered frames are stored as JPEG (config.jpeg_quality) so a
+        restored session can analyze immediately instead of refilling
+        the buffer.
+        """
+        w.f64(self._last_analysis_time)
+        w.f64(self._last_latency_ms)
+        bbox = self._last_subject_bbox
+        w.bool(bbox is not None)
+        if bbox is not None:
+            w.f64s((bbox.x, bbox.y, bbox.w, bbox.h))
+        w.u32(self._frames_without_subject)
+        w.bool(self._subject_lost)
+        w.bool(self._degraded_mode)
+        w.f64s(self._latency_history)
+
+        encode_params = [cv2.IMWRITE_JPEG_QUALITY, self.config.jpeg_quality]
+        encoded = []
+        for frame, timestamp in zip(self._frame_buffer.frames, self._frame_buffer.timestamps):
+            ok, jpeg = cv2.imencode(".jpg", frame, encode_params)
+            if ok:
+                encoded.append((jpeg.tobytes(), timestamp))
+        w.u16(len(encoded))
+        for jpeg, timestamp in encoded:
+            w.f64(timestamp)
+            w.bytes(jpeg)
+
+    def read_state(self, r: "StateReader") -> None:
+        """Restore analyzer state written by write_state."""
+        self._last_analysis_time = r.f64()
+        self._last_latency_ms = r.f64()
+        self._last_subject_bbox = BBox(*r.f64s()) if r.bool() else None
+        self._frames_without_subject = r.u32()
+        self._subject_lost = r.bool()
+        self._degraded_mode = r.bool()
+        self._latency_history.clear()
+        self._latency_history.extend(r.f64s())
+
+        self._frame_buffer.clear()
+        for _ in range(r.u16()):
+            timestamp = r.f64()
+            jpeg = np.frombuffer(r.bytes(), np.uint8)
+            frame = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+            if frame is not None:
+                self._frame_buffer.add_frame(frame, timestamp)
+
     def calculate_environment_features(self, frame: np.ndarray) -> dict[str, any]:
         """
         Calculate environment features from a single frame.
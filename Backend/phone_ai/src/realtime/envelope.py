@@ -0,0 +1,219 @@
+"""
+Cycle Envelopes
+
+每个分析周期一条出站消息。
+One outbound message per analysis cycle.
+
+Without envelopes every analysis cycle sends a ``frame_ack``, one message
+per advice item and a ``telemetry`` message, each JSON-encoded separately
+for every client. Clients that opt in (``?envelope=1`` on the WebSocket
+URL) instead get a single ``cycle`` message::
+
+    {"type": "cycle", "ack": {...}, "advice": [{...}, ...],
+     "telemetry": {...} | null, "timestamp": ms}
+
+The envelope is encoded once per cycle and encoding, and the same bytes
+are sent to every client. ``?encoding=msgpack`` selects a compact binary
+frame when msgpack is installed; otherwise clients fall back to JSON.
+
+Advice items are interned AdvicePayloads whose JSON text is cached on the
+payload, so the JSON envelope (and the per-item text frames for clients
+without envelopes) is spliced from cached fragments and stamped with the
+cycle timestamp instead of being rebuilt as dicts for every cycle.
+"""
+import json
+import time
+from typing import Optional, Union
+
+from .send_queue import SendPriority, classify_advice, classify_message
+from .types import AdvicePayload
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+ENCODING_JSON = "json"
+ENCODING_MSGPACK = "msgpack"
+
+EncodedMessage = Union[str, bytes]
+AdviceItem = Union[AdvicePayload, dict]
+
+
+def available_encodings() -> list[str]:
+    """Encodings this server can produce."""
+    return [ENCODING_JSON, ENCODING_MSGPACK] if msgpack is not None else [ENCODING_JSON]
+
+
+def negotiate_encoding(requested: Optional[str]) -> str:
+    """
+    Pick the envelope encoding for a client.
+
+    Args:
+        requested: Encoding asked for by the client (may be None)
+
+    Returns:
+        The requested encoding if available, otherwise JSON
+    """
+    if requested and requested.lower() in available_encodings():
+        return requested.lower()
+    return ENCODING_JSON
+
+
+def encode_message(payload: dict, encoding: str = ENCODING_JSON) -> EncodedMessage:
+    """
+    Encode a message for the wire.
+
+    Returns:
+        Text for JSON (sent as a text frame), bytes for msgpack (binary frame)
+    """
+    if encoding == ENCODING_MSGPACK:
+        return msgpack.packb(payload, use_bin_type=True)
+    # Same separators as Starlette's send_json
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+
+class CycleEnvelope:
+    """
+    周期信封
+    The messages produced by one analysis cycle, encoded lazily and once.
+
+    Variants are cached by (encoding, with_telemetry): slow clients get the
+    envelope without telemetry, which is the first thing dropped when a
+    viewer falls behind.
+
+    Advice items are AdvicePayloads (stamped with the cycle timestamp) or
+    advice dicts received from another worker.
+    """
+
+    __slots__ = (
+        "ack", "advice", "telemetry", "timestamp",
+        "_encoded", "_advice_messages", "_telemetry_text", "_priority",
+    )
+
+    def __init__(
+        self,
+        ack: Optional[dict],
+        advice: list[AdviceItem],
+        telemetry: Optional[dict],
+        timestamp: Optional[int] = None,
+    ):
+        self.ack = ack
+        self.advice = advice
+        self.telemetry = telemetry
+        self.timestamp = timestamp if timestamp is not None else int(time.time() * 1000)
+        self._encoded: dict[tuple[str, bool], EncodedMessage] = {}
+        self._advice_messages: Optional[list[tuple[str, SendPriority, Optional[str]]]] = None
+        self._telemetry_text: Optional[str] = None
+        self._priority: Optional[tuple[SendPriority, Optional[str]]] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CycleEnvelope":
+        """Rebuild from to_parts() (e.g. after crossing the fan-out bus)."""
+        return cls(
+            ack=data.get("ack"),
+            advice=data.get("advice") or [],
+            telemetry=data.get("telemetry"),
+            timestamp=data.get("timestamp"),
+        )
+
+    def advice_dicts(self) -> list[dict]:
+        """Advice items as plain dicts."""
+        return [
+            item.to_dict(self.timestamp) if isinstance(item, AdvicePayload) else item
+            for item in self.advice
+        ]
+
+    def to_parts(self) -> dict:
+        """Plain dict of the cycle's parts."""
+        return {
+            "ack": self.ack,
+            "advice": self.advice_dicts(),
+            "telemetry": self.telemetry,
+            "timestamp": self.timestamp,
+        }
+
+    def to_dict(self, with_telemetry: bool = True) -> dict:
+        """The ``cycle`` message."""
+        return {
+            "type": "cycle",
+            "ack": self.ack,
+            "advice": self.advice_dicts(),
+            "telemetry": self.telemetry if with_telemetry else None,
+            "timestamp": self.timestamp,
+        }
+
+    def advice_messages(self) -> list[tuple[str, SendPriority, Optional[str]]]:
+        """
+        Separate advice messages for clients without envelopes.
+
+        Returns:
+            (JSON text, priority, latest-wins key) per advice item, built once
+        """
+        messages = self._advice_messages
+        if messages is None:
+            messages = []
+            for item in self.advice:
+                if isinstance(item, AdvicePayload):
+                    priority, key = classify_advice(item.priority.value, item.category.value)
+                    messages.append((item.to_json(self.timestamp), priority, key))
+                else:
+                    priority, key = classify_message(item)
+                    messages.append((encode_message(item), priority, key))
+            self._advice_messages = messages
+        return messages
+
+    def telemetry_text(self) -> Optional[str]:
+        """JSON text of the telemetry message, built once."""
+        if self.telemetry is not None and self._telemetry_text is None:
+            self._telemetry_text = encode_message(self.telemetry)
+        return self._telemetry_text
+
+    @property
+    def priority(self) -> tuple[SendPriority, Optional[str]]:
+        """Send priority (and latest-wins key) of the envelope."""
+        if self._priority is None:
+            priorities = {priority for _, priority, _ in self.advice_messages()}
+            if SendPriority.CRITICAL in priorities:
+                self._priority = (SendPriority.CRITICAL, None)
+            elif SendPriority.NORMAL in priorities:
+                self._priority = (SendPriority.NORMAL, None)
+            else:
+                # Only telemetry/info: a newer cycle supersedes it
+                self._priority = (SendPriority.LATEST, "cycle")
+        return self._priority
+
+    def encoded(self, encoding: str = ENCODING_JSON, with_telemetry: bool = True) -> EncodedMessage:
+        """Encoded envelope; encoded at most once per variant."""
+        if self.telemetry is None:
+            with_telemetry = True
+        key = (encoding, with_telemetry)
+        data = self._encoded.get(key)
+        if data is None:
+            if encoding == ENCODING_JSON:
+                data = self._encode_json(with_telemetry)
+            else:
+                data = encode_message(self.to_dict(with_telemetry), encoding)
+            self._encoded[key] = data
+        return data
+
+    def _encode_json(self, with_telemetry: bool) -> str:
+        # Same text as encode_message(self.to_dict(...)), from cached parts
+        telemetry = self.telemetry_text() if with_telemetry else None
+        return "".join((
+            '{"type":"cycle","ack":',
+            encode_message(self.ack),
+            ',"advice":[',
+            ",".join(text for text, _, _ in self.advice_messages()),
+            '],"telemetry":',
+            telemetry if telemetry is not None else "null",
+            ',"timestamp":',
+            str(self.timestamp),
+            "}",
+        ))
+
+    @property
+    def encode_count(self) -> int:
+        """Number of encodings performed so far."""
+        return len(self._encoded)
@@ -6,7 +6,10 @@ Implements hysteresis thresholds and category-based cooldown to prevent
 rapid toggling of advice and repetitive notifications.
 """
 from dataclasses import dataclass
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from .snapshot import StateReader, StateWriter
 
 
 @dataclass
@@ -288,6 +291,20 @@ class HysteresisController:
         """
         return self._current_states.get(category, "normal")
     
+    def write_state(self, w: "StateWriter") -> None:
+        """Write per-category states, counters and cooldown timestamps to a snapshot."""
+        w.str_map(self._current_states, w.str)
+        w.str_map(self._consistency_counters, w.u32)
+        w.str_map(self._pending_states, w.str)
+        w.str_map(self._last_advice_time, w.f64)
+    
+    def read_state(self, r: "StateReader") -> None:
+        """Restore state written by write_state."""
+        self._current_states = r.str_map(r.str)
+        self._consistency_counters = r.str_map(r.u32)
+        self._pending_states = r.str_map(r.str)
+        self._last_advice_time = r.str_map(r.f64)
+    
     def reset(self, category: Optional[str] = None) -> None:
         """
         Reset state for a category or all categories.
@@ -0,0 +1,211 @@
+"""
+Indicator Pipeline Module
+
+每个会话一条指标流水线：平滑、异常检测、运动类型推断各执行一次。
+One per-session indicator pipeline: smoothing, anomaly detection and motion
+type inference run once per analysis cycle.
+
+The resulting IndicatorFrame is frozen and shared by the advice engine,
+telemetry and the LLM advisor, so no consumer re-smooths the raw values
+or builds its own HeuristicOutput.
+
+Requirements: 8.4, 8.5, 13.1, 13.2, 13.5
+"""
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+from src.models.enums import MotionType
+
+from .smoothing import IndicatorValues, SmoothingFilter, SmoothingFilterConfig
+from .state_machine import MotionIndicators, MotionStateMachine, MotionStateMachineConfig
+from .types import RealtimeAnalysisResult
+
+if TYPE_CHECKING:
+    from .snapshot import StateReader, StateWriter
+
+
+# Motion rules are tuned in px/s; realtime indicators are px/frame
+NOMINAL_FPS = 30.0
+
+
+@dataclass(frozen=True, slots=True)
+class IndicatorFrame:
+    """
+    指标帧
+    Indicators of one analysis cycle after the shared pipeline.
+
+    Value fields use the RealtimeAnalysisResult names and hold smoothed
+    values when smoothing ran. Low-confidence cycles bypass the filter and
+    the state machine, and carry the raw values.
+    """
+    avg_speed_px_frame: float
+    speed_variance: float
+    motion_smoothness: float
+    primary_direction_deg: float
+    subject_occupancy: float
+    confidence: float
+    motion_type: MotionType
+    motion_confidence: float
+    smoothed: bool = False
+    suppressed: bool = False  # Anomaly detected, advice withheld (Requirement 13.2)
+    low_confidence: bool = False  # Below min_confidence (Requirement 13.5)
+    timestamp: float = 0.0
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary for JSON serialization."""
+        return {
+            "avg_speed_px_frame": self.avg_speed_px_frame,
+            "speed_variance": self.speed_variance,
+            "motion_smoothness": self.motion_smoothness,
+            "primary_direction_deg": self.primary_direction_deg,
+            "subject_occupancy": self.subject_occupancy,
+            "confidence": self.confidence,
+            "motion_type": self.motion_type.value,
+            "motion_confidence": self.motion_confidence,
+            "smoothed": self.smoothed,
+            "suppressed": self.suppressed,
+            "low_confidence": self.low_confidence,
+        }
+
+
+class IndicatorPipeline:
+    """
+    指标流水线
+    Owns the session's smoothing filter and motion state machine.
+
+    process() is the only place either is updated; the latest frame is
+    kept for consumers that run after the advice engine.
+    """
+
+    def __init__(
+        self,
+        min_confidence: float = 0.5,
+        smoothing_config: Optional[SmoothingFilterConfig] = None,
+        state_machine_config: Optional[MotionStateMachineConfig] = None,
+    ):
+        """
+        Initialize the pipeline.
+
+        Args:
+            min_confidence: Results below this confidence skip smoothing and inference
+            smoothing_config: Configuration for the smoothing filter
+            state_machine_config: Configuration for the motion state machine
+        """
+        self.min_confidence = min_confidence
+        self.smoothing_filter = SmoothingFilter(smoothing_config)
+        self.state_machine = MotionStateMachine(state_machine_config)
+        self.latest: Optional[IndicatorFrame] = None
+
+    def process(
+        self,
+        analysis_result: RealtimeAnalysisResult,
+        current_time: float = 0.0,
+        apply_smoothing: bool = True,
+    ) -> IndicatorFrame:
+        """
+        Run one analysis result through the pipeline.
+
+        Args:
+            analysis_result: Raw analysis result
+            current_time: Current timestamp in seconds
+            apply_smoothing: Whether to apply the smoothing filter
+
+        Returns:
+            Frozen IndicatorFrame (also stored as ``latest``)
+        """
+        if current_time == 0.0:
+            current_time = time.time()
+
+        if analysis_result.confidence < self.min_confidence:
+            frame = self._low_confidence_frame(analysis_result, current_time)
+            self.latest = frame
+            return frame
+
+        values = IndicatorValues(
+            motion_smoothness=analysis_result.motion_smoothness,
+            avg_speed=analysis_result.avg_speed_px_frame,
+            speed_variance=analysis_result.speed_variance,
+            primary_direction_deg=analysis_result.primary_direction_deg,
+            subject_occupancy=analysis_result.subject_occupancy,
+            confidence=analysis_result.confidence,
+        )
+        if apply_smoothing:
+            # Smoothing and anomaly detection (Requirements 13.1, 13.2)
+            values = self.smoothing_filter.update(values)
+            if self.smoothing_filter.is_suppressed():
+                # Anomalous cycle: keep the motion state as it was
+                frame = self._frame(values, analysis_result.confidence, current_time, suppressed=True)
+                self.latest = frame
+                return frame
+
+        # Update motion state machine (Requirements 8.4, 8.5)
+        self.state_machine.update(
+            MotionIndicators(
+                avg_motion_px_per_s=values.avg_speed * NOMINAL_FPS,
+                motion_smoothness=values.motion_smoothness,
+                subject_occupancy=values.subject_occupancy,
+            ),
+            values.primary_direction_deg,
+        )
+
+        frame = self._frame(values, analysis_result.confidence, current_time, smoothed=apply_smoothing)
+        self.latest = frame
+        return frame
+
+    def _frame(
+        self,
+        values: IndicatorValues,
+        confidence: float,
+        current_time: float,
+        smoothed: bool = True,
+        suppressed: bool = False,
+    ) -> IndicatorFrame:
+        return IndicatorFrame(
+            avg_speed_px_frame=values.avg_speed,
+            speed_variance=values.speed_variance,
+            motion_smoothness=values.motion_smoothness,
+            primary_direction_deg=values.primary_direction_deg,
+            subject_occupancy=values.subject_occupancy,
+            confidence=confidence,
+            motion_type=self.state_machine.get_current_state(),
+            motion_confidence=self.state_machine.get_state_confidence(),
+            smoothed=smoothed,
+            suppressed=suppressed,
+            timestamp=current_time,
+        )
+
+    def _low_confidence_frame(
+        self,
+        analysis_result: RealtimeAnalysisResult,
+        current_time: float,
+    ) -> IndicatorFrame:
+        return IndicatorFrame(
+            avg_speed_px_frame=analysis_result.avg_speed_px_frame,
+            speed_variance=analysis_result.speed_variance,
+            motion_smoothness=analysis_result.motion_smoothness,
+            primary_direction_deg=analysis_result.primary_direction_deg,
+            subject_occupancy=analysis_result.subject_occupancy,
+            confidence=analysis_result.confidence,
+            motion_type=self.state_machine.get_current_state(),
+            motion_confidence=self.state_machine.get_state_confidence(),
+            low_confidence=True,
+            timestamp=current_time,
+        )
+
+    def reset(self) -> None:
+        """Reset the filter, the state machine and the latest frame."""
+        self.smoothing_filter.reset()
+        self.state_machine.reset()
+        self.latest = None
+
+    def write_state(self, w: "StateWriter") -> None:
+        """Write the state machine and smoothing filter to a snapshot."""
+        self.state_machine.write_state(w)
+        self.smoothing_filter.write_state(w)
+
+    def read_state(self, r: "StateReader") -> None:
+        """Restore state written by write_state."""
+        self.state_machine.read_state(r)
+        self.smoothing_filter.read_state(r)
+        self.latest = None
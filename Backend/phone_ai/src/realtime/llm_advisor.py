@@ -6,14 +6,18 @@ shooting advice using LLM API.
 """
 import logging
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Union
 
 from src.services.llm_client import LLMClient, LLMConfig
+from src.realtime.indicator_pipeline import IndicatorFrame
 from src.realtime.types import RealtimeAnalysisResult, AdvicePayload, AdvicePriority, AdviceCategory
 
 
 logger = logging.getLogger(__name__)
 
+# Raw analysis result or the pipeline's smoothed frame (same field names)
+AnalysisValues = Union[RealtimeAnalysisResult, IndicatorFrame]
+
 
 @dataclass
 class LLMAdvisorConfig:
@@ -45,8 +49,8 @@ SYSTEM_PROMPT = """你是一个专业的手机拍摄助手。根据光流分析
 - speed_variance > 15: 速度不稳定"""
 
 
-def build_analysis_prompt(result: RealtimeAnalysisResult) -> str:
-    """Build prompt from analysis result."""
+def build_analysis_prompt(result: AnalysisValues) -> str:
+    """Build prompt from analysis result or smoothed indicators."""
     direction_names = {
         (0, 45): "右",
         (45, 135): "下",
@@ -62,12 +66,16 @@ def build_analysis_prompt(result: RealtimeAnalysisResult) -> str:
             direction = name
             break
     
+    motion_line = ""
+    if isinstance(result, IndicatorFrame):
+        motion_line = f"\n- 运镜类型: {result.motion_type.value}"
+    
     return f"""光流分析数据：
 - 平均速度: {result.avg_speed_px_frame:.1f} 像素/帧
 - 速度方差: {result.speed_variance:.1f}
 - 运动平滑度: {result.motion_smoothness:.2f} (0-1)
 - 主要方向: {direction} ({result.primary_direction_deg:.0f}°)
-- 置信度: {result.confidence:.2f}
+- 置信度: {result.confidence:.2f}{motion_line}
 
 请给出10字以内的拍摄建议："""
 
@@ -95,17 +103,23 @@ class LLMAdvisor:
     
     async def generate_advice(
         self,
-        analysis: RealtimeAnalysisResult
+        analysis: RealtimeAnalysisResult,
+        indicators: Optional[IndicatorFrame] = None,
     ) -> AdvicePayload:
         """
         Generate shooting advice from analysis result.
         
         Args:
             analysis: Optical flow analysis result
+            indicators: Session pipeline output for the result; when given,
+                its smoothed values and motion type are used instead
             
         Returns:
             AdvicePayload with LLM-generated message
         """
+        if indicators is not None and not indicators.low_confidence:
+            analysis = indicators
+        
         # Determine priority and category from analysis
         priority, category = self._determine_priority_category(analysis)
         
@@ -138,7 +152,7 @@ class LLMAdvisor:
     
     def _determine_priority_category(
         self,
-        analysis: RealtimeAnalysisResult
+        analysis: AnalysisValues
     ) -> tuple[AdvicePriority, AdviceCategory]:
         """Determine advice priority and category from analysis."""
         speed = analysis.avg_speed_px_frame
@@ -168,7 +182,7 @@ class LLMAdvisor:
     
     def _generate_fallback_advice(
         self,
-        analysis: RealtimeAnalysisResult,
+        analysis: AnalysisValues,
         priority: AdvicePriority,
         category: AdviceCategory
     ) -> AdvicePayload:
@@ -10,6 +10,7 @@ from dataclasses import dataclass
 from typing import Optional
 
 from src.realtime.analyzer import RealtimeAnalyzer, RealtimeAnalyzerConfig
+from src.realtime.indicator_pipeline import IndicatorPipeline
 from src.realtime.llm_advisor import LLMAdvisor, LLMAdvisorConfig, get_llm_advisor
 from src.realtime.types import RealtimeAnalysisResult, AdvicePayload
 
@@ -33,12 +34,14 @@ class RealtimeService:
     Processes frame buffers through:
     1. Base64 decoding
     2. Optical flow analysis
-    3. LLM advice generation
+    3. Indicator smoothing and motion type inference
+    4. LLM advice generation
     """
     
     def __init__(self, config: Optional[RealtimeServiceConfig] = None):
         self.config = config or RealtimeServiceConfig()
         self._analyzer = RealtimeAnalyzer(self.config.analyzer_config)
+        self._pipeline = IndicatorPipeline()
         self._advisor = LLMAdvisor(self.config.advisor_config)
     
     async def process_frame_buffer(
@@ -90,12 +93,14 @@ class RealtimeService:
             f"latency={analysis_time*1000:.1f}ms"
         )
         
+        indicators = self._pipeline.process(result)
+        
         # Generate advice if enabled
         advice = None
         if generate_advice and self.config.enable_llm_advice:
             try:
                 advice_start = time.time()
-                advice = await self._advisor.generate_advice(result)
+                advice = await self._advisor.generate_advice(result, indicators)
                 advice_time = time.time() - advice_start
                 logger.info(f"Advice generated in {advice_time*1000:.1f}ms: {advice.message}")
             except Exception as e:
@@ -109,6 +114,7 @@ class RealtimeService:
     def reset(self) -> None:
         """Reset service state."""
         self._analyzer.reset()
+        self._pipeline.reset()
 
 
 # Singleton instance
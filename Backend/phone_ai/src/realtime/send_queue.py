@@ -0,0 +1,267 @@
+"""
+Per-Client Send Queues
+
+每个客户端一个有界发送队列和写任务，慢客户端不会拖慢分析循环。
+Bounded per-client send queues drained by a writer task, so a viewer on
+a bad network never stalls analysis for the rest of the session.
+
+Messages are queued by priority class:
+- CRITICAL: never dropped (critical advice, errors). A client whose
+  critical backlog exceeds the queue size is disconnected.
+- NORMAL: FIFO bounded by the queue size; the oldest message is dropped
+  on overflow (acks, warning/positive advice, task updates).
+- LATEST: one slot per key, a new message replaces the pending one
+  (telemetry, info advice, heartbeats).
+
+The writer sends CRITICAL first, then NORMAL, then LATEST slots.
+With the "disconnect" slow-consumer policy, a client that keeps
+overflowing for ``slow_consumer_timeout_s`` is closed so it can
+reconnect; with "drop" it only loses droppable messages.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Optional, Union
+
+
+logger = logging.getLogger(__name__)
+
+
+class SendPriority(str, Enum):
+    """Send priority class."""
+    CRITICAL = "critical"
+    NORMAL = "normal"
+    LATEST = "latest"
+
+
+SLOW_CONSUMER_DISCONNECT = "disconnect"
+SLOW_CONSUMER_DROP = "drop"
+
+# WebSocket close code 1013: "try again later"
+CLOSE_CODE_SLOW_CONSUMER = 1013
+
+OutboundMessage = Union[dict, str, bytes]
+
+
+@dataclass
+class SendQueueConfig:
+    """Configuration for per-client send queues."""
+    max_pending: int = 32  # NORMAL backlog bound (and CRITICAL disconnect limit)
+    slow_consumer_policy: str = SLOW_CONSUMER_DISCONNECT  # "disconnect" or "drop"
+    slow_consumer_timeout_s: float = 10.0  # Sustained overflow before disconnect
+
+
+def classify_advice(priority: Optional[str], category: Optional[str]) -> tuple[SendPriority, Optional[str]]:
+    """
+    Priority class (and latest-wins key) of an advice message.
+
+    Args:
+        priority: Advice priority value ("critical", "warning", "info", ...)
+        category: Advice category value
+    """
+    if priority == "critical":
+        return SendPriority.CRITICAL, None
+    if priority == "info":
+        return SendPriority.LATEST, f"advice:{category}"
+    return SendPriority.NORMAL, None
+
+
+def classify_message(payload: dict) -> tuple[SendPriority, Optional[str]]:
+    """
+    Priority class (and latest-wins key) of an outbound JSON message.
+
+    Returns:
+        (priority, key) where key is set for LATEST messages
+    """
+    msg_type = payload.get("type")
+    if msg_type == "advice":
+        return classify_advice(payload.get("priority"), payload.get("category"))
+    if msg_type in ("telemetry", "heartbeat", "heartbeat_ack", "status"):
+        return SendPriority.LATEST, msg_type
+    if msg_type == "error":
+        return SendPriority.CRITICAL, None
+    return SendPriority.NORMAL, None
+
+
+class ClientSendQueue:
+    """
+    客户端发送队列
+    Bounded, prioritized outbound queue for one WebSocket client.
+
+    put() never blocks; a writer task (started lazily on the running loop)
+    drains the queue to the socket.
+    """
+
+    def __init__(self, websocket: Any, config: Optional[SendQueueConfig] = None):
+        self.websocket = websocket
+        self.config = config or SendQueueConfig()
+
+        self._critical: deque[OutboundMessage] = deque()
+        self._normal: deque[OutboundMessage] = deque()
+        self._latest: OrderedDict[str, OutboundMessage] = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._writer: Optional[asyncio.Task] = None
+        self._overflow_since: Optional[float] = None
+        self.closed = False
+
+        # Metrics
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.disconnected_slow = False
+
+    @property
+    def depth(self) -> int:
+        """Messages waiting to be sent."""
+        return len(self._critical) + len(self._normal) + len(self._latest)
+
+    def is_backlogged(self) -> bool:
+        """True if the client has not caught up with earlier messages."""
+        return self.depth > 0
+
+    def put(
+        self,
+        message: OutboundMessage,
+        priority: SendPriority = SendPriority.NORMAL,
+        key: Optional[str] = None,
+    ) -> bool:
+        """
+        Queue a message without blocking.
+
+        Args:
+            message: dict (sent as JSON), str (text frame) or bytes (binary frame)
+            priority: Priority class
+            key: Latest-wins slot for LATEST messages
+
+        Returns:
+            False if the queue is closed (or was just closed as a slow consumer)
+        """
+        if self.closed:
+            return False
+
+        if priority == SendPriority.CRITICAL:
+            self._critical.append(message)
+            if len(self._critical) > self.config.max_pending:
+                logger.warning("Critical backlog exceeded, disconnecting slow client")
+                self._disconnect()
+                return False
+        elif priority == SendPriority.LATEST:
+            slot = key or "latest"
+            if slot in self._latest:
+                self.coalesced += 1
+                del self._latest[slot]
+            self._latest[slot] = message
+        else:
+            if len(self._normal) >= self.config.max_pending:
+                self._normal.popleft()
+                self.dropped += 1
+                if self._overflow_since is None:
+                    self._overflow_since = time.monotonic()
+            self._normal.append(message)
+
+        self.max_depth = max(self.max_depth, self.depth)
+        self._check_slow_consumer()
+        if self.closed:
+            return False
+
+        self._idle.clear()
+        self._wakeup.set()
+        self._ensure_writer()
+        return True
+
+    async def drain(self) -> None:
+        """Wait until everything queued so far has been sent."""
+        if self.closed or self._writer is None:
+            return
+        await self._idle.wait()
+
+    def close(self) -> None:
+        """Stop the writer and discard pending messages."""
+        self.closed = True
+        self._clear()
+        if self._writer is not None and not self._writer.done():
+            self._writer.cancel()
+        self._idle.set()
+
+    def metrics(self) -> dict:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "disconnected_slow": self.disconnected_slow,
+        }
+
+    def _ensure_writer(self) -> None:
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.get_running_loop().create_task(self._run())
+
+    def _next(self) -> Optional[OutboundMessage]:
+        if self._critical:
+            return self._critical.popleft()
+        if self._normal:
+            return self._normal.popleft()
+        if self._latest:
+            return self._latest.popitem(last=False)[1]
+        return None
+
+    async def _run(self) -> None:
+        while not self.closed:
+            message = self._next()
+            if message is None:
+                self._overflow_since = None
+                self._idle.set()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            try:
+                await self._send(message)
+                self.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error sending message: {e}")
+                # Socket is gone; the receive loop cleans the client up
+                self.closed = True
+                self._clear()
+        self._idle.set()
+
+    async def _send(self, message: OutboundMessage) -> None:
+        if isinstance(message, bytes):
+            await self.websocket.send_bytes(message)
+        elif isinstance(message, str):
+            await self.websocket.send_text(message)
+        else:
+            await self.websocket.send_json(message)
+
+    def _check_slow_consumer(self) -> None:
+        if self.config.slow_consumer_policy != SLOW_CONSUMER_DISCONNECT:
+            return
+        if self._overflow_since is None:
+            return
+        if time.monotonic() - self._overflow_since > self.config.slow_consumer_timeout_s:
+            logger.warning("Client overflowed its send queue for too long, disconnecting")
+            self._disconnect()
+
+    def _disconnect(self) -> None:
+        self.disconnected_slow = True
+        self.close()
+        asyncio.get_running_loop().create_task(self._close_socket())
+
+    async def _close_socket(self) -> None:
+        try:
+            await self.websocket.close(code=CLOSE_CODE_SLOW_CONSUMER)
+        except Exception as e:
+            logger.debug(f"Error closing slow client: {e}")
+
+    def _clear(self) -> None:
+        self._critical.clear()
+        self._normal.clear()
+        self._latest.clear()
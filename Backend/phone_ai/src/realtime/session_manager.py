@@ -16,6 +16,12 @@ from collections import defaultdict
 from .types import SessionState
 from .analyzer import RealtimeAnalyzer
 from .advice_engine import AdviceEngine
+from .session_registry import (
+    WORKER_ID,
+    SessionRecord,
+    SessionRegistry,
+    create_session_registry,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -108,14 +114,23 @@ class PersistentSessionManager:
     - Heartbeat mechanism (Requirement 9.5)
     - Reconnection with exponential backoff (Requirement 9.4)
     - Automatic cleanup of stale sessions
+    - Mirroring of session stats and viewer counts into a shared
+      SessionRegistry, so other workers can see sessions held here
     
     Requirements:
     - 9.4: Reconnection with exponential backoff
     - 9.5: Heartbeat every 5 seconds
     """
     
-    def __init__(self, config: Optional[SessionConfig] = None):
+    def __init__(
+        self,
+        config: Optional[SessionConfig] = None,
+        registry: Optional[SessionRegistry] = None,
+        worker_id: str = WORKER_ID,
+    ):
         self.config = config or SessionConfig()
+        self.registry = registry or create_session_registry()
+        self.worker_id = worker_id
         self._sessions: dict[str, SessionData] = {}
         self._cleanup_task: Optional[asyncio.Task] = None
         self._heartbeat_tasks: dict[str, asyncio.Task] = {}
@@ -356,6 +371,7 @@ class PersistentSessionManager:
             try:
                 await asyncio.sleep(self.config.cleanup_interval_s)
                 await self._cleanup_stale()
+                await self.sync_registry()
             except asyncio.CancelledError:
                 break
             except Exception as e:
@@ -384,10 +400,37 @@ class PersistentSessionManager:
         # Remove stale sessions
         for session_id in stale_sessions:
             self.delete_session(session_id)
+            await self.registry.set_clients(session_id, self.worker_id, 0)
+            record = await self.registry.get(session_id)
+            if record is not None and record.total_clients == 0:
+                await self.registry.remove(session_id)
             if self._on_session_expired:
                 self._on_session_expired(session_id)
             logger.info(f"Removed stale session {session_id}")
     
+    async def sync_registry(self) -> None:
+        """Publish stats and active viewer counts of local sessions."""
+        for session_id, session in list(self._sessions.items()):
+            try:
+                await self.registry.register(session_id)
+                await self.registry.set_clients(
+                    session_id,
+                    self.worker_id,
+                    len(session.get_active_clients(self.config.heartbeat_timeout_s)),
+                )
+                await self.registry.update_stats(
+                    session_id,
+                    session.state.motion_state.value,
+                    session.state.total_analyses,
+                    session.state.avg_latency_ms,
+                )
+            except Exception as e:
+                logger.error(f"Failed to sync session {session_id} to registry: {e}")
+    
+    async def find_session(self, session_id: str) -> Optional[SessionRecord]:
+        """Look up a session held by any worker."""
+        return await self.registry.get(session_id)
+    
     def get_all_sessions(self) -> list[str]:
         """Get all session IDs."""
         return list(self._sessions.keys())
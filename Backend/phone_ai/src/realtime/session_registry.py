@@ -0,0 +1,576 @@
+"""
+Session Registry and Fan-out Bus for Realtime Shooting Sessions
+
+跨 worker 的会话注册表与广播总线。
+Shared session registry and cross-worker fan-out bus.
+
+With several uvicorn workers (or nodes) a session's viewers can be spread
+over different processes. This module provides two pluggable pieces:
+
+- SessionRegistry: shared session records (stats, viewer counts per worker)
+  and an owner lease. The owner worker is the only one that runs analysis
+  for the session; other workers forward frame buffers to it.
+- FanoutBus: delivers broadcasts (advice, telemetry, ...) to viewers
+  connected to other workers, and forwards frame buffers to the owner.
+
+Both come in an in-memory flavour (default, single process; instances can
+share one hub in tests) and a Redis flavour (hashes + pub/sub).
+"""
+import abc
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from configs.settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+# Unique identifier of this worker process
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+# Bus message kinds
+BUS_BROADCAST = "broadcast"  # deliver payload to local viewers of a session
+BUS_FRAMES = "frames"  # frame buffer forwarded to the owner worker
+BUS_CLOSE = "close"  # session deleted, drop local state
+BUS_CYCLE = "cycle"  # one analysis cycle's ack/advice/telemetry for local viewers
+
+BusHandler = Callable[[dict], Awaitable[None]]
+
+
+@dataclass
+class SessionRecord:
+    """Shared view of a session, visible to every worker."""
+    session_id: str
+    created_at: float = field(default_factory=time.time)
+    owner: Optional[str] = None
+    motion_state: str = "static"
+    total_analyses: int = 0
+    avg_latency_ms: float = 0.0
+    # worker_id -> connected viewers on that worker
+    clients: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total_clients(self) -> int:
+        """Viewers across all workers."""
+        return sum(self.clients.values())
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary for JSON serialization."""
+        return {
+            "session_id": self.session_id,
+            "created_at": self.created_at,
+            "owner": self.owner,
+            "motion_state": self.motion_state,
+            "total_analyses": self.total_analyses,
+            "avg_latency_ms": self.avg_latency_ms,
+            "total_clients": self.total_clients,
+        }
+
+
+# =========================================================================
+# Session Registry
+# =========================================================================
+
+class SessionRegistry(abc.ABC):
+    """Shared session records and owner leases."""
+
+    def __init__(self, lease_s: float, record_ttl_s: float):
+        """
+        Args:
+            lease_s: Owner lease duration; an owner that stops renewing
+                loses the session to the next worker that claims it
+            record_ttl_s: Session records expire after this long without updates
+        """
+        self.lease_s = lease_s
+        self.record_ttl_s = record_ttl_s
+
+    @abc.abstractmethod
+    async def register(self, session_id: str) -> SessionRecord:
+        """Create the session record if it does not exist yet."""
+
+    @abc.abstractmethod
+    async def get(self, session_id: str) -> Optional[SessionRecord]:
+        """Get the shared session record."""
+
+    @abc.abstractmethod
+    async def claim(self, session_id: str, worker_id: str) -> str:
+        """
+        Claim or renew the owner lease.
+
+        Returns:
+            The owner after the call (worker_id if the claim succeeded)
+        """
+
+    @abc.abstractmethod
+    async def release(self, session_id: str, worker_id: str) -> None:
+        """Give up the owner lease if worker_id holds it."""
+
+    @abc.abstractmethod
+    async def update_stats(
+        self,
+        session_id: str,
+        motion_state: str,
+        total_analyses: int,
+        avg_latency_ms: float,
+    ) -> None:
+        """Publish analysis stats from the owner worker."""
+
+    @abc.abstractmethod
+    async def set_clients(self, session_id: str, worker_id: str, count: int) -> None:
+        """Record how many viewers of the session are connected to worker_id."""
+
+    @abc.abstractmethod
+    async def remove(self, session_id: str) -> None:
+        """Delete the session record."""
+
+    @abc.abstractmethod
+    async def list_sessions(self) -> list[str]:
+        """All registered session IDs."""
+
+    async def close(self) -> None:
+        """Release backend resources."""
+
+
+class InMemorySessionRegistry(SessionRegistry):
+    """
+    Process-local registry (default).
+
+    Several SessionManager instances may share one registry to simulate
+    multiple workers in a single process.
+    """
+
+    def __init__(
+        self,
+        lease_s: float = 15.0,
+        record_ttl_s: float = 3600.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        super().__init__(lease_s, record_ttl_s)
+        self._clock = clock
+        self._records: dict[str, SessionRecord] = {}
+        self._touched: dict[str, float] = {}
+        self._leases: dict[str, tuple[str, float]] = {}  # session_id -> (owner, expires_at)
+
+    def _live(self, session_id: str) -> Optional[SessionRecord]:
+        record = self._records.get(session_id)
+        if record is None:
+            return None
+        if self._clock() - self._touched[session_id] > self.record_ttl_s:
+            self._drop(session_id)
+            return None
+        return record
+
+    def _drop(self, session_id: str) -> None:
+        self._records.pop(session_id, None)
+        self._touched.pop(session_id, None)
+        self._leases.pop(session_id, None)
+
+    def _owner(self, session_id: str) -> Optional[str]:
+        lease = self._leases.get(session_id)
+        if lease is None or lease[1] <= self._clock():
+            return None
+        return lease[0]
+
+    async def register(self, session_id: str) -> SessionRecord:
+        record = self._live(session_id)
+        if record is None:
+            record = SessionRecord(session_id=session_id, created_at=self._clock())
+            self._records[session_id] = record
+        self._touched[session_id] = self._clock()
+        return record
+
+    async def get(self, session_id: str) -> Optional[SessionRecord]:
+        record = self._live(session_id)
+        if record is not None:
+            record.owner = self._owner(session_id)
+        return record
+
+    async def claim(self, session_id: str, worker_id: str) -> str:
+        owner = self._owner(session_id)
+        if owner is None or owner == worker_id:
+            self._leases[session_id] = (worker_id, self._clock() + self.lease_s)
+            return worker_id
+        return owner
+
+    async def release(self, session_id: str, worker_id: str) -> None:
+        if self._owner(session_id) == worker_id:
+            self._leases.pop(session_id, None)
+
+    async def update_stats(
+        self,
+        session_id: str,
+        motion_state: str,
+        total_analyses: int,
+        avg_latency_ms: float,
+    ) -> None:
+        record = await self.register(session_id)
+        record.motion_state = motion_state
+        record.total_analyses = total_analyses
+        record.avg_latency_ms = avg_latency_ms
+
+    async def set_clients(self, session_id: str, worker_id: str, count: int) -> None:
+        record = await self.register(session_id)
+        if count > 0:
+            record.clients[worker_id] = count
+        else:
+            record.clients.pop(worker_id, None)
+
+    async def remove(self, session_id: str) -> None:
+        self._drop(session_id)
+
+    async def list_sessions(self) -> list[str]:
+        return [sid for sid in list(self._records) if self._live(sid) is not None]
+
+
+# Claim the owner lease if free (or ours), renewing it; returns the owner
+_CLAIM_LUA = """
+local owner = redis.call('GET', KEYS[1])
+if (not owner) or owner == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return ARGV[1]
+end
+return owner
+"""
+
+# Delete the owner lease only if we hold it
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisSessionRegistry(SessionRegistry):
+    """
+    Redis-backed registry shared by all workers.
+
+    Keys (prefix defaults to "realtime:"):
+    - {prefix}session:{id}          hash of record fields
+    - {prefix}session:{id}:clients  hash worker_id -> viewer count
+    - {prefix}session:{id}:owner    owner worker_id, expires with the lease
+    - {prefix}sessions              set of session IDs
+    """
+
+    def __init__(
+        self,
+        url: str = settings.redis.url,
+        lease_s: float = 15.0,
+        record_ttl_s: float = 3600.0,
+        key_prefix: str = "realtime:",
+    ):
+        super().__init__(lease_s, record_ttl_s)
+        self.url = url
+        self.key_prefix = key_prefix
+        self._client = None
+        self._claim_script = None
+        self._release_script = None
+
+    def _redis(self):
+        """Lazily create the client and register Lua scripts."""
+        if self._client is None:
+            import redis.asyncio as aioredis
+
+            self._client = aioredis.from_url(self.url, decode_responses=True)
+            self._claim_script = self._client.register_script(_CLAIM_LUA)
+            self._release_script = self._client.register_script(_RELEASE_LUA)
+        return self._client
+
+    def _key(self, session_id: str, suffix: str = "") -> str:
+        return f"{self.key_prefix}session:{session_id}{suffix}"
+
+    async def register(self, session_id: str) -> SessionRecord:
+        client = self._redis()
+        ttl = int(self.record_ttl_s)
+        now = time.time()
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.hsetnx(self._key(session_id), "created_at", now)
+            pipe.expire(self._key(session_id), ttl)
+            pipe.sadd(f"{self.key_prefix}sessions", session_id)
+            await pipe.execute()
+        return await self.get(session_id) or SessionRecord(session_id, created_at=now)
+
+    async def get(self, session_id: str) -> Optional[SessionRecord]:
+        client = self._redis()
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.hgetall(self._key(session_id))
+            pipe.hgetall(self._key(session_id, ":clients"))
+            pipe.get(self._key(session_id, ":owner"))
+            fields, clients, owner = await pipe.execute()
+        if not fields:
+            return None
+        return SessionRecord(
+            session_id=session_id,
+            created_at=float(fields.get("created_at", 0.0)),
+            owner=owner,
+            motion_state=fields.get("motion_state", "static"),
+            total_analyses=int(fields.get("total_analyses", 0)),
+            avg_latency_ms=float(fields.get("avg_latency_ms", 0.0)),
+            clients={worker: int(count) for worker, count in clients.items()},
+        )
+
+    async def claim(self, session_id: str, worker_id: str) -> str:
+        self._redis()
+        return await self._claim_script(
+            keys=[self._key(session_id, ":owner")],
+            args=[worker_id, int(self.lease_s * 1000)],
+        )
+
+    async def release(self, session_id: str, worker_id: str) -> None:
+        self._redis()
+        await self._release_script(keys=[self._key(session_id, ":owner")], args=[worker_id])
+
+    async def update_stats(
+        self,
+        session_id: str,
+        motion_state: str,
+        total_analyses: int,
+        avg_latency_ms: float,
+    ) -> None:
+        client = self._redis()
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.hset(self._key(session_id), mapping={
+                "motion_state": motion_state,
+                "total_analyses": total_analyses,
+                "avg_latency_ms": avg_latency_ms,
+            })
+            pipe.expire(self._key(session_id), int(self.record_ttl_s))
+            await pipe.execute()
+
+    async def set_clients(self, session_id: str, worker_id: str, count: int) -> None:
+        client = self._redis()
+        key = self._key(session_id, ":clients")
+        async with client.pipeline(transaction=False) as pipe:
+            if count > 0:
+                pipe.hset(key, worker_id, count)
+            else:
+                pipe.hdel(key, worker_id)
+            pipe.expire(key, int(self.record_ttl_s))
+            await pipe.execute()
+
+    async def remove(self, session_id: str) -> None:
+        client = self._redis()
+        await client.delete(
+            self._key(session_id),
+            self._key(session_id, ":clients"),
+            self._key(session_id, ":owner"),
+        )
+        await client.srem(f"{self.key_prefix}sessions", session_id)
+
+    async def list_sessions(self) -> list[str]:
+        client = self._redis()
+        session_ids = sorted(await client.smembers(f"{self.key_prefix}sessions"))
+        if not session_ids:
+            return []
+        async with client.pipeline(transaction=False) as pipe:
+            for session_id in session_ids:
+                pipe.exists(self._key(session_id))
+            alive = await pipe.execute()
+        expired = [sid for sid, ok in zip(session_ids, alive) if not ok]
+        if expired:
+            await client.srem(f"{self.key_prefix}sessions", *expired)
+        return [sid for sid, ok in zip(session_ids, alive) if ok]
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# =========================================================================
+# Fan-out Bus
+# =========================================================================
+
+class FanoutBus(abc.ABC):
+    """
+    Cross-worker message bus.
+
+    Messages are dicts with "kind", "session_id", "origin" and "payload".
+    A worker never receives its own broadcasts (it delivers locally first).
+    """
+
+    def __init__(self):
+        self.published = 0
+        self.received = 0
+
+    @abc.abstractmethod
+    async def start(self, worker_id: str, handler: BusHandler) -> None:
+        """Subscribe this worker; handler is awaited for each incoming message."""
+
+    @abc.abstractmethod
+    async def stop(self) -> None:
+        """Unsubscribe."""
+
+    @abc.abstractmethod
+    async def publish(self, message: dict) -> None:
+        """Send a message to every other worker."""
+
+    @abc.abstractmethod
+    async def send_to_worker(self, worker_id: str, message: dict) -> None:
+        """Send a message to one worker's inbox."""
+
+    def has_peers(self, worker_id: str) -> bool:
+        """
+        Whether a publish from this worker may reach another worker.
+
+        Lets callers skip serializing messages nobody would receive.
+        Buses that cannot tell cheaply assume there are peers.
+        """
+        return True
+
+    def metrics(self) -> dict:
+        """Bus counters."""
+        return {"published": self.published, "received": self.received}
+
+
+class InMemoryFanoutBus(FanoutBus):
+    """
+    In-process bus (default).
+
+    With a single worker there is nobody to fan out to and publish is
+    nearly free; sharing one instance between several SessionManagers
+    simulates multiple workers.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._subscribers: dict[str, BusHandler] = {}
+
+    async def start(self, worker_id: str, handler: BusHandler) -> None:
+        self._subscribers[worker_id] = handler
+
+    async def stop(self) -> None:
+        self._subscribers.clear()
+
+    def has_peers(self, worker_id: str) -> bool:
+        return any(subscriber != worker_id for subscriber in self._subscribers)
+
+    async def publish(self, message: dict) -> None:
+        for worker_id, handler in list(self._subscribers.items()):
+            if worker_id != message.get("origin"):
+                self.published += 1
+                await self._deliver(handler, message)
+
+    async def send_to_worker(self, worker_id: str, message: dict) -> None:
+        handler = self._subscribers.get(worker_id)
+        if handler is None:
+            logger.warning(f"No subscriber for worker {worker_id}")
+            return
+        self.published += 1
+        await self._deliver(handler, message)
+
+    async def _deliver(self, handler: BusHandler, message: dict) -> None:
+        self.received += 1
+        try:
+            await handler(message)
+        except Exception as e:
+            logger.error(f"Fan-out handler error: {e}")
+
+
+class RedisFanoutBus(FanoutBus):
+    """
+    Redis pub/sub bus.
+
+    Channels: {prefix}fanout for broadcasts, {prefix}worker:{id} for each
+    worker's inbox. Messages are JSON encoded once per publish.
+    """
+
+    def __init__(self, url: str = settings.redis.url, key_prefix: str = "realtime:"):
+        super().__init__()
+        self.url = url
+        self.key_prefix = key_prefix
+        self._client = None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._worker_id: Optional[str] = None
+
+    def _redis(self):
+        if self._client is None:
+            import redis.asyncio as aioredis
+
+            self._client = aioredis.from_url(self.url)
+        return self._client
+
+    @property
+    def broadcast_channel(self) -> str:
+        return f"{self.key_prefix}fanout"
+
+    def worker_channel(self, worker_id: str) -> str:
+        return f"{self.key_prefix}worker:{worker_id}"
+
+    async def start(self, worker_id: str, handler: BusHandler) -> None:
+        if self._listener is not None:
+            return
+        self._worker_id = worker_id
+        self._pubsub = self._redis().pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.broadcast_channel, self.worker_channel(worker_id))
+        self._listener = asyncio.create_task(self._listen(handler))
+        logger.info(f"Fan-out bus subscribed as {worker_id}")
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _listen(self, handler: BusHandler) -> None:
+        async for raw in self._pubsub.listen():
+            try:
+                message = json.loads(raw["data"])
+                if message.get("origin") == self._worker_id:
+                    continue
+                self.received += 1
+                await handler(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Fan-out handler error: {e}")
+
+    async def publish(self, message: dict) -> None:
+        self.published += 1
+        await self._redis().publish(self.broadcast_channel, json.dumps(message))
+
+    async def send_to_worker(self, worker_id: str, message: dict) -> None:
+        self.published += 1
+        await self._redis().publish(self.worker_channel(worker_id), json.dumps(message))
+
+    def metrics(self) -> dict:
+        return {**super().metrics(), "subscribed": self._listener is not None}
+
+
+def create_session_registry() -> SessionRegistry:
+    """Create the registry selected by REALTIME_SESSION_BACKEND."""
+    config = settings.realtime
+    if config.session_backend == "redis":
+        return RedisSessionRegistry(
+            lease_s=config.owner_lease_s,
+            record_ttl_s=config.session_record_ttl_s,
+        )
+    return InMemorySessionRegistry(
+        lease_s=config.owner_lease_s,
+        record_ttl_s=config.session_record_ttl_s,
+    )
+
+
+def create_fanout_bus() -> FanoutBus:
+    """Create the fan-out bus selected by REALTIME_SESSION_BACKEND."""
+    if settings.realtime.session_backend == "redis":
+        return RedisFanoutBus()
+    return InMemoryFanoutBus()
@@ -4,13 +4,23 @@ Smoothing Filter Module
 平滑滤波器，应用 Kalman 滤波或滑动窗口平均来减少噪声。
 Applies Kalman filter or sliding window average to reduce noise in indicator values.
 
+Each filter keeps its Kalman estimates, a ring buffer of the last
+window_size raw values and running window mean / M2 (Welford), so an
+update is O(1) in the window size. State is plain Python floats: for six
+indicators, NumPy's per-call overhead outweighs the vector math.
+SmoothingFilterBank advances many sessions' filters per cycle.
+
 Requirements: 13.1, 13.2
 """
-from collections import deque
-from dataclasses import dataclass, field
-from typing import Optional
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional, Sequence
 import math
 
+import numpy as np
+
+if TYPE_CHECKING:
+    from .snapshot import StateReader, StateWriter
+
 
 @dataclass
 class SmoothingFilterConfig:
@@ -63,250 +73,321 @@ class IndicatorValues:
         )
 
 
-@dataclass
-class KalmanState:
-    """State for a single-variable Kalman filter."""
-    estimate: float = 0.0  # Current state estimate (x)
-    error_covariance: float = 1.0  # Estimate error covariance (P)
+INDICATOR_NAMES = (
+    "motion_smoothness",
+    "avg_speed",
+    "speed_variance",
+    "primary_direction_deg",
+    "subject_occupancy",
+    "confidence",
+)
+NUM_INDICATORS = len(INDICATOR_NAMES)
 
+_DIRECTION = INDICATOR_NAMES.index("primary_direction_deg")
+# motion_smoothness is most sensitive to lighting changes; avg_speed catches jumps.
+# Leading columns, so the Kalman filter keeps window statistics for just these.
+_ANOMALY_COLUMNS = (0, 1)
+# Relative variance treated as zero (running sums leave rounding residue
+# where a direct computation over constant values gives exactly 0)
+_VARIANCE_EPS = 1e-12
+# Std used when the window has no variance
+_MIN_STD = 0.001
 
 
 class SmoothingFilter:
     """
     平滑滤波器
     Applies Kalman filter or sliding window average to reduce noise.
-    
+
     The filter maintains state for each indicator and applies smoothing
     to reduce noise while preserving meaningful signal changes.
-    
-    Property 12: For any sequence of raw indicator values, the smoothed 
+
+    The ring holds raw values (plus sin/cos of the direction for the
+    sliding window's circular average). Running window mean and M2 cover
+    the columns the configured mode reads: every column for the sliding
+    window, the anomaly columns for the Kalman filter. They are
+    recomputed from the ring each time it wraps, so rounding error does
+    not accumulate.
+
+    Property 12: For any sequence of raw indicator values, the smoothed
     output SHALL have lower variance than the raw input.
     """
-    
+
     def __init__(self, config: Optional[SmoothingFilterConfig] = None):
         self.config = config or SmoothingFilterConfig()
-        self._history: deque[IndicatorValues] = deque(maxlen=self.config.window_size)
-        
-        # Kalman filter states for each indicator
-        self._kalman_states: dict[str, KalmanState] = {
-            "motion_smoothness": KalmanState(error_covariance=self.config.initial_estimate_error),
-            "avg_speed": KalmanState(error_covariance=self.config.initial_estimate_error),
-            "speed_variance": KalmanState(error_covariance=self.config.initial_estimate_error),
-            "primary_direction_deg": KalmanState(error_covariance=self.config.initial_estimate_error),
-            "subject_occupancy": KalmanState(error_covariance=self.config.initial_estimate_error),
-            "confidence": KalmanState(error_covariance=self.config.initial_estimate_error),
-        }
-        
-        self._anomaly_countdown: int = 0
-        self._initialized: bool = False
-    
+        self._sliding = not self.config.use_kalman
+        self._stat_width = NUM_INDICATORS if self._sliding else len(_ANOMALY_COLUMNS)
+        self.reset()
+
     def is_suppressed(self) -> bool:
         """Check if advice generation should be suppressed due to anomaly."""
-        return self._anomaly_countdown > 0
-    
+        return self._countdown > 0
+
+    def is_initialized(self) -> bool:
+        """True once the filter has seen a sample."""
+        return self._initialized
+
     def update(self, indicators: IndicatorValues) -> IndicatorValues:
         """
         Apply smoothing to new indicators.
-        
+
         Args:
             indicators: Raw indicator values
-            
+
         Returns:
             Smoothed indicator values
         """
-        # Decrement anomaly countdown first (before checking for new anomaly)
-        if self._anomaly_countdown > 0:
-            self._anomaly_countdown -= 1
-        
-        # Check for anomaly (sets countdown, overriding any decrement)
-        if self._initialized and self.detect_anomaly(indicators):
-            self._anomaly_countdown = self.config.anomaly_suppress_cycles
-        
-        # Add to history for sliding window
-        self._history.append(indicators)
-        
-        # Apply smoothing based on configuration
-        if self.config.use_kalman:
-            smoothed = self._apply_kalman_filter(indicators)
+        return IndicatorValues(*self._update(list(indicators.to_tuple())))
+
+    def _update(self, x: list[float]) -> list[float]:
+        """Advance by one sample; x holds the raw indicators in INDICATOR_NAMES order."""
+        cfg = self.config
+        window = cfg.window_size
+        sliding = self._sliding
+        ring, pos, count = self._ring, self._pos, self._count
+        mean, m2 = self._mean, self._m2
+
+        # Decrement anomaly countdown first; a new anomaly sets it again
+        countdown = self._countdown - 1 if self._countdown > 0 else 0
+        if self._initialized and self._is_anomalous(x):
+            countdown = cfg.anomaly_suppress_cycles
+
+        # Push into the ring, updating window statistics in O(1)
+        if sliding:
+            radians = math.radians(x[_DIRECTION])
+            entry = x + [math.sin(radians), math.cos(radians)]
         else:
-            smoothed = self._apply_sliding_window_average()
-        
+            entry = x
+        dir_sum = self._dir_sum
+        if count == window:
+            # Welford, sliding: replace the oldest value y
+            oldest = ring[pos]
+            new_mean = [m + (v - y) / window for m, v, y in zip(mean, x, oldest)]
+            new_m2 = [
+                s + (v - y) * (v - nm + y - m)
+                for s, v, y, m, nm in zip(m2, x, oldest, mean, new_mean)
+            ]
+            if sliding:
+                dir_sum = [d + e - y for d, e, y in zip(dir_sum, entry[NUM_INDICATORS:], oldest[NUM_INDICATORS:])]
+        else:
+            count += 1
+            new_mean = [m + (v - m) / count for m, v in zip(mean, x)]
+            new_m2 = [s + (v - m) * (v - nm) for s, v, m, nm in zip(m2, x, mean, new_mean)]
+            if sliding:
+                dir_sum = [d + e for d, e in zip(dir_sum, entry[NUM_INDICATORS:])]
+
+        ring[pos] = entry
+        self._pos = pos = (pos + 1) % window
+        self._count = count
+        self._countdown = countdown
+        self._mean = new_mean
+        self._m2 = [s if s > 0.0 else 0.0 for s in new_m2]
+        self._dir_sum = dir_sum
+
+        # Re-anchor running statistics when the ring wraps (amortized O(1))
+        if count == window and pos == 0:
+            self._recompute_statistics()
+
+        if sliding:
+            smoothed = list(self._mean)
+            angle = math.degrees(math.atan2(self._dir_sum[0] / count, self._dir_sum[1] / count))
+            smoothed[_DIRECTION] = angle + 360 if angle < 0 else angle
+        elif self._initialized:
+            # Predict: P_pred = P + Q; update: K = P_pred / (P_pred + R),
+            # x_est += K * (measurement - x_est), P = (1 - K) * P_pred
+            q, r = cfg.process_noise, cfg.measurement_noise
+            p_pred = [p + q for p in self._error_cov]
+            gain = [p / (p + r) for p in p_pred]
+            smoothed = [e + k * (v - e) for e, k, v in zip(self._estimate, gain, x)]
+            self._error_cov = [(1 - k) * p for k, p in zip(gain, p_pred)]
+            self._estimate = smoothed
+        else:
+            # Initialize with first measurement
+            smoothed = list(x)
+            self._error_cov = [cfg.initial_estimate_error] * NUM_INDICATORS
+            self._estimate = smoothed
+
         self._initialized = True
         return smoothed
-    
-    def _apply_kalman_filter(self, indicators: IndicatorValues) -> IndicatorValues:
-        """
-        Apply Kalman filter to each indicator.
-        
-        The Kalman filter equations:
-        1. Predict: x_pred = x_est, P_pred = P_est + Q
-        2. Update: K = P_pred / (P_pred + R)
-                   x_est = x_pred + K * (measurement - x_pred)
-                   P_est = (1 - K) * P_pred
-        
-        Args:
-            indicators: Raw indicator values
-            
-        Returns:
-            Kalman-filtered indicator values
-        """
-        Q = self.config.process_noise
-        R = self.config.measurement_noise
-        
-        smoothed_values = {}
-        
-        for name, measurement in [
-            ("motion_smoothness", indicators.motion_smoothness),
-            ("avg_speed", indicators.avg_speed),
-            ("speed_variance", indicators.speed_variance),
-            ("primary_direction_deg", indicators.primary_direction_deg),
-            ("subject_occupancy", indicators.subject_occupancy),
-            ("confidence", indicators.confidence),
-        ]:
-            state = self._kalman_states[name]
-            
-            if not self._initialized:
-                # Initialize with first measurement
-                state.estimate = measurement
-                state.error_covariance = self.config.initial_estimate_error
-                smoothed_values[name] = measurement
-            else:
-                # Predict step
-                x_pred = state.estimate
-                P_pred = state.error_covariance + Q
-                
-                # Update step
-                K = P_pred / (P_pred + R)  # Kalman gain
-                state.estimate = x_pred + K * (measurement - x_pred)
-                state.error_covariance = (1 - K) * P_pred
-                
-                smoothed_values[name] = state.estimate
-        
-        return IndicatorValues(
-            motion_smoothness=smoothed_values["motion_smoothness"],
-            avg_speed=smoothed_values["avg_speed"],
-            speed_variance=smoothed_values["speed_variance"],
-            primary_direction_deg=smoothed_values["primary_direction_deg"],
-            subject_occupancy=smoothed_values["subject_occupancy"],
-            confidence=smoothed_values["confidence"],
-        )
-    
-    def _apply_sliding_window_average(self) -> IndicatorValues:
-        """
-        Apply sliding window average to indicators.
-        
-        Returns:
-            Averaged indicator values over the window
-        """
-        if not self._history:
-            raise ValueError("No history available for averaging")
-        
-        n = len(self._history)
-        
-        # Sum all values in history
-        sum_motion_smoothness = sum(h.motion_smoothness for h in self._history)
-        sum_avg_speed = sum(h.avg_speed for h in self._history)
-        sum_speed_variance = sum(h.speed_variance for h in self._history)
-        sum_subject_occupancy = sum(h.subject_occupancy for h in self._history)
-        sum_confidence = sum(h.confidence for h in self._history)
-        
-        # Handle circular direction averaging properly
-        sum_sin = sum(math.sin(math.radians(h.primary_direction_deg)) for h in self._history)
-        sum_cos = sum(math.cos(math.radians(h.primary_direction_deg)) for h in self._history)
-        avg_direction = math.degrees(math.atan2(sum_sin / n, sum_cos / n))
-        if avg_direction < 0:
-            avg_direction += 360
-        
-        return IndicatorValues(
-            motion_smoothness=sum_motion_smoothness / n,
-            avg_speed=sum_avg_speed / n,
-            speed_variance=sum_speed_variance / n,
-            primary_direction_deg=avg_direction,
-            subject_occupancy=sum_subject_occupancy / n,
-            confidence=sum_confidence / n,
-        )
-    
+
+    def _recompute_statistics(self) -> None:
+        """Window mean, M2 and direction sums computed directly from the ring."""
+        count = self._count
+        columns = list(zip(*self._ring[:count]))
+        if not columns:
+            self._mean = [0.0] * self._stat_width
+            self._m2 = [0.0] * self._stat_width
+            self._dir_sum = [0.0, 0.0]
+            return
+        self._mean = [sum(column) / count for column in columns[:self._stat_width]]
+        self._m2 = [sum((v - m) ** 2 for v in column) for column, m in zip(columns, self._mean)]
+        if self._sliding:
+            self._dir_sum = [sum(column) for column in columns[NUM_INDICATORS:]]
+
+    def _is_anomalous(self, x: list[float]) -> bool:
+        count = self._count
+        if count < 2:
+            return False
+        threshold = self.config.anomaly_threshold
+        for col in _ANOMALY_COLUMNS:
+            mean = self._mean[col]
+            variance = self._m2[col] / (count - 1)
+            has_variance = variance > _VARIANCE_EPS * (1.0 + mean ** 2)
+            std = math.sqrt(variance) if has_variance else _MIN_STD
+            if abs(x[col] - mean) > threshold * std:
+                return True
+        return False
+
     def detect_anomaly(self, indicators: IndicatorValues) -> bool:
         """
         Detect sudden lighting changes or other anomalies.
-        
+
         An anomaly is detected when the current indicators deviate
         significantly from the recent history (more than anomaly_threshold
-        standard deviations).
-        
+        standard deviations of motion_smoothness or avg_speed).
+
         Args:
             indicators: Current indicator values
-            
+
         Returns:
             True if current indicators are anomalous
         """
-        if len(self._history) < 2:
-            return False
-        
-        # Calculate mean and std of motion_smoothness from history
-        # (motion_smoothness is most sensitive to lighting changes)
-        values = [h.motion_smoothness for h in self._history]
-        mean = sum(values) / len(values)
-        
-        if len(values) > 1:
-            variance = sum((v - mean) ** 2 for v in values) / (len(values) - 1)
-            std = math.sqrt(variance) if variance > 0 else 0.001
-        else:
-            std = 0.001  # Avoid division by zero
-        
-        # Check if current value is anomalous
-        deviation = abs(indicators.motion_smoothness - mean)
-        is_anomalous = deviation > (self.config.anomaly_threshold * std)
-        
-        # Also check avg_speed for sudden changes
-        speed_values = [h.avg_speed for h in self._history]
-        speed_mean = sum(speed_values) / len(speed_values)
-        
-        if len(speed_values) > 1:
-            speed_variance = sum((v - speed_mean) ** 2 for v in speed_values) / (len(speed_values) - 1)
-            speed_std = math.sqrt(speed_variance) if speed_variance > 0 else 0.001
-        else:
-            speed_std = 0.001
-        
-        speed_deviation = abs(indicators.avg_speed - speed_mean)
-        speed_anomalous = speed_deviation > (self.config.anomaly_threshold * speed_std)
-        
-        return is_anomalous or speed_anomalous
-    
+        return self._is_anomalous(list(indicators.to_tuple()))
+
+    def get_history(self) -> list[IndicatorValues]:
+        """Raw values in the window, oldest first."""
+        return [IndicatorValues.from_tuple(tuple(values)) for values in self._history_rows()]
+
+    def _history_rows(self) -> list[list[float]]:
+        window, count = self.config.window_size, self._count
+        start = self._pos - count
+        return [self._ring[(start + i) % window][:NUM_INDICATORS] for i in range(count)]
+
     def reset(self) -> None:
         """Reset the filter state."""
-        self._history.clear()
-        self._anomaly_countdown = 0
+        self._ring: list[list[float]] = [[] for _ in range(self.config.window_size)]
+        self._pos = 0
+        self._count = 0
+        self._countdown = 0
         self._initialized = False
-        
-        for state in self._kalman_states.values():
-            state.estimate = 0.0
-            state.error_covariance = self.config.initial_estimate_error
-    
+        self._mean = [0.0] * self._stat_width
+        self._m2 = [0.0] * self._stat_width
+        self._dir_sum = [0.0, 0.0]
+        self._estimate = [0.0] * NUM_INDICATORS
+        self._error_cov = [self.config.initial_estimate_error] * NUM_INDICATORS
+
+    def write_state(self, w: "StateWriter") -> None:
+        """Write filter state (history, Kalman states, anomaly countdown) to a snapshot."""
+        w.f64s([value for row in self._history_rows() for value in row])
+        w.f64s(self._estimate)
+        w.f64s(self._error_cov)
+        w.u16(self._countdown)
+        w.bool(self._initialized)
+
+    def read_state(self, r: "StateReader") -> None:
+        """Restore filter state written by write_state."""
+        self.reset()
+        window = self.config.window_size
+        values = r.f64s()
+        history = [values[i:i + NUM_INDICATORS] for i in range(0, len(values), NUM_INDICATORS)][-window:]
+        for i, row in enumerate(history):
+            if self._sliding:
+                radians = math.radians(row[_DIRECTION])
+                row = row + [math.sin(radians), math.cos(radians)]
+            self._ring[i] = row
+        self._count = len(history)
+        self._pos = self._count % window
+        self._recompute_statistics()
+
+        self._estimate = r.f64s()
+        self._error_cov = r.f64s()
+        self._countdown = r.u16()
+        self._initialized = r.bool()
+
     def get_variance_reduction(self) -> Optional[float]:
         """
         Calculate the variance reduction achieved by the filter.
-        
+
         Returns:
             Ratio of output variance to input variance (< 1 means reduction),
             or None if not enough data.
         """
-        if len(self._history) < 3:
+        history = self._history_rows()
+        if len(history) < 3:
             return None
-        
+
         # Calculate input variance from history
-        values = [h.motion_smoothness for h in self._history]
+        values = [row[0] for row in history]
         mean = sum(values) / len(values)
         input_variance = sum((v - mean) ** 2 for v in values) / len(values)
-        
+
         if input_variance == 0:
             return 1.0  # No variance to reduce
-        
+
         # For Kalman filter, output variance is approximated by error covariance
         if self.config.use_kalman:
-            output_variance = self._kalman_states["motion_smoothness"].error_covariance
+            output_variance = self._error_cov[0]
         else:
             # For sliding window, variance is reduced by factor of window size
-            output_variance = input_variance / len(self._history)
-        
-        return output_variance / input_variance if input_variance > 0 else 1.0
+            output_variance = input_variance / len(history)
+
+        return output_variance / input_variance
+
+
+class SmoothingFilterBank:
+    """
+    平滑滤波器组
+    SmoothingFilters sharing one config, advanced many at a time.
+
+    A thin batch wrapper: every filter keeps its own state, and update()
+    steps the given filters in turn, taking and returning one
+    (n, 6) array per cycle.
+    """
+
+    def __init__(self, config: Optional[SmoothingFilterConfig] = None):
+        self.config = config or SmoothingFilterConfig()
+        self._filters: set[SmoothingFilter] = set()
+
+    def __len__(self) -> int:
+        """Number of filters currently in the bank."""
+        return len(self._filters)
+
+    def create_filter(self) -> SmoothingFilter:
+        """Create a filter with the bank's config and add it to the bank."""
+        smoothing_filter = SmoothingFilter(self.config)
+        self._filters.add(smoothing_filter)
+        return smoothing_filter
+
+    def release(self, smoothing_filter: SmoothingFilter) -> None:
+        """Remove a filter from the bank."""
+        self._check_owner(smoothing_filter)
+        self._filters.discard(smoothing_filter)
+
+    def update(self, filters: Sequence[SmoothingFilter], values: np.ndarray) -> np.ndarray:
+        """
+        Advance many filters by one sample each.
+
+        Args:
+            filters: Distinct filters created by this bank
+            values: (len(filters), 6) raw indicators in INDICATOR_NAMES order
+
+        Returns:
+            (len(filters), 6) smoothed indicators
+        """
+        for smoothing_filter in filters:
+            self._check_owner(smoothing_filter)
+        if len(set(filters)) != len(filters):
+            raise ValueError("A filter can appear only once per batch")
+        rows = np.asarray(values, dtype=np.float64).reshape(len(filters), NUM_INDICATORS).tolist()
+        return np.array(
+            [smoothing_filter._update(row) for smoothing_filter, row in zip(filters, rows)],
+            dtype=np.float64,
+        ).reshape(len(filters), NUM_INDICATORS)
+
+    def is_suppressed(self, filters: Sequence[SmoothingFilter]) -> np.ndarray:
+        """Per-filter anomaly suppression flags."""
+        return np.array([smoothing_filter.is_suppressed() for smoothing_filter in filters], dtype=bool)
+
+    def _check_owner(self, smoothing_filter: SmoothingFilter) -> None:
+        if smoothing_filter not in self._filters:
+            raise ValueError("Filter belongs to another bank")
@@ -0,0 +1,459 @@
+"""
+Session State Snapshots
+
+会话状态快照，用于断线重连和 worker 迁移时快速恢复。
+Versioned binary snapshots of per-session analysis state.
+
+When a phone reconnects after a network blip, or lands on another worker,
+its analyzer, smoothing filter, motion state machine and hysteresis
+cooldowns would otherwise start from zero and produce a burst of unstable
+advice. A snapshot captures that state in a compact binary form:
+
+    MAGIC(4) | version u8 | flags u8 | payload length u32 | crc32 u32 | payload
+
+The payload is written section by section by each component's
+``write_state`` and read back by ``read_state`` in the same order.
+Snapshots are kept in a SnapshotStore (memory LRU with TTL, plus an
+optional local directory shared by workers on the same host).
+"""
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from src.models.enums import MotionType
+
+if TYPE_CHECKING:
+    from .advice_engine import AdviceEngine
+    from .analyzer import RealtimeAnalyzer
+    from .types import SessionState
+
+
+logger = logging.getLogger(__name__)
+
+
+SNAPSHOT_MAGIC = b"RTSN"
+# 2: smoothing filter moved from the analyzer into the advice engine's pipeline
+SNAPSHOT_VERSION = 2
+
+# Header flags
+FLAG_COMPRESSED = 0x01
+
+_HEADER = struct.Struct("<4sBBII")
+# Compress payloads above this size (frame buffers); small state is left as is
+_COMPRESS_MIN_SIZE = 4096
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot cannot be decoded."""
+    pass
+
+
+class StateWriter:
+    """Little-endian binary writer for component state."""
+
+    __slots__ = ("_parts",)
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+
+    def u8(self, value: int) -> None:
+        self._parts.append(struct.pack("<B", value))
+
+    def u16(self, value: int) -> None:
+        self._parts.append(struct.pack("<H", value))
+
+    def u32(self, value: int) -> None:
+        self._parts.append(struct.pack("<I", value))
+
+    def f64(self, value: float) -> None:
+        self._parts.append(struct.pack("<d", value))
+
+    def bool(self, value: bool) -> None:
+        self.u8(1 if value else 0)
+
+    def opt_f64(self, value: Optional[float]) -> None:
+        self.bool(value is not None)
+        if value is not None:
+            self.f64(value)
+
+    def str(self, value: str) -> None:
+        data = value.encode("utf-8")
+        self.u16(len(data))
+        self._parts.append(data)
+
+    def opt_str(self, value: Optional[str]) -> None:
+        self.bool(value is not None)
+        if value is not None:
+            self.str(value)
+
+    def bytes(self, value: bytes) -> None:
+        self.u32(len(value))
+        self._parts.append(value)
+
+    def f64s(self, values) -> None:
+        """Write a sequence of floats as one packed array."""
+        packed = array("d", values)
+        self.u32(len(packed))
+        self._parts.append(packed.tobytes())
+
+    def strs(self, values) -> None:
+        values = list(values)
+        self.u16(len(values))
+        for value in values:
+            self.str(value)
+
+    def str_map(self, mapping: dict, write_value) -> None:
+        """Write a str-keyed dict; write_value(value) writes each value."""
+        self.u16(len(mapping))
+        for key, value in mapping.items():
+            self.str(key)
+            write_value(value)
+
+    def getvalue(self) -> bytes:
+        return b"".join(self._parts)
+
+
+class StateReader:
+    """Reader matching StateWriter."""
+
+    __slots__ = ("_view", "_pos")
+
+    def __init__(self, data: bytes):
+        self._view = memoryview(data)
+        self._pos = 0
+
+    def _take(self, size: int) -> memoryview:
+        end = self._pos + size
+        if end > len(self._view):
+            raise SnapshotError("Snapshot truncated")
+        chunk = self._view[self._pos:end]
+        self._pos = end
+        return chunk
+
+    def _unpack(self, fmt: str, size: int):
+        return struct.unpack(fmt, self._take(size))[0]
+
+    def u8(self) -> int:
+        return self._unpack("<B", 1)
+
+    def u16(self) -> int:
+        return self._unpack("<H", 2)
+
+    def u32(self) -> int:
+        return self._unpack("<I", 4)
+
+    def f64(self) -> float:
+        return self._unpack("<d", 8)
+
+    def bool(self) -> bool:
+        return self.u8() != 0
+
+    def opt_f64(self) -> Optional[float]:
+        return self.f64() if self.bool() else None
+
+    def str(self) -> str:
+        return bytes(self._take(self.u16())).decode("utf-8")
+
+    def opt_str(self) -> Optional[str]:
+        return self.str() if self.bool() else None
+
+    def bytes(self) -> bytes:
+        return bytes(self._take(self.u32()))
+
+    def f64s(self) -> list[float]:
+        count = self.u32()
+        values = array("d")
+        values.frombytes(self._take(count * 8))
+        return values.tolist()
+
+    def strs(self) -> list[str]:
+        return [self.str() for _ in range(self.u16())]
+
+    def str_map(self, read_value) -> dict:
+        result = {}
+        for _ in range(self.u16()):
+            key = self.str()
+            result[key] = read_value()
+        return result
+
+    def at_end(self) -> bool:
+        return self._pos == len(self._view)
+
+
+def _write_session_state(w: StateWriter, state: "SessionState") -> None:
+    w.f64(state.created_at)
+    w.str(state.motion_state.value)
+    w.opt_f64(state.subject_lost_since)
+    w.u32(state.total_analyses)
+    w.f64(state.avg_latency_ms)
+
+
+def _read_session_state(r: StateReader, state: "SessionState") -> None:
+    state.created_at = r.f64()
+    state.motion_state = MotionType(r.str())
+    state.subject_lost_since = r.opt_f64()
+    state.total_analyses = r.u32()
+    state.avg_latency_ms = r.f64()
+
+
+def snapshot_session(
+    state: "SessionState",
+    analyzer: "RealtimeAnalyzer",
+    advice_engine: "AdviceEngine",
+) -> bytes:
+    """
+    Serialize a session's analysis state.
+
+    Args:
+        state: Session state (metrics, motion state)
+        analyzer: The session's realtime analyzer
+        advice_engine: The session's advice engine
+
+    Returns:
+        Versioned binary snapshot
+    """
+    w = StateWriter()
+    _write_session_state(w, state)
+    analyzer.write_state(w)
+    advice_engine.write_state(w)
+    payload = w.getvalue()
+
+    flags = 0
+    if len(payload) >= _COMPRESS_MIN_SIZE:
+        payload = zlib.compress(payload, 1)
+        flags |= FLAG_COMPRESSED
+
+    header = _HEADER.pack(
+        SNAPSHOT_MAGIC, SNAPSHOT_VERSION, flags, len(payload), zlib.crc32(payload)
+    )
+    return header + payload
+
+
+def restore_session(
+    data: bytes,
+    state: "SessionState",
+    analyzer: "RealtimeAnalyzer",
+    advice_engine: "AdviceEngine",
+) -> None:
+    """
+    Restore a snapshot into freshly created session components.
+
+    Raises:
+        SnapshotError: If the snapshot is corrupt or from an unknown version
+    """
+    if len(data) < _HEADER.size:
+        raise SnapshotError("Snapshot truncated")
+    magic, version, flags, length, crc = _HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError("Not a session snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {version}")
+
+    payload = data[_HEADER.size:]
+    if len(payload) != length or zlib.crc32(payload) != crc:
+        raise SnapshotError("Snapshot checksum mismatch")
+    if flags & FLAG_COMPRESSED:
+        payload = zlib.decompress(payload)
+
+    r = StateReader(payload)
+    _read_session_state(r, state)
+    analyzer.read_state(r)
+    advice_engine.read_state(r)
+    if not r.at_end():
+        raise SnapshotError("Trailing data in snapshot")
+
+
+class _Timing:
+    """Running count / mean / max of an operation's duration."""
+
+    __slots__ = ("count", "total_ms", "max_ms", "last_ms")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def add(self, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.last_ms = elapsed_ms
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 4) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 4),
+            "last_ms": round(self.last_ms, 4),
+        }
+
+
+class SnapshotStore:
+    """
+    Snapshot storage with TTL.
+
+    Memory tier: LRU bounded by entry count. Optional disk tier: one file
+    per session in a local directory, written atomically, so a session
+    can be restored by another worker on the same host or after a restart.
+    Snapshot and restore durations are tracked for metrics.
+    """
+
+    def __init__(
+        self,
+        ttl_s: float = 120.0,
+        max_entries: int = 1024,
+        directory: Optional[str] = None,
+        clock=time.time,
+    ):
+        """
+        Args:
+            ttl_s: Snapshots older than this are discarded; should cover
+                the client's reconnection backoff window
+            max_entries: Maximum snapshots kept in memory
+            directory: Optional local directory for the disk tier
+            clock: Wall clock (injectable for tests)
+        """
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.directory = Path(directory) if directory else None
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.snapshot_timing = _Timing()
+        self.restore_timing = _Timing()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.last_size = 0
+
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def save(
+        self,
+        session_id: str,
+        state: "SessionState",
+        analyzer: "RealtimeAnalyzer",
+        advice_engine: "AdviceEngine",
+    ) -> bytes:
+        """Snapshot a session and store it."""
+        start = time.perf_counter()
+        data = snapshot_session(state, analyzer, advice_engine)
+        self.snapshot_timing.add((time.perf_counter() - start) * 1000)
+        self.last_size = len(data)
+        self.put(session_id, data)
+        return data
+
+    def restore(
+        self,
+        session_id: str,
+        state: "SessionState",
+        analyzer: "RealtimeAnalyzer",
+        advice_engine: "AdviceEngine",
+    ) -> bool:
+        """
+        Restore a stored snapshot into session components.
+
+        Returns:
+            True if a snapshot was found and restored
+        """
+        data = self.get(session_id)
+        if data is None:
+            return False
+        start = time.perf_counter()
+        try:
+            restore_session(data, state, analyzer, advice_engine)
+        except (SnapshotError, ValueError) as e:
+            self.errors += 1
+            logger.warning(f"Discarding snapshot for session {session_id}: {e}")
+            self.delete(session_id)
+            return False
+        self.restore_timing.add((time.perf_counter() - start) * 1000)
+        return True
+
+    def put(self, session_id: str, data: bytes) -> None:
+        """Store raw snapshot bytes."""
+        now = self._clock()
+        with self._lock:
+            self._entries.pop(session_id, None)
+            self._entries[session_id] = (now, data)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if self.directory:
+            self._write_file(session_id, data)
+
+    def get(self, session_id: str) -> Optional[bytes]:
+        """Get raw snapshot bytes if present and not expired."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                if now - entry[0] <= self.ttl_s:
+                    self._entries.move_to_end(session_id)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[session_id]
+
+        data = self._read_file(session_id, now)
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def delete(self, session_id: str) -> None:
+        """Remove a snapshot from all tiers."""
+        with self._lock:
+            self._entries.pop(session_id, None)
+        if self.directory:
+            self._path(session_id).unlink(missing_ok=True)
+
+    def _path(self, session_id: str) -> Path:
+        return self.directory / f"{session_id}.snap"
+
+    def _write_file(self, session_id: str, data: bytes) -> None:
+        path = self._path(session_id)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write snapshot for {session_id}: {e}")
+            tmp_path.unlink(missing_ok=True)
+
+    def _read_file(self, session_id: str, now: float) -> Optional[bytes]:
+        if not self.directory:
+            return None
+        path = self._path(session_id)
+        try:
+            if now - path.stat().st_mtime > self.ttl_s:
+                path.unlink(missing_ok=True)
+                return None
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Failed to read snapshot for {session_id}: {e}")
+            return None
+
+    def metrics(self) -> dict:
+        """Snapshot counters and timings."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "last_size_bytes": self.last_size,
+            "snapshot": self.snapshot_timing.to_dict(),
+            "restore": self.restore_timing.to_dict(),
+            "disk_enabled": self.directory is not None,
+        }
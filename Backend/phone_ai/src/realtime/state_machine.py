@@ -6,12 +6,28 @@ Tracks current motion type and provides suppression rules for advice filtering.
 """
 from collections import deque
 from dataclasses import dataclass
-from typing import Optional
+from typing import TYPE_CHECKING, Optional, Union
 
 from src.models.enums import MotionType
 from src.models.data_types import HeuristicOutput
 from src.agents.motion_rules import MotionTypeInferrer, MotionRulesConfig
 
+if TYPE_CHECKING:
+    from .snapshot import StateReader, StateWriter
+
+
+@dataclass(frozen=True, slots=True)
+class MotionIndicators:
+    """
+    The indicators MotionTypeInferrer reads, without a full HeuristicOutput.
+
+    Field names match HeuristicOutput so the inferrer accepts either.
+    """
+    avg_motion_px_per_s: float
+    motion_smoothness: float
+    subject_occupancy: float
+    frame_pct_change: float = 0.0
+
 
 @dataclass
 class MotionStateMachineConfig:
@@ -148,7 +164,7 @@ class MotionStateMachine:
     
     def update(
         self,
-        indicators: HeuristicOutput,
+        indicators: Union[HeuristicOutput, MotionIndicators],
         primary_direction_deg: Optional[float] = None
     ) -> MotionType:
         """
@@ -241,6 +257,27 @@ class MotionStateMachine:
         self._pending_state = None
         self._pending_count = 0
     
+    def write_state(self, w: "StateWriter") -> None:
+        """Write current/pending state and history to a snapshot."""
+        w.str(self._current_state.value)
+        w.f64(self._state_confidence)
+        w.strs(state.value for state in self._state_history)
+        w.f64s(self._confidence_history)
+        w.opt_str(self._pending_state.value if self._pending_state else None)
+        w.u16(self._pending_count)
+    
+    def read_state(self, r: "StateReader") -> None:
+        """Restore state written by write_state."""
+        self._current_state = MotionType(r.str())
+        self._state_confidence = r.f64()
+        self._state_history.clear()
+        self._state_history.extend(MotionType(value) for value in r.strs())
+        self._confidence_history.clear()
+        self._confidence_history.extend(r.f64s())
+        pending = r.opt_str()
+        self._pending_state = MotionType(pending) if pending else None
+        self._pending_count = r.u16()
+    
     def force_state(self, state: MotionType, confidence: float = 1.0) -> None:
         """
         Force the state machine to a specific state.
@@ -3,8 +3,16 @@ Advice Templates Module
 
 建议模板，包含所有中文建议消息。
 支持模板变量替换（如 {direction}）。
+
+模板及其变量替换后的变体都是不可变的驻留对象，所有会话共享同一实例，
+序列化结果按实例缓存。
+Templates and their substituted variants are frozen, interned payloads
+shared by all sessions; their JSON text is cached per instance and they
+are stamped with the send time when serialized.
 """
-from .types import AdvicePayload, AdvicePriority, AdviceCategory
+from dataclasses import replace
+
+from .types import UNSTAMPED, AdvicePayload, AdvicePriority, AdviceCategory
 
 
 # =============================================================================
@@ -19,6 +27,7 @@ STABILITY_CRITICAL = AdvicePayload(
     advanced_message="检测到高频震颤，建议检查云台电机是否过载，或开启机身增强防抖。",
     trigger_haptic=True,
     suppress_duration_s=5.0,
+    timestamp=UNSTAMPED,
 )
 
 STABILITY_WARNING = AdvicePayload(
@@ -26,6 +35,7 @@ STABILITY_WARNING = AdvicePayload(
     category=AdviceCategory.STABILITY,
     message="手持略有不稳，请夹紧双肘，屏住呼吸。",
     suppress_duration_s=3.0,
+    timestamp=UNSTAMPED,
 )
 
 STABILITY_POSITIVE = AdvicePayload(
@@ -33,6 +43,7 @@ STABILITY_POSITIVE = AdvicePayload(
     category=AdviceCategory.STABILITY,
     message="稳如泰山！保持当前状态。",
     suppress_duration_s=3.0,
+    timestamp=UNSTAMPED,
 )
 
 
@@ -46,6 +57,7 @@ SPEED_TOO_FAST = AdvicePayload(
     category=AdviceCategory.SPEED,
     message="移速太快了！请慢一点，给观众留出观察细节的时间。",
     suppress_duration_s=3.0,
+    timestamp=UNSTAMPED,
 )
 
 SPEED_UNEVEN = AdvicePayload(
@@ -53,6 +65,7 @@ SPEED_UNEVEN = AdvicePayload(
     category=AdviceCategory.SPEED,
     message="运镜不匀速，请保持平稳推拉，避免猛推猛拉。",
     suppress_duration_s=3.0,
+    timestamp=UNSTAMPED,
 )
 
 SPEED_PERFECT = AdvicePayload(
@@ -60,6 +73,7 @@ SPEED_PERFECT = AdvicePayload(
     category=AdviceCategory.SPEED,
     message="运镜速度完美！",
     suppress_duration_s=3.0,
+    timestamp=UNSTAMPED,
 )
 
 
@@ -73,6 +87,7 @@ SUBJECT_OFF_CENTER = AdvicePayload(
     category=AdviceCategory.COMPOSITION,
     message="主体正在偏离中心（或三分法线），请向{direction}微调镜头。",
     suppress_duration_s=3.0,
+    timestamp=UNSTAMPED,
 )
 
 SUBJECT_TOO_LARGE = AdvicePayload(
@@ -80,6 +95,7 @@ SUBJECT_TOO_LARGE = AdvicePayload(
     category=AdviceCategory.COMPOSITION,
     message="主体遮挡占比过大，建议后退一步，给画面留白。",
     suppress_duration_s=3.0,
+    timestamp=UNSTAMPED,
 )
 
 SUBJECT_TOO_SMALL = AdvicePayload(
@@ -87,6 +103,7 @@ SUBJECT_TOO_SMALL = AdvicePayload(
     category=AdviceCategory.COMPOSITION,
     message="主体太小，建议靠近或使用长焦。",
     suppress_duration_s=3.0,
+    timestamp=UNSTAMPED,
 )
 
 SUBJECT_LOST = AdvicePayload(
@@ -94,6 +111,7 @@ SUBJECT_LOST = AdvicePayload(
     category=AdviceCategory.COMPOSITION,
     message="主体丢失，请减慢运镜寻找主体。",
     suppress_duration_s=5.0,
+    timestamp=UNSTAMPED,
 )
 
 DIRECTION_HINT = AdvicePayload(
@@ -101,6 +119,7 @@ DIRECTION_HINT = AdvicePayload(
     category=AdviceCategory.COMPOSITION,
     message="正在进行{direction}，请坚持到底，不要中途{avoid}晃动。",
     suppress_duration_s=3.0,
+    timestamp=UNSTAMPED,
 )
 
 # Direction mapping for template substitution
@@ -133,6 +152,7 @@ BEAT_UPCOMING = AdvicePayload(
     category=AdviceCategory.BEAT,
     message="预感重音！建议此时配合一个快速推镜或转场动作。",
     suppress_duration_s=2.0,
+    timestamp=UNSTAMPED,
 )
 
 BEAT_NOW = AdvicePayload(
@@ -140,6 +160,7 @@ BEAT_NOW = AdvicePayload(
     category=AdviceCategory.BEAT,
     message="节奏点已到，可以考虑在此处切断或变换景别。",
     suppress_duration_s=2.0,
+    timestamp=UNSTAMPED,
 )
 
 
@@ -153,6 +174,7 @@ MOTION_BLUR = AdvicePayload(
     category=AdviceCategory.EQUIPMENT,
     message="检测到运动模糊较重，建议将快门速度提高到 1/125s 以上。",
     suppress_duration_s=5.0,
+    timestamp=UNSTAMPED,
 )
 
 TELEPHOTO_SHAKE = AdvicePayload(
@@ -160,6 +182,7 @@ TELEPHOTO_SHAKE = AdvicePayload(
     category=AdviceCategory.EQUIPMENT,
     message="当前长焦段放大抖动明显，建议切换至广角端（0.5x）拍摄更稳。",
     suppress_duration_s=5.0,
+    timestamp=UNSTAMPED,
 )
 
 STABILIZATION_SUGGESTION = AdvicePayload(
@@ -167,6 +190,7 @@ STABILIZATION_SUGGESTION = AdvicePayload(
     category=AdviceCategory.EQUIPMENT,
     message="建议使用三脚架或手持稳定器以获得更稳定的画面。",
     suppress_duration_s=5.0,
+    timestamp=UNSTAMPED,
 )
 
 
@@ -179,6 +203,7 @@ ANALYZING_STATUS = AdvicePayload(
     category=AdviceCategory.STABILITY,
     message="分析中...",
     suppress_duration_s=1.0,
+    timestamp=UNSTAMPED,
 )
 
 LOW_CONFIDENCE_STATUS = AdvicePayload(
@@ -186,6 +211,7 @@ LOW_CONFIDENCE_STATUS = AdvicePayload(
     category=AdviceCategory.STABILITY,
     message="分析中...",
     suppress_duration_s=2.0,
+    timestamp=UNSTAMPED,
 )
 
 
@@ -226,6 +252,58 @@ ADVICE_TEMPLATES = {
 }
 
 
+# =============================================================================
+# Interned Variants (驻留变体)
+# =============================================================================
+
+# Adjustment directions used by subject off-center advice
+ADJUST_DIRECTIONS = ("右", "左", "下", "上")
+
+
+def _variant(template: AdvicePayload, advanced: bool, **substitutions: str) -> AdvicePayload:
+    """Unstamped copy of a template with substitutions applied."""
+    advanced_message = template.advanced_message if advanced else None
+    if substitutions:
+        message = template.message.format(**substitutions)
+        if advanced_message:
+            advanced_message = advanced_message.format(**substitutions)
+    else:
+        message = template.message
+    if message == template.message and advanced_message == template.advanced_message:
+        return template
+    return replace(template, message=message, advanced_message=advanced_message, timestamp=UNSTAMPED)
+
+
+def _variant_key(template_key: str, advanced: bool, substitutions: dict) -> tuple:
+    return (template_key, advanced, *sorted(substitutions.items()))
+
+
+def _build_interned() -> dict[tuple, AdvicePayload]:
+    interned: dict[tuple, AdvicePayload] = {}
+    for key, template in ADVICE_TEMPLATES.items():
+        for advanced in (True, False):
+            interned[_variant_key(key, advanced, {})] = _variant(template, advanced)
+    for direction in DIRECTION_NAMES:
+        substitutions = {
+            "direction": DIRECTION_NAMES[direction],
+            "avoid": AVOID_DIRECTIONS.get(direction, "其他方向"),
+        }
+        for advanced in (True, False):
+            interned[_variant_key("direction_hint", advanced, substitutions)] = _variant(
+                DIRECTION_HINT, advanced, **substitutions
+            )
+    for direction in ADJUST_DIRECTIONS:
+        for advanced in (True, False):
+            interned[_variant_key("subject_off_center", advanced, {"direction": direction})] = _variant(
+                SUBJECT_OFF_CENTER, advanced, direction=direction
+            )
+    return interned
+
+
+# Every variant the advice engine can emit, built once at import
+_INTERNED = _build_interned()
+
+
 def get_template(template_key: str) -> AdvicePayload:
     """
     Get an advice template by key.
@@ -234,7 +312,7 @@ def get_template(template_key: str) -> AdvicePayload:
         template_key: Key of the template to retrieve
         
     Returns:
-        AdvicePayload template
+        AdvicePayload template (shared; payloads are immutable)
         
     Raises:
         KeyError: If template key is not found
@@ -244,6 +322,30 @@ def get_template(template_key: str) -> AdvicePayload:
     return ADVICE_TEMPLATES[template_key]
 
 
+def get_advice(template_key: str, advanced: bool = True, **substitutions: str) -> AdvicePayload:
+    """
+    Get the interned payload for a template variant.
+    
+    Variants outside the finite set built at import (e.g. an unknown
+    direction) are built on each call instead of being interned.
+    
+    Args:
+        template_key: Key of the template
+        advanced: Keep the template's advanced message (professional devices)
+        **substitutions: Template variables (e.g. direction="左")
+        
+    Returns:
+        Unstamped AdvicePayload
+        
+    Raises:
+        KeyError: If template key is not found
+    """
+    payload = _INTERNED.get(_variant_key(template_key, advanced, substitutions))
+    if payload is None:
+        payload = _variant(get_template(template_key), advanced, **substitutions)
+    return payload
+
+
 def get_direction_hint(direction: str) -> AdvicePayload:
     """
     Get a direction hint advice with proper substitution.
@@ -254,12 +356,10 @@ def get_direction_hint(direction: str) -> AdvicePayload:
     Returns:
         AdvicePayload with substituted direction text
     """
-    direction_name = DIRECTION_NAMES.get(direction, direction)
-    avoid_direction = AVOID_DIRECTIONS.get(direction, "其他方向")
-    
-    return DIRECTION_HINT.with_substitution(
-        direction=direction_name,
-        avoid=avoid_direction,
+    return get_advice(
+        "direction_hint",
+        direction=DIRECTION_NAMES.get(direction, direction),
+        avoid=AVOID_DIRECTIONS.get(direction, "其他方向"),
     )
 
 
@@ -273,4 +373,4 @@ def get_subject_off_center_advice(direction: str) -> AdvicePayload:
     Returns:
         AdvicePayload with substituted direction
     """
-    return SUBJECT_OFF_CENTER.with_substitution(direction=direction)
+    return get_advice("subject_off_center", direction=direction)
@@ -0,0 +1,203 @@
+"""
+Latency Tracing
+
+实时热路径的分阶段延迟追踪。
+Per-stage latency spans for the realtime hot path.
+
+A sampled analysis cycle carries a CycleTrace from message parsing in
+the WebSocket handler, through RealtimeAnalyzer and AdviceEngine, to the
+broadcast. Each stage records its duration from monotonic
+(perf_counter) timestamps; the LatencyTracer folds finished traces into
+per-stage histograms served by GET /api/realtime/metrics.
+
+Unsampled cycles get no trace (None). Instrumented code checks for it
+before taking a timestamp, so tracing costs nothing when sampling is
+off. Sessions whose camera client connects with ``?debug=1`` trace
+every cycle and get the breakdown in their telemetry messages.
+"""
+import time
+from bisect import bisect_left
+from typing import Optional
+
+
+# Hot-path stages, in pipeline order
+STAGES = (
+    "parse",          # JSON parse of the frame buffer message
+    "base64_decode",
+    "jpeg_decode",
+    "resize",
+    "gray",           # BGR -> grayscale for optical flow
+    "optical_flow",   # Farneback or Lucas-Kanade, plus flow statistics
+    "subject",        # Subject detection and tracking
+    "environment",    # Environment features of the latest frame
+    "smoothing",      # Indicator pipeline (smoothing, motion state)
+    "advice",         # Advice generation
+    "send",           # Encoding and queueing for every client
+)
+TOTAL = "total"
+
+# Histogram bucket upper bounds (ms)
+BUCKET_BOUNDS_MS = (
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    25.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0,
+)
+
+
+class CycleTrace:
+    """
+    周期追踪
+    Stage durations of one analysis cycle.
+
+    Instrumented code keeps a perf_counter timestamp and calls lap() at
+    the end of each stage; stages hit more than once (e.g. per frame)
+    accumulate.
+    """
+
+    __slots__ = ("start", "spans")
+
+    def __init__(self, start: Optional[float] = None):
+        self.start = start if start is not None else time.perf_counter()
+        self.spans: dict[str, float] = {}
+
+    def lap(self, stage: str, since: float, now: Optional[float] = None) -> float:
+        """
+        Add the time since ``since`` to a stage.
+
+        Args:
+            stage: Stage name
+            since: perf_counter timestamp the stage started at
+            now: perf_counter timestamp the stage ended at (default: now)
+
+        Returns:
+            The stage's end timestamp (start of the next stage)
+        """
+        if now is None:
+            now = time.perf_counter()
+        self.spans[stage] = self.spans.get(stage, 0.0) + (now - since) * 1000
+        return now
+
+    def total_ms(self) -> float:
+        """Time since the cycle started."""
+        return (time.perf_counter() - self.start) * 1000
+
+    def to_dict(self) -> dict:
+        """Stage durations (ms) so far, plus the running total."""
+        breakdown = {stage: round(ms, 3) for stage, ms in self.spans.items()}
+        breakdown[TOTAL] = round(self.total_ms(), 3)
+        return breakdown
+
+
+class StageHistogram:
+    """Fixed-bucket histogram of a stage's duration."""
+
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)  # Last bucket: overflow
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, elapsed_ms: float) -> None:
+        self.counts[bisect_left(BUCKET_BOUNDS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimated q-quantile, interpolated linearly within its bucket.
+
+        The overflow bucket is bounded by the largest sample, and no
+        estimate exceeds it.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for upper, bucket_count in zip((*BUCKET_BOUNDS_MS, self.max_ms), self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                fraction = (rank - seen) / bucket_count
+                return min(lower + (upper - lower) * fraction, self.max_ms)
+            seen += bucket_count
+            lower = upper
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, bucket_count in zip(BUCKET_BOUNDS_MS, self.counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 4) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 4),
+            "p50_ms": round(self.quantile(0.50), 4),
+            "p95_ms": round(self.quantile(0.95), 4),
+            "p99_ms": round(self.quantile(0.99), 4),
+            "buckets": buckets,  # Cumulative counts by upper bound (ms)
+        }
+
+
+class LatencyTracer:
+    """
+    延迟追踪器
+    Samples analysis cycles and aggregates their stage durations.
+
+    Sampling is deterministic: with sample_rate 0.1 every tenth cycle is
+    traced. Debug cycles are always traced.
+    """
+
+    def __init__(self, sample_rate: float = 0.0):
+        """
+        Args:
+            sample_rate: Fraction of cycles to trace (0 disables sampling)
+        """
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self._credit = 0.0
+        self.histograms: dict[str, StageHistogram] = {
+            stage: StageHistogram() for stage in (*STAGES, TOTAL)
+        }
+        self.sampled = 0
+
+    def start(self, debug: bool = False, start: Optional[float] = None) -> Optional[CycleTrace]:
+        """
+        Trace for a new cycle, or None if the cycle is not sampled.
+
+        Args:
+            debug: Always trace (debug sessions)
+            start: perf_counter timestamp the cycle started at
+        """
+        if not debug:
+            if not self.sample_rate:
+                return None
+            self._credit += self.sample_rate
+            if self._credit < 1.0:
+                return None
+            self._credit -= 1.0
+        return CycleTrace(start)
+
+    def record(self, trace: CycleTrace) -> None:
+        """Fold a finished trace into the histograms."""
+        self.sampled += 1
+        for stage, elapsed_ms in trace.spans.items():
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = StageHistogram()
+            histogram.add(elapsed_ms)
+        self.histograms[TOTAL].add(trace.total_ms())
+
+    def metrics(self) -> dict:
+        """Sampling settings and per-stage histograms."""
+        return {
+            "sample_rate": self.sample_rate,
+            "sampled_cycles": self.sampled,
+            "stages": {
+                stage: histogram.to_dict()
+                for stage, histogram in self.histograms.items()
+                if histogram.count
+            },
+        }
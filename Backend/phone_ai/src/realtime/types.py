@@ -6,6 +6,7 @@ Realtime Advisor Data Types
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Optional, TypedDict
+import json
 import time
 
 from src.models.data_types import BBox
@@ -89,11 +90,20 @@ class RealtimeAnalysisResult:
         }
 
 
-@dataclass
+# Timestamp of interned template payloads; they are stamped when serialized
+UNSTAMPED = 0.0
+
+
+@dataclass(frozen=True, slots=True)
 class AdvicePayload:
     """
     建议载荷
     Advice payload for WebSocket transmission.
+    
+    Frozen, so template payloads can be interned and shared between
+    sessions. An UNSTAMPED payload gets its timestamp when serialized.
+    The JSON text is built once per payload; to_json() only fills in the
+    timestamp.
     """
     priority: AdvicePriority
     category: AdviceCategory
@@ -102,20 +112,52 @@ class AdvicePayload:
     timestamp: float = field(default_factory=time.time)
     suppress_duration_s: float = 3.0
     trigger_haptic: bool = False
+    # JSON text before and after the timestamp value, built on first use
+    _json_parts: Optional[tuple[str, str]] = field(default=None, init=False, repr=False, compare=False)
     
-    def to_dict(self) -> dict:
-        """Convert to dictionary for JSON serialization."""
+    def timestamp_ms(self, timestamp_ms: Optional[int] = None) -> int:
+        """Wire timestamp: the given one, else the payload's own, else now."""
+        if timestamp_ms is not None:
+            return timestamp_ms
+        return int((self.timestamp or time.time()) * 1000)
+    
+    def to_dict(self, timestamp_ms: Optional[int] = None) -> dict:
+        """
+        Convert to dictionary for JSON serialization.
+        
+        Args:
+            timestamp_ms: Send time to stamp the message with (optional)
+        """
         return {
             "type": "advice",
             "priority": self.priority.value,
             "category": self.category.value,
             "message": self.message,
             "advanced_message": self.advanced_message,
-            "timestamp": int(self.timestamp * 1000),
+            "timestamp": self.timestamp_ms(timestamp_ms),
             "suppress_duration_ms": int(self.suppress_duration_s * 1000),
             "trigger_haptic": self.trigger_haptic,
         }
     
+    def to_json(self, timestamp_ms: Optional[int] = None) -> str:
+        """
+        JSON text of to_dict(), identical to what send_json would send.
+        
+        Args:
+            timestamp_ms: Send time to stamp the message with (optional)
+        """
+        parts = self._json_parts
+        if parts is None:
+            message = self.to_dict(0)
+            keys = list(message)
+            split = keys.index("timestamp")
+            # Same separators as Starlette's send_json
+            head = json.dumps({k: message[k] for k in keys[:split]}, separators=(",", ":"), ensure_ascii=False)
+            tail = json.dumps({k: message[k] for k in keys[split + 1:]}, separators=(",", ":"), ensure_ascii=False)
+            parts = (head[:-1] + ',"timestamp":', "," + tail[1:])
+            object.__setattr__(self, "_json_parts", parts)
+        return parts[0] + str(self.timestamp_ms(timestamp_ms)) + parts[1]
+    
     def with_substitution(self, **kwargs) -> "AdvicePayload":
         """
         Create a new AdvicePayload with template variables substituted.
@@ -225,6 +267,18 @@ class TelemetryPayload(TypedDict):
     timestamp: int  # Unix timestamp in ms
 
 
+class CycleEnvelopePayload(TypedDict):
+    """
+    周期信封载荷
+    One message per analysis cycle for clients that opt in (Server → Mobile).
+    """
+    type: str  # "cycle"
+    ack: Optional[dict]  # frame_ack fields
+    advice: list[RealtimeAdvicePayload]
+    telemetry: Optional[TelemetryPayload]  # None when dropped for a slow client
+    timestamp: int  # Unix timestamp in ms
+
+
 class TaskPayload(TypedDict):
     """
     任务载荷
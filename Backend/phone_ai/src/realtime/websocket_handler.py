@@ -18,11 +18,12 @@ import cv2
 import numpy as np
 from fastapi import WebSocket, WebSocketDisconnect
 
+from configs.settings import settings
 from .analyzer import RealtimeAnalyzer, RealtimeAnalyzerConfig
 from .advice_engine import AdviceEngine, AdviceEngineConfig
+from .indicator_pipeline import IndicatorFrame
 from .task_manager import TaskManager, TaskManagerConfig
 from .types import (
-    AdvicePayload,
     FrameBufferPayload,
     SessionState,
     ErrorPayload,
@@ -34,10 +35,34 @@ from .types import (
 )
 from ..services.environment_scanner import EnvironmentAnalysis, get_environment_scanner
 from .task_manager import TaskExecutionContext
+from .session_registry import (
+    BUS_BROADCAST,
+    BUS_CLOSE,
+    BUS_CYCLE,
+    BUS_FRAMES,
+    WORKER_ID,
+    FanoutBus,
+    SessionRecord,
+    SessionRegistry,
+    create_fanout_bus,
+    create_session_registry,
+)
+from .snapshot import SnapshotStore
+from .envelope import ENCODING_JSON, CycleEnvelope, negotiate_encoding
+from .send_queue import (
+    ClientSendQueue,
+    SendPriority,
+    SendQueueConfig,
+    classify_message,
+)
+from .tracing import LatencyTracer
 
 
 logger = logging.getLogger(__name__)
 
+# Local state of a session is kept this long after its last client leaves
+SESSION_RELEASE_DELAY_S = 60.0
+
 
 @dataclass
 class WebSocketHandlerConfig:
@@ -59,6 +84,24 @@ class WebSocketHandlerConfig:
     advice_delivery_timeout_ms: float = 100.0
 
 
+@dataclass
+class ClientOptions:
+    """Per-client outbound message options, negotiated on connect."""
+    # One "cycle" message per analysis cycle instead of ack/advice/telemetry
+    envelope: bool = False
+    # Envelope encoding: "json" (text frames) or "msgpack" (binary frames)
+    encoding: str = ENCODING_JSON
+    # Trace every cycle of this client's frame buffers, breakdown in telemetry
+    debug: bool = False
+    
+    @classmethod
+    def from_query(cls, query_params) -> "ClientOptions":
+        """Options from WebSocket URL query parameters (?envelope=1&encoding=msgpack&debug=1)."""
+        envelope = str(query_params.get("envelope", "")).lower() in ("1", "true", "yes")
+        debug = str(query_params.get("debug", "")).lower() in ("1", "true", "yes")
+        return cls(envelope=envelope, encoding=negotiate_encoding(query_params.get("encoding")), debug=debug)
+
+
 class SessionManager:
     """
     会话管理器
@@ -69,15 +112,64 @@ class SessionManager:
     - 9.3: Support multiple concurrent clients per session
     - 9.4: Reconnection with exponential backoff
     - 9.5: Heartbeat mechanism
+    
+    Local state (analyzers, sockets) stays in this process. The shared
+    SessionRegistry and FanoutBus let sessions span several workers: the
+    worker holding the owner lease runs analysis, and broadcasts reach
+    viewers connected to any worker.
+    
+    Analysis state (analyzer buffer, smoothing, motion state, cooldowns)
+    is snapshotted periodically and when the session goes idle, so a
+    client reconnecting within its backoff window, or a worker taking
+    over ownership, resumes with warm state.
+    
+    Every client has its own bounded send queue and writer task; sending
+    to a session only enqueues, so a slow viewer never delays analysis.
+    
+    Sampled analysis cycles are traced per stage (see tracing.py).
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        registry: Optional[SessionRegistry] = None,
+        bus: Optional[FanoutBus] = None,
+        worker_id: str = WORKER_ID,
+        snapshots: Optional[SnapshotStore] = None,
+        send_queue_config: Optional[SendQueueConfig] = None,
+        tracer: Optional[LatencyTracer] = None,
+    ):
         self._sessions: dict[str, SessionState] = {}
         self._clients: dict[str, set[WebSocket]] = {}  # session_id -> set of websockets
         self._analyzers: dict[str, RealtimeAnalyzer] = {}
         self._advice_engines: dict[str, AdviceEngine] = {}
         self._task_managers: dict[str, TaskManager] = {}  # session_id -> TaskManager
         self._heartbeat_tasks: dict[str, asyncio.Task] = {}
+        self._client_options: dict[WebSocket, ClientOptions] = {}
+        
+        # Outbound queues
+        self.send_queue_config = send_queue_config or _create_send_queue_config()
+        self._send_queues: dict[WebSocket, ClientSendQueue] = {}
+        self._closed_queue_totals = {"sent": 0, "dropped": 0, "coalesced": 0}
+        self.outbound_metrics = {
+            "cycles": 0,
+            "envelopes_sent": 0,
+            "envelope_encodes": 0,
+            "telemetry_dropped": 0,
+            "slow_disconnects": 0,
+        }
+        self.tracer = tracer or LatencyTracer(settings.realtime.trace_sample_rate)
+        
+        # Cross-worker state
+        self.worker_id = worker_id
+        self.registry = registry or create_session_registry()
+        self.bus = bus or create_fanout_bus()
+        self._bus_started = False
+        self._lease_renew_at: dict[str, float] = {}  # session_id -> monotonic time
+        
+        # State snapshots
+        self.snapshots = snapshots or _create_snapshot_store()
+        self.snapshot_interval_s = settings.realtime.snapshot_interval_s
+        self._last_snapshot_at: dict[str, float] = {}  # session_id -> monotonic time
     
     def create_session(self, session_id: str) -> SessionState:
         """
@@ -101,7 +193,8 @@ class SessionManager:
             environment_scanner=get_environment_scanner()
         )
         
-        logger.info(f"Created session {session_id}")
+        restored = self.restore_snapshot(session_id)
+        logger.info(f"Created session {session_id}" + (" (restored)" if restored else ""))
         return session
     
     def get_session(self, session_id: str) -> Optional[SessionState]:
@@ -118,6 +211,7 @@ class SessionManager:
             
             # Close all client connections
             for ws in list(self._clients.get(session_id, [])):
+                self._close_send_queue(ws)
                 asyncio.create_task(ws.close())
             
             # Clean up
@@ -126,18 +220,29 @@ class SessionManager:
             self._analyzers.pop(session_id, None)
             self._advice_engines.pop(session_id, None)
             self._task_managers.pop(session_id, None)
+            self._lease_renew_at.pop(session_id, None)
+            self._last_snapshot_at.pop(session_id, None)
             
             logger.info(f"Deleted session {session_id}")
     
-    def add_client(self, session_id: str, websocket: WebSocket) -> None:
+    def add_client(
+        self,
+        session_id: str,
+        websocket: WebSocket,
+        options: Optional[ClientOptions] = None
+    ) -> None:
         """Add a client to a session."""
         if session_id not in self._clients:
             self._clients[session_id] = set()
         self._clients[session_id].add(websocket)
+        self._client_options[websocket] = options or ClientOptions()
+        self._send_queues[websocket] = ClientSendQueue(websocket, self.send_queue_config)
         logger.info(f"Client joined session {session_id}, total: {len(self._clients[session_id])}")
     
     def remove_client(self, session_id: str, websocket: WebSocket) -> None:
         """Remove a client from a session."""
+        self._client_options.pop(websocket, None)
+        self._close_send_queue(websocket)
         if session_id in self._clients:
             self._clients[session_id].discard(websocket)
             logger.info(f"Client left session {session_id}, remaining: {len(self._clients[session_id])}")
@@ -146,6 +251,68 @@ class SessionManager:
         """Get all clients in a session."""
         return self._clients.get(session_id, set())
     
+    def get_client_options(self, websocket: Optional[WebSocket]) -> ClientOptions:
+        """Get negotiated options for a client (defaults for unknown clients)."""
+        return self._client_options.get(websocket) or ClientOptions()
+    
+    def get_send_queue(self, websocket: Optional[WebSocket]) -> Optional[ClientSendQueue]:
+        """Get a client's send queue."""
+        return self._send_queues.get(websocket)
+    
+    async def send_to_client(self, websocket: Optional[WebSocket], payload: dict) -> None:
+        """
+        Send a JSON message to one client.
+        
+        Registered clients go through their send queue; others (e.g. a
+        connection being rejected) are sent to directly.
+        """
+        if websocket is None:
+            return
+        queue = self._send_queues.get(websocket)
+        if queue is not None:
+            priority, key = classify_message(payload)
+            queue.put(payload, priority, key)
+            return
+        try:
+            await websocket.send_json(payload)
+        except Exception as e:
+            logger.error(f"Error sending message: {e}")
+    
+    async def drain(self, session_id: Optional[str] = None) -> None:
+        """Wait until queued messages (of one session, or all) have been sent."""
+        if session_id is None:
+            queues = list(self._send_queues.values())
+        else:
+            queues = [
+                self._send_queues[ws] for ws in self.get_clients(session_id)
+                if ws in self._send_queues
+            ]
+        if queues:
+            await asyncio.gather(*(queue.drain() for queue in queues))
+    
+    def queue_metrics(self) -> dict:
+        """Queue depth of connected clients; counters include departed clients."""
+        queues = list(self._send_queues.values())
+        totals = self._closed_queue_totals
+        return {
+            "clients": len(queues),
+            "depth": sum(queue.depth for queue in queues),
+            "max_depth": max((queue.max_depth for queue in queues), default=0),
+            "sent": totals["sent"] + sum(queue.sent for queue in queues),
+            "dropped": totals["dropped"] + sum(queue.dropped for queue in queues),
+            "coalesced": totals["coalesced"] + sum(queue.coalesced for queue in queues),
+        }
+    
+    def _close_send_queue(self, websocket: WebSocket) -> None:
+        queue = self._send_queues.pop(websocket, None)
+        if queue is not None:
+            if queue.disconnected_slow:
+                self.outbound_metrics["slow_disconnects"] += 1
+            self._closed_queue_totals["sent"] += queue.sent
+            self._closed_queue_totals["dropped"] += queue.dropped
+            self._closed_queue_totals["coalesced"] += queue.coalesced
+            queue.close()
+    
     def get_analyzer(self, session_id: str) -> Optional[RealtimeAnalyzer]:
         """Get analyzer for a session."""
         return self._analyzers.get(session_id)
@@ -165,6 +332,305 @@ class SessionManager:
     def get_session_count(self) -> int:
         """Get total number of sessions."""
         return len(self._sessions)
+    
+    # =====================================================================
+    # State snapshots
+    # =====================================================================
+    
+    def snapshot_session(self, session_id: str) -> bool:
+        """
+        Snapshot a session's analysis state into the snapshot store.
+        
+        Returns:
+            True if the session exists locally and was snapshotted
+        """
+        session = self._sessions.get(session_id)
+        analyzer = self._analyzers.get(session_id)
+        advice_engine = self._advice_engines.get(session_id)
+        if session is None or analyzer is None or advice_engine is None:
+            return False
+        try:
+            self.snapshots.save(session_id, session, analyzer, advice_engine)
+        except Exception as e:
+            logger.warning(f"Failed to snapshot session {session_id}: {e}")
+            return False
+        self._last_snapshot_at[session_id] = time.monotonic()
+        return True
+    
+    def maybe_snapshot(self, session_id: str) -> bool:
+        """Snapshot a session if snapshot_interval_s has passed since the last one."""
+        last = self._last_snapshot_at.get(session_id)
+        if last is not None and time.monotonic() - last < self.snapshot_interval_s:
+            return False
+        return self.snapshot_session(session_id)
+    
+    def restore_snapshot(self, session_id: str) -> bool:
+        """
+        Restore a session's analysis state from the snapshot store.
+        
+        Returns:
+            True if a snapshot was found and restored
+        """
+        session = self._sessions.get(session_id)
+        analyzer = self._analyzers.get(session_id)
+        advice_engine = self._advice_engines.get(session_id)
+        if session is None or analyzer is None or advice_engine is None:
+            return False
+        if not self.snapshots.restore(session_id, session, analyzer, advice_engine):
+            return False
+        self._last_snapshot_at[session_id] = time.monotonic()
+        logger.info(f"Restored session {session_id} from snapshot")
+        return True
+    
+    # =====================================================================
+    # Cross-worker registry and fan-out
+    # =====================================================================
+    
+    async def start(self) -> None:
+        """Subscribe to the fan-out bus (idempotent)."""
+        if not self._bus_started:
+            self._bus_started = True
+            await self.bus.start(self.worker_id, self._on_bus_message)
+    
+    async def stop(self) -> None:
+        """Unsubscribe from the bus and release ownership of local sessions."""
+        for session_id in list(self._sessions):
+            if session_id in self._lease_renew_at:
+                self.snapshot_session(session_id)
+            await self.registry.release(session_id, self.worker_id)
+            await self.registry.set_clients(session_id, self.worker_id, 0)
+        if self._bus_started:
+            self._bus_started = False
+            await self.bus.stop()
+        await self.registry.close()
+    
+    async def register_session(self, session_id: str) -> SessionRecord:
+        """
+        Create local state and the shared record.
+        
+        Ownership is not claimed here: the worker that receives the first
+        frame buffer becomes the owner, so analysis runs where the camera
+        is connected.
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            Shared session record (owner is the routing hint for clients)
+        """
+        self.create_session(session_id)
+        await self.registry.register(session_id)
+        return await self.registry.get(session_id)
+    
+    async def find_session(self, session_id: str) -> Optional[SessionRecord]:
+        """Look up a session on any worker."""
+        return await self.registry.get(session_id)
+    
+    async def ensure_owner(self, session_id: str) -> str:
+        """
+        Claim or renew the owner lease for a session.
+        
+        The lease is renewed at most three times per lease period; in
+        between, the cached ownership is trusted. Stats are published to
+        the registry on each renewal.
+        
+        Returns:
+            Current owner worker ID
+        """
+        now = time.monotonic()
+        if now < self._lease_renew_at.get(session_id, 0.0):
+            return self.worker_id
+        
+        owner = await self.registry.claim(session_id, self.worker_id)
+        if owner != self.worker_id:
+            self._lease_renew_at.pop(session_id, None)
+            return owner
+        
+        session = self._sessions.get(session_id)
+        if session_id not in self._lease_renew_at and session is not None and session.total_analyses == 0:
+            # Newly acquired ownership (e.g. the previous owner went away):
+            # pick up the state it last snapshotted
+            self.restore_snapshot(session_id)
+        self._lease_renew_at[session_id] = now + self.registry.lease_s / 3
+        if session is not None:
+            await self.registry.update_stats(
+                session_id,
+                session.motion_state.value,
+                session.total_analyses,
+                session.avg_latency_ms,
+            )
+        return owner
+    
+    async def sync_clients(self, session_id: str) -> None:
+        """Publish this worker's viewer count for a session."""
+        await self.registry.set_clients(
+            session_id, self.worker_id, len(self.get_clients(session_id))
+        )
+    
+    async def release_session(self, session_id: str) -> None:
+        """
+        Drop local state once the last local viewer has left.
+        
+        The shared record is removed only if no other worker has viewers;
+        otherwise ownership is released so another worker can take over.
+        The session is snapshotted first so a later reconnect resumes it.
+        """
+        if session_id in self._lease_renew_at:
+            self.snapshot_session(session_id)
+        self.delete_session(session_id)
+        await self.registry.set_clients(session_id, self.worker_id, 0)
+        await self.registry.release(session_id, self.worker_id)
+        record = await self.registry.get(session_id)
+        if record is not None and record.total_clients == 0:
+            await self.registry.remove(session_id)
+    
+    async def close_session(self, session_id: str) -> None:
+        """Delete a session on every worker."""
+        self.delete_session(session_id)
+        self.snapshots.delete(session_id)
+        await self.registry.remove(session_id)
+        await self.bus.publish({
+            "kind": BUS_CLOSE,
+            "session_id": session_id,
+            "origin": self.worker_id,
+        })
+    
+    async def send_local(self, session_id: str, payload: dict) -> int:
+        """
+        Queue a payload for viewers connected to this worker.
+        
+        Returns:
+            Number of clients the payload was queued for
+        """
+        priority, key = classify_message(payload)
+        sent = 0
+        for client in self._connected_clients(session_id):
+            queue = self._send_queues.get(client)
+            if queue is not None and queue.put(payload, priority, key):
+                sent += 1
+        return sent
+    
+    async def broadcast(self, session_id: str, payload: dict) -> int:
+        """
+        Send a payload to all viewers of a session on every worker.
+        
+        Returns:
+            Number of local clients the payload was sent to
+        """
+        sent = await self.send_local(session_id, payload)
+        await self.bus.publish({
+            "kind": BUS_BROADCAST,
+            "session_id": session_id,
+            "origin": self.worker_id,
+            "payload": payload,
+        })
+        return sent
+    
+    async def send_cycle_local(self, session_id: str, cycle: CycleEnvelope) -> int:
+        """
+        Queue one analysis cycle for viewers connected to this worker.
+        
+        Envelope clients get a single pre-encoded "cycle" message; the
+        encoding is shared by all of them. Other clients get the separate
+        advice and telemetry messages (their frame_ack is sent by the
+        handler). Clients still working through a backlog get envelopes
+        without telemetry.
+        
+        Returns:
+            Number of clients the cycle was queued for
+        """
+        clients = self._connected_clients(session_id)
+        if not clients:
+            return 0
+        
+        self.outbound_metrics["cycles"] += 1
+        encodes_before = cycle.encode_count
+        sent = 0
+        for client in clients:
+            queue = self._send_queues.get(client)
+            if queue is not None and self._queue_cycle(queue, cycle):
+                sent += 1
+        self.outbound_metrics["envelope_encodes"] += cycle.encode_count - encodes_before
+        return sent
+    
+    async def broadcast_cycle(self, session_id: str, cycle: CycleEnvelope) -> int:
+        """
+        Deliver one analysis cycle to all viewers of a session on every worker.
+        
+        Returns:
+            Number of local clients the cycle was sent to
+        """
+        sent = await self.send_cycle_local(session_id, cycle)
+        # Serialized only for other workers; the advice items are rebuilt as dicts
+        if self.bus.has_peers(self.worker_id):
+            await self.bus.publish({
+                "kind": BUS_CYCLE,
+                "session_id": session_id,
+                "origin": self.worker_id,
+                "cycle": cycle.to_parts(),
+            })
+        return sent
+    
+    def _connected_clients(self, session_id: str) -> list[WebSocket]:
+        return [
+            client for client in self.get_clients(session_id)
+            if client.client_state.name == "CONNECTED"
+        ]
+    
+    def _queue_cycle(self, queue: ClientSendQueue, cycle: CycleEnvelope) -> bool:
+        options = self.get_client_options(queue.websocket)
+        
+        if not options.envelope:
+            # Text encoded once per cycle, shared by every such client
+            for text, priority, key in cycle.advice_messages():
+                queue.put(text, priority, key)
+            if cycle.telemetry is None:
+                return not queue.closed
+            return queue.put(cycle.telemetry_text(), SendPriority.LATEST, "telemetry")
+        
+        # Telemetry is the first thing a lagging client loses
+        with_telemetry = not queue.is_backlogged()
+        if not with_telemetry and cycle.telemetry is not None:
+            self.outbound_metrics["telemetry_dropped"] += 1
+        
+        priority, key = cycle.priority
+        if not queue.put(cycle.encoded(options.encoding, with_telemetry), priority, key):
+            return False
+        self.outbound_metrics["envelopes_sent"] += 1
+        return True
+    
+    async def forward_frames(self, owner: str, session_id: str, payload: dict) -> None:
+        """Forward a frame buffer to the worker that owns the session."""
+        await self.bus.send_to_worker(owner, {
+            "kind": BUS_FRAMES,
+            "session_id": session_id,
+            "origin": self.worker_id,
+            "payload": payload,
+        })
+    
+    async def _on_bus_message(self, message: dict) -> None:
+        """Handle a message from another worker."""
+        kind = message.get("kind")
+        session_id = message.get("session_id")
+        
+        if kind == BUS_BROADCAST:
+            await self.send_local(session_id, message["payload"])
+        elif kind == BUS_CYCLE:
+            await self.send_cycle_local(session_id, CycleEnvelope.from_dict(message["cycle"]))
+        elif kind == BUS_FRAMES:
+            if not self.get_clients(session_id):
+                # Nobody watches here: analyzing would renew the lease and
+                # pin the session to this worker. Give it up so the
+                # sender's worker claims it with its next buffer.
+                logger.info(f"Releasing session {session_id}: frames forwarded but no local clients")
+                await self.release_session(session_id)
+                return
+            handler = RealtimeWebSocketHandler(self)
+            await handler._handle_frame_buffer(None, session_id, message["payload"])
+        elif kind == BUS_CLOSE:
+            self.delete_session(session_id)
+        else:
+            logger.warning(f"Unknown bus message kind: {kind}")
 
 
 class RealtimeWebSocketHandler:
@@ -208,19 +674,25 @@ class RealtimeWebSocketHandler:
         """
         # Accept WebSocket connection with CORS headers
         await websocket.accept()
+        await self.session_manager.start()
         
-        # Get or create session
-        session = self.session_manager.get_session(session_id)
-        if session is None:
-            session = self.session_manager.create_session(session_id)
+        # Get or create session (locally and in the shared registry)
+        record = await self.session_manager.register_session(session_id)
         
-        # Add client to session
-        self.session_manager.add_client(session_id, websocket)
+        # Add client to session with its negotiated message options
+        options = ClientOptions.from_query(websocket.query_params)
+        self.session_manager.add_client(session_id, websocket, options)
+        await self.session_manager.sync_clients(session_id)
         
-        # Send welcome message
+        # Send welcome message; owner/worker_id are session-affinity hints
+        # for load balancers (analysis runs on the owner worker)
         await self._send_message(websocket, {
             "type": "connected",
             "session_id": session_id,
+            "worker_id": self.session_manager.worker_id,
+            "owner": record.owner if record else None,
+            "envelope": options.envelope,
+            "encoding": options.encoding,
             "timestamp": int(time.time() * 1000)
         })
         
@@ -241,12 +713,15 @@ class RealtimeWebSocketHandler:
             # Clean up
             heartbeat_task.cancel()
             self.session_manager.remove_client(session_id, websocket)
+            await self.session_manager.sync_clients(session_id)
             
-            # Clean up empty sessions after delay
+            # Clean up empty sessions after delay; snapshot right away so
+            # a reconnect to another worker resumes the current state
             if not self.session_manager.get_clients(session_id):
-                await asyncio.sleep(60)  # 1 minute delay
+                self.session_manager.snapshot_session(session_id)
+                await asyncio.sleep(SESSION_RELEASE_DELAY_S)
                 if not self.session_manager.get_clients(session_id):
-                    self.session_manager.delete_session(session_id)
+                    await self.session_manager.release_session(session_id)
     
     async def _message_loop(
         self,
@@ -285,11 +760,13 @@ class RealtimeWebSocketHandler:
             message: Raw message string
         """
         try:
+            received_at = time.perf_counter()
             payload = json.loads(message)
+            parsed_at = time.perf_counter()
             msg_type = payload.get("type")
             
             if msg_type == "frames":
-                await self._handle_frame_buffer(websocket, session_id, payload)
+                await self._handle_frame_buffer(websocket, session_id, payload, (received_at, parsed_at))
             elif msg_type == "heartbeat":
                 await self._send_message(websocket, {
                     "type": "heartbeat_ack",
@@ -318,15 +795,19 @@ class RealtimeWebSocketHandler:
         self,
         websocket: WebSocket,
         session_id: str,
-        payload: dict
+        payload: dict,
+        parse_span: Optional[tuple[float, float]] = None,
     ) -> None:
         """
         Handle incoming frame buffer and run analysis.
         
         Args:
-            websocket: WebSocket connection
+            websocket: WebSocket connection (None for buffers forwarded
+                from another worker)
             session_id: Session identifier
             payload: Frame buffer payload
+            parse_span: perf_counter timestamps before and after the
+                message was parsed (the first starts the latency trace)
         """
         frames_b64 = payload.get("frames", [])
         fps = payload.get("fps", 30.0)
@@ -335,6 +816,19 @@ class RealtimeWebSocketHandler:
             await self._send_error(websocket, "INVALID_FRAME_BUFFER")
             return
         
+        # Analysis stays on the owner worker; forward if another worker owns it
+        owner = await self.session_manager.ensure_owner(session_id)
+        if owner != self.session_manager.worker_id:
+            await self.session_manager.forward_frames(owner, session_id, payload)
+            await self._send_message(websocket, {
+                "type": "frame_ack",
+                "frame_count": len(frames_b64),
+                "status": "forwarded",
+                "owner": owner,
+                "timestamp": int(time.time() * 1000)
+            })
+            return
+        
         # Get analyzer and advice engine
         analyzer = self.session_manager.get_analyzer(session_id)
         advice_engine = self.session_manager.get_advice_engine(session_id)
@@ -344,8 +838,15 @@ class RealtimeWebSocketHandler:
             await self._send_error(websocket, "SESSION_EXPIRED")
             return
         
+        # Per-stage latency trace; None unless sampled or a debug client
+        debug = self.session_manager.get_client_options(websocket).debug
+        received_at, parsed_at = parse_span if parse_span is not None else (None, None)
+        trace = self.session_manager.tracer.start(debug=debug, start=received_at)
+        if trace is not None and parse_span is not None:
+            trace.lap("parse", received_at, parsed_at)
+        
         # Decode frames
-        frames = analyzer.decode_frame_buffer(frames_b64)
+        frames = analyzer.decode_frame_buffer(frames_b64, trace)
         
         if len(frames) < self.config.min_frame_buffer_size:
             await self._send_message(websocket, {
@@ -358,76 +859,68 @@ class RealtimeWebSocketHandler:
         
         # Run analysis
         start_time = time.time()
-        analysis_result = analyzer.analyze_buffer(frames, fps)
+        analysis_result = analyzer.analyze_buffer(frames, fps, trace)
         
         # Update session metrics
         session.update_latency(analysis_result.analysis_latency_ms)
         
-        # Generate advice
+        # Smooth and classify once; advice, telemetry and session state share the frame
+        t = time.perf_counter() if trace is not None else 0.0
         current_time = time.time()
+        indicators = advice_engine.pipeline.process(analysis_result, current_time)
+        session.motion_state = indicators.motion_type
+        if trace is not None:
+            t = trace.lap("smoothing", t)
+        
+        # Generate advice
         advice_list = advice_engine.generate_advice(
             analysis_result=analysis_result,
             current_time=current_time,
+            indicators=indicators,
         )
+        if trace is not None:
+            t = trace.lap("advice", t)
         
-        # Send acknowledgment
-        await self._send_message(websocket, {
+        ack = {
             "type": "frame_ack",
             "frame_count": len(frames),
             "analysis_latency_ms": analysis_result.analysis_latency_ms,
             "timestamp": int(time.time() * 1000)
-        })
-        
-        # Push advice to all clients (Requirement 9.2)
-        if advice_list:
-            await self._broadcast_advice(session_id, advice_list)
-
-        # Send telemetry data
-        await self._broadcast_telemetry(session_id, analysis_result)
-    
-    async def _broadcast_advice(
-        self,
-        session_id: str,
-        advice_list: list[AdvicePayload]
-    ) -> None:
-        """
-        Broadcast advice to all clients in a session.
+        }
         
-        Requirement 9.2: Push advice immediately to all connected clients.
+        # Envelope clients get the ack inside the cycle message
+        if not self.session_manager.get_client_options(websocket).envelope:
+            await self._send_message(websocket, ack)
         
-        Args:
-            session_id: Session identifier
-            advice_list: List of advice payloads
-        """
-        clients = self.session_manager.get_clients(session_id)
+        # Push advice and telemetry to all clients in one round (Requirement 9.2)
+        telemetry = self._build_telemetry_payload(analysis_result, indicators)
+        if debug and trace is not None:
+            # Stages up to advice generation; sending is still ahead
+            telemetry["trace"] = trace.to_dict()
+        cycle = CycleEnvelope(
+            ack=ack,
+            advice=advice_list,
+            telemetry=telemetry,
+        )
+        await self.session_manager.broadcast_cycle(session_id, cycle)
+        if trace is not None:
+            trace.lap("send", t)
+            self.session_manager.tracer.record(trace)
         
-        for advice in advice_list:
-            payload = advice.to_dict()
-            
-            # Send to all clients concurrently
-            tasks = []
-            for client in clients:
-                if client.client_state.name == "CONNECTED":
-                    tasks.append(self._send_message(client, payload))
-            
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
-
-    async def _broadcast_telemetry(
-        self,
-        session_id: str,
-        analysis_result: RealtimeAnalysisResult
-    ) -> None:
+        self.session_manager.maybe_snapshot(session_id)
+    
+    @staticmethod
+    def _build_telemetry_payload(
+        analysis_result: RealtimeAnalysisResult,
+        indicators: Optional[IndicatorFrame] = None,
+    ) -> dict:
         """
-        Broadcast telemetry data to all clients in a session.
+        Telemetry message for an analysis result.
 
-        Args:
-            session_id: Session identifier
-            analysis_result: Analysis result to broadcast
+        Values are the raw per-cycle measurements; the pipeline's motion
+        state is added when available.
         """
-        clients = self.session_manager.get_clients(session_id)
-
-        telemetry_payload = {
+        payload = {
             "type": "telemetry",
             "avg_speed_px_frame": analysis_result.avg_speed_px_frame,
             "speed_variance": analysis_result.speed_variance,
@@ -437,14 +930,10 @@ class RealtimeWebSocketHandler:
             "confidence": analysis_result.confidence,
             "timestamp": int(time.time() * 1000)
         }
-
-        tasks = []
-        for client in clients:
-            if client.client_state.name == "CONNECTED":
-                tasks.append(self._send_message(client, telemetry_payload))
-
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        if indicators is not None:
+            payload["motion_type"] = indicators.motion_type.value
+            payload["motion_confidence"] = indicators.motion_confidence
+        return payload
 
     async def _handle_environment_scan_request(
         self,
@@ -564,21 +1053,13 @@ class RealtimeWebSocketHandler:
             session_id: Session identifier
             analysis: Environment analysis result
         """
-        clients = self.session_manager.get_clients(session_id)
-
         payload = {
             "type": "environment",
             **analysis.to_dict(),
             "timestamp": int(time.time() * 1000)
         }
 
-        tasks = []
-        for client in clients:
-            if client.client_state.name == "CONNECTED":
-                tasks.append(self._send_message(client, payload))
-
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        await self.session_manager.broadcast(session_id, payload)
 
     async def _broadcast_task_update(
         self,
@@ -592,8 +1073,6 @@ class RealtimeWebSocketHandler:
             session_id: Session identifier
             context: Task execution context
         """
-        clients = self.session_manager.get_clients(session_id)
-
         task = context.task
         payload = {
             "type": "task",
@@ -610,13 +1089,7 @@ class RealtimeWebSocketHandler:
             "timestamp": int(time.time() * 1000)
         }
 
-        tasks = []
-        for client in clients:
-            if client.client_state.name == "CONNECTED":
-                tasks.append(self._send_message(client, payload))
-
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        await self.session_manager.broadcast(session_id, payload)
     
     async def _heartbeat_loop(
         self,
@@ -648,14 +1121,11 @@ class RealtimeWebSocketHandler:
     
     async def _send_message(
         self,
-        websocket: WebSocket,
+        websocket: Optional[WebSocket],
         payload: dict
     ) -> None:
-        """Send a JSON message to a WebSocket client."""
-        try:
-            await websocket.send_json(payload)
-        except Exception as e:
-            logger.error(f"Error sending message: {e}")
+        """Send a JSON message to a WebSocket client (through its send queue)."""
+        await self.session_manager.send_to_client(websocket, payload)
     
     async def _send_error(
         self,
@@ -749,6 +1219,47 @@ class ReconnectionManager:
         """Check if reconnection should be attempted."""
         attempts = self._attempt_counts.get(session_id, 0)
         return attempts < self.config.max_reconnect_attempts
+    
+    def get_reconnect_window(self) -> float:
+        """
+        Upper bound on the time a client keeps trying to reconnect.
+        
+        Sum of all backoff delays (capped, with maximum jitter). Session
+        snapshots must outlive this window to be useful on reconnect.
+        
+        Returns:
+            Window length in seconds
+        """
+        window = 0.0
+        for attempt in range(self.config.max_reconnect_attempts):
+            delay = self.config.initial_reconnect_delay_s * (
+                self.config.reconnect_backoff_multiplier ** attempt
+            )
+            window += min(delay, self.config.max_reconnect_delay_s) * 1.2
+        return window
+
+
+def _create_send_queue_config() -> SendQueueConfig:
+    """Send queue configuration from REALTIME_SEND_QUEUE_* settings."""
+    config = settings.realtime
+    return SendQueueConfig(
+        max_pending=config.send_queue_size,
+        slow_consumer_policy=config.slow_consumer_policy,
+        slow_consumer_timeout_s=config.slow_consumer_timeout_s,
+    )
+
+
+def _create_snapshot_store() -> SnapshotStore:
+    """Create the snapshot store from REALTIME_SNAPSHOT_* settings."""
+    config = settings.realtime
+    ttl_s = config.snapshot_ttl_s
+    if ttl_s is None:
+        ttl_s = ReconnectionManager().get_reconnect_window() + SESSION_RELEASE_DELAY_S
+    return SnapshotStore(
+        ttl_s=ttl_s,
+        max_entries=config.snapshot_max_entries,
+        directory=config.snapshot_dir,
+    )
 
 
 # Global session manager instance
@@ -0,0 +1,259 @@
+"""
+Shot Boundary Detection
+
+基于HSV直方图的镜头切换检测（向量化实现）。
+Vectorized HSV histogram shot-boundary detection.
+
+Frames are read in batches at low resolution into a preallocated buffer,
+converted to HSV with one cv2 call per batch, and binned into a
+preallocated (N, bins) histogram array with a single ``np.bincount``.
+Distances between consecutive histograms are computed with one vectorized
+operation instead of per-pair ``cv2.compareHist`` calls.
+
+Two modes:
+- full: all histograms in one (N, bins) array, distances in one op
+- streaming: bounded memory, only one batch of histograms is alive at a time
+
+video_ai_demo is packaged separately and vendors this file verbatim as
+app/pipeline/shot_boundary.py. Edit it here and copy it over; a test in
+video_ai_demo fails when the copies drift.
+"""
+
+from typing import Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+# H-S histogram layout, same as cv2.calcHist([hsv], [0, 1], None, [50, 60], [0, 180, 0, 256])
+H_BINS = 50
+S_BINS = 60
+BINS = H_BINS * S_BINS
+
+# Per-channel lookup tables: pixel value -> flattened bin offset
+_H_LUT = ((np.arange(256) * H_BINS // 180) * S_BINS).astype(np.int32)
+_S_LUT = (np.arange(256) * S_BINS // 256).astype(np.int32)
+
+METRICS = ("chisqr", "correl")
+
+
+def compute_histograms(hsv_frames: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Compute H-S histograms for a batch of HSV frames.
+
+    Args:
+        hsv_frames: (B, H, W, 3) uint8 HSV frames
+        out: Optional preallocated (>=B, BINS) float32 array to write into
+
+    Returns:
+        (B, BINS) float32 histogram counts
+    """
+    batch = hsv_frames.shape[0]
+    idx = _H_LUT[hsv_frames[..., 0]] + _S_LUT[hsv_frames[..., 1]]
+    idx += (np.arange(batch, dtype=np.int32) * BINS)[:, None, None]
+    counts = np.bincount(idx.ravel(), minlength=batch * BINS).reshape(batch, BINS)
+
+    if out is None:
+        return counts.astype(np.float32)
+    out[:batch] = counts
+    return out[:batch]
+
+
+def consecutive_distances(
+    hists: np.ndarray,
+    metric: str = "chisqr",
+    previous: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Distances between each histogram and the one before it.
+
+    Matches cv2.compareHist semantics: "chisqr" on L2-normalized histograms
+    (HISTCMP_CHISQR, larger = more different), "correl" is HISTCMP_CORREL
+    (1.0 = identical).
+
+    Args:
+        hists: (N, BINS) histograms
+        metric: "chisqr" or "correl"
+        previous: Histogram preceding hists[0] (streaming); if given the
+            result has N values, otherwise N-1
+
+    Returns:
+        Distance array
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric}")
+
+    if previous is not None:
+        hists = np.concatenate([previous[None, :], hists])
+    if len(hists) < 2:
+        return np.empty(0, dtype=np.float64)
+
+    hists = hists.astype(np.float64, copy=False)
+
+    if metric == "chisqr":
+        norms = np.linalg.norm(hists, axis=1, keepdims=True)
+        hists = hists / np.where(norms > 0, norms, 1.0)
+        a, b = hists[:-1], hists[1:]
+        diff_sq = (a - b) ** 2
+        return np.divide(diff_sq, a, out=np.zeros_like(a), where=a > 0).sum(axis=1)
+
+    centered = hists - hists.mean(axis=1, keepdims=True)
+    a, b = centered[:-1], centered[1:]
+    numerator = (a * b).sum(axis=1)
+    denominator = np.sqrt((a * a).sum(axis=1) * (b * b).sum(axis=1))
+    return np.divide(numerator, denominator, out=np.ones_like(numerator), where=denominator > 0)
+
+
+def iter_histogram_batches(
+    cap: cv2.VideoCapture,
+    sample_rate: int = 1,
+    width: int = 160,
+    batch_size: int = 64,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Read frames in batches at low resolution and yield their histograms.
+
+    The frame and histogram buffers are allocated once and reused, so the
+    yielded arrays are only valid until the next iteration.
+
+    Args:
+        cap: Opened video capture
+        sample_rate: Use every Nth frame (skipped frames are only grabbed)
+        width: Processing width (height keeps aspect ratio)
+        batch_size: Frames per batch
+
+    Yields:
+        (frame_indices, histograms) for each batch
+    """
+    src_w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or width
+    src_h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or width
+    width = min(width, src_w)
+    height = max(1, round(src_h * width / src_w))
+
+    frames = np.empty((batch_size, height, width, 3), dtype=np.uint8)
+    hists = np.empty((batch_size, BINS), dtype=np.float32)
+    indices = np.empty(batch_size, dtype=np.int64)
+
+    frame_idx = 0
+    done = False
+    while not done:
+        count = 0
+        while count < batch_size:
+            if frame_idx % sample_rate:
+                if not cap.grab():
+                    done = True
+                    break
+                frame_idx += 1
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                done = True
+                break
+            cv2.resize(frame, (width, height), dst=frames[count], interpolation=cv2.INTER_AREA)
+            indices[count] = frame_idx
+            count += 1
+            frame_idx += 1
+
+        if count:
+            # One color conversion for the whole batch
+            batch = frames[:count]
+            hsv = cv2.cvtColor(batch.reshape(count * height, width, 3), cv2.COLOR_BGR2HSV)
+            compute_histograms(hsv.reshape(count, height, width, 3), out=hists)
+            yield indices[:count], hists[:count]
+
+
+def histogram_distances(
+    video_path: str,
+    metric: str = "chisqr",
+    sample_rate: int = 1,
+    width: int = 160,
+    batch_size: int = 64,
+    streaming: bool = True,
+) -> Tuple[np.ndarray, np.ndarray, float, int]:
+    """
+    Distances between consecutive sampled frames of a video.
+
+    Args:
+        video_path: Path to the video
+        metric: "chisqr" or "correl"
+        sample_rate: Use every Nth frame
+        width: Processing width
+        batch_size: Frames per batch
+        streaming: Keep only one batch of histograms in memory; otherwise
+            fill one preallocated (N, bins) array and diff it in one op
+
+    Returns:
+        (frame_indices, distances, fps, total_frames) where distances[i] is
+        between frame_indices[i] and the sample before it
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"无法打开视频: {video_path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    index_parts: List[np.ndarray] = []
+    try:
+        if streaming:
+            distance_parts: List[np.ndarray] = []
+            previous = None
+            for indices, hists in iter_histogram_batches(cap, sample_rate, width, batch_size):
+                distance_parts.append(consecutive_distances(hists, metric, previous))
+                index_parts.append((indices if previous is not None else indices[1:]).copy())
+                previous = hists[-1].copy()
+            distances = np.concatenate(distance_parts) if distance_parts else np.empty(0)
+        else:
+            capacity = max(1, total_frames // sample_rate + 1)
+            all_hists = np.empty((capacity, BINS), dtype=np.float32)
+            n = 0
+            for indices, hists in iter_histogram_batches(cap, sample_rate, width, batch_size):
+                if n + len(hists) > capacity:
+                    # Frame count metadata was too low
+                    capacity = max(capacity * 2, n + len(hists))
+                    all_hists = np.resize(all_hists, (capacity, BINS))
+                all_hists[n:n + len(hists)] = hists
+                index_parts.append(indices.copy())
+                n += len(hists)
+            distances = consecutive_distances(all_hists[:n], metric)
+            if index_parts:
+                index_parts[0] = index_parts[0][1:]
+    finally:
+        cap.release()
+
+    frame_indices = np.concatenate(index_parts) if index_parts else np.empty(0, dtype=np.int64)
+    total_frames = max(total_frames, int(frame_indices[-1]) + 1 if len(frame_indices) else 0)
+    return frame_indices, distances, fps, total_frames
+
+
+def find_cuts(
+    frame_indices: np.ndarray,
+    distances: np.ndarray,
+    threshold: float,
+    min_gap_frames: float = 0,
+    metric: str = "chisqr",
+) -> List[int]:
+    """
+    Select cut frames from consecutive distances.
+
+    Candidates are found with one vectorized comparison; only the (few)
+    candidates are walked to enforce the minimum gap between cuts.
+
+    Args:
+        frame_indices: Frame index of each distance
+        distances: Output of consecutive_distances
+        threshold: For "chisqr" a cut is distance > threshold; for
+            "correl" a cut is similarity < threshold
+        min_gap_frames: Minimum number of frames since the previous cut
+        metric: Metric the distances were computed with
+
+    Returns:
+        Cut frame indices, starting with 0
+    """
+    mask = distances > threshold if metric == "chisqr" else distances < threshold
+    cuts = [0]
+    for idx in frame_indices[mask]:
+        if idx - cuts[-1] > min_gap_frames:
+            cuts.append(int(idx))
+    return cuts
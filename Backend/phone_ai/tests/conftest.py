@@ -1,6 +1,10 @@
 """
 Pytest configuration and fixtures.
 """
+import asyncio
+from typing import Optional
+from unittest.mock import AsyncMock, MagicMock
+
 import pytest
 from hypothesis import settings as hypothesis_settings, Verbosity
 
@@ -73,3 +77,39 @@ def sample_heuristic_output():
         subject_occupancy=0.35,
         beat_alignment_score=0.8,
     )
+
+
+class FakeClock:
+    """Manually advanced time source."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """Manually advanced clock, starting at t=1000s."""
+    return FakeClock()
+
+
+@pytest.fixture
+def make_client():
+    """Factory for fake connected WebSockets."""
+    def make(stalled: Optional[asyncio.Event] = None):
+        """Fake client; if `stalled` is given, sends block until it is set."""
+        ws = MagicMock()
+        ws.client_state.name = "CONNECTED"
+        ws.send_json = AsyncMock()
+        ws.send_text = AsyncMock()
+        ws.send_bytes = AsyncMock()
+        ws.close = AsyncMock()
+        if stalled is not None:
+            async def send(_):
+                await stalled.wait()
+            for method in (ws.send_json, ws.send_text, ws.send_bytes):
+                method.side_effect = send
+        return ws
+    return make
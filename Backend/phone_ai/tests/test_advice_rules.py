@@ -0,0 +1,63 @@
+"""
+Tests for the compiled advice rule table.
+"""
+import dataclasses
+import json
+
+import pytest
+
+from src.realtime.advice_engine import AdviceEngine, AdviceEngineConfig
+from src.realtime.advice_rules import AdviceTemplateId, compile_rule_table, materialize
+from src.realtime.templates import (
+    ADVICE_TEMPLATES,
+    STABILITY_CRITICAL,
+    get_advice,
+    get_direction_hint,
+)
+from src.realtime.types import UNSTAMPED
+
+
+class TestRuleTable:
+    """Compilation and materialization."""
+
+    def test_bands_follow_engine_config(self):
+        table = compile_rule_table(
+            AdviceEngineConfig(stability_critical_threshold=0.3, speed_warning_threshold=10.0),
+        )
+        assert table.stability.critical_enter == pytest.approx(0.25)
+        assert table.stability.critical_exit == pytest.approx(0.35)
+        assert (table.speed_fast.warning_enter, table.speed_fast.warning_exit) == (12.0, 8.0)
+        assert AdviceEngine().rules == AdviceEngine().rules
+
+    def test_materialize(self):
+        payload = materialize(AdviceTemplateId.STABILITY_CRITICAL, advanced=True)
+        assert payload.message == STABILITY_CRITICAL.message
+        assert payload.advanced_message == STABILITY_CRITICAL.advanced_message
+        assert payload.trigger_haptic
+        assert materialize(AdviceTemplateId.STABILITY_CRITICAL).advanced_message is None
+        assert "向左" in materialize(AdviceTemplateId.SUBJECT_OFF_CENTER, direction="左").message
+
+
+class TestInternedTemplates:
+    """Fired rules share immutable payloads with cached JSON."""
+
+    def test_variants_are_interned(self):
+        assert materialize(AdviceTemplateId.STABILITY_CRITICAL, advanced=True) is STABILITY_CRITICAL
+        assert materialize(AdviceTemplateId.STABILITY_CRITICAL) is materialize(AdviceTemplateId.STABILITY_CRITICAL)
+        assert get_direction_hint("left") is get_direction_hint("left")
+        assert get_advice("subject_off_center", advanced=False, direction="左") is materialize(
+            AdviceTemplateId.SUBJECT_OFF_CENTER, direction="左"
+        )
+        # Unknown directions are still served, just not interned
+        assert "斜" in get_direction_hint("斜").message
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            STABILITY_CRITICAL.message = "x"
+
+    def test_to_json_matches_to_dict(self):
+        payloads = [*ADVICE_TEMPLATES.values(), get_direction_hint("up"), get_advice("subject_off_center", direction="上")]
+        for payload in payloads:
+            assert payload.timestamp == UNSTAMPED
+            for stamp in (1_700_000_000_123, 0):
+                expected = json.dumps(payload.to_dict(stamp), separators=(",", ":"), ensure_ascii=False)
+                assert payload.to_json(stamp) == expected
+
@@ -0,0 +1,159 @@
+"""
+Tests for batched per-cycle outbound messages.
+"""
+import asyncio
+import json
+
+import pytest
+
+from src.realtime import envelope
+from src.realtime.envelope import CycleEnvelope, negotiate_encoding
+from src.realtime.send_queue import SendPriority
+from src.realtime.session_registry import InMemoryFanoutBus, InMemorySessionRegistry
+from src.realtime.templates import STABILITY_CRITICAL, get_direction_hint
+from src.realtime.websocket_handler import ClientOptions, SessionManager
+
+
+def make_cycle() -> CycleEnvelope:
+    return CycleEnvelope(
+        ack={"type": "frame_ack", "frame_count": 8},
+        advice=[{"type": "advice", "message": "慢一点"}],
+        telemetry={"type": "telemetry", "avg_speed_px_frame": 3.0},
+    )
+
+
+@pytest.fixture
+def manager():
+    return SessionManager(registry=InMemorySessionRegistry(), bus=InMemoryFanoutBus())
+
+
+class TestCycleEnvelope:
+    """Envelope encoding."""
+
+    def test_encoded_once_per_variant(self):
+        cycle = make_cycle()
+        first = cycle.encoded()
+        assert cycle.encoded() is first
+        assert cycle.encode_count == 1
+
+        message = json.loads(first)
+        assert message["type"] == "cycle"
+        assert message["ack"]["frame_count"] == 8
+        assert message["advice"][0]["message"] == "慢一点"
+        assert message["telemetry"]["avg_speed_px_frame"] == 3.0
+
+        assert json.loads(cycle.encoded(with_telemetry=False))["telemetry"] is None
+        assert cycle.encode_count == 2
+
+    def test_json_spliced_from_cached_advice(self):
+        advice = [STABILITY_CRITICAL, get_direction_hint("left")]
+        cycle = CycleEnvelope(
+            ack={"type": "frame_ack", "frame_count": 8},
+            advice=advice,
+            telemetry={"type": "telemetry", "avg_speed_px_frame": 3.0},
+            timestamp=1234,
+        )
+        for with_telemetry in (True, False):
+            expected = json.dumps(cycle.to_dict(with_telemetry), separators=(",", ":"), ensure_ascii=False)
+            assert cycle.encoded(with_telemetry=with_telemetry) == expected
+        # Payloads are stamped with the cycle time, also after crossing the bus
+        assert all(item["timestamp"] == 1234 for item in cycle.to_parts()["advice"])
+        assert CycleEnvelope.from_dict(cycle.to_parts()).encoded() == cycle.encoded()
+        assert cycle.priority == (SendPriority.CRITICAL, None)
+
+    def test_msgpack_falls_back_to_json_when_unavailable(self, monkeypatch):
+        monkeypatch.setattr(envelope, "msgpack", None)
+        assert negotiate_encoding("msgpack") == "json"
+        assert negotiate_encoding(None) == "json"
+
+    def test_client_options_from_query(self):
+        options = ClientOptions.from_query({"envelope": "1", "encoding": "JSON"})
+        assert options.envelope and options.encoding == "json"
+        assert not ClientOptions.from_query({}).envelope
+
+
+class TestSendCycle:
+    """Delivery of one analysis cycle to mixed clients."""
+
+    async def test_envelope_clients_share_one_encoding(self, make_client, manager):
+        manager.create_session("S1")
+        clients = [make_client() for _ in range(3)]
+        for client in clients:
+            manager.add_client("S1", client, ClientOptions(envelope=True))
+
+        sent = await manager.send_cycle_local("S1", make_cycle())
+        await manager.drain("S1")
+
+        assert sent == 3
+        payloads = [client.send_text.call_args.args[0] for client in clients]
+        assert all(payload is payloads[0] for payload in payloads)
+        for client in clients:
+            client.send_json.assert_not_awaited()
+        assert manager.outbound_metrics["envelope_encodes"] == 1
+        assert manager.outbound_metrics["envelopes_sent"] == 3
+
+    async def test_legacy_clients_get_separate_messages(self, make_client, manager):
+        manager.create_session("S1")
+        legacy = make_client()
+        manager.add_client("S1", legacy)
+
+        await manager.send_cycle_local("S1", make_cycle())
+        await manager.drain("S1")
+
+        # Pre-encoded text frames, one message per item
+        types = [json.loads(call.args[0])["type"] for call in legacy.send_text.call_args_list]
+        assert types == ["advice", "telemetry"]
+        legacy.send_json.assert_not_awaited()
+
+    async def test_slow_client_drops_telemetry_first(self, make_client, manager):
+        manager.create_session("S1")
+        release = asyncio.Event()
+        slow, fast = make_client(release), make_client()
+        manager.add_client("S1", slow, ClientOptions(envelope=True))
+        manager.add_client("S1", fast, ClientOptions(envelope=True))
+
+        # The slow client's writer is stuck on the first cycle, the second
+        # waits in its queue, so the third is sent without telemetry
+        for _ in range(3):
+            await manager.send_cycle_local("S1", make_cycle())
+            await asyncio.sleep(0)
+        release.set()
+        await manager.drain("S1")
+
+        slow_message = json.loads(slow.send_text.call_args.args[0])
+        fast_message = json.loads(fast.send_text.call_args.args[0])
+        assert slow_message["telemetry"] is None
+        assert slow_message["advice"]
+        assert fast_message["telemetry"] is not None
+        assert manager.outbound_metrics["telemetry_dropped"] == 1
+
+    async def test_cycle_not_serialized_without_peers(self, make_client, manager, monkeypatch):
+        await manager.start()
+        manager.create_session("S1")
+        viewer = make_client()
+        manager.add_client("S1", viewer, ClientOptions(envelope=True))
+
+        def to_parts(cycle):
+            raise AssertionError("cycle serialized for the bus")
+
+        monkeypatch.setattr(CycleEnvelope, "to_parts", to_parts)
+        assert await manager.broadcast_cycle("S1", make_cycle()) == 1
+        await manager.drain("S1")
+        assert manager.bus.metrics()["published"] == 0
+
+    async def test_cycle_reaches_other_worker(self, make_client):
+        registry, bus = InMemorySessionRegistry(), InMemoryFanoutBus()
+        worker_a = SessionManager(registry=registry, bus=bus, worker_id="worker-a")
+        worker_b = SessionManager(registry=registry, bus=bus, worker_id="worker-b")
+        for worker in (worker_a, worker_b):
+            await worker.start()
+            await worker.register_session("S1")
+        viewer = make_client()
+        worker_b.add_client("S1", viewer, ClientOptions(envelope=True))
+
+        await worker_a.broadcast_cycle("S1", make_cycle())
+        await worker_b.drain("S1")
+
+        message = json.loads(viewer.send_text.call_args.args[0])
+        assert message["type"] == "cycle"
+        assert message["ack"]["frame_count"] == 8
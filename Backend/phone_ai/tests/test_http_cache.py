@@ -0,0 +1,82 @@
+"""
+Tests for ETag handling and the encoded response cache.
+"""
+import gzip
+import json
+
+from starlette.requests import Request
+
+from src.api.http_cache import (
+    ResponseCache,
+    encode_body,
+    encoded_response,
+    etag_matches,
+    make_etag,
+)
+
+
+def _request(**headers) -> Request:
+    raw = [(k.replace("_", "-").lower().encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+class TestETag:
+    """Tests for ETag generation and matching."""
+    
+    def test_etag_changes_with_version(self):
+        assert make_etag("analysis", 1, "completed") == make_etag("analysis", 1, "completed")
+        assert make_etag("analysis", 1, "completed") != make_etag("analysis", 1, "failed")
+        # gzip and identity bodies share the validator, so it is weak
+        assert make_etag("analysis").startswith('W/"')
+    
+    def test_if_none_match(self):
+        etag = make_etag("x")
+        
+        assert etag_matches(_request(if_none_match=etag), etag)
+        assert etag_matches(_request(if_none_match=f'"other", {etag.removeprefix("W/")}'), etag)
+        assert not etag_matches(_request(if_none_match='"other"'), etag)
+        assert not etag_matches(_request(), etag)
+
+
+class TestResponseCache:
+    """Tests for the encoded body LRU."""
+    
+    def test_large_bodies_are_pre_gzipped(self):
+        body = encode_body({"data": "x" * 4096})
+        
+        response = encoded_response(_request(accept_encoding="gzip, br"), body, '"e"')
+        
+        assert response.headers["content-encoding"] == "gzip"
+        assert json.loads(gzip.decompress(response.body)) == {"data": "x" * 4096}
+        plain = encoded_response(_request(), body, '"e"')
+        assert "content-encoding" not in plain.headers
+    
+    def test_repeat_fetch_skips_build(self):
+        cache = ResponseCache()
+        calls = []
+        
+        def build():
+            calls.append(1)
+            return {"status": "completed"}
+        
+        first = cache.get_or_encode('"v1"', build)
+        second = cache.get_or_encode('"v1"', build)
+        
+        assert first is second
+        assert len(calls) == 1
+        assert cache.metrics()["hits"] == 1
+    
+    def test_uncacheable_bodies_are_not_stored(self):
+        cache = ResponseCache()
+        cache.get_or_encode('"v1"', lambda: {"status": "processing"}, cacheable=False)
+        
+        assert cache.get('"v1"') is None
+    
+    def test_evicts_by_entries_and_bytes(self):
+        cache = ResponseCache(max_entries=2, max_bytes=10_000)
+        for i in range(3):
+            cache.put(f'"{i}"', encode_body({"i": i}))
+        assert cache.get('"0"') is None
+        
+        cache.put('"big"', encode_body({"data": "y" * 9000}))
+        assert cache.metrics()["bytes"] <= 10_000
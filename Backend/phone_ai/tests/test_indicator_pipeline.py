@@ -0,0 +1,81 @@
+"""
+Tests for the shared per-session indicator pipeline.
+"""
+import dataclasses
+from unittest.mock import patch
+
+import pytest
+
+from src.models.enums import MotionType
+from src.realtime.advice_engine import AdviceEngine
+from src.realtime.indicator_pipeline import IndicatorPipeline
+from src.realtime.llm_advisor import build_analysis_prompt
+from src.realtime.smoothing import SmoothingFilter
+from src.realtime.templates import LOW_CONFIDENCE_STATUS
+from src.realtime.types import RealtimeAnalysisResult
+from src.realtime.websocket_handler import RealtimeWebSocketHandler
+
+
+def make_result(speed: float = 10.0, smoothness: float = 0.8, confidence: float = 0.9) -> RealtimeAnalysisResult:
+    return RealtimeAnalysisResult(
+        avg_speed_px_frame=speed,
+        speed_variance=1.0,
+        motion_smoothness=smoothness,
+        primary_direction_deg=0.0,
+        subject_occupancy=0.2,
+        confidence=confidence,
+    )
+
+
+class TestIndicatorPipeline:
+    """Smoothing and motion inference run once per cycle."""
+
+    def test_frame_is_frozen(self):
+        frame = IndicatorPipeline().process(make_result(), current_time=1.0)
+        assert frame.smoothed
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            frame.avg_speed_px_frame = 0.0
+
+    def test_horizontal_motion_becomes_pan(self):
+        pipeline = IndicatorPipeline()
+        for t in range(3):
+            frame = pipeline.process(make_result(), current_time=float(t + 1))
+        assert frame.motion_type == MotionType.PAN
+        assert pipeline.latest is frame
+
+    def test_low_confidence_skips_filter_and_state_machine(self):
+        pipeline = IndicatorPipeline(min_confidence=0.5)
+        frame = pipeline.process(make_result(speed=40.0, confidence=0.2), current_time=1.0)
+        assert frame.low_confidence
+        assert frame.avg_speed_px_frame == 40.0
+        assert not pipeline.smoothing_filter.is_initialized()
+        assert pipeline.state_machine.get_state_history() == []
+
+
+class TestSharedFrame:
+    """Consumers reuse the pipeline output instead of re-smoothing."""
+
+    def test_advice_engine_does_not_update_filter_twice(self):
+        engine = AdviceEngine()
+        result = make_result()
+        with patch.object(SmoothingFilter, "update", autospec=True, side_effect=SmoothingFilter.update) as update:
+            indicators = engine.pipeline.process(result, current_time=1.0)
+            engine.generate_advice(result, current_time=1.0, indicators=indicators)
+        assert update.call_count == 1
+        assert len(engine.state_machine.get_state_history()) == 1
+
+    def test_advice_engine_low_confidence(self):
+        engine = AdviceEngine()
+        assert engine.generate_advice(make_result(confidence=0.1), current_time=1.0) == [LOW_CONFIDENCE_STATUS]
+
+    def test_telemetry_and_prompt_carry_motion_type(self):
+        pipeline = IndicatorPipeline()
+        result = make_result()
+        for t in range(3):
+            frame = pipeline.process(result, current_time=float(t + 1))
+
+        telemetry = RealtimeWebSocketHandler._build_telemetry_payload(result, frame)
+        assert telemetry["motion_type"] == "pan"
+        assert telemetry["avg_speed_px_frame"] == result.avg_speed_px_frame
+        assert "运镜类型: pan" in build_analysis_prompt(frame)
+        assert "运镜类型" not in build_analysis_prompt(result)
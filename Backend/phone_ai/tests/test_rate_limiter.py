@@ -0,0 +1,78 @@
+"""
+Tests for the GCRA rate limiter.
+
+Requirements covered:
+- 10.4: Implement rate limiting (100 req/min/user)
+"""
+from src.api.auth import RateLimiter, RedisRateLimiter
+
+
+class TestRateLimiter:
+    """Tests for the in-memory GCRA limiter."""
+    
+    def test_allows_burst_then_rejects(self, clock):
+        limiter = RateLimiter(requests_per_minute=60, clock=clock)
+        
+        results = [limiter.check("user:1") for _ in range(61)]
+        
+        assert all(r.allowed for r in results[:60])
+        assert results[0].remaining == 59
+        assert results[59].remaining == 0
+        assert not results[60].allowed
+        assert results[60].retry_after == 1
+        assert limiter.get_retry_after("user:1") == 1
+    
+    def test_refills_at_sustained_rate(self, clock):
+        limiter = RateLimiter(requests_per_minute=60, clock=clock)
+        for _ in range(60):
+            limiter.check("user:1")
+        
+        clock.now += 1.0
+        assert limiter.check("user:1").allowed
+        assert not limiter.check("user:1").allowed
+    
+    def test_keys_are_independent(self, clock):
+        limiter = RateLimiter(requests_per_minute=1, clock=clock)
+        
+        assert limiter.is_allowed("ip:a") == (True, 0)
+        assert limiter.is_allowed("ip:a") == (False, 0)
+        assert limiter.is_allowed("ip:b") == (True, 0)
+    
+    def test_idle_keys_are_evicted(self, clock):
+        """State is dropped once a key's bucket has refilled."""
+        limiter = RateLimiter(requests_per_minute=60, clock=clock)
+        for i in range(1000):
+            limiter.check(f"ip:{i}")
+        assert len(limiter) == 1000
+        
+        clock.now += 2.0
+        limiter.check("ip:new")
+        
+        assert len(limiter) == 1
+        assert limiter.get_retry_after("ip:0") == 0
+    
+    def test_idle_keys_behind_a_limited_key_are_evicted(self, clock):
+        """A heavy key used long ago does not pin keys that refilled after it."""
+        limiter = RateLimiter(requests_per_minute=60, clock=clock)
+        for _ in range(60):
+            limiter.check("ip:heavy")
+        for i in range(100):
+            limiter.check(f"ip:{i}")
+        
+        clock.now += 2.0
+        limiter.check("ip:new")
+        
+        assert len(limiter) == 2
+        # The heavy key keeps its state: only two seconds have refilled
+        assert limiter.check("ip:heavy").remaining == 1
+
+
+class TestRedisRateLimiter:
+    """Tests for the Redis-backed limiter."""
+    
+    async def test_falls_back_to_local_limits_when_redis_unavailable(self):
+        limiter = RedisRateLimiter(url="redis://127.0.0.1:1/0", requests_per_minute=2)
+        
+        results = [await limiter.acquire("user:1") for _ in range(3)]
+        
+        assert [r.allowed for r in results] == [True, True, False]
@@ -0,0 +1,130 @@
+"""
+Tests for per-client bounded send queues.
+"""
+import asyncio
+
+from src.realtime.send_queue import (
+    CLOSE_CODE_SLOW_CONSUMER,
+    ClientSendQueue,
+    SendPriority,
+    SendQueueConfig,
+    classify_message,
+)
+from src.realtime.session_registry import InMemoryFanoutBus, InMemorySessionRegistry
+from src.realtime.websocket_handler import SessionManager
+
+
+def sent(ws) -> list[dict]:
+    return [call.args[0] for call in ws.send_json.call_args_list]
+
+
+def test_classify_message():
+    assert classify_message({"type": "advice", "priority": "critical"}) == (SendPriority.CRITICAL, None)
+    assert classify_message({"type": "advice", "priority": "warning"}) == (SendPriority.NORMAL, None)
+    assert classify_message({"type": "advice", "priority": "info", "category": "speed"}) == (
+        SendPriority.LATEST, "advice:speed"
+    )
+    assert classify_message({"type": "telemetry"}) == (SendPriority.LATEST, "telemetry")
+    assert classify_message({"type": "frame_ack"}) == (SendPriority.NORMAL, None)
+
+
+class TestClientSendQueue:
+    """Priorities, bounds and the slow-consumer policy."""
+
+    async def test_priority_order_and_latest_wins(self, make_client):
+        ws = make_client()
+        queue = ClientSendQueue(ws)
+        queue.put({"type": "telemetry", "n": 1}, SendPriority.LATEST, "telemetry")
+        queue.put({"type": "frame_ack"})
+        queue.put({"type": "telemetry", "n": 2}, SendPriority.LATEST, "telemetry")
+        queue.put({"type": "advice", "priority": "critical"}, SendPriority.CRITICAL)
+        await queue.drain()
+
+        assert [m["type"] for m in sent(ws)] == ["advice", "frame_ack", "telemetry"]
+        assert sent(ws)[-1]["n"] == 2
+        assert queue.coalesced == 1
+
+    async def test_normal_backlog_drops_oldest_but_keeps_critical(self, make_client):
+        release = asyncio.Event()
+        ws = make_client(release)
+        queue = ClientSendQueue(ws, SendQueueConfig(max_pending=2, slow_consumer_policy="drop"))
+        queue.put({"type": "frame_ack", "n": 0})
+        await asyncio.sleep(0)  # writer picks up n=0 and stalls
+
+        for n in range(1, 5):
+            queue.put({"type": "frame_ack", "n": n})
+        queue.put({"type": "advice", "priority": "critical"}, SendPriority.CRITICAL)
+        release.set()
+        await queue.drain()
+
+        assert [m.get("n") for m in sent(ws)] == [0, None, 3, 4]
+        assert queue.dropped == 2
+        assert queue.max_depth == 3
+        ws.close.assert_not_awaited()
+
+    async def test_sustained_overflow_disconnects(self, make_client):
+        ws = make_client(asyncio.Event())
+        queue = ClientSendQueue(ws, SendQueueConfig(max_pending=1, slow_consumer_timeout_s=0.0))
+        queue.put({"type": "frame_ack"})
+        await asyncio.sleep(0)
+
+        queue.put({"type": "frame_ack"})
+        queue.put({"type": "frame_ack"})
+        await asyncio.sleep(0.01)
+        assert queue.put({"type": "frame_ack"}) is False
+        await asyncio.sleep(0)
+
+        assert queue.disconnected_slow
+        ws.close.assert_awaited_once_with(code=CLOSE_CODE_SLOW_CONSUMER)
+
+    async def test_critical_backlog_limit_disconnects(self, make_client):
+        ws = make_client(asyncio.Event())
+        queue = ClientSendQueue(ws, SendQueueConfig(max_pending=2, slow_consumer_policy="drop"))
+        results = [queue.put({"type": "error"}, SendPriority.CRITICAL) for _ in range(4)]
+        await asyncio.sleep(0)
+
+        assert results[-1] is False
+        assert queue.disconnected_slow
+        ws.close.assert_awaited_once()
+
+
+class TestSessionManagerQueues:
+    """Broadcasts only enqueue."""
+
+    async def test_slow_viewer_does_not_block_broadcast(self, make_client):
+        manager = SessionManager(registry=InMemorySessionRegistry(), bus=InMemoryFanoutBus())
+        manager.create_session("S1")
+        release = asyncio.Event()
+        slow, fast = make_client(release), make_client()
+        manager.add_client("S1", slow)
+        manager.add_client("S1", fast)
+
+        for n in range(5):
+            await asyncio.wait_for(
+                manager.broadcast("S1", {"type": "telemetry", "n": n}), timeout=0.5
+            )
+            await asyncio.sleep(0)
+
+        assert [m["n"] for m in sent(fast)] == [0, 1, 2, 3, 4]
+
+        release.set()
+        await manager.drain("S1")
+        # Slow viewer: the stalled first message, then only the latest telemetry
+        assert [m["n"] for m in sent(slow)] == [0, 4]
+        metrics = manager.queue_metrics()
+        assert metrics["clients"] == 2
+        assert metrics["coalesced"] == 3
+
+    async def test_remove_client_stops_writer(self, make_client):
+        manager = SessionManager(registry=InMemorySessionRegistry(), bus=InMemoryFanoutBus())
+        manager.create_session("S1")
+        ws = make_client(asyncio.Event())
+        manager.add_client("S1", ws)
+        await manager.send_to_client(ws, {"type": "frame_ack"})
+        queue = manager.get_send_queue(ws)
+
+        manager.remove_client("S1", ws)
+        await asyncio.sleep(0)
+
+        assert queue.closed
+        assert manager.get_send_queue(ws) is None
@@ -0,0 +1,200 @@
+"""
+Tests for the shared session registry and cross-worker fan-out bus.
+
+Two SessionManagers sharing one in-memory registry and bus stand in for
+two API workers.
+"""
+import base64
+import json
+import cv2
+import numpy as np
+import pytest
+
+from src.realtime.session_registry import (
+    InMemoryFanoutBus,
+    InMemorySessionRegistry,
+)
+from src.realtime.websocket_handler import RealtimeWebSocketHandler, SessionManager
+
+
+def sent_types(ws) -> list[str]:
+    """Types of the JSON messages sent to a client, in order."""
+    messages = [
+        call.args[0] if isinstance(call.args[0], dict) else json.loads(call.args[0])
+        for call in ws.mock_calls
+        if call[0] in ("send_json", "send_text")
+    ]
+    return [message["type"] for message in messages]
+
+
+@pytest.fixture
+def workers(clock):
+    """Two workers sharing a registry and a bus."""
+    registry = InMemorySessionRegistry(lease_s=15.0, clock=clock)
+    bus = InMemoryFanoutBus()
+    return (
+        SessionManager(registry=registry, bus=bus, worker_id="worker-a"),
+        SessionManager(registry=registry, bus=bus, worker_id="worker-b"),
+    )
+
+
+@pytest.fixture
+def frame_payload():
+    frames = []
+    for i in range(8):
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        frame[50:150, 50 + i * 10:150 + i * 10] = 200
+        _, jpeg = cv2.imencode(".jpg", frame)
+        frames.append(base64.b64encode(jpeg).decode())
+    return {"type": "frames", "frames": frames, "fps": 30.0}
+
+
+class TestInMemorySessionRegistry:
+    """Registry records and owner leases."""
+
+    async def test_claim_and_renew(self, clock):
+        registry = InMemorySessionRegistry(lease_s=10.0, clock=clock)
+        await registry.register("S1")
+
+        assert await registry.claim("S1", "a") == "a"
+        assert await registry.claim("S1", "b") == "a"
+        clock.now += 5
+        assert await registry.claim("S1", "a") == "a"
+        clock.now += 9
+        assert await registry.claim("S1", "b") == "a"
+
+    async def test_expired_lease_can_be_taken_over(self, clock):
+        registry = InMemorySessionRegistry(lease_s=10.0, clock=clock)
+        await registry.claim("S1", "a")
+        clock.now += 11
+        assert await registry.claim("S1", "b") == "b"
+
+    async def test_release(self, clock):
+        registry = InMemorySessionRegistry(clock=clock)
+        await registry.claim("S1", "a")
+        await registry.release("S1", "b")
+        assert await registry.claim("S1", "b") == "a"
+        await registry.release("S1", "a")
+        assert await registry.claim("S1", "b") == "b"
+
+    async def test_clients_summed_across_workers(self, clock):
+        registry = InMemorySessionRegistry(clock=clock)
+        await registry.set_clients("S1", "a", 2)
+        await registry.set_clients("S1", "b", 1)
+        assert (await registry.get("S1")).total_clients == 3
+        await registry.set_clients("S1", "a", 0)
+        assert (await registry.get("S1")).clients == {"b": 1}
+
+    async def test_records_expire(self, clock):
+        registry = InMemorySessionRegistry(record_ttl_s=60.0, clock=clock)
+        await registry.register("S1")
+        clock.now += 61
+        assert await registry.get("S1") is None
+        assert await registry.list_sessions() == []
+
+
+class TestCrossWorkerFanout:
+    """Broadcasts and frame forwarding between workers."""
+
+    async def test_broadcast_reaches_other_worker(self, make_client, workers):
+        worker_a, worker_b = workers
+        for worker in workers:
+            await worker.start()
+            await worker.register_session("S1")
+        viewer_a, viewer_b = make_client(), make_client()
+        worker_a.add_client("S1", viewer_a)
+        worker_b.add_client("S1", viewer_b)
+
+        sent = await worker_a.broadcast("S1", {"type": "advice", "message": "hi"})
+        await worker_a.drain("S1")
+        await worker_b.drain("S1")
+
+        assert sent == 1
+        viewer_a.send_json.assert_awaited_once()
+        viewer_b.send_json.assert_awaited_once_with({"type": "advice", "message": "hi"})
+
+    async def test_frames_forwarded_to_owner(self, make_client, workers, frame_payload):
+        worker_a, worker_b = workers
+        for worker in workers:
+            await worker.start()
+            await worker.register_session("S1")
+        camera, viewer = make_client(), make_client()
+        worker_a.add_client("S1", camera)
+        worker_b.add_client("S1", viewer)
+
+        # Camera's first buffer makes worker A the owner
+        await RealtimeWebSocketHandler(worker_a)._handle_frame_buffer(camera, "S1", frame_payload)
+        await worker_b.drain("S1")
+        assert (await worker_a.find_session("S1")).owner == "worker-a"
+
+        # A buffer arriving at worker B is analyzed on worker A
+        sender = make_client()
+        await RealtimeWebSocketHandler(worker_b)._handle_frame_buffer(sender, "S1", frame_payload)
+
+        ack = sender.send_json.call_args_list[0].args[0]
+        assert ack["status"] == "forwarded"
+        assert ack["owner"] == "worker-a"
+        assert worker_a.get_session("S1").total_analyses == 2
+        assert worker_b.get_session("S1").total_analyses == 0
+        await worker_b.drain("S1")
+        assert sent_types(viewer).count("telemetry") == 2
+
+    async def test_owner_without_clients_hands_over_to_camera(self, make_client, workers, frame_payload):
+        worker_a, worker_b = workers
+        for worker in workers:
+            await worker.start()
+        await worker_a.register_session("S1")
+        camera = make_client()
+        worker_a.add_client("S1", camera)
+        await worker_a.sync_clients("S1")
+
+        # Worker B holds the lease but has no clients (e.g. the camera moved)
+        assert await worker_b.ensure_owner("S1") == "worker-b"
+
+        # The forwarded buffer is not analyzed there and does not renew the lease
+        handler = RealtimeWebSocketHandler(worker_a)
+        await handler._handle_frame_buffer(camera, "S1", frame_payload)
+        assert worker_b.get_session("S1") is None
+        assert (await worker_a.find_session("S1")).owner is None
+
+        # The camera's next buffer moves analysis to its worker
+        await handler._handle_frame_buffer(camera, "S1", frame_payload)
+        assert (await worker_a.find_session("S1")).owner == "worker-a"
+        assert worker_a.get_session("S1").total_analyses == 1
+
+    async def test_owner_failover(self, workers, clock, frame_payload):
+        worker_a, worker_b = workers
+        for worker in workers:
+            await worker.start()
+            await worker.register_session("S1")
+        await worker_a.ensure_owner("S1")
+
+        # Worker A stops renewing; after the lease B takes over
+        clock.now += 16
+        assert await worker_b.ensure_owner("S1") == "worker-b"
+
+    async def test_close_session_everywhere(self, workers):
+        worker_a, worker_b = workers
+        for worker in workers:
+            await worker.start()
+            await worker.register_session("S1")
+
+        await worker_a.close_session("S1")
+
+        assert worker_b.get_session("S1") is None
+        assert await worker_b.find_session("S1") is None
+
+    async def test_release_keeps_record_while_viewers_remain(self, make_client, workers):
+        worker_a, worker_b = workers
+        for worker in workers:
+            await worker.register_session("S1")
+        worker_b.add_client("S1", make_client())
+        await worker_b.sync_clients("S1")
+        await worker_a.ensure_owner("S1")
+
+        await worker_a.release_session("S1")
+
+        record = await worker_b.find_session("S1")
+        assert record is not None
+        assert record.owner is None
+        assert await worker_b.ensure_owner("S1") == "worker-b"
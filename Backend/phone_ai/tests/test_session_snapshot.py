@@ -0,0 +1,268 @@
+"""
+Tests for session state snapshots (fast reconnection and worker migration).
+"""
+import base64
+import os
+import random
+
+import cv2
+import numpy as np
+import pytest
+
+from src.models.data_types import BBox
+from src.models.enums import MotionType
+from src.realtime.advice_engine import AdviceEngine
+from src.realtime.analyzer import RealtimeAnalyzer
+from src.realtime.session_registry import InMemoryFanoutBus, InMemorySessionRegistry
+from src.realtime.smoothing import IndicatorValues, SmoothingFilter
+from src.realtime.snapshot import (
+    SNAPSHOT_VERSION,
+    SnapshotError,
+    SnapshotStore,
+    StateReader,
+    StateWriter,
+    restore_session,
+    snapshot_session,
+)
+from src.realtime.types import SessionState
+from src.realtime.websocket_handler import (
+    RealtimeWebSocketHandler,
+    ReconnectionManager,
+    SessionManager,
+)
+
+
+def random_indicators(rng: random.Random) -> IndicatorValues:
+    return IndicatorValues(
+        motion_smoothness=rng.uniform(0.2, 0.9),
+        avg_speed=rng.uniform(2.0, 25.0),
+        speed_variance=rng.uniform(0.0, 5.0),
+        primary_direction_deg=rng.uniform(0.0, 360.0),
+        subject_occupancy=rng.uniform(0.0, 0.6),
+        confidence=rng.uniform(0.5, 1.0),
+    )
+
+
+def warm_session():
+    """Session components with non-trivial state."""
+    rng = random.Random(3)
+    state = SessionState(session_id="S1")
+    state.motion_state = MotionType.PAN
+    state.update_latency(42.0)
+    state.update_latency(55.0)
+
+    analyzer = RealtimeAnalyzer()
+    frames = [np.full((240, 320, 3), i * 20, dtype=np.uint8) for i in range(6)]
+    analyzer.add_frames_to_buffer(frames, fps=30.0, start_timestamp=100.0)
+    analyzer._last_subject_bbox = BBox(x=0.1, y=0.2, w=0.3, h=0.4)
+    analyzer._latency_history.extend([12.0, 15.5])
+
+    engine = AdviceEngine()
+    for _ in range(5):
+        engine.pipeline.smoothing_filter.update(random_indicators(rng))
+    engine.state_machine.force_state(MotionType.TRACK, 0.8)
+    engine.state_machine._state_history.extend([MotionType.PAN, MotionType.TRACK])
+    engine.state_machine._pending_state = MotionType.DOLLY_IN
+    engine.state_machine._pending_count = 1
+    engine._hysteresis.check_threshold("stability", 0.3, 0.4, 0.5)
+    engine._hysteresis.is_consistent("stability", True)
+    engine._hysteresis.record_advice("stability", 1234.5)
+    engine._subject_lost_since = 99.0
+    return state, analyzer, engine
+
+
+class TestStateCodec:
+    """Binary writer/reader."""
+
+    def test_round_trip(self):
+        w = StateWriter()
+        w.u8(7)
+        w.u32(123456)
+        w.f64(1.5)
+        w.opt_f64(None)
+        w.str("运动")
+        w.opt_str("pan")
+        w.f64s([1.0, 2.0])
+        w.bytes(b"\x00\x01")
+        w.str_map({"a": 1.0}, w.f64)
+
+        r = StateReader(w.getvalue())
+        assert r.u8() == 7
+        assert r.u32() == 123456
+        assert r.f64() == 1.5
+        assert r.opt_f64() is None
+        assert r.str() == "运动"
+        assert r.opt_str() == "pan"
+        assert r.f64s() == [1.0, 2.0]
+        assert r.bytes() == b"\x00\x01"
+        assert r.str_map(r.f64) == {"a": 1.0}
+        assert r.at_end()
+
+    def test_truncated(self):
+        with pytest.raises(SnapshotError):
+            StateReader(b"\x01").u32()
+
+
+class TestSessionSnapshot:
+    """Snapshot and restore of session components."""
+
+    def test_round_trip_restores_state(self):
+        state, analyzer, engine = warm_session()
+        data = snapshot_session(state, analyzer, engine)
+
+        state2 = SessionState(session_id="S1")
+        analyzer2, engine2 = RealtimeAnalyzer(), AdviceEngine()
+        restore_session(data, state2, analyzer2, engine2)
+
+        assert state2.motion_state == MotionType.PAN
+        assert state2.total_analyses == 2
+        assert state2.avg_latency_ms == state.avg_latency_ms
+
+        assert analyzer2._frame_buffer.size() == 6
+        assert analyzer2._frame_buffer.get_timestamps() == analyzer._frame_buffer.get_timestamps()
+        assert analyzer2._last_subject_bbox == analyzer._last_subject_bbox
+        assert list(analyzer2._latency_history) == [12.0, 15.5]
+
+        machine, machine2 = engine.state_machine, engine2.state_machine
+        assert machine2.get_current_state() == MotionType.TRACK
+        assert machine2.get_state_confidence() == machine.get_state_confidence()
+        assert machine2.get_state_history() == machine.get_state_history()
+        assert machine2._pending_state == MotionType.DOLLY_IN
+        assert machine2._pending_count == 1
+
+        assert engine2._hysteresis.get_state("stability") == "warning"
+        assert engine2._hysteresis.is_on_cooldown("stability", 1236.0)
+        assert engine2._hysteresis._consistency_counters == {"stability": 1}
+        assert engine2._subject_lost_since == 99.0
+
+        filter_state, restored_state = StateWriter(), StateWriter()
+        engine.pipeline.smoothing_filter.write_state(filter_state)
+        engine2.pipeline.smoothing_filter.write_state(restored_state)
+        assert restored_state.getvalue() == filter_state.getvalue()
+
+    def test_restored_filter_continues_identically(self):
+        rng = random.Random(11)
+        original = SmoothingFilter()
+        for _ in range(6):
+            original.update(random_indicators(rng))
+
+        w = StateWriter()
+        original.write_state(w)
+        restored = SmoothingFilter()
+        restored.read_state(StateReader(w.getvalue()))
+
+        for _ in range(10):
+            sample = random_indicators(rng)
+            assert restored.update(sample) == original.update(sample)
+            assert restored.is_suppressed() == original.is_suppressed()
+
+    def test_rejects_unknown_version(self):
+        data = bytearray(snapshot_session(*warm_session()))
+        data[4] = SNAPSHOT_VERSION + 1
+        with pytest.raises(SnapshotError):
+            restore_session(bytes(data), SessionState(session_id="S1"), RealtimeAnalyzer(), AdviceEngine())
+
+    def test_rejects_corrupt_payload(self):
+        data = bytearray(snapshot_session(*warm_session()))
+        data[-1] ^= 0xFF
+        with pytest.raises(SnapshotError):
+            restore_session(bytes(data), SessionState(session_id="S1"), RealtimeAnalyzer(), AdviceEngine())
+
+
+class TestSnapshotStore:
+    """Memory and disk tiers."""
+
+    def test_ttl(self, clock):
+        store = SnapshotStore(ttl_s=30.0, clock=clock)
+        store.put("S1", b"data")
+        clock.now += 29
+        assert store.get("S1") == b"data"
+        clock.now += 2
+        assert store.get("S1") is None
+
+    def test_lru_bound(self):
+        store = SnapshotStore(max_entries=2)
+        for session_id in ("S1", "S2", "S3"):
+            store.put(session_id, b"x")
+        assert store.get("S1") is None
+        assert store.get("S3") == b"x"
+
+    def test_disk_tier_shared_between_stores(self, tmp_path):
+        writer = SnapshotStore(directory=str(tmp_path))
+        reader = SnapshotStore(directory=str(tmp_path))
+        state, analyzer, engine = warm_session()
+        writer.save("S1", state, analyzer, engine)
+
+        engine2 = AdviceEngine()
+        assert reader.restore("S1", SessionState(session_id="S1"), RealtimeAnalyzer(), engine2)
+        assert engine2.state_machine.get_current_state() == MotionType.TRACK
+        assert reader.metrics()["restore"]["count"] == 1
+
+        writer.delete("S1")
+        assert not os.listdir(tmp_path)
+
+    def test_corrupt_snapshot_is_discarded(self):
+        store = SnapshotStore()
+        store.put("S1", b"garbage")
+        assert not store.restore("S1", SessionState(session_id="S1"), RealtimeAnalyzer(), AdviceEngine())
+        assert store.get("S1") is None
+        assert store.metrics()["errors"] == 1
+
+
+class TestSessionManagerSnapshots:
+    """Snapshot wiring in the websocket SessionManager."""
+
+    @pytest.fixture
+    def frame_payload(self):
+        frames = []
+        for i in range(8):
+            frame = np.zeros((240, 320, 3), dtype=np.uint8)
+            frame[50:150, 50 + i * 10:150 + i * 10] = 200
+            _, jpeg = cv2.imencode(".jpg", frame)
+            frames.append(base64.b64encode(jpeg).decode())
+        return {"type": "frames", "frames": frames, "fps": 30.0}
+
+    async def test_reconnect_after_release_restores_state(self, frame_payload):
+        manager = SessionManager(registry=InMemorySessionRegistry(), bus=InMemoryFanoutBus())
+        handler = RealtimeWebSocketHandler(session_manager=manager)
+        await manager.register_session("S1")
+        await handler._handle_frame_buffer(None, "S1", frame_payload)
+        assert manager.snapshots.metrics()["snapshot"]["count"] == 1
+
+        engine = manager.get_advice_engine("S1")
+        engine.state_machine.force_state(MotionType.PAN, 0.9)
+        await manager.release_session("S1")
+        assert manager.get_session("S1") is None
+
+        await manager.register_session("S1")
+        assert manager.get_session("S1").total_analyses == 1
+        assert manager.get_advice_engine("S1").get_motion_type() == MotionType.PAN
+
+    async def test_new_owner_restores_previous_owner_state(self, frame_payload):
+        registry, bus = InMemorySessionRegistry(), InMemoryFanoutBus()
+        store = SnapshotStore()
+        worker_a = SessionManager(registry=registry, bus=bus, worker_id="worker-a", snapshots=store)
+        worker_b = SessionManager(registry=registry, bus=bus, worker_id="worker-b", snapshots=store)
+        for worker in (worker_a, worker_b):
+            await worker.register_session("S1")
+
+        await RealtimeWebSocketHandler(session_manager=worker_a)._handle_frame_buffer(
+            None, "S1", frame_payload
+        )
+        await worker_a.stop()
+
+        assert await worker_b.ensure_owner("S1") == "worker-b"
+        assert worker_b.get_session("S1").total_analyses == 1
+
+    async def test_close_session_drops_snapshot(self):
+        manager = SessionManager(registry=InMemorySessionRegistry(), bus=InMemoryFanoutBus())
+        await manager.register_session("S1")
+        assert manager.snapshot_session("S1")
+        await manager.close_session("S1")
+        assert manager.snapshots.get("S1") is None
+
+
+def test_reconnect_window_covers_backoff():
+    window = ReconnectionManager().get_reconnect_window()
+    # 1 + 2 + 4 + 8 + 16 seconds with up to 20% jitter
+    assert window == pytest.approx(31 * 1.2)
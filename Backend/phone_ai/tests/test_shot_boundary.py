@@ -0,0 +1,90 @@
+"""
+Tests for vectorized histogram shot-boundary detection.
+"""
+import cv2
+import numpy as np
+import pytest
+
+from src.services.shot_boundary import (
+    compute_histograms,
+    consecutive_distances,
+    find_cuts,
+    histogram_distances,
+)
+
+
+@pytest.fixture
+def two_shot_video(tmp_path):
+    """Synthetic 25fps video: two differently colored shots, 2 seconds each."""
+    path = tmp_path / "two_shots.mp4"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 25, (320, 180))
+    for color in [(200, 30, 30), (30, 30, 200)]:
+        for i in range(50):
+            frame = np.full((180, 320, 3), color, np.uint8)
+            cv2.circle(frame, (40 + i * 4, 90), 20, (255, 255, 255), -1)
+            writer.write(frame)
+    writer.release()
+    return str(path)
+
+
+class TestHistograms:
+    """Vectorized histograms and distances against OpenCV."""
+
+    def test_histograms_match_calc_hist(self):
+        rng = np.random.default_rng(0)
+        frames = rng.integers(0, 255, (4, 30, 40, 3), dtype=np.uint8)
+        hsv = np.stack([cv2.cvtColor(f, cv2.COLOR_BGR2HSV) for f in frames])
+
+        expected = np.stack([
+            cv2.calcHist([h], [0, 1], None, [50, 60], [0, 180, 0, 256]).flatten()
+            for h in hsv
+        ])
+        np.testing.assert_allclose(compute_histograms(hsv), expected)
+
+    def test_chisqr_matches_compare_hist(self):
+        rng = np.random.default_rng(1)
+        hists = rng.random((5, 3000)).astype(np.float32)
+        distances = consecutive_distances(hists, "chisqr")
+
+        normalized = [cv2.normalize(h, None).flatten() for h in hists]
+        expected = [
+            cv2.compareHist(normalized[i], normalized[i + 1], cv2.HISTCMP_CHISQR)
+            for i in range(4)
+        ]
+        np.testing.assert_allclose(distances, expected, rtol=1e-4)
+
+    def test_previous_histogram_prepended(self):
+        hists = np.eye(3, 3000, dtype=np.float32)
+        assert len(consecutive_distances(hists[1:], "correl", previous=hists[0])) == 2
+        assert len(consecutive_distances(hists[:1], "correl")) == 0
+
+    def test_unknown_metric(self):
+        with pytest.raises(ValueError):
+            consecutive_distances(np.ones((2, 3000)), "emd")
+
+
+class TestDetection:
+    """End-to-end detection on a synthetic video."""
+
+    def test_streaming_matches_full(self, two_shot_video):
+        idx_full, dist_full, fps, total = histogram_distances(two_shot_video, streaming=False)
+        idx_stream, dist_stream, _, _ = histogram_distances(two_shot_video, batch_size=7)
+
+        np.testing.assert_array_equal(idx_full, idx_stream)
+        np.testing.assert_allclose(dist_full, dist_stream)
+        assert fps == 25
+        assert total == 100
+        assert len(idx_full) == 99
+
+    def test_find_cuts(self, two_shot_video):
+        indices, distances, fps, _ = histogram_distances(two_shot_video)
+        assert find_cuts(indices, distances, 0.5, min_gap_frames=fps * 0.5) == [0, 50]
+
+    def test_min_gap(self):
+        indices = np.arange(1, 10)
+        distances = np.array([0, 50, 50, 0, 0, 0, 50, 0, 0], dtype=float)
+        assert find_cuts(indices, distances, 30.0, min_gap_frames=3) == [0, 7]
+
+    def test_unreadable_video(self, tmp_path):
+        with pytest.raises(ValueError):
+            histogram_distances(str(tmp_path / "missing.mp4"))
@@ -3,11 +3,15 @@ Tests for the Smoothing Filter Module.
 
 Property-based tests using Hypothesis to verify smoothing behavior.
 """
+import random
+
+import numpy as np
 import pytest
 from hypothesis import given, strategies as st, settings, assume
 
 from src.realtime.smoothing import (
     SmoothingFilter,
+    SmoothingFilterBank,
     SmoothingFilterConfig,
     IndicatorValues,
 )
@@ -223,9 +227,9 @@ class TestSmoothingFilterUnit:
         filter.reset()
         
         # Should be back to initial state
-        assert len(filter._history) == 0
-        assert not filter._initialized
-        assert filter._anomaly_countdown == 0
+        assert len(filter.get_history()) == 0
+        assert not filter.is_initialized()
+        assert not filter.is_suppressed()
     
     def test_direction_averaging_handles_wraparound(self):
         """Test that direction averaging handles 0/360 wraparound."""
@@ -241,3 +245,76 @@ class TestSmoothingFilterUnit:
         
         # Average should be around 0 degrees, not 120 degrees
         assert result.primary_direction_deg < 30 or result.primary_direction_deg > 330
+
+
+def random_rows(rng: random.Random, n: int) -> np.ndarray:
+    """Raw indicator rows, with some repeated stable values."""
+    rows = []
+    for _ in range(n):
+        if rng.random() < 0.3:
+            rows.append((0.5, 10.0, 1.0, 90.0, 0.3, 0.8))
+        else:
+            rows.append((
+                rng.random(), rng.uniform(0, 50), rng.uniform(0, 5),
+                rng.uniform(0, 360), rng.random(), rng.random(),
+            ))
+    return np.array(rows)
+
+
+class TestSmoothingFilterBank:
+    """O(1) window state and batch updates."""
+
+    @pytest.mark.parametrize("use_kalman", [True, False])
+    def test_batch_matches_individual_filters(self, use_kalman):
+        config = SmoothingFilterConfig(use_kalman=use_kalman)
+        bank = SmoothingFilterBank(config)
+        batched = [bank.create_filter() for _ in range(8)]
+        single = [SmoothingFilter(config) for _ in range(8)]
+        rng = random.Random(5)
+
+        for _ in range(40):
+            values = random_rows(rng, 8)
+            result = bank.update(batched, values)
+            expected = [f.update(IndicatorValues(*row)).to_tuple() for f, row in zip(single, values.tolist())]
+            np.testing.assert_allclose(result, expected, rtol=1e-9, atol=1e-9)
+            assert bank.is_suppressed(batched).tolist() == [f.is_suppressed() for f in single]
+
+    @pytest.mark.parametrize("use_kalman", [True, False])
+    def test_running_statistics_match_window(self, use_kalman):
+        smoothing_filter = SmoothingFilter(SmoothingFilterConfig(window_size=4, use_kalman=use_kalman))
+        rng = random.Random(9)
+        for row in random_rows(rng, 50).tolist():
+            result = smoothing_filter.update(IndicatorValues(*row))
+            history = np.array([h.to_tuple() for h in smoothing_filter.get_history()])
+            # Kalman keeps statistics for the anomaly columns only
+            width = len(smoothing_filter._mean)
+            assert width == (2 if use_kalman else 6)
+            mean = history.mean(axis=0)[:width]
+            np.testing.assert_allclose(smoothing_filter._mean, mean, atol=1e-9)
+            np.testing.assert_allclose(smoothing_filter._m2, ((history[:, :width] - mean) ** 2).sum(axis=0), atol=1e-6)
+            if not use_kalman:
+                np.testing.assert_allclose(result.avg_speed, history[:, 1].mean(), atol=1e-9)
+
+    def test_history_is_bounded_and_ordered(self):
+        smoothing_filter = SmoothingFilter(SmoothingFilterConfig(window_size=3))
+        for i in range(5):
+            smoothing_filter.update(IndicatorValues(0.5, float(i), 1.0, 90.0))
+        assert [h.avg_speed for h in smoothing_filter.get_history()] == [2.0, 3.0, 4.0]
+
+    def test_release_removes_filter(self):
+        bank = SmoothingFilterBank()
+        first = bank.create_filter()
+        first.update(IndicatorValues(0.5, 10.0, 1.0, 90.0))
+        bank.release(first)
+        assert len(bank) == 0
+        with pytest.raises(ValueError):
+            bank.update([first], np.zeros((1, 6)))
+
+    def test_rejects_duplicates_and_foreign_filters(self):
+        bank = SmoothingFilterBank()
+        smoothing_filter = bank.create_filter()
+        row = np.zeros((2, 6))
+        with pytest.raises(ValueError):
+            bank.update([smoothing_filter, smoothing_filter], row)
+        with pytest.raises(ValueError):
+            bank.update([SmoothingFilter()], row[:1])
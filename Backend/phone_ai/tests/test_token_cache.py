@@ -0,0 +1,78 @@
+"""
+Tests for JWT verification caching.
+
+Requirements covered:
+- 10.5: Implement JWT-based authentication
+"""
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from src.api.auth import (
+    TokenCache,
+    TokenData,
+    create_access_token,
+    revoke_token,
+    token_cache,
+    verify_token,
+)
+
+
+class TestTokenCache:
+    """Tests for the verified-claims LRU."""
+    
+    def test_entries_expire_before_token_exp(self):
+        now = [1000.0]
+        cache = TokenCache(max_size=4, expiry_margin=1.0, clock=lambda: now[0])
+        cache.put("token", TokenData(user_id="u1"), exp=1010.0)
+        
+        assert cache.get("token").user_id == "u1"
+        now[0] = 1009.5
+        assert cache.get("token") is None
+        assert cache.metrics()["hits"] == 1
+    
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TokenCache(max_size=2, clock=lambda: 0.0)
+        for name in ["a", "b"]:
+            cache.put(name, TokenData(user_id=name), exp=100.0)
+        cache.get("a")
+        cache.put("c", TokenData(user_id="c"), exp=100.0)
+        
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+
+
+class TestVerifyToken:
+    """Tests for verify_token with the global cache."""
+    
+    def test_repeat_verification_is_served_from_cache(self):
+        token = create_access_token({"sub": "user-cache", "username": "alice"})
+        before = token_cache.metrics()
+        
+        first = verify_token(token)
+        second = verify_token(token)
+        
+        after = token_cache.metrics()
+        assert first.user_id == second.user_id == "user-cache"
+        assert after["verifications"] - before["verifications"] == 1
+        assert after["hits"] - before["hits"] == 1
+    
+    def test_revoked_token_is_rejected(self):
+        token = create_access_token({"sub": "user-revoke", "username": "bob"})
+        verify_token(token)
+        
+        revoke_token(token)
+        
+        with pytest.raises(HTTPException) as exc_info:
+            verify_token(token)
+        assert exc_info.value.status_code == 401
+    
+    def test_expired_token_is_not_cached(self):
+        token = create_access_token({"sub": "user-old"}, expires_delta=timedelta(seconds=-5))
+        
+        with pytest.raises(HTTPException):
+            verify_token(token)
+        with pytest.raises(HTTPException):
+            verify_token(token)
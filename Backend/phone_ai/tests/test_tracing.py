@@ -0,0 +1,141 @@
+"""
+Tests for per-stage latency tracing of the realtime hot path.
+"""
+import asyncio
+import base64
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from src.realtime.analyzer import RealtimeAnalyzer
+from src.realtime.session_registry import InMemoryFanoutBus, InMemorySessionRegistry
+from src.realtime.tracing import TOTAL, CycleTrace, LatencyTracer, StageHistogram
+from src.realtime.websocket_handler import ClientOptions, RealtimeWebSocketHandler, SessionManager
+
+
+def make_frames_message() -> str:
+    frames = []
+    for i in range(8):
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        frame[50:150, 50 + i * 10:150 + i * 10] = 200
+        _, jpeg = cv2.imencode(".jpg", frame)
+        frames.append(base64.b64encode(jpeg).decode())
+    return json.dumps({"type": "frames", "frames": frames, "fps": 30.0})
+
+
+ANALYZER_STAGES = {"base64_decode", "jpeg_decode", "resize", "gray", "optical_flow", "subject", "environment"}
+
+
+class TestLatencyTracer:
+    """Sampling and histograms."""
+
+    def test_sampling_off_returns_no_trace(self):
+        tracer = LatencyTracer(sample_rate=0.0)
+        assert all(tracer.start() is None for _ in range(100))
+        assert tracer.start(debug=True) is not None
+
+    def test_sample_rate(self):
+        tracer = LatencyTracer(sample_rate=0.25)
+        traces = [tracer.start() for _ in range(100)]
+        assert sum(trace is not None for trace in traces) == 25
+
+    def test_histogram_quantiles(self):
+        histogram = StageHistogram()
+        for elapsed_ms in [0.3] * 90 + [40.0] * 9 + [3000.0]:
+            histogram.add(elapsed_ms)
+        metrics = histogram.to_dict()
+        assert metrics["count"] == 100
+        # Interpolated within the (0.25, 0.5] and (25, 50] buckets
+        assert metrics["p50_ms"] == pytest.approx(0.25 + 0.25 * 50 / 90, abs=1e-4)
+        assert metrics["p95_ms"] == pytest.approx(25.0 + 25.0 * 5 / 9, abs=1e-4)
+        assert metrics["p99_ms"] == 50.0
+        assert metrics["max_ms"] == 3000.0
+        assert metrics["buckets"]["0.5"] == 90
+        assert metrics["buckets"]["2500.0"] == 99
+        assert metrics["buckets"]["+Inf"] == 100
+
+    def test_quantiles_do_not_exceed_max(self):
+        histogram = StageHistogram()
+        for _ in range(10):
+            histogram.add(0.3)
+        assert histogram.quantile(0.5) == histogram.quantile(0.99) == 0.3
+
+    def test_record_accumulates_laps(self):
+        tracer = LatencyTracer()
+        trace = CycleTrace()
+        t = trace.lap("jpeg_decode", trace.start)
+        trace.lap("jpeg_decode", t)
+        tracer.record(trace)
+        stages = tracer.metrics()["stages"]
+        assert stages["jpeg_decode"]["count"] == 1
+        assert stages[TOTAL]["count"] == 1
+        assert "advice" not in stages
+
+
+class TestTracedPipeline:
+    """Spans threaded through analyzer, advice and broadcast."""
+
+    def test_analyzer_spans(self):
+        analyzer = RealtimeAnalyzer()
+        trace = CycleTrace()
+        frames = analyzer.decode_frame_buffer(json.loads(make_frames_message())["frames"], trace)
+        untraced = analyzer.analyze_buffer(frames)
+        traced = analyzer.analyze_buffer(frames, trace=trace)
+        assert set(trace.spans) == ANALYZER_STAGES
+        assert traced.avg_speed_px_frame == pytest.approx(untraced.avg_speed_px_frame)
+
+    @pytest.mark.parametrize("sample_rate", [0.0, 1.0])
+    async def test_debug_client_gets_breakdown(self, make_client, sample_rate):
+        manager = SessionManager(
+            registry=InMemorySessionRegistry(),
+            bus=InMemoryFanoutBus(),
+            tracer=LatencyTracer(sample_rate),
+        )
+        manager.create_session("S1")
+        camera, debugger = make_client(), make_client()
+        manager.add_client("S1", camera)
+        manager.add_client("S1", debugger, ClientOptions(envelope=True, debug=True))
+        handler = RealtimeWebSocketHandler(manager)
+
+        # Sampled cycles are recorded without a breakdown in telemetry
+        await handler._handle_message(camera, "S1", make_frames_message())
+        await manager.drain("S1")
+        cycle = json.loads(debugger.send_text.call_args.args[0])
+        assert "trace" not in cycle["telemetry"]
+        assert manager.tracer.sampled == int(sample_rate)
+
+        # Buffers from a debug client are always traced
+        await handler._handle_message(debugger, "S1", make_frames_message())
+        await manager.drain("S1")
+        breakdown = json.loads(debugger.send_text.call_args.args[0])["telemetry"]["trace"]
+        assert ANALYZER_STAGES | {"parse", "smoothing", "advice", TOTAL} <= set(breakdown)
+
+        stages = manager.tracer.metrics()["stages"]
+        assert stages["send"]["count"] == manager.tracer.sampled == int(sample_rate) + 1
+
+    async def test_parse_span_excludes_ownership(self, make_client):
+        manager = SessionManager(
+            registry=InMemorySessionRegistry(),
+            bus=InMemoryFanoutBus(),
+            tracer=LatencyTracer(1.0),
+        )
+        manager.create_session("S1")
+        debugger = make_client()
+        manager.add_client("S1", debugger, ClientOptions(envelope=True, debug=True))
+        ensure_owner = manager.ensure_owner
+
+        async def slow_ensure_owner(session_id):
+            await asyncio.sleep(0.05)
+            return await ensure_owner(session_id)
+
+        manager.ensure_owner = slow_ensure_owner
+        await RealtimeWebSocketHandler(manager)._handle_message(debugger, "S1", make_frames_message())
+        await manager.drain("S1")
+        breakdown = json.loads(debugger.send_text.call_args.args[0])["telemetry"]["trace"]
+        assert breakdown["parse"] < 50.0 <= breakdown[TOTAL]
+
+    def test_client_options_debug_from_query(self):
+        assert ClientOptions.from_query({"debug": "1"}).debug
+        assert not ClientOptions.from_query({}).debug
@@ -1,7 +1,7 @@
 """视频分析API路由（整合现有功能，提供统一响应格式）"""
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request
 from pydantic import BaseModel, Field, HttpUrl
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Any
 from datetime import datetime
 from pathlib import Path
 import uuid
@@ -10,10 +10,20 @@ import shutil
 from ..core.auth import User, optional_user
 from ..core.response import success_response, error_response, ErrorCode
 from ..core.config import settings
+from ..core.cache import TTLCache
+from ..core.http_cache import (
+    make_etag,
+    etag_matches,
+    not_modified,
+    encode_body,
+    encoded_response,
+    response_cache
+)
 from ..db.session import get_db
 from ..db.repo import JobRepository
 from ..db.models import Job, JobMode, JobStatus
-from ..pipeline.orchestrator import submit_job
+from ..pipeline.job_queue import submit_job
+from ..pipeline.executor import run_blocking
 from ..integrations.mm_llm_client import MMHLLMClient
 from ..core.logging import logger
 import json
@@ -22,42 +32,14 @@ import json
 router = APIRouter(prefix="/analysis", tags=["视频分析"])
 
 
-# 内存缓存：存储同步分析的结果
-# key: analysis_id, value: {"result": dict, "timestamp": datetime}
-_analysis_cache: Dict[str, dict] = {}
-
-# 缓存配置
-CACHE_MAX_SIZE = 100  # 最多缓存100个分析结果
-CACHE_EXPIRE_HOURS = 24  # 缓存24小时后过期
-
-
-def _cleanup_cache():
-    """清理过期的缓存"""
-    now = datetime.now()
-    expired_keys = []
-    
-    for key, value in _analysis_cache.items():
-        timestamp = value.get("timestamp")
-        if timestamp:
-            age_hours = (now - timestamp).total_seconds() / 3600
-            if age_hours > CACHE_EXPIRE_HOURS:
-                expired_keys.append(key)
-    
-    for key in expired_keys:
-        del _analysis_cache[key]
-        logger.info(f"清理过期缓存: {key}")
-    
-    # 如果缓存数量超限，删除最旧的
-    if len(_analysis_cache) > CACHE_MAX_SIZE:
-        sorted_items = sorted(
-            _analysis_cache.items(),
-            key=lambda x: x[1].get("timestamp", datetime.min)
-        )
-        
-        to_remove = len(_analysis_cache) - CACHE_MAX_SIZE
-        for key, _ in sorted_items[:to_remove]:
-            del _analysis_cache[key]
-            logger.info(f"清理超限缓存: {key}")
+# 同步分析结果缓存：key 为 analysis_id，value 为分析结果
+_analysis_cache = TTLCache(
+    max_entries=settings.analysis_cache_max_entries,
+    max_bytes=int(settings.analysis_cache_max_mb * 1024 * 1024),
+    ttl_seconds=settings.analysis_cache_ttl_hours * 3600,
+    disk_dir=settings.data_dir / "cache" / "analysis" if settings.analysis_cache_disk_enabled else None,
+    name="analysis_cache"
+)
 
 
 class CreateAnalysisRequest(BaseModel):
@@ -253,9 +235,11 @@ async def create_analysis(
         
         logger.info(f"提取视频帧: {video_path}")
         
-        # 提取帧（快速模式：每2秒一帧，最多5帧）
+        # 提取帧（快速模式：每2秒一帧，最多5帧），ffmpeg 在线程池中执行，不阻塞事件循环
         try:
-            frames_result = extract_frames(
+            frames_result = await run_blocking(
+                "extract_frames",
+                extract_frames,
                 video_path,
                 frames_dir,
                 fps=0.5,  # 每2秒一帧
@@ -479,11 +463,7 @@ async def create_analysis(
         result["analysisId"] = analysis_id  # 添加 analysisId 字段，兼容前端轮询逻辑
         
         # === 保存到缓存，供后续 get API 使用 ===
-        _cleanup_cache()  # 清理过期缓存
-        _analysis_cache[analysis_id] = {
-            "result": result,
-            "timestamp": datetime.now()
-        }
+        _analysis_cache.set(analysis_id, result)
         logger.info(f"已缓存分析结果: {analysis_id}, 当前缓存数: {len(_analysis_cache)}")
         
         return success_response(
@@ -596,9 +576,23 @@ async def _generate_analysis_with_llm(segments: List[dict], job_id: str) -> dict
         }
 
 
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    分析缓存指标
+    
+    返回同步分析结果缓存的条目数、字节数、命中/未命中/淘汰计数，以及响应缓存指标
+    """
+    return success_response(data={
+        "analysis_cache": _analysis_cache.metrics(),
+        "response_cache": response_cache.metrics()
+    })
+
+
 @router.get("/{analysis_id}")
 async def get_analysis(
     analysis_id: str,
+    request: Request,
     current_user: Optional[User] = Depends(optional_user)
 ):
     """
@@ -609,30 +603,28 @@ async def get_analysis(
     注意：
     - analysis_xxx 格式的ID表示同步分析，从缓存读取
     - job_xxx 格式的ID表示异步任务，从数据库查询
+    - 支持 If-None-Match（未变化时返回304）；已生成的结果编码一次后从响应缓存返回，
+      不再重复解析result_json或调用LLM
     """
     try:
         # 如果是同步分析（analysis_xxx格式），从缓存读取
         if analysis_id.startswith("analysis_"):
             logger.info(f"从缓存读取同步分析结果: {analysis_id}")
             
-            if analysis_id in _analysis_cache:
-                cache_entry = _analysis_cache[analysis_id]
-                cached_result = cache_entry.get("result")
-                timestamp = cache_entry.get("timestamp")
+            cache_entry = _analysis_cache.get_entry(analysis_id)
+            if cache_entry is not None:
+                cached_result = cache_entry.value
+                timestamp = cache_entry.created_at
                 
-                # 检查是否过期
-                if timestamp:
-                    age_hours = (datetime.now() - timestamp).total_seconds() / 3600
-                    if age_hours > CACHE_EXPIRE_HOURS:
-                        del _analysis_cache[analysis_id]
-                        logger.warning(f"缓存已过期: {analysis_id}, 年龄: {age_hours:.1f}小时")
-                        return error_response(
-                            ErrorCode.RESOURCE_NOT_FOUND,
-                            f"分析结果已过期（{age_hours:.1f}小时前生成）"
-                        )
+                etag = make_etag("analysis", analysis_id, timestamp)
+                if etag_matches(request, etag):
+                    return not_modified(etag)
                 
                 logger.info(f"成功从缓存获取分析结果: {analysis_id}")
-                return success_response(data=cached_result)
+                body = response_cache.get_or_encode(
+                    etag, lambda: success_response(data=cached_result)
+                )
+                return encoded_response(request, body, etag)
             else:
                 logger.warning(f"缓存中未找到分析结果: {analysis_id}, 当前缓存数: {len(_analysis_cache)}")
                 return error_response(
@@ -643,20 +635,29 @@ async def get_analysis(
         # 异步任务（job_xxx格式），从数据库查询
         with get_db() as db:
             job_repo = JobRepository(db)
-            job = job_repo.get(analysis_id)
+            version = job_repo.get_version(analysis_id)
             
-            if not job:
+            if version is None:
                 return error_response(
                     ErrorCode.RESOURCE_NOT_FOUND,
                     f"分析任务 {analysis_id} 不存在"
                 )
             
-            if job.status != JobStatus.SUCCEEDED:
+            if version[0] != JobStatus.SUCCEEDED.value:
                 return error_response(
                     ErrorCode.ANALYSIS_FAILED,
                     "分析尚未完成或失败"
                 )
             
+            # === 结果未变化时直接返回304或缓存的响应 ===
+            etag = make_etag("analysis", analysis_id, *version)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            body = response_cache.get(etag)
+            if body is not None:
+                return encoded_response(request, body, etag)
+            
+            job = job_repo.get(analysis_id)
             if not job.result_json:
                 return error_response(
                     ErrorCode.RESOURCE_NOT_FOUND,
@@ -795,7 +796,11 @@ async def get_analysis(
                 audienceResponse=audience_response
             )
             
-            return success_response(data=analysis.dict())
+            # 生成报告时会更新Job，按最新版本缓存
+            body = encode_body(success_response(data=analysis.dict()))
+            etag = make_etag("analysis", analysis_id, *job_repo.get_version(analysis_id))
+            response_cache.put(etag, body)
+            return encoded_response(request, body, etag)
     
     except json.JSONDecodeError as e:
         logger.error(f"解析分析结果失败: {str(e)}")
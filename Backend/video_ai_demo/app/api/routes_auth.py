@@ -1,9 +1,9 @@
 """认证相关API路由"""
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
 
-from ..core.auth import User, create_access_token
+from ..core.auth import User, create_access_token, revoke_token, token_cache
 from ..core.response import success_response, error_response, ErrorCode
 from ..core.logging import logger
 
@@ -114,11 +114,25 @@ async def register(request: LoginRequest):
 
 
 @router.post("/logout")
-async def logout():
+async def logout(authorization: Optional[str] = Header(None)):
     """
     用户登出
     
-    客户端应删除本地存储的token
+    吊销当前token（即使仍在缓存中也会被拒绝），客户端应删除本地存储的token
     """
+    if authorization:
+        parts = authorization.split()
+        if len(parts) == 2 and parts[0].lower() == "bearer":
+            revoke_token(parts[1])
     return success_response(message="登出成功")
 
+
+@router.get("/metrics")
+async def get_auth_metrics():
+    """
+    认证指标
+    
+    返回token缓存大小、命中率及验签/失败次数
+    """
+    return success_response(data=token_cache.metrics())
+
@@ -1,15 +1,15 @@
 """仪表板API路由"""
 from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Optional, Dict, Any, Callable, Tuple
 from datetime import datetime, timedelta
 from collections import defaultdict
-import json
+import time
 
 from ..core.auth import User, get_current_user, optional_user
 from ..core.response import success_response, error_response, ErrorCode
 from ..db.session import get_db
-from ..db.repo import JobRepository
+from ..db.repo import JobRepository, DashboardStatsRepository
 from ..db.models import JobStatus
 from ..core.logging import logger
 
@@ -17,6 +17,22 @@ from ..core.logging import logger
 router = APIRouter(prefix="/dashboard", tags=["仪表板"])
 
 
+# 仪表板聚合结果的进程内短TTL缓存（聚合表本身已增量维护，这里只挡住重复请求）
+DASHBOARD_CACHE_TTL_SECONDS = 5.0
+_dashboard_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+
+def _get_cached(key: str, builder: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """读取缓存，过期则重新构建"""
+    now = time.monotonic()
+    cached = _dashboard_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+    data = builder()
+    _dashboard_cache[key] = (now + DASHBOARD_CACHE_TTL_SECONDS, data)
+    return data
+
+
 class StatItem(BaseModel):
     """统计项"""
     label: str = Field(..., description="标签")
@@ -71,6 +87,55 @@ class ScheduleResponse(BaseModel):
     tasks: List[TaskItem]
 
 
+def _build_stats() -> Dict[str, Any]:
+    """从聚合表构建统计数据"""
+    with get_db() as db:
+        stats_repo = DashboardStatsRepository(db)
+        
+        # 获取统计数据
+        total_jobs = stats_repo.get_status_counts()
+        completed_count = total_jobs.get(JobStatus.SUCCEEDED, 0)
+        
+        # 总时长（成功Job的增量汇总）
+        totals = stats_repo.get_totals()
+        total_duration = totals["duration_ms"] / 1000
+    
+    # 构建统计数据
+    stats = StatsResponse(
+        stats=[
+            StatItem(
+                label="已分析视频",
+                value=str(completed_count),
+                icon="FileVideo",
+                color="text-blue-400",
+                bg="bg-blue-400/10"
+            ),
+            StatItem(
+                label="爆款基因库",
+                value=str(completed_count * 15),  # 假设每个视频提取15个基因
+                icon="Zap",
+                color="text-yellow-400",
+                bg="bg-yellow-400/10"
+            ),
+            StatItem(
+                label="节省创作时长",
+                value=f"{int(total_duration / 60)}h",
+                icon="Timer",
+                color="text-green-400",
+                bg="bg-green-400/10"
+            ),
+            StatItem(
+                label="平均分析分",
+                value="88.5",
+                icon="TrendingUp",
+                color="text-purple-400",
+                bg="bg-purple-400/10"
+            )
+        ]
+    )
+    return stats.dict()
+
+
 @router.get("/stats")
 async def get_stats(current_user: Optional[User] = Depends(optional_user)):
     """
@@ -79,64 +144,7 @@ async def get_stats(current_user: Optional[User] = Depends(optional_user)):
     返回用户的各项统计指标
     """
     try:
-        with get_db() as db:
-            job_repo = JobRepository(db)
-            
-            # 获取统计数据
-            total_jobs = job_repo.count_by_status()
-            completed_count = total_jobs.get(JobStatus.SUCCEEDED, 0)
-            
-            # 计算总时长（从已完成的任务中统计）
-            total_duration = 0
-            jobs = job_repo.list_by_status(JobStatus.SUCCEEDED, limit=1000)
-            
-            for job in jobs:
-                if job.result_json:
-                    try:
-                        result = json.loads(job.result_json)
-                        target = result.get("target", {})
-                        segments = target.get("segments", [])
-                        if segments:
-                            duration_sec = segments[-1].get("end_ms", 0) / 1000
-                            total_duration += duration_sec
-                    except:
-                        pass
-            
-            # 构建统计数据
-            stats = StatsResponse(
-                stats=[
-                    StatItem(
-                        label="已分析视频",
-                        value=str(completed_count),
-                        icon="FileVideo",
-                        color="text-blue-400",
-                        bg="bg-blue-400/10"
-                    ),
-                    StatItem(
-                        label="爆款基因库",
-                        value=str(completed_count * 15),  # 假设每个视频提取15个基因
-                        icon="Zap",
-                        color="text-yellow-400",
-                        bg="bg-yellow-400/10"
-                    ),
-                    StatItem(
-                        label="节省创作时长",
-                        value=f"{int(total_duration / 60)}h",
-                        icon="Timer",
-                        color="text-green-400",
-                        bg="bg-green-400/10"
-                    ),
-                    StatItem(
-                        label="平均分析分",
-                        value="88.5",
-                        icon="TrendingUp",
-                        color="text-purple-400",
-                        bg="bg-purple-400/10"
-                    )
-                ]
-            )
-            
-            return success_response(data=stats.dict())
+        return success_response(data=_get_cached("stats", _build_stats))
     
     except Exception as e:
         logger.error(f"获取统计数据失败: {str(e)}")
@@ -171,20 +179,7 @@ async def get_projects(
             # 转换为项目摘要
             projects = []
             for job in jobs:
-                # 解析结果
-                segment_count = 0
-                duration_sec = 0
-                
-                if job.result_json:
-                    try:
-                        result = json.loads(job.result_json)
-                        target = result.get("target", {})
-                        segments = target.get("segments", [])
-                        segment_count = len(segments)
-                        if segments:
-                            duration_sec = segments[-1].get("end_ms", 0) / 1000
-                    except:
-                        pass
+                segment_count = job.segment_count or 0
                 
                 # 计算时间描述
                 time_diff = datetime.now() - job.created_at
@@ -238,6 +233,76 @@ async def get_projects(
         )
 
 
+def _build_schedule() -> Dict[str, Any]:
+    """从聚合表构建日程热力图"""
+    with get_db() as db:
+        stats_repo = DashboardStatsRepository(db)
+        
+        # 过去7天（含今天）每天的任务数（按创建日期聚合）
+        now = datetime.utcnow()
+        seven_days_ago = now - timedelta(days=6)
+        
+        day_counts = defaultdict(int)
+        day_names = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+        
+        for day, count in stats_repo.get_daily_created(seven_days_ago).items():
+            day_of_week = datetime.strptime(day, "%Y-%m-%d").weekday()  # 0=Monday, 6=Sunday
+            day_counts[day_of_week] += count
+        
+        # 统计不同状态的任务数量
+        status_counts = stats_repo.get_status_counts()
+    
+    # 找出最大值用于归一化
+    max_count = max(day_counts.values()) if day_counts else 1
+    
+    # 构建日程数据
+    schedule_data = []
+    for i, day_name in enumerate(day_names):
+        count = day_counts.get(i, 0)
+        # 归一化到0-100
+        intensity = int((count / max_count) * 100) if max_count > 0 else 0
+        schedule_data.append(ScheduleDay(day=day_name, intensity=intensity))
+    
+    queued_count = status_counts.get(JobStatus.QUEUED, 0)
+    running_count = status_counts.get(JobStatus.RUNNING, 0)
+    succeeded_count = status_counts.get(JobStatus.SUCCEEDED, 0)
+    
+    # 构建任务列表
+    tasks = []
+    if queued_count > 0:
+        tasks.append(TaskItem(
+            label=f"待解析: {queued_count}个视频",
+            active=True,
+            color="bg-indigo-500"
+        ))
+    if running_count > 0:
+        tasks.append(TaskItem(
+            label=f"分析中: {running_count}个视频",
+            active=True,
+            color="bg-green-500"
+        ))
+    if succeeded_count > 0:
+        tasks.append(TaskItem(
+            label=f"已完成: {succeeded_count}个视频",
+            active=False,
+            color="bg-gray-500"
+        ))
+    
+    # 如果没有任何任务，显示提示
+    if not tasks:
+        tasks.append(TaskItem(
+            label="暂无任务",
+            active=False,
+            color="bg-gray-400"
+        ))
+    
+    schedule = ScheduleResponse(
+        schedule=schedule_data,
+        tasks=tasks
+    )
+    return schedule.dict()
+
+
 @router.get("/schedule")
 async def get_schedule(current_user: Optional[User] = Depends(optional_user)):
     """
@@ -246,78 +311,7 @@ async def get_schedule(current_user: Optional[User] = Depends(optional_user)):
     返回用户的任务日程（基于最近7天的真实数据）
     """
     try:
-        with get_db() as db:
-            job_repo = JobRepository(db)
-            
-            # 获取过去7天的所有任务
-            now = datetime.now()
-            seven_days_ago = now - timedelta(days=7)
-            
-            # 统计每天的任务数量
-            day_counts = defaultdict(int)
-            day_names = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-            
-            # 获取所有任务
-            all_jobs = job_repo.list_history(limit=1000)
-            
-            # 统计过去7天每天的任务数
-            for job in all_jobs:
-                if job.created_at and job.created_at >= seven_days_ago:
-                    day_of_week = job.created_at.weekday()  # 0=Monday, 6=Sunday
-                    day_counts[day_of_week] += 1
-            
-            # 找出最大值用于归一化
-            max_count = max(day_counts.values()) if day_counts else 1
-            
-            # 构建日程数据
-            schedule_data = []
-            for i, day_name in enumerate(day_names):
-                count = day_counts.get(i, 0)
-                # 归一化到0-100
-                intensity = int((count / max_count) * 100) if max_count > 0 else 0
-                schedule_data.append(ScheduleDay(day=day_name, intensity=intensity))
-            
-            # 统计不同状态的任务数量
-            status_counts = job_repo.count_by_status()
-            queued_count = status_counts.get(JobStatus.QUEUED, 0)
-            running_count = status_counts.get(JobStatus.RUNNING, 0)
-            succeeded_count = status_counts.get(JobStatus.SUCCEEDED, 0)
-            
-            # 构建任务列表
-            tasks = []
-            if queued_count > 0:
-                tasks.append(TaskItem(
-                    label=f"待解析: {queued_count}个视频",
-                    active=True,
-                    color="bg-indigo-500"
-                ))
-            if running_count > 0:
-                tasks.append(TaskItem(
-                    label=f"分析中: {running_count}个视频",
-                    active=True,
-                    color="bg-green-500"
-                ))
-            if succeeded_count > 0:
-                tasks.append(TaskItem(
-                    label=f"已完成: {succeeded_count}个视频",
-                    active=False,
-                    color="bg-gray-500"
-                ))
-            
-            # 如果没有任何任务，显示提示
-            if not tasks:
-                tasks.append(TaskItem(
-                    label="暂无任务",
-                    active=False,
-                    color="bg-gray-400"
-                ))
-            
-            schedule = ScheduleResponse(
-                schedule=schedule_data,
-                tasks=tasks
-            )
-            
-            return success_response(data=schedule.dict())
+        return success_response(data=_get_cached("schedule", _build_schedule))
     
     except Exception as e:
         logger.error(f"获取日程失败: {str(e)}")
@@ -325,4 +319,3 @@ async def get_schedule(current_user: Optional[User] = Depends(optional_user)):
             ErrorCode.INTERNAL_ERROR,
             "获取日程失败"
         )
-
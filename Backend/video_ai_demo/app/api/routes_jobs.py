@@ -1,7 +1,8 @@
 """Job相关API路由"""
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 import uuid
@@ -10,8 +11,18 @@ import asyncio
 
 from ..db.session import get_db
 from ..db.repo import JobRepository
+from ..db.writer import db_writer
 from ..db.models import Job, JobMode, JobStatus
-from ..pipeline.orchestrator import submit_job
+from ..pipeline.job_queue import submit_job, job_queue
+from ..pipeline.executor import step_metrics
+from ..pipeline.events import job_event_bus, format_sse
+from ..core.http_cache import (
+    make_etag,
+    etag_matches,
+    not_modified,
+    encoded_response,
+    response_cache
+)
 from ..core.logging import logger
 
 
@@ -88,6 +99,7 @@ class CreateJobRequest(BaseModel):
     target_video: VideoInput
     user_video: Optional[VideoInput] = None
     options: JobOptions = Field(default_factory=JobOptions)
+    priority: int = Field(default=0, ge=-10, le=10, description="队列优先级，越大越先执行")
 
 
 class CreateJobResponse(BaseModel):
@@ -182,8 +194,8 @@ async def create_job(request: CreateJobRequest):
         }
     }
     
-    # 提交到运行器（异步执行）
-    await submit_job(job_id, job_config)
+    # 提交到队列（由worker池异步执行）
+    await submit_job(job_id, job_config, priority=request.priority)
     
     return CreateJobResponse(
         job_id=job_id,
@@ -193,89 +205,126 @@ async def create_job(request: CreateJobRequest):
 
 
 @router.get("/jobs/{job_id}", response_model=JobResponse)
-async def get_job(job_id: str):
-    """查询Job状态"""
+async def get_job(job_id: str, request: Request):
+    """
+    查询Job状态
     
+    支持 If-None-Match（未变化时返回304）；已结束Job的响应编码一次后从缓存返回
+    """
     with get_db() as db:
         job_repo = JobRepository(db)
-        job = job_repo.get(job_id)
+        version = job_repo.get_version(job_id)
         
-        if not job:
+        if version is None:
             raise HTTPException(status_code=404, detail=f"Job {job_id} 不存在")
         
-        # 构建响应
-        response = JobResponse(
-            job_id=job.id,
-            mode=job.mode.value,
-            status=job.status.value,
-            created_at=job.created_at,
-            updated_at=job.updated_at,
-            started_at=job.started_at,
-            completed_at=job.completed_at
-        )
-        
-        # 查询关联的视频资源
-        from ..db.repo import AssetRepository
-        from ..db.models import AssetRole
-        asset_repo = AssetRepository(db)
-        
-        # 目标视频
-        target_asset = asset_repo.get_by_job_and_role(job_id, AssetRole.TARGET)
-        if target_asset:
-            response.target_video = VideoSourceInfo(
-                source_type=target_asset.source_type or "file",
-                source_url=target_asset.source_url,
-                source_path=target_asset.source_path,
-                local_path=target_asset.local_path
-            )
-        
-        # 用户视频（compare模式）
-        user_asset = asset_repo.get_by_job_and_role(job_id, AssetRole.USER)
-        if user_asset:
-            response.user_video = VideoSourceInfo(
-                source_type=user_asset.source_type or "file",
-                source_url=user_asset.source_url,
-                source_path=user_asset.source_path,
-                local_path=user_asset.local_path
-            )
-        
-        # 进度
-        if job.status == JobStatus.RUNNING:
-            response.progress = JobProgress(
-                stage=job.progress_stage,
-                percent=job.progress_percent,
-                message=job.progress_message
-            )
-        
-        # 最终结果
-        if job.status == JobStatus.SUCCEEDED and job.result_json:
-            try:
-                response.result = json.loads(job.result_json)
-            except json.JSONDecodeError:
-                logger.error(f"Job {job_id} 结果JSON解析失败")
+        etag = make_etag("job", job_id, *version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
         
-        # 部分结果（用于流式显示）
-        if job.status == JobStatus.RUNNING and job.partial_result_json:
+        finished = version[0] in (JobStatus.SUCCEEDED.value, JobStatus.FAILED.value)
+        body = response_cache.get_or_encode(
+            etag,
+            lambda: _build_job_response(db, job_id),
+            cacheable=finished
+        )
+    
+    return encoded_response(request, body, etag)
+
+
+def _build_job_response(db: Session, job_id: str) -> JobResponse:
+    """读取Job及关联资源，构建详情响应"""
+    job_repo = JobRepository(db)
+    job = job_repo.get_or_raise(job_id)
+    
+    # 构建响应
+    response = JobResponse(
+        job_id=job.id,
+        mode=job.mode.value,
+        status=job.status.value,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+        started_at=job.started_at,
+        completed_at=job.completed_at
+    )
+    
+    # 查询关联的视频资源
+    from ..db.repo import AssetRepository
+    from ..db.models import AssetRole
+    asset_repo = AssetRepository(db)
+    
+    # 目标视频
+    target_asset = asset_repo.get_by_job_and_role(job_id, AssetRole.TARGET)
+    if target_asset:
+        response.target_video = VideoSourceInfo(
+            source_type=target_asset.source_type or "file",
+            source_url=target_asset.source_url,
+            source_path=target_asset.source_path,
+            local_path=target_asset.local_path
+        )
+    
+    # 用户视频（compare模式）
+    user_asset = asset_repo.get_by_job_and_role(job_id, AssetRole.USER)
+    if user_asset:
+        response.user_video = VideoSourceInfo(
+            source_type=user_asset.source_type or "file",
+            source_url=user_asset.source_url,
+            source_path=user_asset.source_path,
+            local_path=user_asset.local_path
+        )
+    
+    # 进度
+    if job.status == JobStatus.RUNNING:
+        response.progress = JobProgress(
+            stage=job.progress_stage,
+            percent=job.progress_percent,
+            message=job.progress_message
+        )
+    
+    # 最终结果
+    if job.status == JobStatus.SUCCEEDED and job.result_json:
+        try:
+            response.result = json.loads(job.result_json)
+        except json.JSONDecodeError:
+            logger.error(f"Job {job_id} 结果JSON解析失败")
+    
+    # 部分结果（用于流式显示）
+    if job.status == JobStatus.RUNNING:
+        try:
+            response.partial_result = job_repo.get_partial_result(job_id)
+        except json.JSONDecodeError:
+            logger.error(f"Job {job_id} 部分结果JSON解析失败")
+    
+    # 错误
+    if job.status == JobStatus.FAILED:
+        error_details = None
+        if job.error_details:
             try:
-                response.partial_result = json.loads(job.partial_result_json)
+                error_details = json.loads(job.error_details)
             except json.JSONDecodeError:
-                logger.error(f"Job {job_id} 部分结果JSON解析失败")
-        
-        # 错误
-        if job.status == JobStatus.FAILED:
-            error_details = None
-            if job.error_details:
-                try:
-                    error_details = json.loads(job.error_details)
-                except json.JSONDecodeError:
-                    pass
-            
-            response.error = JobErrorInfo(
-                message=job.error_message or "未知错误",
-                details=error_details
-            )
+                pass
         
-        return response
+        response.error = JobErrorInfo(
+            message=job.error_message or "未知错误",
+            details=error_details
+        )
+    
+    return response
+
+
+@router.get("/queue")
+async def get_queue_metrics():
+    """
+    Job队列指标
+    
+    Returns:
+        队列深度（按优先级）、运行中Job数量、worker并发数、累计计数、各步骤耗时及写线程指标
+    """
+    return {
+        **job_queue.metrics(),
+        "step_timings_ms": step_metrics(),
+        "db_writer": db_writer.metrics()
+    }
 
 
 @router.get("/history", response_model=List[HistoryItem])
@@ -296,20 +345,9 @@ async def get_history(limit: int = 50):
             
             history_items = []
             for job in jobs:
-                # 解析结果获取统计信息
-                segment_count = None
-                duration_sec = None
-                
-                if job.result_json:
-                    try:
-                        result = json.loads(job.result_json)
-                        target = result.get("target", {})
-                        segments = target.get("segments", [])
-                        segment_count = len(segments)
-                        if segments:
-                            duration_sec = segments[-1].get("end_ms", 0) / 1000
-                    except:
-                        pass
+                # 统计信息来自保存结果时写入的摘要字段
+                segment_count = job.segment_count
+                duration_sec = job.duration_ms / 1000 if job.duration_ms is not None else None
                 
                 # 解析学习要点
                 learning_points = []
@@ -371,8 +409,7 @@ async def delete_job(job_id: str):
                     logger.warning(f"删除 Job {job_id} 文件失败: {str(e)}")
             
             # 从数据库中删除 Job（级联删除相关的 assets 和 artifacts）
-            db.delete(job)
-            db.commit()
+            job_repo.delete(job_id)
             
             logger.info(f"Job {job_id} 已成功删除")
             
@@ -389,11 +426,91 @@ async def delete_job(job_id: str):
         raise HTTPException(status_code=500, detail=f"删除失败: {str(e)}")
 
 
+# SSE 心跳间隔（秒）
+STREAM_KEEPALIVE_SECONDS = 15.0
+# Job 不在本进程运行时，回退检查数据库的间隔（秒）
+STREAM_FALLBACK_POLL_SECONDS = 5.0
+
+
+def _load_stream_snapshot(job_id: str):
+    """
+    从数据库构建 SSE 快照（仅用于晚加入的订阅者）
+    
+    Returns:
+        (frames, finished)：SSE 帧列表，以及 Job 是否已结束
+    """
+    with get_db() as db:
+        job_repo = JobRepository(db)
+        job = job_repo.get(job_id)
+        
+        if not job:
+            return [format_sse({'error': 'Job不存在'}, event="error")], True
+        
+        current_status = job.status.value
+        frames = []
+        
+        if job.status == JobStatus.RUNNING:
+            frames.append(format_sse({
+                "type": "progress",
+                "status": current_status,
+                "progress": {
+                    "stage": job.progress_stage,
+                    "percent": job.progress_percent or 0,
+                    "message": job.progress_message or ""
+                }
+            }))
+        
+        if job.status == JobStatus.RUNNING:
+            try:
+                partial_result = job_repo.get_partial_result(job_id) or {}
+                segments = partial_result.get("target", {}).get("segments", [])
+                if segments:
+                    frames.append(format_sse({
+                        "type": "segments",
+                        "status": current_status,
+                        "segments": segments,
+                        "total": len(segments)
+                    }))
+            except json.JSONDecodeError as e:
+                logger.error(f"解析部分结果失败: {str(e)}")
+        
+        if job.status == JobStatus.SUCCEEDED:
+            if job.result_json:
+                try:
+                    frames.append(format_sse({
+                        "type": "complete",
+                        "status": "succeeded",
+                        "result": json.loads(job.result_json)
+                    }))
+                except json.JSONDecodeError:
+                    pass
+            frames.append(format_sse({'status': 'succeeded'}, event="done"))
+            return frames, True
+        
+        if job.status == JobStatus.FAILED:
+            frames.append(format_sse({
+                "type": "error",
+                "status": "failed",
+                "error": {
+                    "message": job.error_message or "任务失败",
+                    "details": json.loads(job.error_details) if job.error_details else None
+                }
+            }))
+            frames.append(format_sse({'status': 'failed'}, event="done"))
+            return frames, True
+        
+        return frames, False
+
+
 @router.get("/jobs/{job_id}/stream")
 async def stream_job_progress(job_id: str):
     """
     SSE 流式推送任务进度和片段数据
     
+    订阅进程内事件总线，首帧发送完整快照（type=segments），
+    之后只推送变化的片段（type=segments_delta）。数据库仅用于晚加入者，
+    以及 Job 不在本进程运行时的回退检查。
+    
     Args:
         job_id: Job ID
     
@@ -402,119 +519,52 @@ async def stream_job_progress(job_id: str):
     """
     async def event_generator():
         """生成 SSE 事件"""
+        # 先订阅再取快照，避免丢失两者之间发布的事件
+        queue = job_event_bus.subscribe(job_id)
         try:
-            # 检查任务是否存在
-            with get_db() as db:
-                job_repo = JobRepository(db)
-                job = job_repo.get(job_id)
-                
-                if not job:
-                    yield f"event: error\ndata: {json.dumps({'error': 'Job不存在'})}\n\n"
+            frames = job_event_bus.snapshot(job_id)
+            if frames is None:
+                frames, finished = _load_stream_snapshot(job_id)
+                for frame in frames:
+                    yield frame
+                if finished:
                     return
+            else:
+                for frame in frames:
+                    yield frame
             
             logger.info(f"开始流式推送任务 {job_id} 的进度")
             
-            last_partial_result = None
-            last_status = None
-            check_count = 0
-            max_checks = 300  # 最多检查5分钟（每秒一次）
-            
-            while check_count < max_checks:
-                with get_db() as db:
-                    job_repo = JobRepository(db)
-                    job = job_repo.get(job_id)
-                    
-                    if not job:
-                        yield f"event: error\ndata: {json.dumps({'error': 'Job已删除'})}\n\n"
-                        return
-                    
-                    current_status = job.status.value
-                    
-                    # 发送进度更新
-                    if job.status == JobStatus.RUNNING:
-                        progress_data = {
-                            "type": "progress",
-                            "status": current_status,
-                            "progress": {
-                                "stage": job.progress_stage,
-                                "percent": job.progress_percent or 0,
-                                "message": job.progress_message or ""
-                            }
-                        }
-                        yield f"data: {json.dumps(progress_data)}\n\n"
-                    
-                    # 发送部分结果（片段数据）
-                    if job.partial_result_json and job.partial_result_json != last_partial_result:
-                        try:
-                            partial_result = json.loads(job.partial_result_json)
-                            
-                            # 提取片段数据
-                            segments = None
-                            if "target" in partial_result:
-                                segments = partial_result["target"].get("segments", [])
-                            
-                            if segments:
-                                segment_data = {
-                                    "type": "segments",
-                                    "status": current_status,
-                                    "segments": segments,
-                                    "total": len(segments)
-                                }
-                                yield f"data: {json.dumps(segment_data)}\n\n"
-                                
-                                last_partial_result = job.partial_result_json
-                                logger.info(f"推送 {len(segments)} 个片段到前端")
-                        
-                        except json.JSONDecodeError as e:
-                            logger.error(f"解析部分结果失败: {str(e)}")
-                    
-                    # 任务完成
-                    if job.status == JobStatus.SUCCEEDED:
-                        # 发送最终结果
-                        if job.result_json:
-                            try:
-                                result = json.loads(job.result_json)
-                                complete_data = {
-                                    "type": "complete",
-                                    "status": "succeeded",
-                                    "result": result
-                                }
-                                yield f"data: {json.dumps(complete_data)}\n\n"
-                                logger.info(f"任务 {job_id} 完成，推送最终结果")
-                            except json.JSONDecodeError:
-                                pass
-                        
-                        # 发送完成信号
-                        yield f"event: done\ndata: {json.dumps({'status': 'succeeded'})}\n\n"
-                        return
-                    
-                    # 任务失败
-                    elif job.status == JobStatus.FAILED:
-                        error_data = {
-                            "type": "error",
-                            "status": "failed",
-                            "error": {
-                                "message": job.error_message or "任务失败",
-                                "details": json.loads(job.error_details) if job.error_details else None
-                            }
-                        }
-                        yield f"data: {json.dumps(error_data)}\n\n"
-                        yield f"event: done\ndata: {json.dumps({'status': 'failed'})}\n\n"
-                        logger.error(f"任务 {job_id} 失败")
-                        return
-                    
-                    last_status = current_status
+            while True:
+                tracking = job_event_bus.is_tracking(job_id)
+                timeout = STREAM_KEEPALIVE_SECONDS if tracking else STREAM_FALLBACK_POLL_SECONDS
                 
-                # 等待1秒后继续检查
-                await asyncio.sleep(1)
-                check_count += 1
-            
-            # 超时
-            yield f"event: error\ndata: {json.dumps({'error': '任务超时'})}\n\n"
-            
+                try:
+                    frame = await asyncio.wait_for(queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    if not job_event_bus.is_tracking(job_id):
+                        # Job 不在本进程运行（或尚未开始），回退读取数据库
+                        snapshot_frames, finished = _load_stream_snapshot(job_id)
+                        new_frames = [f for f in snapshot_frames if f not in frames]
+                        for snapshot_frame in new_frames:
+                            yield snapshot_frame
+                        frames = snapshot_frames
+                        if finished:
+                            return
+                    yield ": keepalive\n\n"
+                    continue
+                
+                yield frame
+                if frame.startswith("event: done"):
+                    logger.info(f"任务 {job_id} 流式推送结束")
+                    return
+        
         except Exception as e:
             logger.error(f"流式推送异常: {str(e)}", exc_info=True)
-            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            yield format_sse({'error': str(e)}, event="error")
+        
+        finally:
+            job_event_bus.unsubscribe(job_id, queue)
     
     return StreamingResponse(
         event_generator(),
@@ -525,4 +575,3 @@ async def stream_job_progress(job_id: str):
             "X-Accel-Buffering": "no"
         }
     )
-
@@ -1,10 +1,15 @@
 """认证和授权模块"""
-from typing import Optional
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
 from fastapi import Header, HTTPException, Depends
 from pydantic import BaseModel
 import jwt
 from datetime import datetime, timedelta
 
+from .config import settings
 from .response import ErrorCode, error_response
 
 
@@ -42,19 +47,138 @@ def create_access_token(user: User) -> str:
     return encoded_jwt
 
 
-def verify_token(token: str) -> Optional[TokenData]:
-    """验证令牌"""
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("user_id")
-        email: str = payload.get("email")
-        if user_id is None or email is None:
+class TokenCache:
+    """已验证令牌的LRU缓存
+    
+    轮询接口（/jobs/{id}、/analysis/{id}/status）会用同一个token频繁请求，
+    缓存验签后的声明可以跳过重复的解码与签名校验。
+    以token的SHA-256为键（不保存token原文），条目在token过期前略早失效；
+    吊销的token记录到其过期为止，缓存淘汰后仍会被拒绝。
+    """
+    
+    def __init__(self, max_size: int = 1024, expiry_margin: float = 1.0):
+        self.max_size = max_size
+        self.expiry_margin = expiry_margin
+        # token哈希 -> (声明, 失效时间)，最久未使用的在前
+        self._entries: "OrderedDict[bytes, Tuple[TokenData, float]]" = OrderedDict()
+        # token哈希 -> exp
+        self._revoked: Dict[bytes, float] = {}
+        self._lock = threading.Lock()
+        
+        # 计数器
+        self.hits = 0
+        self.misses = 0
+        self.verifications = 0
+        self.failures = 0
+    
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+    
+    def get(self, token: str) -> Optional[TokenData]:
+        """读取缓存的声明，未命中或即将过期时返回None"""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
             return None
-        return TokenData(user_id=user_id, email=email)
-    except jwt.ExpiredSignatureError:
+    
+    def put(self, token: str, token_data: TokenData, exp: float):
+        """缓存已验证的声明，直到exp之前"""
+        expires_at = exp - self.expiry_margin
+        if expires_at <= time.time():
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (token_data, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def revoke(self, token: str, exp: float):
+        """吊销token（直到其自然过期）"""
+        key = self._key(token)
+        with self._lock:
+            self._entries.pop(key, None)
+            now = time.time()
+            self._revoked = {k: e for k, e in self._revoked.items() if e > now}
+            self._revoked[key] = exp
+    
+    def is_revoked(self, token: str) -> bool:
+        """token是否已被吊销"""
+        if not self._revoked:
+            return False
+        with self._lock:
+            return self._key(token) in self._revoked
+    
+    def metrics(self) -> Dict[str, Any]:
+        """缓存与验签指标"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "verifications": self.verifications,
+            "failures": self.failures,
+            "revoked": len(self._revoked)
+        }
+
+
+# 全局token缓存
+token_cache = TokenCache(max_size=settings.token_cache_size)
+
+
+def _decode_token(token: str) -> Optional[Dict[str, Any]]:
+    """解码并验签，失败返回None"""
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.InvalidTokenError:
+        # 包括 ExpiredSignatureError
+        return None
+
+
+def verify_token(token: str) -> Optional[TokenData]:
+    """验证令牌（命中缓存时跳过验签）"""
+    if token_cache.is_revoked(token):
         return None
-    except jwt.JWTError:
+    
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+    
+    token_cache.verifications += 1
+    payload = _decode_token(token)
+    if payload is None:
+        token_cache.failures += 1
         return None
+    
+    user_id: str = payload.get("user_id")
+    email: str = payload.get("email")
+    if user_id is None or email is None:
+        token_cache.failures += 1
+        return None
+    
+    exp = payload.get("exp", 0)
+    token_data = TokenData(user_id=user_id, email=email, exp=datetime.utcfromtimestamp(exp))
+    token_cache.put(token, token_data, exp)
+    return token_data
+
+
+def revoke_token(token: str) -> bool:
+    """吊销令牌（登出时调用），无效token返回False"""
+    payload = _decode_token(token)
+    if payload is None:
+        return False
+    token_cache.revoke(token, payload.get("exp", 0))
+    return True
 
 
 async def get_current_user(
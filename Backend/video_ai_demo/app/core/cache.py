@@ -0,0 +1,210 @@
+"""带TTL的LRU缓存（可选磁盘层）
+
+内存层：OrderedDict 按访问顺序排列，读写与淘汰都是 O(1)；
+同时限制条目数和总字节数（按JSON编码后的大小计算），过期条目在访问时惰性清除。
+
+磁盘层（可选）：每个条目一个JSON文件，原子写入（临时文件 + rename）。
+内存未命中时回落到磁盘并提升到内存，因此结果可以跨进程重启保留，
+同一主机上的多个worker也能共享。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional
+
+from .logging import logger
+
+
+class CacheEntry(NamedTuple):
+    """缓存条目"""
+    value: Any
+    created_at: float  # epoch秒
+    size: int  # JSON编码后的字节数
+
+
+class TTLCache:
+    """带TTL、条目数与字节数限制的LRU缓存"""
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        ttl_seconds: float,
+        disk_dir: Optional[Path] = None,
+        name: str = "cache"
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.name = name
+
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # 计数器
+        self._stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._prune_disk()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get_entry(key, count=False) is not None
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存值，未命中或已过期返回None"""
+        entry = self.get_entry(key)
+        return entry.value if entry else None
+
+    def get_entry(self, key: str, count: bool = True) -> Optional[CacheEntry]:
+        """读取缓存条目（含创建时间），先查内存再查磁盘"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry.created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    if count:
+                        self._stats["hits"] += 1
+                    return entry
+                self._remove(key)
+                self._stats["expirations"] += 1
+
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                if count:
+                    self._stats["misses"] += 1
+                return None
+            if count:
+                self._stats["disk_hits"] += 1
+            self._insert(key, entry)
+        return entry
+
+    def set(self, key: str, value: Any):
+        """写入缓存（值需可JSON序列化）"""
+        encoded = json.dumps(value, ensure_ascii=False, default=str)
+        entry = CacheEntry(value, time.time(), len(encoded.encode("utf-8")))
+
+        with self._lock:
+            self._insert(key, entry)
+
+        if self.disk_dir:
+            self._write_disk(key, entry, encoded)
+
+    def delete(self, key: str):
+        """删除条目（内存与磁盘）"""
+        with self._lock:
+            self._remove(key)
+        if self.disk_dir:
+            self._disk_path(key).unlink(missing_ok=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        """缓存指标"""
+        hits = self._stats["hits"] + self._stats["disk_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "disk_enabled": self.disk_dir is not None,
+            **self._stats
+        }
+
+    # ===== 内存层 =====
+
+    def _insert(self, key: str, entry: CacheEntry):
+        """插入到LRU尾部，超限时从头部淘汰（调用方持有锁）"""
+        self._remove(key)
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self._stats["evictions"] += 1
+            logger.debug(f"[{self.name}] 淘汰缓存: {evicted_key}")
+
+    def _remove(self, key: str):
+        """移除内存条目（调用方持有锁）"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    # ===== 磁盘层 =====
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{hashlib.sha1(key.encode()).hexdigest()}.json"
+
+    def _read_disk(self, key: str, now: float) -> Optional[CacheEntry]:
+        """从磁盘读取条目，过期则删除文件"""
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"[{self.name}] 读取磁盘缓存失败: {key}, {str(e)}")
+            return None
+
+        if data.get("key") != key:
+            return None
+        created_at = data.get("created_at", 0)
+        if now - created_at > self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            self._stats["expirations"] += 1
+            return None
+
+        value = data.get("value")
+        size = len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+        return CacheEntry(value, created_at, size)
+
+    def _write_disk(self, key: str, entry: CacheEntry, encoded_value: str):
+        """原子写入磁盘文件"""
+        path = self._disk_path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        payload = (
+            f'{{"key": {json.dumps(key)}, "created_at": {entry.created_at}, '
+            f'"value": {encoded_value}}}'
+        )
+        try:
+            tmp_path.write_text(payload, encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"[{self.name}] 写入磁盘缓存失败: {key}, {str(e)}")
+            tmp_path.unlink(missing_ok=True)
+
+    def _prune_disk(self):
+        """启动时删除过期的磁盘条目"""
+        now = time.time()
+        removed = 0
+        for path in self.disk_dir.glob("*.json"):
+            try:
+                if now - path.stat().st_mtime > self.ttl_seconds:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.info(f"[{self.name}] 清理过期磁盘缓存 {removed} 个")
@@ -22,10 +22,44 @@ class Settings(BaseSettings):
     data_dir: Path = Path("./data")
     sqlite_path: str = "./data/demo.db"
     
+    # SQLite 调优（每个连接建立时通过PRAGMA应用）
+    sqlite_journal_mode: str = "WAL"  # WAL：读写并发，读不阻塞写
+    sqlite_synchronous: str = "NORMAL"  # WAL模式下NORMAL即可保证一致性
+    sqlite_busy_timeout_ms: int = 5000  # 锁等待时间，避免 "database is locked"
+    sqlite_mmap_size: int = 256 * 1024 * 1024  # 内存映射读取（字节）
+    sqlite_cache_size_kb: int = 64 * 1024  # 页缓存大小（KiB）
+    
+    # 单写线程：合并各Job的进度/部分结果写入
+    sqlite_write_batch_size: int = 100  # 每个事务最多合并的写操作数
+    sqlite_write_batch_delay_ms: float = 20.0  # 等待凑批的最长时间
+    
+    # 进度上报节流（阶段切换和终态总是立即写入）
+    progress_flush_interval_ms: float = 500.0  # 同一阶段内两次写入的最小间隔
+    progress_min_delta: float = 1.0  # 进度变化小于该值时不单独触发写入
+    
+    # 同步分析结果缓存（/analysis/create）
+    analysis_cache_max_entries: int = 100
+    analysis_cache_max_mb: float = 64.0
+    analysis_cache_ttl_hours: float = 24.0
+    analysis_cache_disk_enabled: bool = False  # 开启后写入 data_dir/cache/analysis，重启后保留、多worker共享
+    
+    # 认证：已验证token缓存条目数
+    token_cache_size: int = 1024
+    
     # FFmpeg
     ffmpeg_bin: str = "ffmpeg"
     ffprobe_bin: str = "ffprobe"
     
+    # Pipeline 阻塞步骤（ffmpeg、场景检测、文件复制）线程池大小
+    pipeline_executor_workers: int = 4
+    
+    # Job队列
+    job_worker_concurrency: int = 2  # 同时执行的Job数量
+    job_lease_seconds: float = 120.0  # 租约时长，超时未续期视为孤儿Job
+    job_heartbeat_seconds: float = 30.0  # 心跳续期间隔
+    job_queue_poll_seconds: float = 5.0  # 空闲时轮询队列的间隔
+    job_max_attempts: int = 3  # 孤儿Job最多重新排队次数
+    
     # 服务配置
     api_host: str = "0.0.0.0"
     api_port: int = 8000
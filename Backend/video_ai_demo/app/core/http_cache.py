@@ -0,0 +1,156 @@
+"""HTTP条件请求与响应缓存
+
+前端会反复轮询 Job 详情和分析结果，而结果在大多数轮询之间并未变化：
+- ETag 由资源版本（状态、updated_at 等）生成，If-None-Match 命中时直接返回 304，
+  不读取、不解析大字段
+- 已完成的结果以序列化后的字节（以及预先 gzip 的版本）缓存在有界 LRU 中，
+  重复获取跳过数据库解码、JSON 编码和压缩
+"""
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+
+# 小于该大小的响应不压缩
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+
+
+class EncodedBody(NamedTuple):
+    """序列化后的响应体（及其gzip版本）"""
+    raw: bytes
+    gzipped: Optional[bytes]
+
+
+def make_etag(*parts: Any) -> str:
+    """根据标识资源版本的字段生成弱ETag（同一版本按 Accept-Encoding 返回gzip或原文，字节不同）"""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match 是否与当前ETag匹配"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # 弱比较：W/"x" 与 "x" 视为相同
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in header.split(",")
+    )
+
+
+def not_modified(etag: str) -> Response:
+    """304响应"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def encode_body(content: Any) -> EncodedBody:
+    """JSON编码，足够大时同时生成gzip版本"""
+    raw = json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+    gzipped = gzip.compress(raw, GZIP_LEVEL) if len(raw) >= GZIP_MIN_SIZE else None
+    return EncodedBody(raw, gzipped)
+
+
+def encoded_response(request: Request, body: EncodedBody, etag: str) -> Response:
+    """返回已编码的响应体，客户端支持时返回gzip版本"""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding"
+    }
+    content = body.raw
+    if body.gzipped is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        content = body.gzipped
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    """以ETag为键的已编码响应LRU
+
+    ETag 随资源版本变化，旧版本的条目无需显式失效，自然被淘汰。
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, EncodedBody]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # 计数器
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _size(body: EncodedBody) -> int:
+        return len(body.raw) + len(body.gzipped or b"")
+
+    def get(self, etag: str) -> Optional[EncodedBody]:
+        """读取缓存的响应体"""
+        with self._lock:
+            body = self._entries.get(etag)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(etag)
+            self.hits += 1
+            return body
+
+    def put(self, etag: str, body: EncodedBody):
+        """写入缓存，超出条目数或字节数时淘汰最久未使用的条目"""
+        size = self._size(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(etag, None)
+            if old is not None:
+                self._bytes -= self._size(old)
+            self._entries[etag] = body
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._size(evicted)
+
+    def get_or_encode(
+        self,
+        etag: str,
+        build: Callable[[], Any],
+        cacheable: bool = True
+    ) -> EncodedBody:
+        """命中则返回缓存，否则构建、编码并（可选）缓存"""
+        body = self.get(etag)
+        if body is None:
+            body = encode_body(build())
+            if cacheable:
+                self.put(etag, body)
+        return body
+
+    def metrics(self) -> Dict[str, Any]:
+        """缓存指标"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+# 全局响应缓存（Job详情与分析结果）
+response_cache = ResponseCache()
@@ -1,5 +1,5 @@
 """数据库模型"""
-from sqlalchemy import Column, String, Integer, Float, Text, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, String, Integer, Float, Text, DateTime, Boolean, ForeignKey, UniqueConstraint, Index, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -26,6 +26,14 @@ class JobMode(str, enum.Enum):
 class Job(Base):
     """Job表"""
     __tablename__ = "jobs"
+    __table_args__ = (
+        # 队列领取：WHERE status='queued' ORDER BY priority DESC, created_at
+        Index("ix_jobs_queue", "status", "priority", "created_at"),
+        # 历史/项目列表：ORDER BY created_at DESC
+        Index("ix_jobs_created_at", "created_at"),
+        # 按状态列出/统计
+        Index("ix_jobs_status_created_at", "status", "created_at"),
+    )
     
     id = Column(String, primary_key=True)
     mode = Column(SQLEnum(JobMode), nullable=False)
@@ -47,6 +55,18 @@ class Job(Base):
     learning_points_json = Column(Text)  # 学习要点JSON数组
     thumbnail_url = Column(String)  # 缩略图URL（可选）
     
+    # 结果摘要（保存结果时写入，列表查询无需解析result_json）
+    segment_count = Column(Integer)  # 镜头数量
+    duration_ms = Column(Float)  # 视频时长（最后一个镜头的end_ms）
+    feature_count = Column(Integer)  # 特征总数
+    
+    # 队列
+    config_json = Column(Text)  # Job配置JSON（用于排队执行和重启恢复）
+    priority = Column(Integer, default=0, nullable=False)  # 优先级（越大越先执行）
+    attempts = Column(Integer, default=0, nullable=False)  # 已执行次数
+    lease_owner = Column(String)  # 持有租约的worker
+    lease_expires_at = Column(DateTime)  # 租约到期时间（心跳续期）
+    
     # 时间戳
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -56,6 +76,46 @@ class Job(Base):
     # 关联
     assets = relationship("Asset", back_populates="job", cascade="all, delete-orphan")
     artifacts = relationship("Artifact", back_populates="job", cascade="all, delete-orphan")
+    partial_segments = relationship("JobSegment", back_populates="job", cascade="all, delete-orphan")
+
+
+class JobSegment(Base):
+    """Job片段表（流式部分结果，每个片段一行，只写变化的片段）"""
+    __tablename__ = "job_segments"
+    __table_args__ = (
+        UniqueConstraint("job_id", "segment_id", name="uq_job_segments_job_segment"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(String, ForeignKey("jobs.id"), nullable=False, index=True)
+    segment_id = Column(String, nullable=False)
+    position = Column(Integer, nullable=False, default=0)  # 片段顺序
+    analyzing = Column(Boolean, default=True)  # 是否仍在分析中
+    segment_json = Column(Text)  # 单个片段JSON
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # 关联
+    job = relationship("Job", back_populates="partial_segments")
+
+
+class JobStatusCount(Base):
+    """Job状态计数表（仪表板聚合，随状态变化增量更新）"""
+    __tablename__ = "job_status_counts"
+    
+    status = Column(String, primary_key=True)  # JobStatus.value
+    count = Column(Integer, default=0, nullable=False)
+
+
+class JobDailyStats(Base):
+    """Job每日统计表（仪表板聚合，按创建日期增量更新）"""
+    __tablename__ = "job_daily_stats"
+    
+    day = Column(String, primary_key=True)  # YYYY-MM-DD（UTC）
+    created_count = Column(Integer, default=0, nullable=False)  # 当天创建的Job数
+    succeeded_count = Column(Integer, default=0, nullable=False)  # 其中已成功的Job数
+    duration_ms = Column(Float, default=0.0, nullable=False)  # 成功Job的视频总时长
+    feature_count = Column(Integer, default=0, nullable=False)  # 成功Job的特征总数
 
 
 class AssetRole(str, enum.Enum):
@@ -1,29 +1,75 @@
 """数据仓储层"""
-from sqlalchemy.orm import Session
-from typing import Optional, List
-from datetime import datetime
+from sqlalchemy import func, case
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, defer
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime, timedelta
 import json
 
-from .models import Job, JobStatus, Asset, Artifact, VirtualMotionJob
+from .models import (
+    Job, JobStatus, JobSegment, JobStatusCount, JobDailyStats,
+    Asset, Artifact, VirtualMotionJob
+)
 from ..core.errors import JobNotFoundError
 
 
+# 列表查询不需要的大字段，延迟加载
+_LIST_DEFERRED_COLUMNS = (
+    Job.result_json,
+    Job.partial_result_json,
+    Job.config_json,
+    Job.error_details,
+)
+
+
+def summarize_result(result: dict) -> Dict[str, Any]:
+    """从Job结果中提取摘要字段（segment_count、duration_ms、feature_count）"""
+    segments = (result.get("target") or {}).get("segments") or []
+    return {
+        "segment_count": len(segments),
+        "duration_ms": segments[-1].get("end_ms", 0) if segments else None,
+        "feature_count": sum(len(seg.get("features") or []) for seg in segments)
+    }
+
+
 class JobRepository:
     """Job仓储"""
     
     def __init__(self, db: Session):
         self.db = db
+        self.stats = DashboardStatsRepository(db)
     
     def create(self, job: Job) -> Job:
         """创建Job"""
         self.db.add(job)
         self.db.flush()
+        self.stats.record_created(job)
         return job
     
     def get(self, job_id: str) -> Optional[Job]:
         """获取Job"""
         return self.db.query(Job).filter(Job.id == job_id).first()
     
+    def get_version(self, job_id: str) -> Optional[Tuple]:
+        """
+        Job当前版本（用于ETag），只读取少量列，不加载结果大字段
+        
+        运行中的Job还包含流式片段的最新更新时间与数量。
+        不存在时返回None。
+        """
+        row = self.db.query(Job.status, Job.updated_at).filter(Job.id == job_id).first()
+        if row is None:
+            return None
+        
+        version = (row.status.value, row.updated_at)
+        if row.status == JobStatus.RUNNING:
+            latest, count = self.db.query(
+                func.max(JobSegment.updated_at),
+                func.count(JobSegment.id)
+            ).filter(JobSegment.job_id == job_id).one()
+            version += (latest, count)
+        return version
+    
     def get_or_raise(self, job_id: str) -> Job:
         """获取Job，不存在则抛异常"""
         job = self.get(job_id)
@@ -40,7 +86,7 @@ class JobRepository:
     ) -> Job:
         """更新Job状态"""
         job = self.get_or_raise(job_id)
-        job.status = status
+        self._set_status(job, status)
         job.updated_at = datetime.utcnow()
         
         if status == JobStatus.RUNNING and not job.started_at:
@@ -48,6 +94,8 @@ class JobRepository:
         
         if status in [JobStatus.SUCCEEDED, JobStatus.FAILED]:
             job.completed_at = datetime.utcnow()
+            job.lease_owner = None
+            job.lease_expires_at = None
         
         if error_message:
             job.error_message = error_message
@@ -78,6 +126,18 @@ class JobRepository:
         """保存Job最终结果"""
         job = self.get_or_raise(job_id)
         job.result_json = json.dumps(result, ensure_ascii=False)
+        summary = summarize_result(result)
+        
+        # 已成功的Job重新保存结果时，聚合中扣除旧摘要
+        succeeded = job.status == JobStatus.SUCCEEDED
+        if succeeded:
+            self.stats.record_succeeded(job, sign=-1)
+        job.segment_count = summary["segment_count"]
+        job.duration_ms = summary["duration_ms"]
+        job.feature_count = summary["feature_count"]
+        if succeeded:
+            self.stats.record_succeeded(job, sign=1)
+        
         job.updated_at = datetime.utcnow()
         self.db.flush()
         return job
@@ -90,6 +150,90 @@ class JobRepository:
         self.db.flush()
         return job
     
+    def save_partial_segments(
+        self,
+        job_id: str,
+        segments: List[Dict[str, Any]],
+        start_position: int = 0
+    ) -> int:
+        """
+        按片段写入部分结果（只写传入的片段，已存在则更新）
+        
+        Args:
+            job_id: Job ID
+            segments: 新增或变化的片段
+            start_position: 第一个片段在完整列表中的位置
+        
+        Returns:
+            写入的片段数量
+        """
+        if not segments:
+            return 0
+        
+        segment_ids = [seg["segment_id"] for seg in segments]
+        existing = {
+            row.segment_id: row
+            for row in self.db.query(JobSegment).filter(
+                JobSegment.job_id == job_id,
+                JobSegment.segment_id.in_(segment_ids)
+            )
+        }
+        
+        now = datetime.utcnow()
+        for offset, segment in enumerate(segments):
+            row = existing.get(segment["segment_id"])
+            if row is None:
+                row = JobSegment(
+                    job_id=job_id,
+                    segment_id=segment["segment_id"],
+                    position=start_position + offset
+                )
+                self.db.add(row)
+            row.analyzing = bool(segment.get("analyzing", False))
+            row.segment_json = json.dumps(segment, ensure_ascii=False)
+            row.updated_at = now
+        
+        self.db.flush()
+        return len(segments)
+    
+    def get_partial_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """按需物化当前的部分结果视图"""
+        rows = self.db.query(JobSegment).filter(
+            JobSegment.job_id == job_id
+        ).order_by(JobSegment.position).all()
+        
+        if not rows:
+            # 兼容旧数据：整体保存的部分结果
+            job = self.get(job_id)
+            if job and job.partial_result_json:
+                return json.loads(job.partial_result_json)
+            return None
+        
+        job = self.get(job_id)
+        return {
+            "mode": job.mode.value if job else "learn",
+            "target": {
+                "segments": [json.loads(row.segment_json) for row in rows],
+                "detection_method": self._detection_method(job),
+                "analyzing": any(row.analyzing for row in rows)
+            }
+        }
+    
+    @staticmethod
+    def _detection_method(job: Optional[Job]) -> str:
+        """从Job配置推断场景检测方式（与Orchestrator的默认值一致）"""
+        config = json.loads(job.config_json) if job and job.config_json else {}
+        use_cv = config.get("options", {}).get("scene_detection", {}).get("use_cv", True)
+        return "cv" if use_cv else "llm"
+    
+    def clear_partial_segments(self, job_id: str) -> int:
+        """清理片段行（Job结束后或重新执行前）"""
+        count = self.db.query(JobSegment).filter(
+            JobSegment.job_id == job_id
+        ).delete(synchronize_session=False)
+        self.db.flush()
+        return count
+    
     def update_summary(
         self,
         job_id: str,
@@ -109,21 +253,138 @@ class JobRepository:
         self.db.flush()
         return job
     
+    def enqueue(self, job_id: str, config: dict, priority: int = 0) -> Job:
+        """将Job及其配置写入队列"""
+        job = self.get_or_raise(job_id)
+        self._set_status(job, JobStatus.QUEUED)
+        job.config_json = json.dumps(config, ensure_ascii=False)
+        job.priority = priority
+        job.lease_owner = None
+        job.lease_expires_at = None
+        job.partial_result_json = None
+        job.updated_at = datetime.utcnow()
+        self.clear_partial_segments(job_id)
+        return job
+    
+    def claim_next(self, worker_id: str, lease_seconds: float) -> Optional[Job]:
+        """
+        领取优先级最高、最早入队的Job并加租约
+        
+        通过带状态条件的UPDATE保证同一Job只会被一个worker领取。
+        """
+        candidate = self.db.query(Job.id).filter(
+            Job.status == JobStatus.QUEUED,
+            Job.config_json.isnot(None)
+        ).order_by(Job.priority.desc(), Job.created_at).first()
+        
+        if not candidate:
+            return None
+        
+        now = datetime.utcnow()
+        claimed = self.db.query(Job).filter(
+            Job.id == candidate.id,
+            Job.status == JobStatus.QUEUED
+        ).update({
+            Job.status: JobStatus.RUNNING,
+            Job.lease_owner: worker_id,
+            Job.lease_expires_at: now + timedelta(seconds=lease_seconds),
+            Job.attempts: Job.attempts + 1,
+            Job.started_at: func.coalesce(Job.started_at, now),
+            Job.updated_at: now
+        }, synchronize_session=False)
+        self.db.flush()
+        
+        if not claimed:
+            return None
+        self.stats.record_status_change(None, JobStatus.QUEUED, JobStatus.RUNNING)
+        return self.get(candidate.id)
+    
+    def renew_lease(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """心跳续期，租约已被他人接管时返回False"""
+        renewed = self.db.query(Job).filter(
+            Job.id == job_id,
+            Job.status == JobStatus.RUNNING,
+            Job.lease_owner == worker_id
+        ).update({
+            Job.lease_expires_at: datetime.utcnow() + timedelta(seconds=lease_seconds)
+        }, synchronize_session=False)
+        self.db.flush()
+        return bool(renewed)
+    
+    def requeue(self, job_id: str, count_attempt: bool = True) -> Job:
+        """
+        释放租约并重新排队（丢弃上一次执行的部分结果）
+        
+        Args:
+            job_id: Job ID
+            count_attempt: 是否计入重试次数；优雅停机时为False，
+                归还claim_next计入的那一次，避免正常重启耗尽重试次数
+        """
+        job = self.get_or_raise(job_id)
+        self._set_status(job, JobStatus.QUEUED)
+        if not count_attempt and job.attempts:
+            job.attempts -= 1
+        job.lease_owner = None
+        job.lease_expires_at = None
+        job.partial_result_json = None
+        job.updated_at = datetime.utcnow()
+        self.clear_partial_segments(job_id)
+        return job
+    
+    def recover_orphaned(self, max_attempts: int) -> Tuple[List[str], List[str]]:
+        """
+        恢复租约过期的RUNNING Job（进程崩溃或重启遗留）
+        
+        Returns:
+            (重新排队的Job ID, 标记失败的Job ID)
+        """
+        now = datetime.utcnow()
+        orphans = self.db.query(Job).filter(
+            Job.status == JobStatus.RUNNING,
+            (Job.lease_expires_at.is_(None)) | (Job.lease_expires_at < now)
+        ).all()
+        
+        requeued, failed = [], []
+        for job in orphans:
+            if job.config_json and (job.attempts or 0) < max_attempts:
+                self.requeue(job.id)
+                requeued.append(job.id)
+            else:
+                self.update_status(
+                    job.id,
+                    JobStatus.FAILED,
+                    error_message="任务执行中断，且无法恢复",
+                    error_details={"exception": "OrphanedJob", "attempts": job.attempts or 0}
+                )
+                failed.append(job.id)
+        return requeued, failed
+    
+    def count_queued_by_priority(self) -> Dict[int, int]:
+        """按优先级统计排队中的Job数量"""
+        rows = self.db.query(Job.priority, func.count(Job.id)).filter(
+            Job.status == JobStatus.QUEUED
+        ).group_by(Job.priority).all()
+        return {priority or 0: count for priority, count in rows}
+    
+    def _list_query(self):
+        """列表查询（延迟加载大字段）"""
+        return self.db.query(Job).options(*(defer(col) for col in _LIST_DEFERRED_COLUMNS))
+    
     def list_history(self, limit: int = 50, offset: int = 0) -> List[Job]:
         """获取历史记录列表"""
-        return self.db.query(Job).order_by(Job.created_at.desc()).offset(offset).limit(limit).all()
+        return self._list_query().order_by(Job.created_at.desc()).offset(offset).limit(limit).all()
     
     def count_by_status(self) -> dict:
-        """按状态统计Job数量"""
-        result = {}
-        for status in JobStatus:
-            count = self.db.query(Job).filter(Job.status == status).count()
+        """按状态统计Job数量（单次GROUP BY）"""
+        result = {status: 0 for status in JobStatus}
+        rows = self.db.query(Job.status, func.count(Job.id)).group_by(Job.status).all()
+        for status, count in rows:
             result[status] = count
         return result
     
     def list_by_status(self, status: JobStatus, limit: int = 100) -> List[Job]:
         """按状态列出Job"""
-        return self.db.query(Job).filter(Job.status == status).order_by(Job.created_at.desc()).limit(limit).all()
+        return self._list_query().filter(Job.status == status).order_by(Job.created_at.desc()).limit(limit).all()
     
     def count_all(self) -> int:
         """统计所有Job数量"""
@@ -134,9 +395,145 @@ class JobRepository:
         job = self.get(job_id)
         if not job:
             return False
+        self.stats.record_deleted(job)
         self.db.delete(job)
         self.db.flush()
         return True
+    
+    def _set_status(self, job: Job, status: JobStatus):
+        """修改状态并同步仪表板聚合"""
+        old_status = job.status
+        job.status = status
+        if old_status != status:
+            self.stats.record_status_change(job, old_status, status)
+
+
+class DashboardStatsRepository:
+    """仪表板聚合仓储（状态计数与每日统计，随Job变化增量更新）"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    # ===== 增量更新 =====
+    
+    def record_created(self, job: Job):
+        """新建Job"""
+        self._bump_status(job.status, 1)
+        self._bump_day(job.created_at, created_count=1)
+    
+    def record_status_change(
+        self,
+        job: Optional[Job],
+        old_status: Optional[JobStatus],
+        new_status: JobStatus
+    ):
+        """Job状态变化（job仅在涉及SUCCEEDED时需要）"""
+        if old_status is not None:
+            self._bump_status(old_status, -1)
+        self._bump_status(new_status, 1)
+        
+        if job is not None and old_status == JobStatus.SUCCEEDED:
+            self.record_succeeded(job, sign=-1)
+        if job is not None and new_status == JobStatus.SUCCEEDED:
+            self.record_succeeded(job, sign=1)
+    
+    def record_succeeded(self, job: Job, sign: int = 1):
+        """计入（sign=-1时扣除）一个成功Job的摘要"""
+        self._bump_day(
+            job.created_at,
+            succeeded_count=sign,
+            duration_ms=sign * (job.duration_ms or 0.0),
+            feature_count=sign * (job.feature_count or 0)
+        )
+    
+    def record_deleted(self, job: Job):
+        """删除Job"""
+        self._bump_status(job.status, -1)
+        self._bump_day(job.created_at, created_count=-1)
+        if job.status == JobStatus.SUCCEEDED:
+            self.record_succeeded(job, sign=-1)
+    
+    def rebuild(self):
+        """从jobs表全量重建聚合（启动时校正）"""
+        self.db.query(JobStatusCount).delete(synchronize_session=False)
+        self.db.query(JobDailyStats).delete(synchronize_session=False)
+        
+        for status, count in self.db.query(Job.status, func.count(Job.id)).group_by(Job.status):
+            self.db.add(JobStatusCount(status=status.value, count=count))
+        
+        day = func.date(Job.created_at)
+        succeeded = Job.status == JobStatus.SUCCEEDED
+        rows = self.db.query(
+            day,
+            func.count(Job.id),
+            func.sum(case((succeeded, 1), else_=0)),
+            func.sum(case((succeeded, func.coalesce(Job.duration_ms, 0)), else_=0)),
+            func.sum(case((succeeded, func.coalesce(Job.feature_count, 0)), else_=0))
+        ).filter(Job.created_at.isnot(None)).group_by(day)
+        for day_key, created, succeeded_count, duration_ms, feature_count in rows:
+            self.db.add(JobDailyStats(
+                day=day_key,
+                created_count=created,
+                succeeded_count=succeeded_count or 0,
+                duration_ms=duration_ms or 0.0,
+                feature_count=feature_count or 0
+            ))
+        self.db.flush()
+    
+    # ===== 查询 =====
+    
+    def get_status_counts(self) -> Dict[JobStatus, int]:
+        """各状态Job数量"""
+        result = {status: 0 for status in JobStatus}
+        for row in self.db.query(JobStatusCount):
+            result[JobStatus(row.status)] = row.count
+        return result
+    
+    def get_totals(self) -> Dict[str, float]:
+        """成功Job的总时长与特征总数"""
+        duration_ms, feature_count = self.db.query(
+            func.coalesce(func.sum(JobDailyStats.duration_ms), 0),
+            func.coalesce(func.sum(JobDailyStats.feature_count), 0)
+        ).one()
+        return {"duration_ms": float(duration_ms), "feature_count": int(feature_count)}
+    
+    def get_daily_created(self, since: datetime) -> Dict[str, int]:
+        """某日期之后每天创建的Job数（day -> count）"""
+        rows = self.db.query(JobDailyStats.day, JobDailyStats.created_count).filter(
+            JobDailyStats.day >= since.strftime("%Y-%m-%d")
+        )
+        return {day: count for day, count in rows}
+    
+    # ===== 内部实现 =====
+    
+    def _bump_status(self, status: JobStatus, delta: int):
+        """原子地增减状态计数"""
+        stmt = sqlite_insert(JobStatusCount).values(status=status.value, count=delta)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[JobStatusCount.status],
+            set_={"count": JobStatusCount.count + stmt.excluded.count}
+        )
+        self.db.execute(stmt)
+    
+    def _bump_day(self, created_at: Optional[datetime], **deltas):
+        """原子地增减某天的统计"""
+        day = (created_at or datetime.utcnow()).strftime("%Y-%m-%d")
+        values = {
+            "created_count": 0,
+            "succeeded_count": 0,
+            "duration_ms": 0.0,
+            "feature_count": 0,
+            **deltas
+        }
+        stmt = sqlite_insert(JobDailyStats).values(day=day, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[JobDailyStats.day],
+            set_={
+                name: getattr(JobDailyStats, name) + getattr(stmt.excluded, name)
+                for name in values
+            }
+        )
+        self.db.execute(stmt)
 
 
 class AssetRepository:
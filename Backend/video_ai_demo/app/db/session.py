@@ -1,5 +1,5 @@
 """数据库会话管理"""
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
 from typing import Generator
@@ -10,10 +10,32 @@ from .models import Base
 # 创建引擎
 engine = create_engine(
     f"sqlite:///{settings.sqlite_path}",
-    connect_args={"check_same_thread": False},
+    connect_args={
+        "check_same_thread": False,
+        "timeout": settings.sqlite_busy_timeout_ms / 1000
+    },
     echo=False
 )
 
+
+@event.listens_for(engine, "connect")
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """每个新连接应用调优参数
+
+    WAL 模式下读者不阻塞写者，进度写入期间列表/详情/SSE 查询可以并发进行；
+    busy_timeout 让偶发的写锁竞争等待而不是直接报 "database is locked"。
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        # 负值表示以 KiB 为单位
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kb)}")
+    finally:
+        cursor.close()
+
 # 会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -21,6 +43,11 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 def init_db():
     """初始化数据库"""
     Base.metadata.create_all(bind=engine)
+    
+    # 启动时从jobs表重建仪表板聚合，之后随Job变化增量更新
+    from .repo import DashboardStatsRepository
+    with get_db() as db:
+        DashboardStatsRepository(db).rebuild()
 
 
 @contextmanager
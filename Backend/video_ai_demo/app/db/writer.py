@@ -0,0 +1,169 @@
+"""单写线程（合并高频写入）
+
+SQLite 同一时间只允许一个写事务。多个 Job 并发运行时，每次进度/片段更新
+各自开一个事务会互相争抢写锁并各自 fsync。这里把这些高频、可合并的写操作
+交给一个专用线程：在短时间窗口内攒批，放进同一个事务一次提交。
+WAL 模式下读请求（列表、详情、SSE）与写线程并发，不受影响。
+
+写操作是 ``Callable[[Session], Any]``，提交后返回 ``concurrent.futures.Future``，
+调用方通常不等待结果；需要保证先后顺序时（例如写入终态前）调用 ``flush()``
+等待之前提交的写操作全部落盘。
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .session import get_db
+from ..core.config import settings
+from ..core.logging import logger
+
+
+WriteOp = Callable[[Session], Any]
+
+# 停止信号
+_STOP = object()
+
+
+class DBWriteQueue:
+    """单写线程与批量事务"""
+
+    def __init__(
+        self,
+        max_batch: Optional[int] = None,
+        max_delay_ms: Optional[float] = None,
+        session_scope: Callable[[], ContextManager[Session]] = get_db
+    ):
+        self.session_scope = session_scope
+        self.max_batch = max_batch or settings.sqlite_write_batch_size
+        self.max_delay = (
+            max_delay_ms if max_delay_ms is not None else settings.sqlite_write_batch_delay_ms
+        ) / 1000
+
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        # 计数器
+        self._stats = {
+            "submitted": 0,
+            "written": 0,
+            "failed": 0,
+            "batches": 0,
+            "fallbacks": 0,
+            "max_batch_size": 0
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动写线程（重复调用无副作用）"""
+        with self._lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="sqlite-writer", daemon=True
+            )
+            self._thread.start()
+        logger.info(
+            f"SQLite写线程已启动: max_batch={self.max_batch}, "
+            f"max_delay={self.max_delay * 1000:.0f}ms"
+        )
+
+    def stop(self, timeout: Optional[float] = 10.0):
+        """写完已提交的操作后停止"""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+        thread.join(timeout)
+        with self._lock:
+            self._thread = None
+        logger.info("SQLite写线程已停止")
+
+    def submit(self, op: WriteOp) -> Future:
+        """提交写操作；写线程未启动时在当前线程直接执行"""
+        future: Future = Future()
+        self._stats["submitted"] += 1
+
+        if not self.running:
+            self._execute_batch([(op, future)])
+            return future
+
+        self._queue.put((op, future))
+        return future
+
+    def flush(self) -> Future:
+        """返回一个在此前提交的写操作全部完成后完成的 Future"""
+        return self.submit(lambda db: None)
+
+    def metrics(self) -> Dict[str, Any]:
+        """写线程指标"""
+        batches = self._stats["batches"]
+        return {
+            "running": self.running,
+            "pending": self._queue.qsize(),
+            "avg_batch_size": round(self._stats["written"] / batches, 2) if batches else 0,
+            **self._stats
+        }
+
+    def _run(self):
+        """写线程主循环：阻塞等第一个操作，再在时间窗口内攒批"""
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._execute_batch(batch)
+            if stop:
+                return
+
+    def _execute_batch(self, batch: List[Tuple[WriteOp, Future]]):
+        """整批放在一个事务里提交；失败时逐个重试，隔离出错的操作"""
+        try:
+            results = []
+            with self.session_scope() as db:
+                for op, _ in batch:
+                    results.append(op(db))
+        except Exception as e:
+            if len(batch) == 1:
+                self._stats["failed"] += 1
+                logger.error(f"SQLite写操作失败: {str(e)}")
+                batch[0][1].set_exception(e)
+                return
+
+            self._stats["fallbacks"] += 1
+            logger.warning(f"批量写入失败，逐个重试{len(batch)}个操作: {str(e)}")
+            for item in batch:
+                self._execute_batch([item])
+            return
+
+        self._stats["batches"] += 1
+        self._stats["written"] += len(batch)
+        self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(batch))
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+# 全局写线程
+db_writer = DBWriteQueue()
@@ -17,6 +17,9 @@ from .api import (
     routes_user
 )
 from .db.session import init_db
+from .db.writer import db_writer
+from .pipeline.job_queue import job_queue
+from .pipeline.executor import shutdown_executor
 from .core.config import settings
 from .core.logging import logger
 
@@ -27,11 +30,17 @@ async def lifespan(app: FastAPI):
     # 启动时
     logger.info("初始化数据库...")
     init_db()
+    db_writer.start()
+    logger.info("启动Job队列...")
+    await job_queue.start()
     logger.info("应用启动完成")
     
     yield
     
     # 关闭时
+    await job_queue.stop()
+    db_writer.stop()
+    shutdown_executor()
     logger.info("应用关闭")
 
 
@@ -0,0 +1,213 @@
+"""Job进度事件总线（进程内发布/订阅）
+
+Orchestrator 在更新进度/片段时发布事件，SSE 处理器订阅事件，
+不再每秒轮询数据库。每个事件只编码一次，所有订阅者共享同一个 SSE 帧。
+总线同时保存运行中 Job 的最新快照，晚加入的订阅者直接从内存获得当前视图，
+只有总线不认识的 Job（已结束或运行在其他进程）才回退读取数据库。
+"""
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Set
+
+from ..core.logging import logger
+
+
+def format_sse(payload: Dict[str, Any], event: Optional[str] = None) -> str:
+    """编码一个 SSE 帧"""
+    data = json.dumps(payload, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {data}\n\n"
+    return f"data: {data}\n\n"
+
+
+@dataclass
+class JobStreamState:
+    """运行中 Job 的内存快照"""
+    status: str = "running"
+    progress: Optional[Dict[str, Any]] = None
+    # segment_id -> segment（保持插入顺序）
+    segments: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+
+class JobEventBus:
+    """进程内 Job 事件总线"""
+
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._states: Dict[str, JobStreamState] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # ===== 订阅端 =====
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        """订阅 Job 事件，返回接收 SSE 帧的队列"""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        """取消订阅"""
+        subscribers = self._subscribers.get(job_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[job_id]
+
+    def is_tracking(self, job_id: str) -> bool:
+        """总线是否持有该 Job 的实时状态（即 Job 正在本进程中运行）"""
+        return job_id in self._states
+
+    def snapshot(self, job_id: str) -> Optional[List[str]]:
+        """当前视图的 SSE 帧（供晚加入的订阅者使用），未知 Job 返回 None"""
+        state = self._states.get(job_id)
+        if state is None:
+            return None
+        return self._snapshot_frames(state)
+
+    def subscriber_count(self, job_id: str) -> int:
+        """订阅者数量"""
+        return len(self._subscribers.get(job_id, ()))
+
+    # ===== 发布端 =====
+
+    def publish_progress(self, job_id: str, stage: str, percent: float, message: str):
+        """发布进度更新"""
+        state = self._states.setdefault(job_id, JobStreamState())
+        progress = {"stage": stage, "percent": percent or 0, "message": message or ""}
+        if state.progress == progress:
+            return
+        state.progress = progress
+        self._broadcast(job_id, format_sse({
+            "type": "progress",
+            "status": state.status,
+            "progress": progress
+        }))
+
+    def publish_segments(self, job_id: str, segments: List[Dict[str, Any]]):
+        """发布片段更新（新增或变化的片段），只推送增量"""
+        state = self._states.setdefault(job_id, JobStreamState())
+
+        changed = []
+        for segment in segments:
+            segment_id = segment.get("segment_id")
+            if state.segments.get(segment_id) != segment:
+                state.segments[segment_id] = segment
+                changed.append(segment)
+
+        if not changed:
+            return
+
+        self._broadcast(job_id, format_sse({
+            "type": "segments_delta",
+            "status": state.status,
+            "segments": changed,
+            "total": len(state.segments)
+        }))
+
+    def publish_complete(self, job_id: str, result: Optional[Dict[str, Any]]):
+        """发布完成事件并释放内存状态"""
+        frames = []
+        if result is not None:
+            frames.append(format_sse({
+                "type": "complete",
+                "status": "succeeded",
+                "result": result
+            }))
+        frames.append(format_sse({"status": "succeeded"}, event="done"))
+        self._finish(job_id, frames)
+
+    def publish_failed(
+        self,
+        job_id: str,
+        message: str,
+        details: Optional[Dict[str, Any]] = None
+    ):
+        """发布失败事件并释放内存状态"""
+        frames = [
+            format_sse({
+                "type": "error",
+                "status": "failed",
+                "error": {"message": message or "任务失败", "details": details}
+            }),
+            format_sse({"status": "failed"}, event="done")
+        ]
+        self._finish(job_id, frames)
+
+    def release(self, job_id: str):
+        """Job 在本进程中止（被取消、重新排队）时释放内存状态，不推送终止帧
+
+        订阅者随后按未跟踪的 Job 处理，回退读取数据库。
+        """
+        self._states.pop(job_id, None)
+
+    # ===== 内部实现 =====
+
+    def _finish(self, job_id: str, frames: List[str]):
+        """推送终止帧，Job 结束后由数据库服务晚加入者"""
+        for frame in frames:
+            self._broadcast(job_id, frame)
+        self._states.pop(job_id, None)
+
+    def _snapshot_frames(self, state: JobStreamState) -> List[str]:
+        """根据内存状态构建完整视图"""
+        frames = []
+        if state.progress:
+            frames.append(format_sse({
+                "type": "progress",
+                "status": state.status,
+                "progress": state.progress
+            }))
+        if state.segments:
+            segments = list(state.segments.values())
+            frames.append(format_sse({
+                "type": "segments",
+                "status": state.status,
+                "segments": segments,
+                "total": len(segments)
+            }))
+        return frames
+
+    def _broadcast(self, job_id: str, frame: str):
+        """把同一个已编码帧投递给所有订阅者"""
+        subscribers = self._subscribers.get(job_id)
+        if not subscribers:
+            return
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if self._loop is not None and running_loop is not self._loop:
+            # 从工作线程发布时切回事件循环
+            self._loop.call_soon_threadsafe(self._deliver, job_id, frame)
+        else:
+            self._deliver(job_id, frame)
+
+    def _deliver(self, job_id: str, frame: str):
+        """投递到各订阅队列；慢订阅者溢出时用完整快照重新同步"""
+        for queue in list(self._subscribers.get(job_id, ())):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                logger.warning(f"Job {job_id} 的SSE订阅者积压，重新同步快照")
+                self._resync(job_id, queue, frame)
+
+    def _resync(self, job_id: str, queue: asyncio.Queue, frame: str):
+        """清空积压的增量，改投完整快照"""
+        while not queue.empty():
+            queue.get_nowait()
+        state = self._states.get(job_id)
+        frames = self._snapshot_frames(state) if state else []
+        if frame not in frames:
+            frames.append(frame)
+        for item in frames[:self.queue_size]:
+            queue.put_nowait(item)
+
+
+# 全局事件总线
+job_event_bus = JobEventBus()
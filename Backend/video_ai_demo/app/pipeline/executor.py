@@ -0,0 +1,90 @@
+"""Pipeline阻塞步骤执行器
+
+ffmpeg/ffprobe 子进程、PySceneDetect 解码和文件复制都是阻塞调用，
+直接在 async 编排器中执行会卡住整个 uvicorn 事件循环（HTTP、SSE、鉴权全部停顿）。
+这里把它们派发到有界线程池（子进程与 OpenCV 解码期间会释放 GIL），
+并按步骤记录墙钟耗时。
+"""
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from ..core.config import settings
+from ..core.logging import logger
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# 步骤耗时统计: step -> {"count", "total_ms", "max_ms", "last_ms"}
+_step_stats: Dict[str, Dict[str, float]] = {}
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """获取（必要时创建）步骤线程池"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.pipeline_executor_workers,
+                    thread_name_prefix="pipeline-step"
+                )
+    return _executor
+
+
+def shutdown_executor(wait: bool = False):
+    """关闭线程池"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait, cancel_futures=True)
+            _executor = None
+
+
+async def run_blocking(step: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    在线程池中执行阻塞步骤并记录耗时
+    
+    Args:
+        step: 步骤名（用于耗时统计）
+        func: 阻塞函数
+    
+    Returns:
+        func 的返回值
+    """
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        return await loop.run_in_executor(
+            get_executor(),
+            functools.partial(func, *args, **kwargs)
+        )
+    finally:
+        _record_step(step, (time.perf_counter() - started) * 1000)
+
+
+def _record_step(step: str, elapsed_ms: float):
+    """记录一次步骤耗时"""
+    stats = _step_stats.setdefault(
+        step, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0}
+    )
+    stats["count"] += 1
+    stats["total_ms"] += elapsed_ms
+    stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+    stats["last_ms"] = elapsed_ms
+    logger.debug(f"步骤 {step} 耗时 {elapsed_ms:.0f}ms")
+
+
+def step_metrics() -> Dict[str, Dict[str, float]]:
+    """各步骤耗时统计（含平均值）"""
+    return {
+        step: {
+            **stats,
+            "avg_ms": stats["total_ms"] / stats["count"] if stats["count"] else 0.0
+        }
+        for step, stats in _step_stats.items()
+    }
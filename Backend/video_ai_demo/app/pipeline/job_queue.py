@@ -0,0 +1,214 @@
+"""持久化Job队列
+
+基于 SQLite jobs 表（QUEUED 状态）的有界工作池：
+- 固定数量的 worker 协程按优先级领取 Job，限制同时运行的 Pipeline 数量
+- 运行中的 Job 持有租约并定期心跳续期
+- 启动时（以及空闲轮询时）把租约过期的孤儿 RUNNING Job 重新排队
+"""
+import asyncio
+import json
+import os
+import socket
+import uuid
+from typing import Dict, Any, List, Optional
+
+from .orchestrator import PipelineOrchestrator, _run_job
+from ..db.session import get_db
+from ..db.repo import JobRepository
+from ..db.models import JobStatus
+from ..db.writer import db_writer
+from ..core.config import settings
+from ..core.logging import logger
+
+
+class JobQueue:
+    """Job队列与工作池"""
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        lease_seconds: Optional[float] = None,
+        heartbeat_seconds: Optional[float] = None,
+        poll_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None
+    ):
+        self.concurrency = concurrency or settings.job_worker_concurrency
+        self.lease_seconds = lease_seconds or settings.job_lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds or settings.job_heartbeat_seconds
+        self.poll_seconds = poll_seconds or settings.job_queue_poll_seconds
+        self.max_attempts = max_attempts or settings.job_max_attempts
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._lease_lost: set = set()
+        self._wakeup: Optional[asyncio.Event] = None
+
+        # 计数器
+        self._stats = {
+            "submitted": 0,
+            "started": 0,
+            "completed": 0,
+            "recovered": 0,
+            "abandoned": 0
+        }
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self):
+        """恢复孤儿Job并启动worker"""
+        if self._workers:
+            return
+
+        self._wakeup = asyncio.Event()
+        self.recover_orphaned()
+
+        for index in range(self.concurrency):
+            self._workers.append(asyncio.create_task(self._worker_loop(index)))
+
+        logger.info(f"Job队列已启动: worker={self.worker_id}, concurrency={self.concurrency}")
+
+    async def stop(self):
+        """停止worker，运行中的Job释放租约重新排队"""
+        job_ids = list(self._running.keys())
+
+        # 取消worker会一并取消其正在等待的Job任务
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._running.clear()
+
+        # 等待已提交的进度写入落盘后再重新排队，避免旧进度覆盖重置后的状态
+        await asyncio.wrap_future(db_writer.flush())
+
+        for job_id in job_ids:
+            with get_db() as db:
+                job_repo = JobRepository(db)
+                job = job_repo.get(job_id)
+                if job and job.status == JobStatus.RUNNING and job.lease_owner == self.worker_id:
+                    job_repo.requeue(job_id, count_attempt=False)
+                    logger.info(f"Job {job_id} 已释放租约并重新排队")
+
+        logger.info("Job队列已停止")
+
+    def submit(self, job_id: str, job_config: Dict[str, Any], priority: int = 0):
+        """写入队列并唤醒worker"""
+        with get_db() as db:
+            job_repo = JobRepository(db)
+            job_repo.enqueue(job_id, job_config, priority)
+
+        self._stats["submitted"] += 1
+        self.notify()
+
+    def notify(self):
+        """唤醒空闲worker"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def recover_orphaned(self):
+        """把租约过期的RUNNING Job重新排队（超过重试次数则标记失败）"""
+        with get_db() as db:
+            job_repo = JobRepository(db)
+            requeued, failed = job_repo.recover_orphaned(self.max_attempts)
+
+        if requeued or failed:
+            logger.warning(f"恢复孤儿Job: 重新排队{len(requeued)}个, 放弃{len(failed)}个")
+        self._stats["recovered"] += len(requeued)
+        self._stats["abandoned"] += len(failed)
+
+    def metrics(self) -> Dict[str, Any]:
+        """队列指标"""
+        with get_db() as db:
+            job_repo = JobRepository(db)
+            queued_by_priority = job_repo.count_queued_by_priority()
+
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "queue_depth": sum(queued_by_priority.values()),
+            "queued_by_priority": queued_by_priority,
+            "running": len(self._running),
+            "running_job_ids": list(self._running.keys()),
+            "idle_workers": max(self.concurrency - len(self._running), 0),
+            **self._stats
+        }
+
+    async def _worker_loop(self, index: int):
+        """worker：领取Job，执行，空闲时等待唤醒或轮询"""
+        while True:
+            try:
+                self._wakeup.clear()
+                job_id, job_config = self._claim()
+
+                if job_id is None:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                    except asyncio.TimeoutError:
+                        # 空闲时顺带接管其他进程遗留的孤儿Job
+                        self.recover_orphaned()
+                    continue
+
+                await self._execute(job_id, job_config)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {index} 异常: {str(e)}", exc_info=True)
+                await asyncio.sleep(self.poll_seconds)
+
+    def _claim(self):
+        """领取下一个Job"""
+        with get_db() as db:
+            job_repo = JobRepository(db)
+            job = job_repo.claim_next(self.worker_id, self.lease_seconds)
+            if job is None:
+                return None, None
+            return job.id, json.loads(job.config_json)
+
+    async def _execute(self, job_id: str, job_config: Dict[str, Any]):
+        """执行Job，期间心跳续期"""
+        logger.info(f"领取Job {job_id}")
+        self._stats["started"] += 1
+
+        orchestrator = PipelineOrchestrator(job_id, job_config)
+        task = asyncio.create_task(_run_job(job_id, orchestrator))
+        self._running[job_id] = task
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, task))
+
+        try:
+            await task
+        except asyncio.CancelledError:
+            if job_id not in self._lease_lost:
+                raise
+            logger.warning(f"Job {job_id} 已由其他worker接管")
+        finally:
+            heartbeat.cancel()
+            self._lease_lost.discard(job_id)
+            self._running.pop(job_id, None)
+            self._stats["completed"] += 1
+
+    async def _heartbeat(self, job_id: str, task: asyncio.Task):
+        """定期续期租约；租约被接管时取消本地执行"""
+        while not task.done():
+            await asyncio.sleep(self.heartbeat_seconds)
+            with get_db() as db:
+                job_repo = JobRepository(db)
+                renewed = job_repo.renew_lease(job_id, self.worker_id, self.lease_seconds)
+            if not renewed and not task.done():
+                logger.warning(f"Job {job_id} 租约已失效，停止本地执行")
+                self._lease_lost.add(job_id)
+                task.cancel()
+                return
+
+
+# 全局Job队列
+job_queue = JobQueue()
+
+
+async def submit_job(job_id: str, job_config: Dict[str, Any], priority: int = 0):
+    """提交Job到队列"""
+    logger.info(f"提交Job {job_id}, priority={priority}")
+    job_queue.submit(job_id, job_config, priority)
@@ -1,19 +1,24 @@
 """Pipeline编排器"""
 import asyncio
+import time
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable
 import uuid
 
 from .steps.ingest import ingest_video
 from .steps.extract_frames import extract_frames
-from .steps.scene_detect import detect_scenes
+from .steps.scene_detect import detect_scenes_and_sample_frames
 from .steps.mm_llm_decompose import decompose_with_mm_llm
 from .steps.artifacts import generate_artifacts
 from .steps.compare_map import map_segments
 from .steps.improve_steps import generate_improvements
 from .steps.format_analysis import generate_formatted_analysis
+from .events import job_event_bus
+from .executor import run_blocking
+from .progress import ProgressReporter
 
 from ..db.session import get_db
+from ..db.writer import db_writer
 from ..db.repo import JobRepository, AssetRepository, ArtifactRepository
 from ..db.models import JobStatus, Asset, AssetRole, Artifact, ArtifactType
 from ..core.config import settings
@@ -30,6 +35,8 @@ class PipelineOrchestrator:
         self.job_config = job_config
         self.mode = job_config.get("mode", "learn")
         self.job_dir = settings.data_dir / "jobs" / job_id
+        self.step_timings: Dict[str, float] = {}  # 各步骤墙钟耗时（ms）
+        self.progress = ProgressReporter(job_id)  # 进度/片段写入节流
     
     async def execute(self) -> Dict[str, Any]:
         """执行Pipeline"""
@@ -43,7 +50,7 @@ class PipelineOrchestrator:
             else:
                 raise JobExecutionError(f"不支持的mode: {self.mode}")
             
-            logger.info(f"Job {self.job_id} 执行成功")
+            logger.info(f"Job {self.job_id} 执行成功，步骤耗时(ms): {self._format_timings()}")
             return result
         
         except Exception as e:
@@ -60,45 +67,44 @@ class PipelineOrchestrator:
         self._update_progress("ingest", 10, "下载视频...")
         ingest_result = await self._ingest_asset(target_video, AssetRole.TARGET)
         
-        # 2. CV场景检测（新增）
+        # 2. CV场景检测 + 抽帧（单次解码）
         use_cv_detection = options.get("scene_detection", {}).get("use_cv", True)
         
         if use_cv_detection:
-            self._update_progress("scene_detection", 25, "CV场景检测...")
-            cv_segments = detect_scenes(
+            self._update_progress("scene_detection", 25, "CV场景检测与抽帧...")
+            frame_config = options.get("frame_extract", {})
+            decode_result = await self._run_step(
+                "scene_detection",
+                detect_scenes_and_sample_frames,
                 ingest_result["local_path"],
-                self.job_dir / "target",
-                threshold=options.get("scene_detection", {}).get("threshold", 27.0)
+                self.job_dir,
+                threshold=options.get("scene_detection", {}).get("threshold", 27.0),
+                fps=frame_config.get("fps", 2.0),
+                max_frames=frame_config.get("max_frames", 240),
+                keyframes_dir=self.job_dir / "target" / "scene_keyframes"
             )
+            cv_segments = decode_result["segments"]
+            frames_result = decode_result
             logger.info(f"CV检测到{len(cv_segments)}个场景")
             
             # 立即保存CV检测结果（无特征）
-            partial_result = {
-                "mode": "learn",
-                "target": {
-                    "asset_id": ingest_result.get("asset_id"),
-                    "segments": [
-                        {
-                            **seg,
-                            "features": [],
-                            "analyzing": True  # 标记为分析中
-                        }
-                        for seg in cv_segments
-                    ],
-                    "detection_method": "cv",
-                    "analyzing": True
+            self._save_partial_segments([
+                {
+                    **seg,
+                    "features": [],
+                    "analyzing": True  # 标记为分析中
                 }
-            }
-            self._save_partial_result(partial_result)
+                for seg in cv_segments
+            ])
         else:
             cv_segments = None
-        
-        # 3. Extract frames
-        self._update_progress("extract_frames", 35, "抽取关键帧...")
-        frames_result = self._extract_frames_for_asset(
-            ingest_result["local_path"],
-            options.get("frame_extract", {})
-        )
+            
+            # 3. Extract frames
+            self._update_progress("extract_frames", 35, "抽取关键帧...")
+            frames_result = await self._extract_frames_for_asset(
+                ingest_result["local_path"],
+                options.get("frame_extract", {})
+            )
         
         # 4. LLM特征分析（基于CV检测的场景）
         self._update_progress("feature_analysis", 60, "分析视频特征...")
@@ -119,7 +125,9 @@ class PipelineOrchestrator:
         
         # 5. Generate artifacts
         self._update_progress("artifacts", 85, "生成产物...")
-        artifacts_result = generate_artifacts(
+        artifacts_result = await self._run_step(
+            "artifacts",
+            generate_artifacts,
             decompose_result["segments"],
             frames_result["frames_index"],
             self.job_dir / "target",
@@ -158,7 +166,7 @@ class PipelineOrchestrator:
         target_ingest = await self._ingest_asset(target_video, AssetRole.TARGET)
         
         self._update_progress("target_extract", 15, "抽取target关键帧...")
-        target_frames = self._extract_frames_for_asset(
+        target_frames = await self._extract_frames_for_asset(
             target_ingest["local_path"],
             options.get("frame_extract", {})
         )
@@ -169,7 +177,9 @@ class PipelineOrchestrator:
             options.get("llm", {})
         )
         
-        target_artifacts = generate_artifacts(
+        target_artifacts = await self._run_step(
+            "artifacts",
+            generate_artifacts,
             target_decompose["segments"],
             target_frames["frames_index"],
             self.job_dir / "target",
@@ -181,7 +191,7 @@ class PipelineOrchestrator:
         user_ingest = await self._ingest_asset(user_video, AssetRole.USER)
         
         self._update_progress("user_extract", 50, "抽取user关键帧...")
-        user_frames = self._extract_frames_for_asset(
+        user_frames = await self._extract_frames_for_asset(
             user_ingest["local_path"],
             options.get("frame_extract", {})
         )
@@ -192,7 +202,9 @@ class PipelineOrchestrator:
             options.get("llm", {})
         )
         
-        user_artifacts = generate_artifacts(
+        user_artifacts = await self._run_step(
+            "artifacts",
+            generate_artifacts,
             user_decompose["segments"],
             user_frames["frames_index"],
             self.job_dir / "user",
@@ -286,7 +298,7 @@ class PipelineOrchestrator:
         
         return {**ingest_result, "asset_id": asset_id}
     
-    def _extract_frames_for_asset(
+    async def _extract_frames_for_asset(
         self,
         video_path: str,
         frame_config: Dict[str, Any]
@@ -296,13 +308,28 @@ class PipelineOrchestrator:
         fps = frame_config.get("fps", 2.0)
         max_frames = frame_config.get("max_frames", 240)
         
-        return extract_frames(
+        return await self._run_step(
+            "extract_frames",
+            extract_frames,
             video_path,
             self.job_dir,
             fps,
             max_frames
         )
     
+    async def _run_step(self, step: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """在线程池中执行阻塞步骤，避免卡住事件循环，并记录本Job的步骤耗时"""
+        started = time.perf_counter()
+        try:
+            return await run_blocking(step, func, *args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.step_timings[step] = self.step_timings.get(step, 0.0) + elapsed_ms
+    
+    def _format_timings(self) -> str:
+        """格式化步骤耗时"""
+        return ", ".join(f"{step}={ms:.0f}" for step, ms in self.step_timings.items())
+    
     async def _analyze_cv_segments(
         self,
         cv_segments: List[Dict[str, Any]],
@@ -401,25 +428,8 @@ class PipelineOrchestrator:
                 f"分析特征 {idx + 1}/{total_segments}"
             )
             
-            # 构建当前的部分结果（包含已分析的和待分析的）
-            all_segments = segments_with_features + [
-                {
-                    **cv_segments[i],
-                    "features": [],
-                    "analyzing": True
-                }
-                for i in range(idx + 1, total_segments)
-            ]
-            
-            partial_result = {
-                "mode": "learn",
-                "target": {
-                    "segments": all_segments,
-                    "detection_method": "cv",
-                    "analyzing": idx + 1 < total_segments
-                }
-            }
-            self._save_partial_result(partial_result)
+            # 只写入刚完成的片段，待分析的占位片段已在CV检测后写入
+            self._save_partial_segments([segments_with_features[-1]], start_position=idx)
         
         return {"segments": segments_with_features}
     
@@ -522,16 +532,18 @@ class PipelineOrchestrator:
 """
     
     def _update_progress(self, stage: str, percent: float, message: str):
-        """更新进度"""
-        with get_db() as db:
-            job_repo = JobRepository(db)
-            job_repo.update_progress(self.job_id, stage, percent, message)
+        """更新进度（数据库写入节流合并，事件总线实时推送）"""
+        self.progress.update(stage, percent, message)
+        job_event_bus.publish_progress(self.job_id, stage, percent, message)
     
-    def _save_partial_result(self, partial_result: Dict[str, Any]):
-        """保存部分结果（用于流式更新）"""
-        with get_db() as db:
-            job_repo = JobRepository(db)
-            job_repo.save_partial_result(self.job_id, partial_result)
+    def _save_partial_segments(
+        self,
+        segments: List[Dict[str, Any]],
+        start_position: int = 0
+    ):
+        """保存新增或变化的片段（用于流式更新，数据库写入节流合并）"""
+        self.progress.save_segments(segments, start_position)
+        job_event_bus.publish_segments(self.job_id, segments)
     
     async def _generate_summary(self, result: Dict[str, Any]) -> Dict[str, Any]:
         """生成任务总结（标题和学习要点）"""
@@ -565,30 +577,6 @@ class PipelineOrchestrator:
             }
 
 
-# 全局Job运行器（简单版本：内存字典）
-_running_jobs: Dict[str, asyncio.Task] = {}
-
-
-async def submit_job(job_id: str, job_config: Dict[str, Any]):
-    """提交Job到运行器"""
-    
-    logger.info(f"提交Job {job_id}")
-    
-    # 更新状态为running
-    with get_db() as db:
-        job_repo = JobRepository(db)
-        job_repo.update_status(job_id, JobStatus.RUNNING)
-    
-    # 创建orchestrator
-    orchestrator = PipelineOrchestrator(job_id, job_config)
-    
-    # 创建异步任务
-    task = asyncio.create_task(_run_job(job_id, orchestrator))
-    _running_jobs[job_id] = task
-    
-    return task
-
-
 async def _run_job(job_id: str, orchestrator: PipelineOrchestrator):
     """运行Job（后台任务）"""
     
@@ -623,11 +611,17 @@ async def _run_job(job_id: str, orchestrator: PipelineOrchestrator):
             except Exception as e:
                 logger.error(f"生成格式化分析报告失败: {str(e)}")
         
+        # 写入积压的进度/片段并等待落盘，避免覆盖终态
+        orchestrator.progress.close()
+        await asyncio.wrap_future(db_writer.flush())
+        
         # 更新状态为succeeded，并保存总结和格式化报告
         with get_db() as db:
             job_repo = JobRepository(db)
             job_repo.update_status(job_id, JobStatus.SUCCEEDED)
             job_repo.update_progress(job_id, "completed", 100, "完成")
+            # 最终结果已写入result_json，流式片段行不再需要
+            job_repo.clear_partial_segments(job_id)
             # 保存总结信息（包括缩略图）
             job_repo.update_summary(
                 job_id,
@@ -639,12 +633,22 @@ async def _run_job(job_id: str, orchestrator: PipelineOrchestrator):
             if formatted_analysis:
                 job_repo.save_partial_result(job_id, formatted_analysis)
         
+        job_event_bus.publish_complete(job_id, result)
         logger.info(f"Job {job_id} 完成，标题: {summary.get('title')}")
     
+    except asyncio.CancelledError:
+        # 队列停止或租约被接管：Job会重新排队，丢弃未写入的进度，避免覆盖新一轮执行
+        logger.warning(f"Job {job_id} 已取消")
+        orchestrator.progress.discard()
+        job_event_bus.release(job_id)
+        raise
+    
     except Exception as e:
         logger.error(f"Job {job_id} 失败: {str(e)}", exc_info=True)
         
-        # 更新状态为failed
+        # 更新状态为failed（先写入积压的更新并等待落盘）
+        orchestrator.progress.close()
+        await asyncio.wrap_future(db_writer.flush())
         with get_db() as db:
             job_repo = JobRepository(db)
             job_repo.update_status(
@@ -653,9 +657,9 @@ async def _run_job(job_id: str, orchestrator: PipelineOrchestrator):
                 error_message=str(e),
                 error_details={"exception": str(type(e).__name__)}
             )
-    
-    finally:
-        # 清理任务
-        if job_id in _running_jobs:
-            del _running_jobs[job_id]
-
+            job_repo.clear_partial_segments(job_id)
+        job_event_bus.publish_failed(
+            job_id,
+            str(e),
+            {"exception": str(type(e).__name__)}
+        )
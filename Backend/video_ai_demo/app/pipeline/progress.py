@@ -0,0 +1,133 @@
+"""Job进度上报（节流合并）
+
+Pipeline 在特征分析阶段每完成一个片段就更新一次进度和部分结果，
+逐次写库会产生大量只差零点几个百分点的事务。ProgressReporter 在内存中
+合并这些更新，按固定间隔把最新状态交给写线程（不等待落盘）：
+- 阶段切换时立即写入（连同积压的片段）
+- 同一阶段内，间隔内的更新只保留最新值，由定时器在间隔结束时写入
+- 进度变化小于 min_delta 的更新不单独触发写入，随下一次写入一并落盘
+- close() 写入所有积压，Job 终态写入前调用
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from ..db.repo import JobRepository
+from ..db.writer import db_writer, DBWriteQueue
+from ..core.config import settings
+
+
+class ProgressReporter:
+    """单个Job的进度/片段写入节流器"""
+
+    def __init__(
+        self,
+        job_id: str,
+        interval_ms: Optional[float] = None,
+        min_delta: Optional[float] = None,
+        writer: Optional[DBWriteQueue] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.job_id = job_id
+        self.interval = (
+            interval_ms if interval_ms is not None else settings.progress_flush_interval_ms
+        ) / 1000
+        self.min_delta = min_delta if min_delta is not None else settings.progress_min_delta
+        self.writer = writer or db_writer
+        self._clock = clock
+
+        # 待写入的最新进度 (stage, percent, message)
+        self._pending_progress: Optional[tuple] = None
+        # 待写入的片段：position -> segment
+        self._pending_segments: Dict[int, Dict[str, Any]] = {}
+        # 最近一次写入的进度
+        self._written_stage: Optional[str] = None
+        self._written_percent: float = 0.0
+        self._last_flush: Optional[float] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.updates = 0
+        self.flushes = 0
+
+    def update(self, stage: str, percent: float, message: str):
+        """记录进度更新"""
+        self.updates += 1
+        self._pending_progress = (stage, percent, message)
+
+        if stage != self._written_stage:
+            self.flush()
+        elif abs((percent or 0) - self._written_percent) >= self.min_delta:
+            self._flush_or_schedule()
+
+    def save_segments(self, segments: List[Dict[str, Any]], start_position: int = 0):
+        """记录新增或变化的片段（按位置合并，同一位置只保留最新值）"""
+        self.updates += 1
+        for offset, segment in enumerate(segments):
+            self._pending_segments[start_position + offset] = segment
+        self._flush_or_schedule()
+
+    def flush(self):
+        """立即把积压的更新交给写线程（不等待落盘）"""
+        self._cancel_timer()
+        progress = self._pending_progress
+        segments = self._pending_segments
+        self._pending_progress = None
+        self._pending_segments = {}
+
+        if progress is None and not segments:
+            return
+
+        self._last_flush = self._clock()
+        self.flushes += 1
+        if progress is not None:
+            self._written_stage, self._written_percent = progress[0], progress[1] or 0
+
+        job_id = self.job_id
+
+        def write(db):
+            job_repo = JobRepository(db)
+            for position in sorted(segments):
+                job_repo.save_partial_segments(job_id, [segments[position]], position)
+            if progress is not None:
+                job_repo.update_progress(job_id, *progress)
+
+        self.writer.submit(write)
+
+    def close(self):
+        """写入所有积压的更新（Job结束前调用）"""
+        self.flush()
+
+    def discard(self):
+        """丢弃积压的更新并取消定时写入（Job被取消、将由其他worker重新执行时调用）"""
+        self._cancel_timer()
+        self._pending_progress = None
+        self._pending_segments.clear()
+
+    def _flush_or_schedule(self):
+        """间隔已到则立即写入，否则在间隔结束时写入"""
+        now = self._clock()
+        if self._last_flush is None or now - self._last_flush >= self.interval:
+            self.flush()
+            return
+
+        if self._timer is not None:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 不在事件循环中（例如工作线程），无法延迟写入
+            self.flush()
+            return
+        self._timer = loop.call_later(
+            self.interval - (now - self._last_flush), self._on_timer
+        )
+
+    def _on_timer(self):
+        self._timer = None
+        self.flush()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
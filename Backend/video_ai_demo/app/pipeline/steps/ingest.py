@@ -8,6 +8,7 @@ from typing import Dict, Any, Optional
 from ...core.errors import VideoProcessingError
 from ...core.config import settings
 from ...core.logging import logger
+from ..executor import run_blocking
 
 
 async def ingest_video(
@@ -37,12 +38,12 @@ async def ingest_video(
     if source_type == "url":
         await _download_video(source_url, local_path)
     elif source_type == "file":
-        _copy_video(source_path, local_path)
+        await run_blocking("copy_video", _copy_video, source_path, local_path)
     else:
         raise VideoProcessingError(f"不支持的source_type: {source_type}")
     
     # 获取视频元数据
-    metadata = _probe_video(local_path)
+    metadata = await run_blocking("probe_video", _probe_video, local_path)
     
     return {
         "local_path": str(local_path),
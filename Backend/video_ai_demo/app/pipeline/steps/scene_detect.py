@@ -1,7 +1,10 @@
 """CV场景检测步骤 - 使用传统CV算法进行镜头切分"""
+import inspect
+import json
+import shutil
 from pathlib import Path
 from typing import Dict, Any, List
-from scenedetect import open_video, SceneManager, split_video_ffmpeg
+from scenedetect import open_video, SceneManager, split_video_ffmpeg, FrameTimecode
 from scenedetect.detectors import ContentDetector, ThresholdDetector
 from scenedetect.scene_manager import save_images
 
@@ -114,10 +117,174 @@ def detect_scenes(
         raise VideoProcessingError(f"CV场景检测失败: {str(e)}")
 
 
+# PySceneDetect 0.7 起检测器以 FrameTimecode 作为帧位置，0.6 使用整数帧号
+_DETECTOR_USES_TIMECODE = "timecode" in inspect.signature(ContentDetector.process_frame).parameters
+
+# 送入场景检测器的帧宽度（与 SceneManager 自动降采样的目标宽度一致）
+_DETECTION_WIDTH = 256
+
+
+def detect_scenes_and_sample_frames(
+    video_path: str,
+    output_dir: Path,
+    threshold: float = 27.0,
+    min_scene_len: int = 15,
+    fps: float = 2.0,
+    max_frames: int = 240,
+    keyframes_dir: Path = None
+) -> Dict[str, Any]:
+    """
+    单次解码同时完成场景检测和抽帧
+    
+    每一帧只解码一次：降采样后送入 ContentDetector，
+    同时按 fps 采样保存原分辨率帧用于 frames_index。
+    场景关键帧直接取距场景中点最近的采样帧，不再单独解码。
+    
+    Args:
+        video_path: 视频路径
+        output_dir: 抽帧输出目录（frames/ 与 frames_index.json 写在其中）
+        threshold: 检测阈值（越低越敏感，默认27）
+        min_scene_len: 最小场景长度（帧数）
+        fps: 抽帧率
+        max_frames: 最大抽帧数
+        keyframes_dir: 场景关键帧目录（可选）
+    
+    Returns:
+        {
+            "segments": 与 detect_scenes 相同格式的场景列表,
+            "frames_dir": str,
+            "frames_index": List[{"frame_id": str, "ts_ms": float, "path": str}],
+            "total_frames": int
+        }
+    """
+    import cv2
+    
+    logger.info(
+        f"开始单次解码场景检测+抽帧: threshold={threshold}, "
+        f"min_scene_len={min_scene_len}, fps={fps}, max_frames={max_frames}"
+    )
+    
+    frames_dir = output_dir / "frames"
+    frames_dir.mkdir(parents=True, exist_ok=True)
+    
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise VideoProcessingError(f"无法打开视频: {video_path}")
+    
+    try:
+        video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        detector = ContentDetector(threshold=threshold, min_scene_len=min_scene_len)
+        
+        sample_interval_ms = 1000.0 / fps
+        frames_index = []
+        cut_frames = []
+        frame_idx = 0
+        detection_size = None
+        
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            
+            # 场景检测：降采样后送入检测器
+            if detection_size is None:
+                height, width = frame.shape[:2]
+                scale = min(1.0, _DETECTION_WIDTH / width)
+                detection_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            small = cv2.resize(frame, detection_size, interpolation=cv2.INTER_AREA)
+            cuts = detector.process_frame(_detector_position(frame_idx, video_fps), small)
+            cut_frames.extend(_frame_number(cut) for cut in cuts)
+            
+            # 抽帧：到达下一个采样时间点时保存原分辨率帧
+            ts_ms = frame_idx * 1000.0 / video_fps
+            if len(frames_index) < max_frames and ts_ms >= len(frames_index) * sample_interval_ms:
+                frame_path = frames_dir / f"frame_{len(frames_index) + 1:05d}.jpg"
+                cv2.imwrite(str(frame_path), frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+                frames_index.append({
+                    "frame_id": f"f_{len(frames_index):05d}",
+                    "ts_ms": len(frames_index) * sample_interval_ms,
+                    "path": str(frame_path)
+                })
+            
+            frame_idx += 1
+        
+        if frame_idx == 0:
+            raise VideoProcessingError("无法读取视频帧")
+        
+        cut_frames.extend(
+            _frame_number(cut)
+            for cut in detector.post_process(_detector_position(frame_idx, video_fps))
+        )
+    
+    except VideoProcessingError:
+        raise
+    except Exception as e:
+        raise VideoProcessingError(f"单次解码场景检测失败: {str(e)}")
+    finally:
+        cap.release()
+    
+    # 切点 -> 场景
+    boundaries = [0] + sorted(c for c in set(cut_frames) if 0 < c < frame_idx) + [frame_idx]
+    segments = []
+    for i in range(len(boundaries) - 1):
+        start_frame = boundaries[i]
+        end_frame = boundaries[i + 1]
+        start_ms = (start_frame / video_fps) * 1000
+        end_ms = (end_frame / video_fps) * 1000
+        segments.append({
+            "segment_id": f"seg_{i+1:03d}",
+            "start_ms": start_ms,
+            "end_ms": end_ms,
+            "start_frame": start_frame,
+            "end_frame": end_frame,
+            "duration_ms": end_ms - start_ms
+        })
+    
+    # 保存索引文件
+    index_file = output_dir / "frames_index.json"
+    with open(index_file, "w", encoding="utf-8") as f:
+        json.dump(frames_index, f, ensure_ascii=False, indent=2)
+    
+    # 场景关键帧：复用采样帧
+    if keyframes_dir is not None and frames_index and len(segments) < 50:
+        keyframes_dir.mkdir(parents=True, exist_ok=True)
+        for i, segment in enumerate(segments):
+            mid_ms = (segment["start_ms"] + segment["end_ms"]) / 2
+            closest = min(frames_index, key=lambda f: abs(f["ts_ms"] - mid_ms))
+            shutil.copy2(closest["path"], keyframes_dir / f"{i+1:03d}-keyframe.jpg")
+    
+    logger.info(f"单次解码完成：{frame_idx}帧，{len(segments)}个场景，抽取{len(frames_index)}帧")
+    
+    return {
+        "segments": segments,
+        "frames_dir": str(frames_dir),
+        "frames_index": frames_index,
+        "total_frames": len(frames_index)
+    }
+
+
+def _detector_position(frame_idx: int, fps: float):
+    """构造检测器所需的帧位置"""
+    if _DETECTOR_USES_TIMECODE:
+        return FrameTimecode(frame_idx, fps)
+    return frame_idx
+
+
+def _frame_number(position) -> int:
+    """检测器返回的切点转为帧号"""
+    if hasattr(position, "get_frames"):
+        return position.get_frames()
+    return int(position)
+
+
 def detect_scenes_with_optical_flow(
     video_path: str,
     output_dir: Path,
-    flow_threshold: float = 30.0
+    flow_threshold: float = 30.0,
+    fast: bool = False,
+    width: int = 160,
+    step: int = 0,
+    prefilter_threshold: float = 12.0
 ) -> List[Dict[str, Any]]:
     """
     使用光流法检测场景切换（更精确但更慢）
@@ -125,11 +292,20 @@ def detect_scenes_with_optical_flow(
     Args:
         video_path: 视频路径
         output_dir: 输出目录
-        flow_threshold: 光流阈值
+        flow_threshold: 光流阈值（原分辨率下的平均光流幅度）
+        fast: 快速模式：低分辨率、跳帧采样、预筛选后才计算稠密光流
+        width: 快速模式下的处理宽度
+        step: 快速模式下的采样间隔（帧），0表示按约6次/秒自动选择
+        prefilter_threshold: 快速模式下的预筛选阈值（灰度平均绝对差，0-255）
     
     Returns:
         场景列表
     """
+    if fast:
+        return _detect_scenes_optical_flow_fast(
+            video_path, flow_threshold, width, step, prefilter_threshold
+        )
+    
     import cv2
     import numpy as np
     
@@ -189,24 +365,7 @@ def detect_scenes_with_optical_flow(
         scene_changes.append(total_frames - 1)  # 结束帧
         cap.release()
         
-        # 转换为段落格式
-        segments = []
-        for i in range(len(scene_changes) - 1):
-            start_frame = scene_changes[i]
-            end_frame = scene_changes[i + 1]
-            
-            start_ms = (start_frame / fps) * 1000
-            end_ms = (end_frame / fps) * 1000
-            
-            segments.append({
-                "segment_id": f"seg_{i+1:03d}",
-                "start_ms": start_ms,
-                "end_ms": end_ms,
-                "start_frame": start_frame,
-                "end_frame": end_frame,
-                "duration_ms": end_ms - start_ms
-            })
-        
+        segments = _scene_changes_to_segments(scene_changes, fps)
         logger.info(f"光流法检测完成，共检测到{len(segments)}个场景")
         return segments
         
@@ -214,68 +373,229 @@ def detect_scenes_with_optical_flow(
         raise VideoProcessingError(f"光流法场景检测失败: {str(e)}")
 
 
-def detect_scenes_simple(
+def _detect_scenes_optical_flow_fast(
     video_path: str,
-    output_dir: Path,
-    threshold: float = 30.0,
-    sample_rate: int = 5
+    flow_threshold: float,
+    width: int,
+    step: int,
+    prefilter_threshold: float
 ) -> List[Dict[str, Any]]:
     """
-    简单快速的场景检测（基于直方图差异）
+    光流法快速模式
     
-    Args:
-        video_path: 视频路径
-        output_dir: 输出目录
-        threshold: 相似度阈值（0-100，越大越严格）
-        sample_rate: 采样率（每N帧检测一次）
-    
-    Returns:
-        场景列表
+    1. 每 step 帧取一帧（跳过的帧只 grab 不转换），缩放到 width 宽的灰度图
+    2. 相邻采样帧做廉价预筛选（平均绝对差 / 灰度直方图距离），超过阈值才视为候选区间
+    3. 候选区间回退解码区间内每一帧，定位差异最大的相邻帧对
+    4. 只对该帧对计算稠密光流，按缩放比例换算阈值后确认切换
     """
     import cv2
     import numpy as np
     
-    logger.info(f"开始快速场景检测: threshold={threshold}, sample_rate={sample_rate}")
+    logger.info(
+        f"开始光流法场景检测(快速模式): threshold={flow_threshold}, "
+        f"width={width}, step={step or 'auto'}"
+    )
     
     try:
         cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        source_width = cap.get(cv2.CAP_PROP_FRAME_WIDTH) or width
         
-        # 读取第一帧
-        ret, prev_frame = cap.read()
+        scale = min(1.0, width / source_width)
+        step = step or max(1, int(round(fps / 6)))
+        # 光流幅度与分辨率成正比
+        scaled_threshold = flow_threshold * scale
+        
+        def to_small(frame):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            if scale < 1.0:
+                gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            return gray
+        
+        ret, frame = cap.read()
         if not ret:
             raise VideoProcessingError("无法读取视频第一帧")
         
-        prev_hist = _calculate_histogram(prev_frame)
-        
+        prev_small = to_small(frame)
+        prev_idx = 0
+        frame_idx = 0
         scene_changes = [0]
-        frame_idx = 1
+        stats = {"samples": 1, "candidates": 0, "refined_frames": 0, "flow_pairs": 0}
         
         while True:
+            # 跳过中间帧：grab 只解码不做颜色转换
+            ended = False
+            for _ in range(step - 1):
+                if not cap.grab():
+                    ended = True
+                    break
+                frame_idx += 1
+            if ended:
+                break
+            
             ret, frame = cap.read()
             if not ret:
                 break
+            frame_idx += 1
+            small = to_small(frame)
+            stats["samples"] += 1
             
-            # 采样检测
-            if frame_idx % sample_rate == 0:
-                curr_hist = _calculate_histogram(frame)
-                
-                # 计算直方图相似度
-                similarity = cv2.compareHist(
-                    prev_hist, curr_hist, cv2.HISTCMP_CORREL
+            if _frame_difference(prev_small, small) > prefilter_threshold:
+                stats["candidates"] += 1
+                cut_idx, pair = _refine_candidate(
+                    cap, prev_idx, frame_idx, prev_small, small, to_small, stats
                 )
-                
-                # 相似度低于阈值，认为是场景切换
-                if similarity < (1 - threshold / 100):
-                    scene_changes.append(frame_idx)
-                    logger.debug(f"检测到场景切换: 帧{frame_idx}, 相似度={similarity:.3f}")
-                    prev_hist = curr_hist
+                stats["flow_pairs"] += 1
+                if _mean_flow_magnitude(*pair) > scaled_threshold:
+                    scene_changes.append(cut_idx)
+                    logger.debug(f"检测到场景切换: 帧{cut_idx}")
             
-            frame_idx += 1
+            prev_small = small
+            prev_idx = frame_idx
         
-        scene_changes.append(total_frames - 1)
         cap.release()
+        scene_changes.append(max(total_frames, frame_idx + 1) - 1)  # 结束帧
+        
+        segments = _scene_changes_to_segments(scene_changes, fps)
+        logger.info(
+            f"光流法检测完成(快速模式)，共检测到{len(segments)}个场景，"
+            f"采样{stats['samples']}帧，候选{stats['candidates']}个，"
+            f"细化解码{stats['refined_frames']}帧，光流计算{stats['flow_pairs']}次"
+        )
+        return segments
+    
+    except VideoProcessingError:
+        raise
+    except Exception as e:
+        raise VideoProcessingError(f"光流法场景检测失败: {str(e)}")
+
+
+def _frame_difference(a, b) -> float:
+    """预筛选分数：灰度平均绝对差与直方图距离（换算到0-255）取较大值"""
+    import cv2
+    
+    sad = float(cv2.absdiff(a, b).mean())
+    hist_a = cv2.calcHist([a], [0], None, [32], [0, 256])
+    hist_b = cv2.calcHist([b], [0], None, [32], [0, 256])
+    cv2.normalize(hist_a, hist_a)
+    cv2.normalize(hist_b, hist_b)
+    hist_dist = cv2.compareHist(hist_a, hist_b, cv2.HISTCMP_BHATTACHARYYA)
+    return max(sad, hist_dist * 255)
+
+
+def _refine_candidate(cap, start_idx, end_idx, start_small, end_small, to_small, stats):
+    """
+    在候选区间 (start_idx, end_idx] 内定位切换帧
+    
+    回退解码区间内的每一帧，返回差异最大的相邻帧对的后一帧索引及该帧对；
+    读取结束后解码位置恰好回到 end_idx 之后。无法回退时使用采样帧对本身。
+    """
+    import cv2
+    
+    if end_idx - start_idx <= 1 or not cap.set(cv2.CAP_PROP_POS_FRAMES, start_idx + 1):
+        return end_idx, (start_small, end_small)
+    
+    frames = [start_small]
+    for _ in range(end_idx - start_idx):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(to_small(frame))
+    stats["refined_frames"] += len(frames) - 1
+    
+    if len(frames) != end_idx - start_idx + 1:
+        # 回退读取不完整，恢复位置后按采样帧对处理
+        cap.set(cv2.CAP_PROP_POS_FRAMES, end_idx + 1)
+        return end_idx, (start_small, end_small)
+    
+    diffs = [
+        float(cv2.absdiff(frames[i - 1], frames[i]).mean())
+        for i in range(1, len(frames))
+    ]
+    best = max(range(len(diffs)), key=diffs.__getitem__) + 1
+    return start_idx + best, (frames[best - 1], frames[best])
+
+
+def _mean_flow_magnitude(prev_gray, gray) -> float:
+    """两帧之间的平均稠密光流幅度"""
+    import cv2
+    import numpy as np
+    
+    flow = cv2.calcOpticalFlowFarneback(
+        prev_gray, gray, None,
+        pyr_scale=0.5,
+        levels=3,
+        winsize=15,
+        iterations=3,
+        poly_n=5,
+        poly_sigma=1.2,
+        flags=0
+    )
+    mag, _ = cv2.cartToPolar(flow[..., 0], flow[..., 1])
+    return float(np.mean(mag))
+
+
+def _scene_changes_to_segments(scene_changes: List[int], fps: float) -> List[Dict[str, Any]]:
+    """切换帧列表转换为段落格式"""
+    segments = []
+    for i in range(len(scene_changes) - 1):
+        start_frame = scene_changes[i]
+        end_frame = scene_changes[i + 1]
+        
+        start_ms = (start_frame / fps) * 1000
+        end_ms = (end_frame / fps) * 1000
+        
+        segments.append({
+            "segment_id": f"seg_{i+1:03d}",
+            "start_ms": start_ms,
+            "end_ms": end_ms,
+            "start_frame": start_frame,
+            "end_frame": end_frame,
+            "duration_ms": end_ms - start_ms
+        })
+    return segments
+
+
+def detect_scenes_simple(
+    video_path: str,
+    output_dir: Path,
+    threshold: float = 30.0,
+    sample_rate: int = 5,
+    streaming: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    简单快速的场景检测（基于直方图差异）
+    
+    Args:
+        video_path: 视频路径
+        output_dir: 输出目录
+        threshold: 相似度阈值（0-100，越大越严格）
+        sample_rate: 采样率（每N帧检测一次）
+        streaming: 流式模式（内存占用与视频长度无关）
+    
+    Returns:
+        场景列表
+    """
+    from ..shot_boundary import find_cuts, histogram_distances
+    
+    logger.info(f"开始快速场景检测: threshold={threshold}, sample_rate={sample_rate}")
+    
+    try:
+        # 分批低分辨率读取，向量化计算相邻采样帧的直方图相关性
+        frame_indices, similarities, fps, total_frames = histogram_distances(
+            video_path, metric="correl", sample_rate=sample_rate, streaming=streaming
+        )
+        if not len(frame_indices) and not total_frames:
+            raise VideoProcessingError("无法读取视频第一帧")
+        
+        # 相似度低于阈值，认为是场景切换
+        scene_changes = find_cuts(
+            frame_indices, similarities, 1 - threshold / 100, metric="correl"
+        )
+        logger.debug(f"检测到场景切换: {scene_changes[1:]}")
+        
+        scene_changes.append(total_frames - 1)
         
         # 转换格式
         segments = []
@@ -306,20 +626,3 @@ def detect_scenes_simple(
         raise VideoProcessingError(f"快速场景检测失败: {str(e)}")
 
 
-def _calculate_histogram(frame):
-    """计算帧的颜色直方图"""
-    import cv2
-    
-    # 转换为HSV色彩空间
-    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-    
-    # 计算直方图
-    hist = cv2.calcHist(
-        [hsv], [0, 1], None, [50, 60], [0, 180, 0, 256]
-    )
-    
-    # 归一化
-    cv2.normalize(hist, hist, alpha=0, beta=1, norm_type=cv2.NORM_MINMAX)
-    
-    return hist
-
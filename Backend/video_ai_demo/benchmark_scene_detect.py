@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+场景检测基准测试
+对比光流法（逐帧全分辨率）、光流法快速模式与 ContentDetector 的速度和准确率
+
+用法：
+  python benchmark_scene_detect.py                      # 使用合成视频（已知切点）
+  python benchmark_scene_detect.py --video data/x.mp4   # 使用真实视频（以ContentDetector结果为参考）
+  python benchmark_scene_detect.py --skip-full          # 跳过很慢的逐帧光流
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.pipeline.steps.scene_detect import detect_scenes, detect_scenes_with_optical_flow
+
+
+def make_synthetic_video(path: Path, scenes: int, frames_per_scene: int, size=(640, 360), fps=25):
+    """合成视频：每个场景是不同的纹理背景，镜头缓慢平移并有运动物体；返回真实切点"""
+    import cv2
+    import numpy as np
+
+    width, height = size
+    rng = np.random.default_rng(7)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    cuts = []
+
+    for scene in range(scenes):
+        if scene:
+            cuts.append(scene * frames_per_scene)
+        # 大于画面的纹理，用于模拟镜头平移
+        texture = rng.integers(0, 255, (height + 80, width + 80, 3), dtype=np.uint8)
+        texture = cv2.GaussianBlur(texture, (0, 0), 6)
+        texture = cv2.normalize(texture, None, 0, 255, cv2.NORM_MINMAX)
+        tint = rng.integers(0, 120, 3)
+        texture = np.clip(texture.astype(np.int16) + tint - 60, 0, 255).astype(np.uint8)
+
+        for i in range(frames_per_scene):
+            offset = i % 80
+            frame = texture[offset // 2:offset // 2 + height, offset:offset + width].copy()
+            x = 40 + (i * 7) % (width - 80)
+            cv2.circle(frame, (x, height // 2), 25, (255, 255, 255), -1)
+            writer.write(frame)
+
+    writer.release()
+    return cuts
+
+
+def score(detected, truth, tolerance):
+    """按容差匹配切点，返回 (precision, recall)"""
+    remaining = list(truth)
+    matched = 0
+    for cut in detected:
+        hit = next((t for t in remaining if abs(t - cut) <= tolerance), None)
+        if hit is not None:
+            remaining.remove(hit)
+            matched += 1
+    precision = matched / len(detected) if detected else (1.0 if not truth else 0.0)
+    recall = matched / len(truth) if truth else 1.0
+    return precision, recall
+
+
+def cuts_of(segments):
+    """段落列表中的内部切点（去掉首尾）"""
+    return [s["start_frame"] for s in segments[1:]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="场景检测基准测试")
+    parser.add_argument("--video", help="真实视频路径（默认生成合成视频）")
+    parser.add_argument("--scenes", type=int, default=8, help="合成视频场景数")
+    parser.add_argument("--frames-per-scene", type=int, default=60, help="合成视频每个场景帧数")
+    parser.add_argument("--flow-threshold", type=float, default=3.0, help="光流阈值（原分辨率平均幅度）")
+    parser.add_argument("--tolerance", type=int, default=2, help="切点匹配容差（帧）")
+    parser.add_argument("--skip-full", action="store_true", help="跳过逐帧全分辨率光流")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="scene_bench_"))
+
+    truth = None
+    video = args.video
+    if not video:
+        video = str(workdir / "synthetic.mp4")
+        truth = make_synthetic_video(Path(video), args.scenes, args.frames_per_scene)
+        print(f"合成视频: {args.scenes}个场景 x {args.frames_per_scene}帧, 切点={truth}")
+
+    detectors = [("ContentDetector", lambda: detect_scenes(video, workdir / "content"))]
+    detectors.append((
+        "光流法(快速模式)",
+        lambda: detect_scenes_with_optical_flow(
+            video, workdir / "flow_fast", args.flow_threshold, fast=True
+        )
+    ))
+    if not args.skip_full:
+        detectors.append((
+            "光流法(逐帧)",
+            lambda: detect_scenes_with_optical_flow(video, workdir / "flow", args.flow_threshold)
+        ))
+
+    results = []
+    for name, run in detectors:
+        start = time.perf_counter()
+        segments = run()
+        elapsed = time.perf_counter() - start
+        results.append((name, cuts_of(segments), elapsed))
+
+    if truth is None:
+        # 真实视频没有标注，以ContentDetector为参考
+        truth = results[0][1]
+        print("真实视频：以 ContentDetector 的切点作为参考")
+
+    print()
+    print(f"{'检测器':<18}{'耗时(s)':>10}{'切点数':>8}{'精确率':>10}{'召回率':>10}")
+    print("-" * 56)
+    for name, cuts, elapsed in results:
+        precision, recall = score(cuts, truth, args.tolerance)
+        print(f"{name:<18}{elapsed:>10.2f}{len(cuts):>8}{precision:>10.2f}{recall:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
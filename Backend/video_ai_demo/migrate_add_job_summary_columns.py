@@ -0,0 +1,93 @@
+"""
+数据库迁移脚本：添加Job结果摘要字段与列表索引
+为 jobs 表添加 segment_count, duration_ms, feature_count 字段，
+创建 created_at 与 (status, created_at) 索引，并从已有 result_json 回填摘要
+"""
+import json
+import sqlite3
+from pathlib import Path
+
+# (字段名, 列定义)
+SUMMARY_COLUMNS = [
+    ("segment_count", "INTEGER"),
+    ("duration_ms", "FLOAT"),
+    ("feature_count", "INTEGER"),
+]
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_jobs_created_at ON jobs (created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_jobs_status_created_at ON jobs (status, created_at)",
+]
+
+
+def summarize(result_json: str):
+    """从结果JSON计算摘要（与 app.db.repo.summarize_result 一致）"""
+    result = json.loads(result_json)
+    segments = (result.get("target") or {}).get("segments") or []
+    return (
+        len(segments),
+        segments[-1].get("end_ms", 0) if segments else None,
+        sum(len(seg.get("features") or []) for seg in segments)
+    )
+
+
+def migrate():
+    """执行迁移"""
+    db_path = Path("./data/demo.db")
+    
+    if not db_path.exists():
+        print(f"数据库文件不存在: {db_path}")
+        return
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        # 检查字段是否已存在
+        cursor.execute("PRAGMA table_info(jobs)")
+        columns = [row[1] for row in cursor.fetchall()]
+        
+        for name, definition in SUMMARY_COLUMNS:
+            if name not in columns:
+                print(f"添加 {name} 字段...")
+                cursor.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+                print(f"✓ {name} 字段已添加")
+            else:
+                print(f"✓ {name} 字段已存在")
+        
+        for statement in INDEXES:
+            cursor.execute(statement)
+        print("✓ 列表索引已就绪")
+        
+        # 回填已有结果的摘要
+        cursor.execute(
+            "SELECT id, result_json FROM jobs "
+            "WHERE result_json IS NOT NULL AND segment_count IS NULL"
+        )
+        rows = cursor.fetchall()
+        backfilled = 0
+        for job_id, result_json in rows:
+            try:
+                segment_count, duration_ms, feature_count = summarize(result_json)
+            except (json.JSONDecodeError, AttributeError, TypeError):
+                print(f"⚠ 跳过无法解析的结果: {job_id}")
+                continue
+            cursor.execute(
+                "UPDATE jobs SET segment_count = ?, duration_ms = ?, feature_count = ? WHERE id = ?",
+                (segment_count, duration_ms, feature_count, job_id)
+            )
+            backfilled += 1
+        print(f"✓ 已回填 {backfilled} 条Job摘要")
+        
+        conn.commit()
+        print("\n✅ 数据库迁移完成！")
+        
+    except Exception as e:
+        print(f"\n❌ 迁移失败: {str(e)}")
+        conn.rollback()
+    
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
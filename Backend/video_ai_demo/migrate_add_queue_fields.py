@@ -0,0 +1,59 @@
+"""
+数据库迁移脚本：添加Job队列字段
+为 jobs 表添加 config_json, priority, attempts, lease_owner, lease_expires_at 字段及队列索引
+"""
+import sqlite3
+from pathlib import Path
+
+# (字段名, 列定义)
+QUEUE_COLUMNS = [
+    ("config_json", "TEXT"),
+    ("priority", "INTEGER NOT NULL DEFAULT 0"),
+    ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+    ("lease_owner", "VARCHAR"),
+    ("lease_expires_at", "DATETIME"),
+]
+
+
+def migrate():
+    """执行迁移"""
+    db_path = Path("./data/demo.db")
+    
+    if not db_path.exists():
+        print(f"数据库文件不存在: {db_path}")
+        return
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        # 检查字段是否已存在
+        cursor.execute("PRAGMA table_info(jobs)")
+        columns = [row[1] for row in cursor.fetchall()]
+        
+        for name, definition in QUEUE_COLUMNS:
+            if name not in columns:
+                print(f"添加 {name} 字段...")
+                cursor.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+                print(f"✓ {name} 字段已添加")
+            else:
+                print(f"✓ {name} 字段已存在")
+        
+        # 队列领取索引
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS ix_jobs_queue ON jobs (status, priority, created_at)"
+        )
+        print("✓ ix_jobs_queue 索引已就绪")
+        
+        conn.commit()
+        print("\n✅ 数据库迁移完成！")
+        
+    except Exception as e:
+        print(f"\n❌ 迁移失败: {str(e)}")
+        conn.rollback()
+    
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,38 @@
+"""认证模块测试"""
+from app.core.auth import (
+    User,
+    create_access_token,
+    verify_token,
+    revoke_token,
+    token_cache
+)
+
+
+def _token(user_id: str) -> str:
+    return create_access_token(User(id=user_id, email=f"{user_id}@example.com", name="测试"))
+
+
+def test_repeat_verification_hits_cache():
+    """同一token重复请求只验签一次"""
+    token = _token("user_cache")
+    before = token_cache.metrics()
+
+    assert verify_token(token).user_id == "user_cache"
+    assert verify_token(token).user_id == "user_cache"
+
+    after = token_cache.metrics()
+    assert after["verifications"] - before["verifications"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+
+def test_revoked_token_is_rejected_even_when_cached():
+    token = _token("user_revoke")
+    assert verify_token(token) is not None
+
+    assert revoke_token(token) is True
+    assert verify_token(token) is None
+
+
+def test_invalid_token_is_rejected():
+    assert verify_token("not-a-jwt") is None
+    assert revoke_token("not-a-jwt") is False
@@ -0,0 +1,51 @@
+"""TTL/LRU缓存测试"""
+import time
+
+from app.core.cache import TTLCache
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    """超出条目数或字节数时淘汰最久未使用的条目"""
+    cache = TTLCache(max_entries=2, max_bytes=1000, ttl_seconds=60)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    cache.get("a")
+    cache.set("c", {"v": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+
+    cache.set("big", {"v": "x" * 900})
+    assert cache.metrics()["bytes"] <= 1000
+    assert cache.metrics()["evictions"] >= 2
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    cache = TTLCache(max_entries=10, max_bytes=10_000, ttl_seconds=60)
+    cache.set("a", {"v": 1})
+
+    now = time.time()
+    monkeypatch.setattr("app.core.cache.time.time", lambda: now + 61)
+
+    assert cache.get("a") is None
+    metrics = cache.metrics()
+    assert metrics["expirations"] == 1
+    assert metrics["misses"] == 1
+    assert len(cache) == 0
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    """磁盘层在新实例（重启/其他worker）中可读"""
+    first = TTLCache(max_entries=10, max_bytes=10_000, ttl_seconds=60, disk_dir=tmp_path)
+    first.set("analysis_1", {"hookScore": 80})
+
+    second = TTLCache(max_entries=10, max_bytes=10_000, ttl_seconds=60, disk_dir=tmp_path)
+    entry = second.get_entry("analysis_1")
+
+    assert entry.value == {"hookScore": 80}
+    assert second.metrics()["disk_hits"] == 1
+    assert second.get("analysis_1") == {"hookScore": 80}
+    assert second.metrics()["hits"] == 1
+
+    second.delete("analysis_1")
+    assert TTLCache(10, 10_000, 60, disk_dir=tmp_path).get("analysis_1") is None
@@ -0,0 +1,85 @@
+"""单写线程测试"""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.models import Base, Job, JobMode, JobStatus
+from app.db.repo import JobRepository
+from app.db.writer import DBWriteQueue
+
+
+@pytest.fixture
+def session_scope():
+    """共享同一连接的内存SQLite会话（可跨线程）"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+
+    @contextmanager
+    def scope():
+        db = SessionLocal()
+        try:
+            yield db
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    with scope() as db:
+        JobRepository(db).create(Job(id="job_1", mode=JobMode.LEARN, status=JobStatus.RUNNING))
+    return scope
+
+
+def test_writes_are_batched_and_flushed_in_order(session_scope):
+    """攒批提交，flush 之后之前的写入均已落盘"""
+    writer = DBWriteQueue(max_batch=50, max_delay_ms=50, session_scope=session_scope)
+    writer.start()
+    try:
+        for percent in range(10):
+            writer.submit(
+                lambda db, p=percent: JobRepository(db).update_progress("job_1", "stage", p, "")
+            )
+        writer.flush().result(timeout=5)
+    finally:
+        writer.stop()
+
+    with session_scope() as db:
+        assert JobRepository(db).get("job_1").progress_percent == 9
+
+    metrics = writer.metrics()
+    assert metrics["written"] == 11
+    assert metrics["batches"] < metrics["written"]
+
+
+def test_failed_op_is_isolated_from_batch(session_scope):
+    """批内单个操作失败不影响其他操作"""
+    writer = DBWriteQueue(max_batch=50, max_delay_ms=50, session_scope=session_scope)
+    writer.start()
+    try:
+        ok = writer.submit(lambda db: JobRepository(db).update_progress("job_1", "a", 50, ""))
+        bad = writer.submit(lambda db: JobRepository(db).update_progress("job_missing", "a", 50, ""))
+        writer.flush().result(timeout=5)
+    finally:
+        writer.stop()
+
+    assert ok.exception() is None
+    assert bad.exception() is not None
+    with session_scope() as db:
+        assert JobRepository(db).get("job_1").progress_percent == 50
+
+
+def test_submit_runs_inline_when_not_started(session_scope):
+    writer = DBWriteQueue(session_scope=session_scope)
+    future = writer.submit(lambda db: JobRepository(db).update_progress("job_1", "a", 20, ""))
+    assert future.done()
+    with session_scope() as db:
+        assert JobRepository(db).get("job_1").progress_percent == 20
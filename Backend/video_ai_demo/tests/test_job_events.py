@@ -0,0 +1,77 @@
+"""Job事件总线测试"""
+import json
+import pytest
+
+from app.pipeline.events import JobEventBus
+
+
+def _payload(frame: str) -> dict:
+    """解析 SSE 帧中的 data 部分"""
+    data_line = [line for line in frame.splitlines() if line.startswith("data: ")][0]
+    return json.loads(data_line[len("data: "):])
+
+
+@pytest.mark.asyncio
+async def test_segments_are_published_as_deltas():
+    """只推送新增或变化的片段"""
+    bus = JobEventBus()
+    queue = bus.subscribe("job_1")
+
+    seg1 = {"segment_id": "seg_001", "features": [], "analyzing": True}
+    seg2 = {"segment_id": "seg_002", "features": [], "analyzing": True}
+    bus.publish_segments("job_1", [seg1, seg2])
+
+    seg1_done = {**seg1, "analyzing": False}
+    bus.publish_segments("job_1", [seg1_done, seg2])
+
+    first = _payload(queue.get_nowait())
+    second = _payload(queue.get_nowait())
+
+    assert first["type"] == "segments_delta"
+    assert len(first["segments"]) == 2
+    assert second["segments"] == [seg1_done]
+    assert second["total"] == 2
+
+
+@pytest.mark.asyncio
+async def test_viewers_share_encoded_frame_and_late_joiner_gets_snapshot():
+    """多个订阅者共享同一帧，晚加入者从内存获得快照"""
+    bus = JobEventBus()
+    viewer_a = bus.subscribe("job_1")
+    viewer_b = bus.subscribe("job_1")
+
+    bus.publish_progress("job_1", "feature_analysis", 60, "分析视频特征...")
+    bus.publish_segments("job_1", [{"segment_id": "seg_001"}])
+
+    assert viewer_a.get_nowait() is viewer_b.get_nowait()
+
+    snapshot = bus.snapshot("job_1")
+    assert [_payload(f)["type"] for f in snapshot] == ["progress", "segments"]
+
+
+@pytest.mark.asyncio
+async def test_terminal_event_releases_state():
+    """Job结束后释放内存状态，晚加入者回退到数据库"""
+    bus = JobEventBus()
+    queue = bus.subscribe("job_1")
+    bus.publish_progress("job_1", "ingest", 10, "下载视频...")
+    bus.publish_complete("job_1", {"mode": "learn"})
+
+    frames = [queue.get_nowait() for _ in range(queue.qsize())]
+    assert frames[-1].startswith("event: done")
+    assert not bus.is_tracking("job_1")
+    assert bus.snapshot("job_1") is None
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_resynced_with_snapshot():
+    """慢订阅者队列溢出时改投完整快照"""
+    bus = JobEventBus(queue_size=2)
+    queue = bus.subscribe("job_1")
+
+    for i in range(5):
+        bus.publish_segments("job_1", [{"segment_id": f"seg_{i:03d}"}])
+
+    payloads = [_payload(queue.get_nowait()) for _ in range(queue.qsize())]
+    assert payloads[0]["type"] == "segments"
+    assert payloads[0]["total"] == 5
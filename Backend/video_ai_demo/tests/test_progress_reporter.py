@@ -0,0 +1,93 @@
+"""进度上报节流测试"""
+import asyncio
+import pytest
+
+from app.pipeline.progress import ProgressReporter
+
+
+class RecordingWriter:
+    """记录提交的写操作，不访问数据库"""
+
+    def __init__(self):
+        self.ops = []
+
+    def submit(self, op):
+        self.ops.append(op)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRepo:
+    """收集写操作对仓储的调用"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+
+def _replay(op, monkeypatch):
+    repo = FakeRepo()
+    monkeypatch.setattr("app.pipeline.progress.JobRepository", lambda db: repo)
+    op(None)
+    return repo.calls
+
+
+@pytest.mark.asyncio
+async def test_updates_within_interval_are_coalesced():
+    """同一阶段内的高频更新合并为一次写入"""
+    writer, clock = RecordingWriter(), FakeClock()
+    reporter = ProgressReporter("job_1", interval_ms=500, min_delta=1, writer=writer, clock=clock)
+
+    reporter.update("feature_analysis", 60, "分析特征 0/100")
+    for i in range(1, 100):
+        clock.now = i * 0.001
+        reporter.update("feature_analysis", 60 + i * 0.25, f"分析特征 {i}/100")
+
+    assert len(writer.ops) == 1
+    reporter.close()
+    assert len(writer.ops) == 2
+    assert reporter.updates == 100
+
+
+@pytest.mark.asyncio
+async def test_stage_transition_flushes_immediately(monkeypatch):
+    """阶段切换立即写入，并带上积压的片段"""
+    writer, clock = RecordingWriter(), FakeClock()
+    reporter = ProgressReporter("job_1", interval_ms=500, writer=writer, clock=clock)
+
+    reporter.update("scene_detection", 25, "")
+    clock.now = 0.01
+    reporter.save_segments([{"segment_id": "seg_001"}, {"segment_id": "seg_002"}])
+    reporter.save_segments([{"segment_id": "seg_002", "analyzing": False}], start_position=1)
+    reporter.update("feature_analysis", 60, "")
+
+    assert len(writer.ops) == 2
+    calls = _replay(writer.ops[1], monkeypatch)
+    assert [name for name, _ in calls] == [
+        "save_partial_segments", "save_partial_segments", "update_progress"
+    ]
+    assert calls[1][1] == ("job_1", [{"segment_id": "seg_002", "analyzing": False}], 1)
+    assert calls[2][1] == ("job_1", "feature_analysis", 60, "")
+
+
+@pytest.mark.asyncio
+async def test_pending_update_is_written_when_interval_elapses():
+    """间隔内最后一次更新由定时器补写"""
+    writer = RecordingWriter()
+    reporter = ProgressReporter("job_1", interval_ms=20, writer=writer)
+
+    reporter.update("feature_analysis", 60, "")
+    reporter.update("feature_analysis", 70, "")
+    assert len(writer.ops) == 1
+
+    await asyncio.sleep(0.05)
+    assert len(writer.ops) == 2
+    assert reporter.flushes == 2
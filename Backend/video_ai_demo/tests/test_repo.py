@@ -0,0 +1,187 @@
+"""数据仓储层测试"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import Base, Job, JobMode, JobStatus, JobSegment
+from app.db.repo import JobRepository, DashboardStatsRepository
+
+
+@pytest.fixture
+def db():
+    """内存SQLite会话"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def job_repo(db):
+    repo = JobRepository(db)
+    repo.create(Job(id="job_1", mode=JobMode.LEARN, status=JobStatus.RUNNING))
+    return repo
+
+
+def _segment(idx: int, analyzing: bool = True) -> dict:
+    return {
+        "segment_id": f"seg_{idx:03d}",
+        "start_ms": idx * 1000,
+        "end_ms": (idx + 1) * 1000,
+        "features": [],
+        "analyzing": analyzing
+    }
+
+
+def test_partial_segments_are_upserted_per_row(db, job_repo):
+    """只写入变化的片段，按位置物化完整视图"""
+    job_repo.save_partial_segments("job_1", [_segment(i) for i in range(3)])
+    job_repo.save_partial_segments("job_1", [_segment(1, analyzing=False)], start_position=1)
+
+    assert db.query(JobSegment).count() == 3
+
+    partial = job_repo.get_partial_result("job_1")
+    segments = partial["target"]["segments"]
+    assert [s["segment_id"] for s in segments] == ["seg_000", "seg_001", "seg_002"]
+    assert segments[1]["analyzing"] is False
+    assert partial["target"]["analyzing"] is True
+
+
+def test_partial_result_done_when_all_segments_analyzed(job_repo):
+    job_repo.save_partial_segments("job_1", [_segment(0, analyzing=False)])
+    assert job_repo.get_partial_result("job_1")["target"]["analyzing"] is False
+
+
+def test_clear_partial_segments(job_repo):
+    job_repo.save_partial_segments("job_1", [_segment(0)])
+    assert job_repo.clear_partial_segments("job_1") == 1
+    assert job_repo.get_partial_result("job_1") is None
+
+
+def test_detection_method_follows_job_config(job_repo):
+    job_repo.save_partial_segments("job_1", [_segment(0)])
+    assert job_repo.get_partial_result("job_1")["target"]["detection_method"] == "cv"
+
+    job_repo.get("job_1").config_json = '{"options": {"scene_detection": {"use_cv": false}}}'
+    assert job_repo.get_partial_result("job_1")["target"]["detection_method"] == "llm"
+
+
+def test_requeue_discards_previous_attempt_segments(job_repo):
+    """重试的Job不会把上一次执行的片段当作自己的流式结果"""
+    job_repo.save_partial_segments("job_1", [_segment(0)])
+    job_repo.requeue("job_1")
+    assert job_repo.get_partial_result("job_1") is None
+
+    job_repo.save_partial_segments("job_1", [_segment(0)])
+    job_repo.enqueue("job_1", {"mode": "learn"})
+    assert job_repo.get_partial_result("job_1") is None
+
+
+def test_claim_next_respects_priority_and_lease(db):
+    """按优先级领取，同一Job只能被领取一次"""
+    repo = JobRepository(db)
+    for job_id, priority in [("job_low", 0), ("job_high", 5)]:
+        repo.create(Job(id=job_id, mode=JobMode.LEARN, status=JobStatus.QUEUED))
+        repo.enqueue(job_id, {"mode": "learn"}, priority=priority)
+
+    first = repo.claim_next("worker_a", lease_seconds=60)
+    second = repo.claim_next("worker_b", lease_seconds=60)
+
+    assert first.id == "job_high"
+    assert first.status == JobStatus.RUNNING
+    assert first.lease_owner == "worker_a"
+    assert first.attempts == 1
+    assert second.id == "job_low"
+    assert repo.claim_next("worker_a", lease_seconds=60) is None
+    assert repo.renew_lease("job_high", "worker_b", 60) is False
+
+
+def test_graceful_requeue_does_not_count_attempt(db):
+    """优雅停机重新排队不消耗重试次数，崩溃恢复仍然计入"""
+    repo = JobRepository(db)
+    repo.create(Job(id="job_1", mode=JobMode.LEARN, status=JobStatus.QUEUED))
+    repo.enqueue("job_1", {"mode": "learn"})
+
+    for _ in range(5):
+        assert repo.claim_next("worker_a", lease_seconds=60).attempts == 1
+        repo.requeue("job_1", count_attempt=False)
+    assert repo.get("job_1").attempts == 0
+
+    repo.claim_next("worker_a", lease_seconds=60)
+    repo.requeue("job_1")
+    assert repo.get("job_1").attempts == 1
+
+
+def test_recover_orphaned_requeues_expired_leases(db):
+    """租约过期的RUNNING Job重新排队，超过重试次数则失败"""
+    repo = JobRepository(db)
+    for job_id in ["job_orphan", "job_exhausted"]:
+        repo.create(Job(id=job_id, mode=JobMode.LEARN, status=JobStatus.QUEUED))
+        repo.enqueue(job_id, {"mode": "learn"})
+        repo.claim_next("worker_dead", lease_seconds=-1)
+    repo.get("job_exhausted").attempts = 3
+
+    requeued, failed = repo.recover_orphaned(max_attempts=3)
+
+    assert requeued == ["job_orphan"]
+    assert failed == ["job_exhausted"]
+    assert repo.get("job_orphan").status == JobStatus.QUEUED
+    assert repo.get("job_exhausted").status == JobStatus.FAILED
+    assert repo.count_queued_by_priority() == {0: 1}
+
+
+def test_save_result_materializes_summary_columns(job_repo):
+    """保存结果时写入摘要字段，统计无需解析result_json"""
+    result = {
+        "mode": "learn",
+        "target": {"segments": [
+            {**_segment(0), "features": [{"type": "push_in"}, {"type": "natural"}]},
+            {**_segment(1), "features": [{"type": "warm_tone"}]}
+        ]}
+    }
+    job_repo.save_result("job_1", result)
+    job_repo.update_status("job_1", JobStatus.SUCCEEDED)
+
+    job = job_repo.list_history()[0]
+    assert (job.segment_count, job.duration_ms, job.feature_count) == (2, 2000, 3)
+
+
+def test_count_by_status_includes_empty_statuses(job_repo):
+    counts = job_repo.count_by_status()
+    assert counts[JobStatus.RUNNING] == 1
+    assert counts[JobStatus.QUEUED] == 0
+    assert set(counts) == set(JobStatus)
+
+
+def test_dashboard_stats_are_updated_incrementally(db, job_repo):
+    """状态变化与结果保存增量更新聚合，与全量重建一致"""
+    stats = DashboardStatsRepository(db)
+    job_repo.create(Job(id="job_2", mode=JobMode.LEARN, status=JobStatus.QUEUED))
+    job_repo.save_result("job_1", {"target": {"segments": [{**_segment(0), "features": [{}]}]}})
+    job_repo.update_status("job_1", JobStatus.SUCCEEDED)
+
+    counts = stats.get_status_counts()
+    assert counts[JobStatus.RUNNING] == 0
+    assert counts[JobStatus.QUEUED] == 1
+    assert counts[JobStatus.SUCCEEDED] == 1
+    assert stats.get_totals() == {"duration_ms": 1000.0, "feature_count": 1}
+    incremental = (stats.get_status_counts(), stats.get_totals())
+
+    stats.rebuild()
+    assert (stats.get_status_counts(), stats.get_totals()) == incremental
+
+    job_repo.delete("job_1")
+    assert stats.get_status_counts()[JobStatus.SUCCEEDED] == 0
+    assert stats.get_totals() == {"duration_ms": 0.0, "feature_count": 0}
+
+
+def test_get_version_changes_with_streamed_segments(job_repo):
+    """运行中Job的版本随流式片段变化，用于ETag"""
+    before = job_repo.get_version("job_1")
+    job_repo.save_partial_segments("job_1", [_segment(0)])
+
+    assert job_repo.get_version("job_1") != before
+    assert job_repo.get_version("job_missing") is None
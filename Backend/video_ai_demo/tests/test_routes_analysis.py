@@ -0,0 +1,28 @@
+"""视频分析路由测试"""
+import threading
+import pytest
+
+from app.core.response import ErrorCode
+from app.api.routes_analysis import CreateAnalysisRequest, create_analysis
+
+
+@pytest.mark.asyncio
+async def test_create_extracts_frames_off_the_event_loop(monkeypatch, tmp_path):
+    """抽帧在线程池中执行，不阻塞事件循环"""
+    threads = []
+
+    def fake_extract_frames(video_path, frames_dir, **kwargs):
+        threads.append(threading.current_thread().name)
+        return {"frames_index": []}
+
+    monkeypatch.setattr(
+        "app.pipeline.steps.extract_frames.extract_frames", fake_extract_frames
+    )
+
+    response = await create_analysis(
+        CreateAnalysisRequest(url=str(tmp_path / "video.mp4")), current_user=None
+    )
+
+    assert threads and threads[0].startswith("pipeline-step")
+    assert threads[0] != threading.current_thread().name
+    assert response["error"]["code"] == ErrorCode.ANALYSIS_FAILED
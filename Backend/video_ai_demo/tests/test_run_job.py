@@ -0,0 +1,69 @@
+"""Job执行取消测试"""
+import asyncio
+import pytest
+
+from app.pipeline.events import job_event_bus
+from app.pipeline.orchestrator import _run_job
+from app.pipeline.progress import ProgressReporter
+
+
+class RecordingWriter:
+    """记录提交的写操作，不访问数据库"""
+
+    def __init__(self):
+        self.ops = []
+
+    def submit(self, op):
+        self.ops.append(op)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class BlockingOrchestrator:
+    """上报进度后一直等待，直到被取消"""
+
+    def __init__(self, job_id: str, writer: RecordingWriter, clock: FakeClock):
+        self.job_id = job_id
+        self.progress = ProgressReporter(job_id, interval_ms=500, min_delta=1, writer=writer, clock=clock)
+        self.started = asyncio.Event()
+        self._clock = clock
+
+    async def execute(self):
+        self.progress.update("feature_analysis", 60, "分析特征 0/10")
+        job_event_bus.publish_progress(self.job_id, "feature_analysis", 60, "分析特征 0/10")
+        self._clock.now = 0.1
+        # 间隔内的更新由定时器延迟写入
+        self.progress.update("feature_analysis", 65, "分析特征 2/10")
+        self.started.set()
+        await asyncio.Event().wait()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_job_discards_pending_progress_and_bus_state():
+    """队列停止或租约被接管时取消定时写入并释放总线状态"""
+    writer, clock = RecordingWriter(), FakeClock()
+    orchestrator = BlockingOrchestrator("job_cancel", writer, clock)
+    task = asyncio.create_task(_run_job("job_cancel", orchestrator))
+    await orchestrator.started.wait()
+
+    assert orchestrator.progress._timer is not None
+    assert job_event_bus.is_tracking("job_cancel")
+    writes = len(writer.ops)
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert orchestrator.progress._timer is None
+    assert not job_event_bus.is_tracking("job_cancel")
+
+    # 定时器到期后也不会再写入旧进度
+    await asyncio.sleep(0.6)
+    orchestrator.progress.close()
+    assert len(writer.ops) == writes
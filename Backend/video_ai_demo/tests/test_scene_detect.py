@@ -0,0 +1,137 @@
+"""场景检测步骤测试"""
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from app.pipeline.steps.scene_detect import detect_scenes, detect_scenes_and_sample_frames
+
+
+@pytest.fixture
+def two_scene_video(tmp_path):
+    """合成视频：两个颜色不同的场景，各3秒（25fps）"""
+    path = tmp_path / "two_scenes.mp4"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 25, (320, 180))
+    for color in [(200, 30, 30), (30, 30, 200)]:
+        for i in range(75):
+            frame = np.full((180, 320, 3), color, np.uint8)
+            cv2.circle(frame, (40 + i * 3, 90), 20, (255, 255, 255), -1)
+            writer.write(frame)
+    writer.release()
+    return str(path)
+
+
+def test_single_pass_matches_scene_manager(two_scene_video, tmp_path):
+    """单次解码的切点与 SceneManager 一致，并同时产出抽帧索引"""
+    expected = detect_scenes(two_scene_video, tmp_path / "reference")
+    result = detect_scenes_and_sample_frames(
+        two_scene_video,
+        tmp_path / "job",
+        fps=2.0,
+        max_frames=10,
+        keyframes_dir=tmp_path / "job" / "scene_keyframes"
+    )
+
+    assert [(s["start_frame"], s["end_frame"]) for s in result["segments"]] == [
+        (s["start_frame"], s["end_frame"]) for s in expected
+    ]
+    assert result["total_frames"] == 10
+    assert [f["ts_ms"] for f in result["frames_index"][:3]] == [0.0, 500.0, 1000.0]
+    assert (tmp_path / "job" / "frames_index.json").exists()
+    assert len(list((tmp_path / "job" / "scene_keyframes").glob("*-keyframe.jpg"))) == len(expected)
+
+
+@pytest.fixture
+def textured_video(tmp_path):
+    """合成视频：三个纹理不同的场景（光流需要纹理），镜头平移，各40帧"""
+    path = tmp_path / "textured.mp4"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 25, (320, 180))
+    rng = np.random.default_rng(0)
+    for _ in range(3):
+        texture = cv2.GaussianBlur(rng.integers(0, 255, (220, 360, 3), dtype=np.uint8), (0, 0), 4)
+        texture = cv2.normalize(texture, None, 0, 255, cv2.NORM_MINMAX)
+        for i in range(40):
+            writer.write(np.ascontiguousarray(texture[i // 2:i // 2 + 180, i:i + 320]))
+    writer.release()
+    return str(path)
+
+
+def test_fast_optical_flow_matches_full_mode(textured_video, tmp_path):
+    """快速模式只在候选区间计算光流，切点与逐帧模式一致"""
+    from app.pipeline.steps.scene_detect import detect_scenes_with_optical_flow
+
+    full = detect_scenes_with_optical_flow(textured_video, tmp_path, flow_threshold=3.0)
+    fast = detect_scenes_with_optical_flow(
+        textured_video, tmp_path, flow_threshold=3.0, fast=True
+    )
+
+    assert [s["start_frame"] for s in fast] == [0, 40, 80]
+    assert [s["start_frame"] for s in fast] == [s["start_frame"] for s in full]
+    assert fast[-1]["end_frame"] == 119
+
+
+def test_vectorized_histograms_match_opencv():
+    """查找表+bincount 直方图与 cv2.calcHist 一致，向量化距离与 compareHist 一致"""
+    from app.pipeline.shot_boundary import compute_histograms, consecutive_distances
+
+    rng = np.random.default_rng(1)
+    frames = rng.integers(0, 255, (3, 36, 64, 3), dtype=np.uint8)
+    hsv = np.stack([cv2.cvtColor(f, cv2.COLOR_BGR2HSV) for f in frames])
+    hists = compute_histograms(hsv)
+
+    expected = [
+        cv2.calcHist([h], [0, 1], None, [50, 60], [0, 180, 0, 256]).flatten() for h in hsv
+    ]
+    np.testing.assert_allclose(hists, np.stack(expected))
+
+    correl = consecutive_distances(hists, "correl")
+    chisqr = consecutive_distances(hists, "chisqr")
+    normalized = [cv2.normalize(h, None).flatten() for h in expected]
+    for i in range(2):
+        assert correl[i] == pytest.approx(
+            cv2.compareHist(expected[i], expected[i + 1], cv2.HISTCMP_CORREL), abs=1e-4
+        )
+        assert chisqr[i] == pytest.approx(
+            cv2.compareHist(normalized[i], normalized[i + 1], cv2.HISTCMP_CHISQR), rel=1e-3
+        )
+
+
+def test_vendored_shot_boundary_matches_source():
+    """app/pipeline/shot_boundary.py 与 phone_ai 中的源文件逐字一致（不在同一仓库时跳过）"""
+    source = Path(__file__).resolve().parents[2] / "phone_ai" / "src" / "services" / "shot_boundary.py"
+    if not source.exists():
+        pytest.skip("phone_ai 源文件不存在")
+    vendored = Path(__file__).resolve().parents[1] / "app" / "pipeline" / "shot_boundary.py"
+
+    lines = vendored.read_text(encoding="utf-8").splitlines()
+    # 去掉开头的复制说明注释
+    while lines and lines[0].startswith("#"):
+        lines.pop(0)
+    assert lines == source.read_text(encoding="utf-8").splitlines()
+
+
+def test_histogram_streaming_matches_full(two_scene_video):
+    """流式模式（小批次跨批携带）与完整模式结果一致"""
+    from app.pipeline.shot_boundary import histogram_distances
+
+    idx_full, dist_full, _, total = histogram_distances(
+        two_scene_video, metric="correl", sample_rate=5, streaming=False
+    )
+    idx_stream, dist_stream, _, _ = histogram_distances(
+        two_scene_video, metric="correl", sample_rate=5, batch_size=4
+    )
+
+    np.testing.assert_array_equal(idx_full, idx_stream)
+    np.testing.assert_allclose(dist_full, dist_stream)
+    assert total == 150
+
+
+def test_detect_scenes_simple(two_scene_video, tmp_path):
+    """快速场景检测找到颜色切换点"""
+    from app.pipeline.steps.scene_detect import detect_scenes_simple
+
+    segments = detect_scenes_simple(two_scene_video, tmp_path)
+
+    assert [s["start_frame"] for s in segments] == [0, 75]
+    assert segments[-1]["end_frame"] == 149
@@ -147,6 +147,8 @@ export const streamJobProgress = (
 ): { close: () => void } => {
   const url = `${SHOT_ANALYSIS_BASE_URL}${API_BASE_PATH}/jobs/${jobId}/stream`;
   const eventSource = new EventSource(url);
+  // 当前片段视图（按 segment_id 合并增量）
+  let currentSegments: any[] = [];
 
   eventSource.onmessage = (event) => {
     try {
@@ -165,9 +167,31 @@ export const streamJobProgress = (
           break;
 
         case 'segments':
-          // 片段数据更新
-          if (callbacks.onSegments && data.segments) {
-            callbacks.onSegments(data.segments);
+          // 完整片段快照
+          if (data.segments) {
+            currentSegments = data.segments;
+            if (callbacks.onSegments) {
+              callbacks.onSegments(currentSegments);
+            }
+          }
+          break;
+
+        case 'segments_delta':
+          // 片段增量：只包含新增或变化的片段
+          if (data.segments) {
+            const merged = [...currentSegments];
+            for (const segment of data.segments) {
+              const index = merged.findIndex(s => s.segment_id === segment.segment_id);
+              if (index >= 0) {
+                merged[index] = segment;
+              } else {
+                merged.push(segment);
+              }
+            }
+            currentSegments = merged;
+            if (callbacks.onSegments) {
+              callbacks.onSegments(currentSegments);
+            }
           }
           break;
 